@@ -0,0 +1,393 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from aiogram import Router, F, Bot
+from aiogram.types import Message, CallbackQuery
+from aiogram.filters import Command
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from db_utils import (
+    create_broadcast, get_broadcast, get_broadcasts, set_broadcast_status,
+    get_broadcast_recipients, checkpoint_broadcast
+)
+from services.outbound import get_outbound_queue, PRIORITY_BROADCAST, PRIORITY_INTERACTIVE
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Создаем роутер для рассылок
+broadcast_router = Router()
+
+# Администраторы, которым доступны рассылки
+BROADCAST_ADMIN_IDS = [
+    123456789,  # Заменить на реальный ID администратора
+]
+
+# Сколько получателей обрабатывается между сохранениями прогресса.
+# После сбоя страница отправляется заново, поэтому часть получателей
+# последней страницы может получить сообщение дважды
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+
+# Интервал обновления сообщения с прогрессом рассылки (секунды)
+BROADCAST_REPORT_INTERVAL = 5
+
+# Ответы Telegram, после которых пользователь больше не получит сообщения
+BLOCKED_ERRORS = ("chat not found", "user is deactivated", "bot was blocked", "bot can't initiate")
+
+# Статусы, из которых рассылку можно отменить
+BROADCAST_CANCELLABLE = ("draft", "running", "paused")
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Выполняющиеся рассылки: ID рассылки -> задача
+_running: Dict[int, asyncio.Task] = {}
+
+def _is_blocked_error(error: Exception) -> bool:
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    return isinstance(error, TelegramBadRequest) and any(text in str(error).lower() for text in BLOCKED_ERRORS)
+
+async def _deliver(bot: Bot, user_id: int, text: str) -> str:
+    try:
+        await get_outbound_queue().send_message(bot, user_id, text, priority=PRIORITY_BROADCAST, parse_mode="HTML")
+        return "sent"
+    except Exception as e:
+        if _is_blocked_error(e):
+            return "blocked"
+        logger.error(f"Ошибка при отправке рассылки пользователю {user_id}: {e}")
+        return "failed"
+
+async def run_broadcast(bot: Bot, broadcast_id: int, on_progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, Any]]:
+    """
+    Отправляет рассылку, начиная с последнего сохраненного получателя.
+
+    Получатели выбираются из users страницами по BROADCAST_BATCH_SIZE
+    по возрастанию user_id, сообщения отправляются через очередь исходящих
+    сообщений с самым низким приоритетом. После каждой страницы прогресс
+    сохраняется в базе, поэтому после перезапуска или паузы рассылка
+    продолжается с места остановки. Пользователи, заблокировавшие бота,
+    запоминаются и в следующие рассылки не попадают. Перед каждой страницей
+    проверяется статус: если администратор поставил рассылку на паузу или
+    отменил ее, отправка прекращается.
+
+    Args:
+        bot: Бот, который отправляет сообщения
+        broadcast_id: ID рассылки
+        on_progress: Функция, которая получает рассылку с прогрессом после каждой страницы
+
+    Returns:
+        Optional[Dict[str, Any]]: Рассылка с итоговым прогрессом и скоростью
+        или None, если рассылки нет
+    """
+    campaign = await get_broadcast(broadcast_id)
+    if campaign is None:
+        return None
+    if campaign["status"] in ("draft", "paused"):
+        await set_broadcast_status(broadcast_id, "running")
+
+    started = time.monotonic()
+    processed = 0
+    last_user_id = campaign["last_user_id"]
+    while True:
+        campaign = await get_broadcast(broadcast_id)
+        if campaign is None or campaign["status"] != "running":
+            break
+
+        user_ids = await get_broadcast_recipients(last_user_id, BROADCAST_BATCH_SIZE)
+        if not user_ids:
+            await set_broadcast_status(broadcast_id, "done")
+            campaign = await get_broadcast(broadcast_id)
+            break
+
+        results = await asyncio.gather(*(_deliver(bot, user_id, campaign["text"]) for user_id in user_ids))
+        blocked = [user_id for user_id, result in zip(user_ids, results) if result == "blocked"]
+        last_user_id = user_ids[-1]
+        if not await checkpoint_broadcast(
+            broadcast_id, last_user_id, results.count("sent"), results.count("failed"), blocked
+        ):
+            # Без сохраненного прогресса продолжать нельзя: после перезапуска страницы ушли бы повторно
+            await set_broadcast_status(broadcast_id, "paused")
+            break
+        processed += len(user_ids)
+
+        if on_progress is not None:
+            progress = await get_broadcast(broadcast_id)
+            if progress is not None:
+                progress["rate"] = processed / max(time.monotonic() - started, 0.001)
+                await on_progress(progress)
+
+    if campaign is not None:
+        campaign["rate"] = processed / max(time.monotonic() - started, 0.001)
+        logger.info(
+            f"Рассылка {broadcast_id}: статус {campaign['status']}, доставлено {campaign['sent']}, "
+            f"заблокировали бота {campaign['blocked']}, ошибок {campaign['failed']}, "
+            f"{campaign['rate']:.1f} сообщ./с"
+        )
+    return campaign
+
+def format_broadcast_report(campaign: Dict[str, Any]) -> str:
+    """
+    Форматирует прогресс рассылки для администратора.
+
+    Args:
+        campaign: Рассылка из базы (с необязательной скоростью rate)
+
+    Returns:
+        str: Текст отчета в HTML-разметке
+    """
+    processed = campaign["sent"] + campaign["failed"] + campaign["blocked"]
+    total = max(campaign["total"], processed)
+    percent = processed / total * 100 if total else 100.0
+    text = (
+        f"📣 <b>Рассылка #{campaign['id']}</b> - {campaign['status']}\n\n"
+        f"Обработано: <b>{processed}</b> из <b>{total}</b> ({percent:.0f}%)\n"
+        f"Доставлено: <b>{campaign['sent']}</b>\n"
+        f"Заблокировали бота: <b>{campaign['blocked']}</b>\n"
+        f"Ошибок: <b>{campaign['failed']}</b>"
+    )
+    rate = campaign.get("rate")
+    if rate:
+        text += f"\nСкорость: <b>{rate:.1f}</b> сообщ./с"
+        if campaign["status"] == "running" and total > processed:
+            text += f", осталось около {(total - processed) / rate / 60:.0f} мин"
+    return text
+
+def start_broadcast(bot: Bot, broadcast_id: int, report_message: Optional[Message] = None) -> bool:
+    """
+    Запускает рассылку в фоне и обновляет сообщение с прогрессом.
+
+    Args:
+        bot: Бот, который отправляет сообщения
+        broadcast_id: ID рассылки
+        report_message: Сообщение администратору, в котором показывается прогресс
+
+    Returns:
+        bool: False, если эта рассылка уже выполняется
+    """
+    task = _running.get(broadcast_id)
+    if task is not None and not task.done():
+        return False
+
+    last_report = 0.0
+
+    async def edit_report(campaign: Dict[str, Any], force: bool = False) -> None:
+        nonlocal last_report
+        if report_message is None or (not force and time.monotonic() - last_report < BROADCAST_REPORT_INTERVAL):
+            return
+        last_report = time.monotonic()
+        try:
+            await get_outbound_queue().send(
+                report_message.chat.id,
+                lambda: report_message.edit_text(format_broadcast_report(campaign), parse_mode="HTML"),
+                priority=PRIORITY_INTERACTIVE
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось обновить прогресс рассылки {broadcast_id}: {e}")
+
+    async def run() -> None:
+        try:
+            campaign = await run_broadcast(bot, broadcast_id, edit_report)
+            if campaign is not None:
+                await edit_report(campaign, force=True)
+        except Exception as e:
+            logger.error(f"Рассылка {broadcast_id} прервана ошибкой: {e}")
+        finally:
+            _running.pop(broadcast_id, None)
+
+    _running[broadcast_id] = asyncio.get_running_loop().create_task(run())
+    return True
+
+async def resume_broadcasts(bot: Bot) -> int:
+    """
+    Продолжает рассылки, прерванные перезапуском бота.
+
+    Args:
+        bot: Бот, который отправляет сообщения
+
+    Returns:
+        int: Количество продолженных рассылок
+    """
+    campaigns = await get_broadcasts("running")
+    for campaign in campaigns:
+        logger.info(f"Продолжаем рассылку {campaign['id']} после пользователя {campaign['last_user_id']}")
+        start_broadcast(bot, campaign["id"])
+    return len(campaigns)
+
+def _is_admin(message: Message) -> bool:
+    if message.from_user.id in BROADCAST_ADMIN_IDS:
+        return True
+    logger.warning(f"Пользователь {message.from_user.id} попытался управлять рассылками без прав")
+    return False
+
+def _parse_broadcast_id(message: Message) -> Optional[int]:
+    parts = message.text.split()
+    if len(parts) < 2 or not parts[1].isdigit():
+        return None
+    return int(parts[1])
+
+# Обработчики команд
+@broadcast_router.message(Command("broadcast"))
+async def cmd_broadcast(message: Message):
+    """
+    Обработчик команды /broadcast для создания рассылки всем пользователям.
+    Формат: /broadcast ТЕКСТ - текст может содержать форматирование.
+    Доступно только администраторам.
+    """
+    if not _is_admin(message):
+        await message.answer("⛔ У вас нет прав для выполнения этой команды.")
+        return
+
+    # Берем текст с форматированием, без самой команды
+    parts = message.html_text.split(maxsplit=1)
+    if len(parts) < 2:
+        await message.answer(
+            "❌ Неверный формат команды. Используйте: /broadcast ТЕКСТ\n\n"
+            "Управление: /broadcast_status [ID], /broadcast_pause ID, /broadcast_resume ID, /broadcast_cancel ID"
+        )
+        return
+
+    broadcast_id = await create_broadcast(message.from_user.id, parts[1])
+    if broadcast_id is None:
+        await message.answer("❌ Не удалось создать рассылку.")
+        return
+    campaign = await get_broadcast(broadcast_id)
+
+    builder = InlineKeyboardBuilder()
+    builder.button(text="✅ Отправить", callback_data=f"broadcast_start_{broadcast_id}")
+    builder.button(text="❌ Отменить", callback_data=f"broadcast_drop_{broadcast_id}")
+    builder.adjust(2)
+
+    await message.answer(parts[1], parse_mode="HTML")
+    await message.answer(
+        f"📣 Рассылка #{broadcast_id}: сообщение выше получат <b>{campaign['total']}</b> пользователей. Отправить?",
+        parse_mode="HTML",
+        reply_markup=builder.as_markup()
+    )
+    logger.info(f"Администратор {message.from_user.id} создал рассылку {broadcast_id}")
+
+@broadcast_router.callback_query(F.data.startswith("broadcast_start_"))
+async def start_broadcast_callback(callback: CallbackQuery, bot: Bot):
+    """
+    Обработчик подтверждения рассылки.
+    """
+    if callback.from_user.id not in BROADCAST_ADMIN_IDS:
+        await callback.answer("⛔ Нет прав")
+        return
+
+    broadcast_id = int(callback.data.rsplit("_", 1)[1])
+    campaign = await get_broadcast(broadcast_id)
+    if campaign is None or not await set_broadcast_status(broadcast_id, "running", from_statuses=("draft",)):
+        await callback.answer("Рассылка уже запущена или отменена")
+        return
+
+    campaign["status"] = "running"
+    await callback.message.edit_text(format_broadcast_report(campaign), parse_mode="HTML")
+    start_broadcast(bot, broadcast_id, callback.message)
+    await callback.answer("Рассылка запущена")
+    logger.info(f"Администратор {callback.from_user.id} запустил рассылку {broadcast_id}")
+
+@broadcast_router.callback_query(F.data.startswith("broadcast_drop_"))
+async def drop_broadcast_callback(callback: CallbackQuery):
+    """
+    Обработчик отмены черновика рассылки.
+    """
+    if callback.from_user.id not in BROADCAST_ADMIN_IDS:
+        await callback.answer("⛔ Нет прав")
+        return
+
+    broadcast_id = int(callback.data.rsplit("_", 1)[1])
+    if not await set_broadcast_status(broadcast_id, "cancelled", from_statuses=("draft",)):
+        # Рассылку уже запустили или отменили: отменить можно только черновик
+        campaign = await get_broadcast(broadcast_id)
+        await callback.answer(f"Рассылка в статусе {campaign['status'] if campaign else 'удалена'}, отменить можно только черновик")
+        return
+
+    await callback.message.edit_text(f"❌ Рассылка #{broadcast_id} отменена.")
+    await callback.answer()
+
+@broadcast_router.message(Command("broadcast_status"))
+async def cmd_broadcast_status(message: Message):
+    """
+    Обработчик команды /broadcast_status для просмотра прогресса рассылок.
+    Формат: /broadcast_status [ID] - без ID показывает последние рассылки.
+    Доступно только администраторам.
+    """
+    if not _is_admin(message):
+        await message.answer("⛔ У вас нет прав для выполнения этой команды.")
+        return
+
+    broadcast_id = _parse_broadcast_id(message)
+    if broadcast_id is not None:
+        campaign = await get_broadcast(broadcast_id)
+        campaigns = [campaign] if campaign else []
+    else:
+        campaigns = await get_broadcasts(limit=5)
+
+    if not campaigns:
+        await message.answer("Рассылок пока нет.")
+        return
+    await message.answer("\n\n".join(format_broadcast_report(campaign) for campaign in campaigns), parse_mode="HTML")
+
+@broadcast_router.message(Command("broadcast_pause", "broadcast_cancel"))
+async def cmd_broadcast_stop(message: Message):
+    """
+    Обработчик команд /broadcast_pause и /broadcast_cancel.
+    Формат: /broadcast_pause ID - рассылку можно продолжить командой /broadcast_resume,
+    /broadcast_cancel ID - рассылка останавливается окончательно.
+    Доступно только администраторам.
+    """
+    if not _is_admin(message):
+        await message.answer("⛔ У вас нет прав для выполнения этой команды.")
+        return
+
+    broadcast_id = _parse_broadcast_id(message)
+    campaign = await get_broadcast(broadcast_id) if broadcast_id is not None else None
+    if campaign is None:
+        await message.answer("❌ Укажите ID существующей рассылки, например: /broadcast_pause 3")
+        return
+
+    status = "cancelled" if message.text.startswith("/broadcast_cancel") else "paused"
+    # Пауза - только для выполняющейся рассылки, отмена - для еще не завершенной
+    allowed = BROADCAST_CANCELLABLE if status == "cancelled" else ("running",)
+    if campaign["status"] not in allowed or not await set_broadcast_status(broadcast_id, status, from_statuses=allowed):
+        campaign = await get_broadcast(broadcast_id) or campaign
+        if status == "cancelled":
+            action = "отменить можно только черновик, выполняющуюся рассылку или рассылку на паузе"
+        else:
+            action = "поставить на паузу можно только выполняющуюся рассылку"
+        await message.answer(f"❌ Рассылка #{broadcast_id} в статусе {campaign['status']}: {action}.")
+        return
+
+    if campaign["status"] == "running":
+        await message.answer(
+            f"⏸ Рассылка #{broadcast_id} остановится после текущей страницы ({'отменена' if status == 'cancelled' else 'пауза'})."
+        )
+    else:
+        await message.answer(f"❌ Рассылка #{broadcast_id} отменена.")
+    logger.info(f"Администратор {message.from_user.id} перевел рассылку {broadcast_id} в статус {status}")
+
+@broadcast_router.message(Command("broadcast_resume"))
+async def cmd_broadcast_resume(message: Message, bot: Bot):
+    """
+    Обработчик команды /broadcast_resume для продолжения рассылки после паузы.
+    Формат: /broadcast_resume ID
+    Доступно только администраторам.
+    """
+    if not _is_admin(message):
+        await message.answer("⛔ У вас нет прав для выполнения этой команды.")
+        return
+
+    broadcast_id = _parse_broadcast_id(message)
+    campaign = await get_broadcast(broadcast_id) if broadcast_id is not None else None
+    if campaign is None or not await set_broadcast_status(broadcast_id, "running", from_statuses=("paused", "running")):
+        await message.answer("❌ Продолжить можно только рассылку на паузе.")
+        return
+
+    campaign["status"] = "running"
+    report_message = await message.answer(format_broadcast_report(campaign), parse_mode="HTML")
+    if not start_broadcast(bot, broadcast_id, report_message):
+        await message.answer("Рассылка уже выполняется.")
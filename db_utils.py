@@ -1,7 +1,10 @@
 import aiosqlite
+import asyncio
 import os
 import logging
-from typing import Dict, Any, Optional, List, Tuple, Union
+from datetime import datetime
+from itertools import groupby
+from typing import Dict, Any, Optional, List, Tuple, Union, Sequence
 
 # Путь к БД
 DB_PATH = os.getenv("DB_PATH", "BD_ONA.db")
@@ -90,6 +93,10 @@ async def save_user(user_id: int, username: Optional[str], full_name: Optional[s
                 )
                 railway_print(f"Добавлен новый пользователь {user_id}", "INFO")
             
+            # Пользователь снова пишет боту - значит, он его разблокировал
+            await _ensure_broadcast_tables(db)
+            await db.execute("DELETE FROM blocked_users WHERE user_id = ?", (user_id,))
+            
             await db.commit()
             return True
     except Exception as e:
@@ -430,4 +437,1564 @@ async def get_profile_data(user_id: int) -> Tuple[Optional[str], Optional[str]]:
     except Exception as e:
         railway_print(f"Ошибка при получении профиля пользователя: {e}", "ERROR")
         logger.error(f"Ошибка при получении профиля пользователя: {e}")
-        return None, None 
\ No newline at end of file
+        return None, None
+
+async def iter_stored_answers(batch_size: int = 200, after_user_id: int = 0, completed_only: bool = False):
+    """
+    Потоково перебирает сохраненные ответы пользователей на опрос.
+    
+    Ответы берутся из данных FSM (user_states), где хранится полный словарь
+    answers; если в состоянии ответов нет, используются строки survey_answers,
+    записанные по ходу опроса, или строки user_answers.
+    Пользователи перебираются пачками по возрастанию user_id (keyset-пагинация),
+    поэтому в памяти одновременно находится не больше одной пачки.
+    
+    Args:
+        batch_size: Количество пользователей в одной пачке
+        after_user_id: Начать перебор с пользователей, чей ID больше указанного
+        completed_only: Только пользователи с готовым профилем (profile_completed
+            в состоянии или строка user_profiles), которые не проходят опрос сейчас
+            (нет строки survey_progress), чтобы не использовать неполные ответы
+    
+    Yields:
+        Tuple[int, Dict[str, Any]]: Кортеж (ID пользователя, словарь ответов)
+    """
+    import json
+    
+    last_user_id = after_user_id
+    while True:
+        try:
+            async with aiosqlite.connect(DB_PATH) as db:
+                db.row_factory = aiosqlite.Row
+                
+                # Проверяем, существует ли таблица user_states
+                await db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_states (
+                        user_id INTEGER PRIMARY KEY,
+                        state_name TEXT,
+                        state_data TEXT,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                )
+                await _ensure_survey_tables(db)
+                await db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS user_profiles (
+                        user_id INTEGER PRIMARY KEY,
+                        profile_text TEXT,
+                        personality_type TEXT,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                )
+                
+                async with db.execute(
+                    """
+                    SELECT u.user_id AS user_id, s.state_data AS state_data,
+                           EXISTS (SELECT 1 FROM user_profiles WHERE user_id = u.user_id) AS has_profile,
+                           EXISTS (SELECT 1 FROM survey_progress WHERE user_id = u.user_id) AS in_survey
+                    FROM (
+                        SELECT user_id FROM user_states
+                        UNION
+                        SELECT DISTINCT user_id FROM survey_answers
+                        UNION
+                        SELECT DISTINCT user_id FROM user_answers
+                    ) AS u
+                    LEFT JOIN user_states AS s ON s.user_id = u.user_id
+                    WHERE u.user_id > ?
+                    ORDER BY u.user_id
+                    LIMIT ?
+                    """,
+                    (last_user_id, batch_size)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+        except Exception as e:
+            railway_print(f"Ошибка при чтении сохраненных ответов: {e}", "ERROR")
+            logger.error(f"Ошибка при чтении сохраненных ответов: {e}")
+            return
+        
+        if not rows:
+            return
+        
+        for row in rows:
+            user_id = row['user_id']
+            last_user_id = user_id
+            
+            answers = {}
+            profile_completed = False
+            if row['state_data']:
+                try:
+                    state_data = json.loads(row['state_data'])
+                    answers = state_data.get("answers") or {}
+                    profile_completed = bool(state_data.get("profile_completed"))
+                except (ValueError, AttributeError):
+                    logger.warning(f"Не удалось разобрать данные состояния пользователя {user_id}")
+            
+            if completed_only and (row['in_survey'] or not (profile_completed or row['has_profile'])):
+                continue
+            
+            # Если в состоянии FSM ответов нет, берем ответы, записанные по ходу опроса,
+            # а затем строки старой таблицы user_answers
+            if not answers:
+                answers = await get_survey_answers(user_id)
+            if not answers:
+                answers = {str(key): value for key, value in (await get_user_answers(user_id)).items()}
+            
+            if answers:
+                yield user_id, answers
+        
+        if len(rows) < batch_size:
+            return
+
+class BatchedWriter:
+    """
+    Фоновый пакетный писатель в SQLite.
+    
+    Операции записи ставятся в очередь без ожидания и выполняются фоновой
+    задачей пачками: все операции, накопившиеся за flush_interval секунд
+    (но не больше max_batch), записываются одним соединением в одной
+    транзакции. Порядок операций сохраняется, поэтому удаление, поставленное
+    в очередь после вставки, выполнится после нее.
+    Если пачка не записалась, операции повторяются по одной, и пропускаются
+    только те, что завершились ошибкой.
+    """
+    
+    def __init__(self, flush_interval: float = 0.2, max_batch: int = 500):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: Optional["asyncio.Queue"] = None
+        self._worker: Optional["asyncio.Task"] = None
+    
+    def submit(self, sql: str, params: Tuple = ()) -> None:
+        """
+        Ставит операцию записи в очередь.
+        
+        Args:
+            sql: SQL-запрос
+            params: Параметры запроса
+        """
+        self._ensure_worker()
+        self._queue.put_nowait((sql, params))
+    
+    async def flush(self) -> None:
+        """
+        Дожидается записи всех операций, поставленных в очередь.
+        """
+        if self._queue is not None and self._worker is not None and not self._worker.done():
+            await self._queue.join()
+    
+    async def close(self) -> None:
+        """
+        Записывает оставшиеся операции и останавливает фоновую задачу.
+        """
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._queue = None
+    
+    def _ensure_worker(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self._write(batch)
+            except Exception as e:
+                railway_print(f"Ошибка при пакетной записи в базу данных: {e}", "ERROR")
+                logger.error(f"Ошибка при пакетной записи в базу данных ({len(batch)} операций): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+    
+    async def _write(self, batch: List[Tuple[str, Tuple]]) -> None:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_survey_tables(db)
+            try:
+                # Подряд идущие одинаковые запросы выполняются одним executemany
+                for sql, group in groupby(batch, key=lambda item: item[0]):
+                    await db.executemany(sql, [params for _, params in group])
+                await db.commit()
+            except Exception as e:
+                # Одна неудачная операция не должна отменять записи других пользователей:
+                # откатываем пачку и повторяем операции по одной
+                await db.rollback()
+                logger.warning(f"Пакетная запись не удалась ({len(batch)} операций), запись по одной: {e}")
+                await self._write_each(db, batch)
+    
+    async def _write_each(self, db, batch: List[Tuple[str, Tuple]]) -> None:
+        for sql, params in batch:
+            try:
+                await db.execute(sql, params)
+            except Exception as e:
+                railway_print(f"Ошибка при записи в базу данных: {e}", "ERROR")
+                logger.error(f"Ошибка при записи в базу данных, операция пропущена: {e}; запрос: {sql}; параметры: {params}")
+        await db.commit()
+
+# Общий пакетный писатель
+db_writer = BatchedWriter()
+
+# Флаг, что таблицы прогресса опроса уже созданы в этом процессе
+_survey_tables_ready = False
+
+async def _ensure_survey_tables(db) -> None:
+    """
+    Создает таблицы ответов и прогресса опроса, если их еще нет.
+    """
+    global _survey_tables_ready
+    if _survey_tables_ready:
+        return
+    
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS survey_answers (
+            user_id INTEGER NOT NULL,
+            question_id TEXT NOT NULL,
+            answer TEXT,
+            answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, question_id)
+        )
+        """
+    )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS survey_progress (
+            user_id INTEGER PRIMARY KEY,
+            question_index INTEGER NOT NULL DEFAULT 0,
+            is_demo_questions INTEGER NOT NULL DEFAULT 1,
+            waiting_for_vasini_confirmation INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await db.commit()
+    _survey_tables_ready = True
+
+def queue_survey_answer(user_id: int, question_id: str, answer: str, question_index: int,
+                        is_demo_questions: bool, waiting_for_vasini_confirmation: bool = False) -> None:
+    """
+    Ставит в очередь запись ответа на вопрос опроса вместе с новой позицией в опросе.
+    
+    Стоимость записи не зависит от количества уже данных ответов: пишется
+    одна строка ответа и одна строка прогресса.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        question_id: ID вопроса
+        answer: Ответ пользователя
+        question_index: Индекс следующего вопроса
+        is_demo_questions: Находится ли пользователь в блоке демо-вопросов
+        waiting_for_vasini_confirmation: Ожидается ли подтверждение начала теста Vasini
+    """
+    db_writer.submit(
+        "INSERT INTO survey_answers (user_id, question_id, answer, answered_at) "
+        "VALUES (?, ?, ?, CURRENT_TIMESTAMP) "
+        "ON CONFLICT(user_id, question_id) DO UPDATE SET answer = excluded.answer, answered_at = excluded.answered_at",
+        (user_id, question_id, answer)
+    )
+    queue_survey_progress(user_id, question_index, is_demo_questions, waiting_for_vasini_confirmation)
+
+def queue_survey_progress(user_id: int, question_index: int, is_demo_questions: bool,
+                          waiting_for_vasini_confirmation: bool = False) -> None:
+    """
+    Ставит в очередь запись текущей позиции пользователя в опросе.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        question_index: Индекс текущего вопроса
+        is_demo_questions: Находится ли пользователь в блоке демо-вопросов
+        waiting_for_vasini_confirmation: Ожидается ли подтверждение начала теста Vasini
+    """
+    db_writer.submit(
+        "INSERT INTO survey_progress (user_id, question_index, is_demo_questions, waiting_for_vasini_confirmation, updated_at) "
+        "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP) "
+        "ON CONFLICT(user_id) DO UPDATE SET question_index = excluded.question_index, "
+        "is_demo_questions = excluded.is_demo_questions, "
+        "waiting_for_vasini_confirmation = excluded.waiting_for_vasini_confirmation, "
+        "updated_at = excluded.updated_at",
+        (user_id, question_index, int(is_demo_questions), int(waiting_for_vasini_confirmation))
+    )
+
+def queue_survey_reset(user_id: int, keep_answers: bool = False) -> None:
+    """
+    Ставит в очередь удаление прогресса опроса пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        keep_answers: Сохранить строки ответов (используется после завершения опроса)
+    """
+    db_writer.submit("DELETE FROM survey_progress WHERE user_id = ?", (user_id,))
+    if not keep_answers:
+        db_writer.submit("DELETE FROM survey_answers WHERE user_id = ?", (user_id,))
+
+async def get_survey_progress(user_id: int) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+    """
+    Получает сохраненный прогресс опроса и ответы пользователя.
+    
+    Перед чтением дожидается записи операций из очереди, поэтому результат
+    учитывает все принятые ответы.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+    
+    Returns:
+        Tuple[Optional[Dict[str, Any]], Dict[str, str]]: Позиция в опросе
+        (question_index, is_demo_questions, waiting_for_vasini_confirmation)
+        или None, если опрос не начат, и словарь ответов {question_id: answer}
+    """
+    await db_writer.flush()
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            db.row_factory = aiosqlite.Row
+            await _ensure_survey_tables(db)
+            
+            async with db.execute(
+                "SELECT question_index, is_demo_questions, waiting_for_vasini_confirmation "
+                "FROM survey_progress WHERE user_id = ?",
+                (user_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            
+            progress = None
+            if row:
+                progress = {
+                    "question_index": row['question_index'],
+                    "is_demo_questions": bool(row['is_demo_questions']),
+                    "waiting_for_vasini_confirmation": bool(row['waiting_for_vasini_confirmation'])
+                }
+            
+            answers = await _select_survey_answers(db, user_id)
+            return progress, answers
+    except Exception as e:
+        railway_print(f"Ошибка при получении прогресса опроса: {e}", "ERROR")
+        logger.error(f"Ошибка при получении прогресса опроса пользователя {user_id}: {e}")
+        return None, {}
+
+async def get_survey_answers(user_id: int) -> Dict[str, str]:
+    """
+    Получает ответы пользователя на вопросы опроса, записанные по мере прохождения.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+    
+    Returns:
+        Dict[str, str]: Словарь с ответами {question_id: answer}
+    """
+    await db_writer.flush()
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            db.row_factory = aiosqlite.Row
+            await _ensure_survey_tables(db)
+            return await _select_survey_answers(db, user_id)
+    except Exception as e:
+        railway_print(f"Ошибка при получении ответов опроса: {e}", "ERROR")
+        logger.error(f"Ошибка при получении ответов опроса пользователя {user_id}: {e}")
+        return {}
+
+async def _select_survey_answers(db, user_id: int) -> Dict[str, str]:
+    async with db.execute(
+        "SELECT question_id, answer FROM survey_answers WHERE user_id = ?",
+        (user_id,)
+    ) as cursor:
+        return {row['question_id']: row['answer'] async for row in cursor}
+
+async def get_vasini_answer_rows() -> List[Tuple[int, str, str]]:
+    """
+    Получает ответы всех пользователей на вопросы Vasini.
+    
+    Returns:
+        List[Tuple[int, str, str]]: Строки (ID пользователя, ID вопроса, ответ)
+    """
+    await db_writer.flush()
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_survey_tables(db)
+            async with db.execute(
+                "SELECT user_id, question_id, answer FROM survey_answers WHERE question_id LIKE 'vasini\\_%' ESCAPE '\\'"
+            ) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        railway_print(f"Ошибка при получении ответов на вопросы Vasini: {e}", "ERROR")
+        logger.error(f"Ошибка при получении ответов на вопросы Vasini: {e}")
+        return []
+
+async def _ensure_telegram_files_table(db) -> None:
+    """
+    Создает таблицу соответствия содержимого файлов и file_id Telegram, если ее еще нет.
+    """
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS telegram_files (
+            content_hash TEXT NOT NULL,
+            media_type TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            file_unique_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash, media_type)
+        )
+        """
+    )
+
+async def get_telegram_file_id(content_hash: str, media_type: str) -> Optional[str]:
+    """
+    Получает file_id Telegram для ранее загруженного файла.
+    
+    Args:
+        content_hash: Хэш содержимого файла
+        media_type: Тип медиа (voice, audio, document, ...)
+    
+    Returns:
+        Optional[str]: file_id или None, если файл еще не загружался
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_telegram_files_table(db)
+            async with db.execute(
+                "SELECT file_id FROM telegram_files WHERE content_hash = ? AND media_type = ?",
+                (content_hash, media_type)
+            ) as cursor:
+                row = await cursor.fetchone()
+            return row[0] if row else None
+    except Exception as e:
+        railway_print(f"Ошибка при получении file_id: {e}", "ERROR")
+        logger.error(f"Ошибка при получении file_id для {content_hash}: {e}")
+        return None
+
+async def save_telegram_file_id(content_hash: str, media_type: str, file_id: str, file_unique_id: Optional[str]) -> bool:
+    """
+    Сохраняет file_id Telegram для загруженного файла.
+    
+    Args:
+        content_hash: Хэш содержимого файла
+        media_type: Тип медиа (voice, audio, document, ...)
+        file_id: file_id, который вернул Telegram
+        file_unique_id: file_unique_id, который вернул Telegram
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_telegram_files_table(db)
+            await db.execute(
+                "INSERT INTO telegram_files (content_hash, media_type, file_id, file_unique_id, created_at) "
+                "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(content_hash, media_type) DO UPDATE SET file_id = excluded.file_id, "
+                "file_unique_id = excluded.file_unique_id, created_at = excluded.created_at",
+                (content_hash, media_type, file_id, file_unique_id)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении file_id: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении file_id для {content_hash}: {e}")
+        return False
+
+async def delete_telegram_file_id(content_hash: str, media_type: str) -> bool:
+    """
+    Удаляет сохраненный file_id, который Telegram больше не принимает.
+    
+    Args:
+        content_hash: Хэш содержимого файла
+        media_type: Тип медиа (voice, audio, document, ...)
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_telegram_files_table(db)
+            await db.execute(
+                "DELETE FROM telegram_files WHERE content_hash = ? AND media_type = ?",
+                (content_hash, media_type)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при удалении file_id: {e}", "ERROR")
+        logger.error(f"Ошибка при удалении file_id для {content_hash}: {e}")
+        return False
+
+async def _ensure_meditation_library_table(db) -> None:
+    """
+    Создает таблицу библиотеки заранее озвученных медитаций, если ее еще нет.
+    """
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meditation_library (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            meditation_type TEXT NOT NULL,
+            personality_type TEXT NOT NULL,
+            duration TEXT NOT NULL,
+            text TEXT NOT NULL,
+            audio_path TEXT NOT NULL,
+            audio_size INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            served_count INTEGER NOT NULL DEFAULT 0,
+            last_served_at TIMESTAMP
+        )
+        """
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_meditation_library_slot "
+        "ON meditation_library (meditation_type, personality_type, duration)"
+    )
+
+async def add_meditation_library_item(meditation_type: str, personality_type: str, duration: str,
+                                      text: str, audio_path: str, audio_size: int) -> Optional[int]:
+    """
+    Добавляет озвученную медитацию в библиотеку.
+    
+    Args:
+        meditation_type: Тип медитации (relax, focus, sleep)
+        personality_type: Тип личности
+        duration: Продолжительность (short, medium, long)
+        text: Текст медитации
+        audio_path: Путь к mp3-файлу
+        audio_size: Размер mp3-файла в байтах
+    
+    Returns:
+        Optional[int]: ID добавленной медитации или None при ошибке
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_meditation_library_table(db)
+            cursor = await db.execute(
+                "INSERT INTO meditation_library "
+                "(meditation_type, personality_type, duration, text, audio_path, audio_size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (meditation_type, personality_type, duration, text, audio_path, audio_size)
+            )
+            await db.commit()
+            return cursor.lastrowid
+    except Exception as e:
+        railway_print(f"Ошибка при добавлении медитации в библиотеку: {e}", "ERROR")
+        logger.error(f"Ошибка при добавлении медитации {meditation_type}/{personality_type}/{duration} в библиотеку: {e}")
+        return None
+
+async def get_meditation_library_items(meditation_type: Optional[str] = None,
+                                       personality_type: Optional[str] = None,
+                                       duration: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Получает медитации из библиотеки (без текста), новые первыми.
+    
+    Args:
+        meditation_type: Тип медитации (None - любой)
+        personality_type: Тип личности (None - любой)
+        duration: Продолжительность (None - любая)
+    
+    Returns:
+        List[Dict[str, Any]]: Список медитаций с метаданными
+    """
+    conditions = []
+    params = []
+    for column, value in (("meditation_type", meditation_type), ("personality_type", personality_type), ("duration", duration)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_meditation_library_table(db)
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "SELECT id, meditation_type, personality_type, duration, audio_path, audio_size, "
+                "created_at, served_count, last_served_at FROM meditation_library "
+                f"{where}ORDER BY created_at DESC, id DESC",
+                params
+            ) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+    except Exception as e:
+        railway_print(f"Ошибка при получении библиотеки медитаций: {e}", "ERROR")
+        logger.error(f"Ошибка при получении библиотеки медитаций: {e}")
+        return []
+
+async def mark_meditation_library_served(item_id: int) -> bool:
+    """
+    Отмечает отправку медитации из библиотеки пользователю.
+    
+    Args:
+        item_id: ID медитации в библиотеке
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_meditation_library_table(db)
+            await db.execute(
+                "UPDATE meditation_library SET served_count = served_count + 1, "
+                "last_served_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (item_id,)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при обновлении статистики библиотеки медитаций: {e}", "ERROR")
+        logger.error(f"Ошибка при обновлении статистики медитации {item_id}: {e}")
+        return False
+
+async def delete_meditation_library_items(item_ids: List[int]) -> bool:
+    """
+    Удаляет медитации из библиотеки.
+    
+    Args:
+        item_ids: ID удаляемых медитаций
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    if not item_ids:
+        return True
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_meditation_library_table(db)
+            await db.executemany("DELETE FROM meditation_library WHERE id = ?", [(item_id,) for item_id in item_ids])
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при удалении медитаций из библиотеки: {e}", "ERROR")
+        logger.error(f"Ошибка при удалении медитаций {item_ids} из библиотеки: {e}")
+        return False
+
+# Окна счетчиков использования: ключ периода в UTC
+USAGE_WINDOWS = {
+    "all": None,
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m"
+}
+
+_usage_counters_ready = False
+
+# Сколько ждать освобождения базы при конкурентной записи счетчика (секунды)
+USAGE_BUSY_TIMEOUT = 5.0
+
+def usage_period(window: str = "all", now: Optional[datetime] = None) -> str:
+    """
+    Возвращает ключ текущего периода для окна счетчика.
+    
+    Args:
+        window: Окно счетчика (all, day, week, month)
+        now: Момент времени в UTC (по умолчанию текущий)
+    
+    Returns:
+        str: Ключ периода ("all" для счетчика без окна)
+    """
+    period_format = USAGE_WINDOWS[window]
+    if period_format is None:
+        return "all"
+    return (now or datetime.utcnow()).strftime(period_format)
+
+async def _ensure_usage_counters_table(db) -> None:
+    """
+    Создает таблицу счетчиков использования, если ее еще нет.
+    
+    При создании таблицы в нее переносятся счетчики медитаций, которые
+    раньше хранились в данных FSM (user_meditation_count).
+    """
+    global _usage_counters_ready
+    if _usage_counters_ready:
+        return
+    
+    async with db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('usage_counters', 'user_states')"
+    ) as cursor:
+        existing_tables = {row[0] for row in await cursor.fetchall()}
+    
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_counters (
+            user_id INTEGER NOT NULL,
+            counter TEXT NOT NULL,
+            period TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, counter, period)
+        )
+        """
+    )
+    
+    if "usage_counters" not in existing_tables and "user_states" in existing_tables:
+        await db.execute(
+            """
+            INSERT OR IGNORE INTO usage_counters (user_id, counter, period, count)
+            SELECT user_id, 'meditation', 'all', CAST(json_extract(state_data, '$.user_meditation_count') AS INTEGER)
+            FROM user_states
+            WHERE json_valid(state_data) AND json_extract(state_data, '$.user_meditation_count') > 0
+            """
+        )
+        logger.info("Счетчики медитаций перенесены из данных FSM в таблицу usage_counters")
+    
+    await db.commit()
+    _usage_counters_ready = True
+
+async def try_increment_usage(user_id: int, counter: str, limit: int, window: str = "all") -> Optional[bool]:
+    """
+    Атомарно увеличивает счетчик использования, если лимит еще не достигнут.
+    
+    Проверка и увеличение выполняются одним запросом, поэтому два
+    одновременных запроса не могут оба пройти проверку последнего
+    доступного использования.
+    
+    Соединение ждет освобождения базы до USAGE_BUSY_TIMEOUT секунд, а если
+    база все еще заблокирована, запрос повторяется один раз. При ошибке
+    использование не разрешается: иначе под нагрузкой, когда база чаще
+    всего заблокирована, лимит бы не действовал.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        counter: Имя счетчика (например, "meditation")
+        limit: Максимальное значение счетчика за период
+        window: Окно счетчика (all, day, week, month)
+    
+    Returns:
+        Optional[bool]: True, если использование разрешено и учтено, False если
+        лимит достигнут, None при ошибке базы данных
+    """
+    if limit <= 0:
+        return False
+    for attempt in range(2):
+        try:
+            async with aiosqlite.connect(DB_PATH, timeout=USAGE_BUSY_TIMEOUT) as db:
+                await _ensure_usage_counters_table(db)
+                async with db.execute(
+                    "INSERT INTO usage_counters (user_id, counter, period, count, updated_at) "
+                    "VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP) "
+                    "ON CONFLICT(user_id, counter, period) DO UPDATE SET "
+                    "count = usage_counters.count + 1, updated_at = CURRENT_TIMESTAMP WHERE usage_counters.count < ? "
+                    "RETURNING count",
+                    (user_id, counter, usage_period(window), limit)
+                ) as cursor:
+                    row = await cursor.fetchone()
+                await db.commit()
+                return row is not None
+        except Exception as e:
+            if attempt == 0 and "locked" in str(e):
+                logger.warning(f"База заблокирована при обновлении счетчика {counter} для пользователя {user_id}, повторяем")
+                continue
+            railway_print(f"Ошибка при обновлении счетчика {counter}: {e}", "ERROR")
+            logger.error(f"Ошибка при обновлении счетчика {counter} для пользователя {user_id}: {e}")
+            return None
+
+async def get_usage_count(user_id: int, counter: str, window: str = "all") -> int:
+    """
+    Получает значение счетчика использования за текущий период.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        counter: Имя счетчика
+        window: Окно счетчика (all, day, week, month)
+    
+    Returns:
+        int: Значение счетчика (0, если использований не было)
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_usage_counters_table(db)
+            async with db.execute(
+                "SELECT count FROM usage_counters WHERE user_id = ? AND counter = ? AND period = ?",
+                (user_id, counter, usage_period(window))
+            ) as cursor:
+                row = await cursor.fetchone()
+            return row[0] if row else 0
+    except Exception as e:
+        railway_print(f"Ошибка при получении счетчика {counter}: {e}", "ERROR")
+        logger.error(f"Ошибка при получении счетчика {counter} для пользователя {user_id}: {e}")
+        return 0
+
+async def reset_usage(counter: str, user_ids: Optional[List[int]] = None, window: Optional[str] = None) -> Optional[int]:
+    """
+    Сбрасывает счетчики использования одним запросом.
+    
+    Args:
+        counter: Имя счетчика
+        user_ids: ID пользователей (None - все пользователи)
+        window: Окно, текущий период которого сбрасывается (None - все периоды)
+    
+    Returns:
+        Optional[int]: Количество сброшенных счетчиков или None при ошибке
+    """
+    conditions = ["counter = ?"]
+    params: List[Any] = [counter]
+    if user_ids is not None:
+        if not user_ids:
+            return 0
+        conditions.append(f"user_id IN ({', '.join('?' * len(user_ids))})")
+        params.extend(user_ids)
+    if window is not None:
+        conditions.append("period = ?")
+        params.append(usage_period(window))
+    
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_usage_counters_table(db)
+            cursor = await db.execute(f"DELETE FROM usage_counters WHERE {' AND '.join(conditions)}", params)
+            await db.commit()
+            return cursor.rowcount
+    except Exception as e:
+        railway_print(f"Ошибка при сбросе счетчиков {counter}: {e}", "ERROR")
+        logger.error(f"Ошибка при сбросе счетчиков {counter}: {e}")
+        return None
+
+async def _ensure_voice_transcripts_table(db) -> None:
+    """
+    Создает таблицу распознанных голосовых сообщений, если ее еще нет.
+    """
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS voice_transcripts (
+            file_unique_id TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            language TEXT,
+            duration INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_voice_transcripts_last_used ON voice_transcripts (last_used_at)"
+    )
+
+async def get_voice_transcript(file_unique_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Получает распознанный текст голосового сообщения и отмечает обращение к нему.
+    
+    Args:
+        file_unique_id: Постоянный ID файла в Telegram (одинаковый у пересланных сообщений)
+    
+    Returns:
+        Optional[Dict[str, Any]]: Текст, язык, длительность и время распознавания
+        или None, если сообщение еще не распознавалось или произошла ошибка
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_voice_transcripts_table(db)
+            db.row_factory = aiosqlite.Row
+            async with db.execute(
+                "UPDATE voice_transcripts SET hits = hits + 1, last_used_at = CURRENT_TIMESTAMP "
+                "WHERE file_unique_id = ? RETURNING text, language, duration, created_at, hits",
+                (file_unique_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+            await db.commit()
+            return dict(row) if row else None
+    except Exception as e:
+        railway_print(f"Ошибка при получении распознанного голосового сообщения: {e}", "ERROR")
+        logger.error(f"Ошибка при получении распознанного голосового сообщения {file_unique_id}: {e}")
+        return None
+
+async def save_voice_transcript(file_unique_id: str, text: str, language: Optional[str] = None,
+                                duration: Optional[int] = None) -> bool:
+    """
+    Сохраняет распознанный текст голосового сообщения.
+    
+    Args:
+        file_unique_id: Постоянный ID файла в Telegram
+        text: Распознанный текст
+        language: Язык распознавания
+        duration: Длительность голосового сообщения в секундах
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_voice_transcripts_table(db)
+            await db.execute(
+                "INSERT OR REPLACE INTO voice_transcripts (file_unique_id, text, language, duration) "
+                "VALUES (?, ?, ?, ?)",
+                (file_unique_id, text, language, duration)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении распознанного голосового сообщения: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении распознанного голосового сообщения {file_unique_id}: {e}")
+        return False
+
+async def evict_voice_transcripts(max_age_days: int, max_entries: int) -> Optional[int]:
+    """
+    Удаляет давно не использованные распознанные голосовые сообщения.
+    
+    Args:
+        max_age_days: Удаляются записи, к которым не обращались дольше этого срока (дни)
+        max_entries: Максимальное количество записей; сверх него удаляются самые старые по обращению
+    
+    Returns:
+        Optional[int]: Количество удаленных записей или None при ошибке
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_voice_transcripts_table(db)
+            cursor = await db.execute(
+                "DELETE FROM voice_transcripts WHERE last_used_at < datetime('now', ?)",
+                (f"-{max_age_days} days",)
+            )
+            removed = cursor.rowcount
+            cursor = await db.execute(
+                "DELETE FROM voice_transcripts WHERE file_unique_id NOT IN "
+                "(SELECT file_unique_id FROM voice_transcripts ORDER BY last_used_at DESC LIMIT ?)",
+                (max_entries,)
+            )
+            removed += cursor.rowcount
+            await db.commit()
+            return removed
+    except Exception as e:
+        railway_print(f"Ошибка при очистке распознанных голосовых сообщений: {e}", "ERROR")
+        logger.error(f"Ошибка при очистке распознанных голосовых сообщений: {e}")
+        return None
+
+# Флаг, что таблица напоминаний уже создана в этом процессе
+_reminders_ready = False
+
+async def _ensure_reminders_table(db) -> None:
+    """
+    Создает таблицы напоминаний и часовых поясов пользователей, если их еще нет.
+    
+    В таблицу напоминаний, созданную до появления индекса срабатываний,
+    добавляется столбец next_fire_at, а прежний индекс по active удаляется.
+    """
+    global _reminders_ready
+    if _reminders_ready:
+        return
+    
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reminders (
+            user_id INTEGER PRIMARY KEY,
+            time TEXT NOT NULL,
+            days TEXT NOT NULL,
+            timezone TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            next_fire_at INTEGER,
+            last_sent_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    async with db.execute("PRAGMA table_info(reminders)") as cursor:
+        columns = [row[1] for row in await cursor.fetchall()]
+    if "next_fire_at" not in columns:
+        await db.execute("ALTER TABLE reminders ADD COLUMN next_fire_at INTEGER")
+    
+    # Индекс срабатываний: ближайшее срабатывание включенных напоминаний (секунды UTC)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reminders_next_fire ON reminders (next_fire_at, user_id) WHERE active = 1"
+    )
+    await db.execute("DROP INDEX IF EXISTS idx_reminders_active")
+    # Рассылка берет тип личности из профиля, чтобы выбрать текст напоминания
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_profiles (
+            user_id INTEGER PRIMARY KEY,
+            profile_text TEXT,
+            personality_type TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_timezones (
+            user_id INTEGER PRIMARY KEY,
+            timezone TEXT NOT NULL,
+            answer TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await db.commit()
+    _reminders_ready = True
+
+def _reminder_from_row(row) -> Dict[str, Any]:
+    return {
+        "user_id": row["user_id"],
+        "time": row["time"],
+        "days": row["days"].split(",") if row["days"] else [],
+        "timezone": row["timezone"],
+        "active": bool(row["active"]),
+        "next_fire_at": row["next_fire_at"],
+        "last_sent_at": row["last_sent_at"]
+    }
+
+async def get_reminder(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Получает настройки напоминаний пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+    
+    Returns:
+        Optional[Dict[str, Any]]: Время, дни недели, часовой пояс, признак активности,
+        ближайшее срабатывание и время последней отправки или None,
+        если напоминания не настраивались
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM reminders WHERE user_id = ?", (user_id,)) as cursor:
+                row = await cursor.fetchone()
+                return _reminder_from_row(row) if row else None
+    except Exception as e:
+        railway_print(f"Ошибка при получении напоминаний пользователя: {e}", "ERROR")
+        logger.error(f"Ошибка при получении напоминаний пользователя {user_id}: {e}")
+        return None
+
+async def save_reminder(user_id: int, time: str, days: List[str], active: bool = True,
+                        timezone: Optional[str] = None, next_fire_at: Optional[int] = None) -> bool:
+    """
+    Сохраняет настройки напоминаний пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        time: Местное время напоминания в формате HH:MM
+        days: Дни недели (mon, tue, ...)
+        active: Включены ли напоминания
+        timezone: Часовой пояс пользователя (None - оставить сохраненный)
+        next_fire_at: Ближайшее срабатывание (секунды UTC); None - напоминание
+                      будет проиндексировано при следующем запуске бота
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            await db.execute(
+                "INSERT INTO reminders (user_id, time, days, timezone, active, next_fire_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(user_id) DO UPDATE SET time = excluded.time, days = excluded.days, "
+                "timezone = COALESCE(excluded.timezone, reminders.timezone), "
+                "active = excluded.active, next_fire_at = excluded.next_fire_at, updated_at = excluded.updated_at",
+                (user_id, time, ",".join(days), timezone, int(active), next_fire_at)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении напоминаний пользователя: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении напоминаний пользователя {user_id}: {e}")
+        return False
+
+async def get_unindexed_reminders() -> List[Tuple[int, str, str, Optional[str]]]:
+    """
+    Получает включенные напоминания, для которых не вычислено ближайшее срабатывание.
+    
+    Returns:
+        List[Tuple[int, str, str, Optional[str]]]: Кортежи (user_id, время HH:MM,
+        дни недели через запятую, часовой пояс напоминания или пользователя)
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            async with db.execute(
+                "SELECT r.user_id, r.time, r.days, COALESCE(r.timezone, t.timezone) FROM reminders r "
+                "LEFT JOIN user_timezones t ON t.user_id = r.user_id "
+                "WHERE r.active = 1 AND r.next_fire_at IS NULL"
+            ) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        railway_print(f"Ошибка при загрузке напоминаний: {e}", "ERROR")
+        logger.error(f"Ошибка при загрузке напоминаний без ближайшего срабатывания: {e}")
+        return []
+
+async def get_due_reminders(now: int, limit: int = 1000) -> List[Tuple[int, str, str, Optional[str], int, Optional[str]]]:
+    """
+    Получает напоминания, время срабатывания которых уже наступило.
+    
+    Выборка идет по частичному индексу (next_fire_at, user_id) включенных
+    напоминаний, самые ранние первыми.
+    
+    Args:
+        now: Текущее время (секунды UTC)
+        limit: Максимальное количество напоминаний
+    
+    Returns:
+        List[Tuple[int, str, str, Optional[str], int, Optional[str]]]: Кортежи (user_id,
+        время HH:MM, дни недели через запятую, часовой пояс, срабатывание
+        в секундах UTC, тип личности из профиля)
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            async with db.execute(
+                "SELECT r.user_id, r.time, r.days, r.timezone, r.next_fire_at, p.personality_type "
+                "FROM reminders r "
+                "LEFT JOIN user_profiles p ON p.user_id = r.user_id "
+                "WHERE r.active = 1 AND r.next_fire_at <= ? ORDER BY r.next_fire_at, r.user_id LIMIT ?",
+                (now, limit)
+            ) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        railway_print(f"Ошибка при выборке напоминаний: {e}", "ERROR")
+        logger.error(f"Ошибка при выборке напоминаний на {now}: {e}")
+        return []
+
+async def set_reminder_next_fire(rows: List[Tuple[Optional[int], int]]) -> bool:
+    """
+    Записывает ближайшие срабатывания напоминаний одной транзакцией.
+    
+    Args:
+        rows: Кортежи (срабатывание в секундах UTC, user_id)
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            await db.executemany("UPDATE reminders SET next_fire_at = ? WHERE user_id = ?", rows)
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при обновлении срабатываний напоминаний: {e}", "ERROR")
+        logger.error(f"Ошибка при обновлении срабатываний напоминаний ({len(rows)} записей): {e}")
+        return False
+
+async def save_user_timezone(user_id: int, timezone: str, answer: Optional[str] = None) -> bool:
+    """
+    Сохраняет часовой пояс пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        timezone: Идентификатор часового пояса (например, Europe/Moscow)
+        answer: Исходный ответ пользователя
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            await db.execute(
+                "INSERT INTO user_timezones (user_id, timezone, answer, updated_at) "
+                "VALUES (?, ?, ?, CURRENT_TIMESTAMP) "
+                "ON CONFLICT(user_id) DO UPDATE SET timezone = excluded.timezone, "
+                "answer = excluded.answer, updated_at = excluded.updated_at",
+                (user_id, timezone, answer)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении часового пояса: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении часового пояса пользователя {user_id}: {e}")
+        return False
+
+async def get_user_timezone(user_id: int) -> Optional[str]:
+    """
+    Получает часовой пояс пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+    
+    Returns:
+        Optional[str]: Идентификатор часового пояса или None, если он неизвестен
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            async with db.execute("SELECT timezone FROM user_timezones WHERE user_id = ?", (user_id,)) as cursor:
+                row = await cursor.fetchone()
+                return row[0] if row else None
+    except Exception as e:
+        railway_print(f"Ошибка при получении часового пояса: {e}", "ERROR")
+        logger.error(f"Ошибка при получении часового пояса пользователя {user_id}: {e}")
+        return None
+
+async def get_unparsed_timezone_answers() -> List[Tuple[int, str]]:
+    """
+    Получает ответы на вопрос о часовом поясе, которые еще не переведены в часовой пояс.
+    
+    Returns:
+        List[Tuple[int, str]]: Кортежи (user_id, ответ)
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_survey_tables(db)
+            await _ensure_reminders_table(db)
+            async with db.execute(
+                "SELECT a.user_id, a.answer FROM survey_answers a "
+                "LEFT JOIN user_timezones t ON t.user_id = a.user_id "
+                "WHERE a.question_id = 'timezone' AND t.user_id IS NULL"
+            ) as cursor:
+                return await cursor.fetchall()
+    except Exception as e:
+        railway_print(f"Ошибка при загрузке ответов о часовом поясе: {e}", "ERROR")
+        logger.error(f"Ошибка при загрузке ответов о часовом поясе: {e}")
+        return []
+
+async def save_user_timezones(rows: List[Tuple[int, str, str]]) -> bool:
+    """
+    Сохраняет часовые пояса пользователей одной транзакцией и сбрасывает
+    ближайшие срабатывания их напоминаний для пересчета.
+    
+    Args:
+        rows: Кортежи (user_id, часовой пояс, исходный ответ)
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminders_table(db)
+            await db.executemany(
+                "INSERT OR REPLACE INTO user_timezones (user_id, timezone, answer) VALUES (?, ?, ?)",
+                rows
+            )
+            await db.executemany(
+                "UPDATE reminders SET timezone = ?, next_fire_at = NULL WHERE user_id = ?",
+                [(timezone, user_id) for user_id, timezone, _ in rows]
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении часовых поясов: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении часовых поясов ({len(rows)} записей): {e}")
+        return False
+
+def queue_reminder_sent(user_id: int) -> None:
+    """
+    Ставит в очередь отметку об отправке напоминания пользователю.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+    """
+    db_writer.submit(
+        "UPDATE reminders SET last_sent_at = CURRENT_TIMESTAMP WHERE user_id = ?",
+        (user_id,)
+    )
+
+async def _ensure_reminder_copy_table(db) -> None:
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS reminder_copy (
+            week TEXT NOT NULL,
+            personality_type TEXT NOT NULL,
+            weekday INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (week, personality_type, weekday)
+        ) WITHOUT ROWID
+        """
+    )
+
+async def save_reminder_copy(week: str, personality_type: str, weekday: int, text: str) -> bool:
+    """
+    Сохраняет заранее подготовленный текст напоминания.
+    
+    Args:
+        week: Неделя (дата понедельника в формате YYYY-MM-DD)
+        personality_type: Тип личности
+        weekday: День недели (0 - понедельник)
+        text: Текст напоминания
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminder_copy_table(db)
+            await db.execute(
+                "INSERT OR REPLACE INTO reminder_copy (week, personality_type, weekday, text) VALUES (?, ?, ?, ?)",
+                (week, personality_type, weekday, text)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении текста напоминания: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении текста напоминания {week}/{personality_type}/{weekday}: {e}")
+        return False
+
+async def get_reminder_copy(week: str) -> Dict[Tuple[str, int], str]:
+    """
+    Получает тексты напоминаний на неделю.
+    
+    Args:
+        week: Неделя (дата понедельника в формате YYYY-MM-DD)
+    
+    Returns:
+        Dict[Tuple[str, int], str]: Тексты по (тип личности, день недели)
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminder_copy_table(db)
+            async with db.execute(
+                "SELECT personality_type, weekday, text FROM reminder_copy WHERE week = ?",
+                (week,)
+            ) as cursor:
+                return {(row[0], row[1]): row[2] for row in await cursor.fetchall()}
+    except Exception as e:
+        railway_print(f"Ошибка при загрузке текстов напоминаний: {e}", "ERROR")
+        logger.error(f"Ошибка при загрузке текстов напоминаний на неделю {week}: {e}")
+        return {}
+
+async def delete_reminder_copy_before(week: str) -> int:
+    """
+    Удаляет тексты напоминаний прошедших недель.
+    
+    Args:
+        week: Первая неделя, тексты которой нужно оставить
+    
+    Returns:
+        int: Количество удаленных текстов
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_reminder_copy_table(db)
+            cursor = await db.execute("DELETE FROM reminder_copy WHERE week < ?", (week,))
+            await db.commit()
+            return cursor.rowcount
+    except Exception as e:
+        railway_print(f"Ошибка при удалении старых текстов напоминаний: {e}", "ERROR")
+        logger.error(f"Ошибка при удалении текстов напоминаний до недели {week}: {e}")
+        return 0
+
+# Флаг, что таблицы рассылок уже созданы в этом процессе
+_broadcasts_ready = False
+
+async def _ensure_broadcast_tables(db) -> None:
+    """
+    Создает таблицы рассылок и пользователей, заблокировавших бота, если их еще нет.
+    """
+    global _broadcasts_ready
+    if _broadcasts_ready:
+        return
+    
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'draft',
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS blocked_users (
+            user_id INTEGER PRIMARY KEY,
+            blocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await db.commit()
+    _broadcasts_ready = True
+
+async def create_broadcast(admin_id: int, text: str) -> Optional[int]:
+    """
+    Создает черновик рассылки и подсчитывает получателей.
+    
+    Args:
+        admin_id: ID администратора, который создал рассылку
+        text: Текст рассылки в HTML-разметке
+    
+    Returns:
+        Optional[int]: ID рассылки или None в случае ошибки
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            async with db.execute(
+                "SELECT COUNT(*) FROM users WHERE user_id NOT IN (SELECT user_id FROM blocked_users)"
+            ) as cursor:
+                total = (await cursor.fetchone())[0]
+            cursor = await db.execute(
+                "INSERT INTO broadcasts (admin_id, text, total) VALUES (?, ?, ?)",
+                (admin_id, text, total)
+            )
+            await db.commit()
+            return cursor.lastrowid
+    except Exception as e:
+        railway_print(f"Ошибка при создании рассылки: {e}", "ERROR")
+        logger.error(f"Ошибка при создании рассылки администратором {admin_id}: {e}")
+        return None
+
+async def get_broadcast(broadcast_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Получает рассылку с ее прогрессом.
+    
+    Args:
+        broadcast_id: ID рассылки
+    
+    Returns:
+        Optional[Dict[str, Any]]: Текст, статус, последний обработанный получатель,
+        счетчики и время создания или None, если рассылки нет
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            db.row_factory = aiosqlite.Row
+            async with db.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,)) as cursor:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+    except Exception as e:
+        railway_print(f"Ошибка при получении рассылки: {e}", "ERROR")
+        logger.error(f"Ошибка при получении рассылки {broadcast_id}: {e}")
+        return None
+
+async def get_broadcasts(status: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Получает последние рассылки.
+    
+    Args:
+        status: Статус рассылок (None - любой)
+        limit: Максимальное количество рассылок
+    
+    Returns:
+        List[Dict[str, Any]]: Рассылки, самые новые первыми
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            db.row_factory = aiosqlite.Row
+            query = "SELECT * FROM broadcasts"
+            params: list = []
+            if status is not None:
+                query += " WHERE status = ?"
+                params.append(status)
+            query += " ORDER BY id DESC LIMIT ?"
+            params.append(limit)
+            async with db.execute(query, params) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+    except Exception as e:
+        railway_print(f"Ошибка при получении рассылок: {e}", "ERROR")
+        logger.error(f"Ошибка при получении рассылок: {e}")
+        return []
+
+async def set_broadcast_status(broadcast_id: int, status: str, from_statuses: Optional[Sequence[str]] = None) -> bool:
+    """
+    Меняет статус рассылки (draft, running, paused, done, cancelled).
+    
+    Args:
+        broadcast_id: ID рассылки
+        status: Новый статус
+        from_statuses: Статусы, из которых разрешен переход (None - из любого);
+            проверка и изменение выполняются одним запросом
+    
+    Returns:
+        bool: True, если статус изменен, False если рассылки нет, переход
+        не разрешен или произошла ошибка
+    """
+    condition = ""
+    params = [status, status, broadcast_id]
+    if from_statuses is not None:
+        condition = f" AND status IN ({', '.join('?' for _ in from_statuses)})"
+        params.extend(from_statuses)
+    
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            cursor = await db.execute(
+                "UPDATE broadcasts SET status = ?, updated_at = CURRENT_TIMESTAMP, "
+                "finished_at = CASE WHEN ? IN ('done', 'cancelled') THEN CURRENT_TIMESTAMP ELSE finished_at END "
+                f"WHERE id = ?{condition}",
+                params
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+    except Exception as e:
+        railway_print(f"Ошибка при изменении статуса рассылки: {e}", "ERROR")
+        logger.error(f"Ошибка при изменении статуса рассылки {broadcast_id}: {e}")
+        return False
+
+async def get_broadcast_recipients(after_user_id: int, limit: int) -> List[int]:
+    """
+    Получает следующую страницу получателей рассылки.
+    
+    Пользователи перебираются по возрастанию user_id от последнего
+    обработанного (без OFFSET), поэтому каждая страница выбирается
+    по первичному ключу, а новые пользователи попадают в текущую рассылку.
+    
+    Args:
+        after_user_id: Последний обработанный получатель
+        limit: Размер страницы
+    
+    Returns:
+        List[int]: ID пользователей, кроме заблокировавших бота
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            async with db.execute(
+                "SELECT user_id FROM users WHERE user_id > ? "
+                "AND user_id NOT IN (SELECT user_id FROM blocked_users) ORDER BY user_id LIMIT ?",
+                (after_user_id, limit)
+            ) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+    except Exception as e:
+        railway_print(f"Ошибка при выборке получателей рассылки: {e}", "ERROR")
+        logger.error(f"Ошибка при выборке получателей рассылки после {after_user_id}: {e}")
+        return []
+
+async def checkpoint_broadcast(broadcast_id: int, last_user_id: int, sent: int, failed: int,
+                               blocked_user_ids: List[int]) -> bool:
+    """
+    Записывает прогресс рассылки после очередной страницы одной транзакцией.
+    
+    Args:
+        broadcast_id: ID рассылки
+        last_user_id: Последний обработанный получатель
+        sent: Сколько сообщений доставлено на этой странице
+        failed: Сколько сообщений не доставлено на этой странице
+        blocked_user_ids: Пользователи, заблокировавшие бота (их напоминания выключаются)
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await _ensure_broadcast_tables(db)
+            await _ensure_reminders_table(db)
+            blocked_rows = [(user_id,) for user_id in blocked_user_ids]
+            await db.executemany("INSERT OR IGNORE INTO blocked_users (user_id) VALUES (?)", blocked_rows)
+            # Напоминания заблокировавшим бота только расходуют лимит отправки
+            await db.executemany(
+                "UPDATE reminders SET active = 0, next_fire_at = NULL WHERE user_id = ?", blocked_rows
+            )
+            await db.execute(
+                "UPDATE broadcasts SET last_user_id = ?, sent = sent + ?, failed = failed + ?, "
+                "blocked = blocked + ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (last_user_id, sent, failed, len(blocked_user_ids), broadcast_id)
+            )
+            await db.commit()
+            return True
+    except Exception as e:
+        railway_print(f"Ошибка при сохранении прогресса рассылки: {e}", "ERROR")
+        logger.error(f"Ошибка при сохранении прогресса рассылки {broadcast_id}: {e}")
+        return False
@@ -8,9 +8,16 @@ from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message
 from aiogram.filters import Command
 from sqlite_storage import SQLiteStorage
-from db_utils import init_db, save_user
+from db_utils import init_db, save_user, db_writer
 from dotenv import load_dotenv
-from aiogram.types import BufferedInputFile
+from media_cache import answer_document_bytes
+from services.loop_guard import start_loop_guard
+from services.spool import get_spool, start_spool_janitor
+from services.tts_cache import get_tts_cache
+from services.outbound import get_outbound_queue
+from services.webhook import BOT_MODE, run_webhook
+from meditation_library import schedule_library_builds, remove_orphan_files, MEDITATION_LIBRARY_DIR
+from reminder_copy import schedule_reminder_copy_builds
 
 # Путь к БД
 DB_PATH = os.getenv("DB_PATH", "BD_ONA.db")
@@ -203,7 +210,8 @@ try:
     from voice_handler import voice_router
     from conversation_handler import conversation_router
     from meditation_handler import meditation_router
-    from reminder_handler import reminder_router, scheduler
+    from reminder_handler import reminder_router, scheduler, restore_reminders, close_reminder_sends
+    from broadcast_handler import broadcast_router, resume_broadcasts
     railway_print("Все модули успешно импортированы", "INFO")
 except ImportError as e:
     logger.error(f"Ошибка импорта модулей: {e}")
@@ -220,6 +228,7 @@ except ImportError as e:
     conversation_router = Router(name="conversation")
     meditation_router = Router(name="meditation")
     reminder_router = Router(name="reminder")
+    broadcast_router = Router(name="broadcast")
     
     # Создаем базовую клавиатуру
     def get_main_keyboard():
@@ -234,6 +243,15 @@ except ImportError as e:
     from apscheduler.schedulers.asyncio import AsyncIOScheduler
     scheduler = AsyncIOScheduler()
     
+    async def restore_reminders(bot) -> int:
+        return 0
+    
+    async def close_reminder_sends() -> int:
+        return 0
+    
+    async def resume_broadcasts(bot) -> int:
+        return 0
+    
     railway_print("Аварийная загрузка базовых модулей выполнена", "WARNING")
 
 # Создаем экземпляр бота и диспетчер
@@ -253,6 +271,7 @@ dp.include_router(voice_router)
 # Далее регистрируем остальные роутеры
 dp.include_router(meditation_router)
 dp.include_router(reminder_router)
+dp.include_router(broadcast_router)
 # Регистрируем роутер обычных сообщений последним
 dp.include_router(conversation_router)
 
@@ -353,11 +372,10 @@ async def cmd_api_key(message: Message):
         )
         
         # Отправляем файл с полными инструкциями
-        await message.answer_document(
-            document=BufferedInputFile(
-                instructions.encode('utf-8'),
-                filename="api_key_setup_instructions.md"
-            ),
+        await answer_document_bytes(
+            message,
+            instructions.encode('utf-8'),
+            filename="api_key_setup_instructions.md",
             caption="Подробные инструкции по настройке API ключа OpenAI"
         )
         
@@ -405,6 +423,8 @@ async def main():
     logger.info("Бот ОНА запускается...")
     railway_print("Запуск основного цикла бота...", "INFO")
     
+    loop_guard_task = None
+    spool_janitor_task = None
     try:
         # Инициализируем базу данных
         db_initialized = await init_db()
@@ -413,15 +433,17 @@ async def main():
         else:
             railway_print("База данных SQLite инициализирована успешно", "INFO")
         
-        # Удаляем все обновления, которые были пропущены (если бот был отключен)
-        await bot.delete_webhook(drop_pending_updates=True)
-        railway_print("Старые обновления удалены", "INFO")
-        
-        # Удаляем webhook (если он был установлен)
-        webhook_info = await bot.get_webhook_info()
-        if webhook_info.url:
-            await bot.delete_webhook()
-            logger.info("Webhook удален, старые обновления очищены")
+        # В режиме вебхука обновления, пришедшие за время перезапуска, ждут в Telegram и не удаляются
+        if BOT_MODE != "webhook":
+            # Удаляем все обновления, которые были пропущены (если бот был отключен)
+            await bot.delete_webhook(drop_pending_updates=True)
+            railway_print("Старые обновления удалены", "INFO")
+            
+            # Удаляем webhook (если он был установлен)
+            webhook_info = await bot.get_webhook_info()
+            if webhook_info.url:
+                await bot.delete_webhook()
+                logger.info("Webhook удален, старые обновления очищены")
         
         # Завершаем потенциально запущенные сессии бота (для предотвращения конфликтов)
         if hasattr(bot, "session") and bot.session:
@@ -439,14 +461,40 @@ async def main():
         logger.info(f"Соединение с Telegram API установлено успешно. Имя бота: @{bot_info.username}")
         railway_print(f"Бот @{bot_info.username} успешно подключен к Telegram API", "INFO")
         
+        # Восстанавливаем напоминания пользователей из базы данных
+        await restore_reminders(bot)
+        
+        # Продолжаем рассылки, прерванные перезапуском
+        await resume_broadcasts(bot)
+        
         # Запускаем планировщик заданий
         await start_scheduler()
         
+        # Ночная сборка библиотеки готовых медитаций
+        schedule_library_builds(scheduler)
+        
+        # Ночная подготовка текстов напоминаний на неделю вперед
+        schedule_reminder_copy_builds(scheduler)
+        
+        # Следим за блокирующими вызовами в цикле событий
+        loop_guard_task = start_loop_guard()
+        
+        # Убираем забытые временные файлы и следим за местом на диске,
+        # в том числе в кэше озвучки и директории библиотеки медитаций
+        spool = get_spool()
+        spool.watch("tts_cache", get_tts_cache().cache_dir, get_tts_cache().cleanup)
+        spool.watch("library", MEDITATION_LIBRARY_DIR, remove_orphan_files)
+        spool_janitor_task = start_spool_janitor()
+        
         # Сообщение о готовности бота
         railway_print("=== ONA BOT ЗАПУЩЕН И ГОТОВ К РАБОТЕ ===", "INFO")
         
-        # Запускаем бота с длинным поллингом и параметрами для предотвращения конфликтов
-        await dp.start_polling(bot, fast=True, timeout=60, allowed_updates=None, polling_timeout=60)
+        if BOT_MODE == "webhook":
+            # Принимаем обновления через HTTP-сервер вебхука (BOT_MODE=webhook)
+            await run_webhook(dp, bot)
+        else:
+            # Запускаем бота с длинным поллингом и параметрами для предотвращения конфликтов
+            await dp.start_polling(bot, fast=True, timeout=60, allowed_updates=None, polling_timeout=60)
     except Exception as e:
         # Проверяем, является ли ошибка конфликтом запросов
         if "Conflict: terminated by other getUpdates" in str(e) or "TelegramConflictError" in str(e):
@@ -487,6 +535,30 @@ async def main():
             scheduler.shutdown()
             logger.info("Планировщик заданий остановлен")
         
+        if loop_guard_task:
+            loop_guard_task.cancel()
+        
+        if spool_janitor_task:
+            spool_janitor_task.cancel()
+        
+        # Отправляем сообщения, оставшиеся в очереди исходящих
+        outbound = get_outbound_queue()
+        await outbound.close()
+        logger.info(f"Очередь исходящих сообщений остановлена: {outbound.get_stats()}")
+        
+        # Завершаем отправки напоминаний, которые ждали очереди исходящих
+        await close_reminder_sends()
+        
+        # Дописываем в базу данных операции из очереди пакетной записи
+        await db_writer.close()
+        
+        # Закрываем общую HTTP-сессию синтеза речи
+        try:
+            from services.tts import close_http_session
+            await close_http_session()
+        except ImportError:
+            pass
+        
         if hasattr(bot, "session") and bot.session:
             await bot.session.close()
             logger.info("Сессия бота закрыта")
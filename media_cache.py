@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, InputFile, FSInputFile, BufferedInputFile
+
+from db_utils import get_telegram_file_id, save_telegram_file_id, delete_telegram_file_id
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Максимальное количество file_id, которые держатся в памяти
+MAX_CACHED_FILE_IDS = 5000
+
+# Фрагменты ошибок Telegram, означающих, что сохраненный file_id больше не действителен
+STALE_FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "wrong file_id",
+    "file reference expired",
+    "file_reference_expired",
+)
+
+# file_id, уже прочитанные из базы данных: (хэш содержимого, тип медиа) -> file_id
+_file_ids: Dict[Tuple[str, str], str] = {}
+
+def content_hash(data: bytes) -> str:
+    """
+    Вычисляет хэш содержимого файла.
+
+    Args:
+        data: Содержимое файла
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде
+    """
+    return hashlib.sha256(data).hexdigest()
+
+def _file_hash_sync(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def file_content_hash(path: str) -> str:
+    """
+    Вычисляет хэш содержимого файла на диске, не блокируя цикл событий.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде
+    """
+    return await asyncio.to_thread(_file_hash_sync, path)
+
+def _sent_file(message: Message, media_type: str) -> Optional[Any]:
+    if media_type == "photo":
+        return message.photo[-1] if message.photo else None
+    return getattr(message, media_type, None)
+
+async def _lookup(key: Tuple[str, str]) -> Optional[str]:
+    file_id = _file_ids.get(key)
+    if file_id is None:
+        file_id = await get_telegram_file_id(*key)
+        if file_id is not None:
+            _remember(key, file_id)
+    return file_id
+
+def _is_stale_file_id(error: TelegramBadRequest) -> bool:
+    text = str(error.message).lower()
+    return any(marker in text for marker in STALE_FILE_ID_ERRORS)
+
+def _remember(key: Tuple[str, str], file_id: str) -> None:
+    if len(_file_ids) >= MAX_CACHED_FILE_IDS:
+        _file_ids.pop(next(iter(_file_ids)))
+    _file_ids[key] = file_id
+
+async def send_cached_media(
+    send: Callable[..., Awaitable[Message]],
+    media_type: str,
+    media_hash: str,
+    make_input_file: Callable[[], InputFile],
+    **kwargs
+) -> Message:
+    """
+    Отправляет медиа по сохраненному file_id, а если его нет - загружает файл.
+
+    После первой загрузки file_id и file_unique_id, которые вернул Telegram,
+    сохраняются по хэшу содержимого, и следующие отправки того же файла
+    идут по ссылке без повторной загрузки. Если Telegram сообщает, что
+    сохраненный file_id недействителен, он удаляется и файл загружается
+    заново; остальные ошибки передаются вызывающему, а file_id остается.
+
+    Args:
+        send: Метод отправки (например, message.answer_voice или bot.send_audio с chat_id в kwargs)
+        media_type: Тип медиа, совпадающий с полем Message (voice, audio, document, video, photo)
+        media_hash: Хэш содержимого файла
+        make_input_file: Функция, создающая файл для загрузки
+        **kwargs: Остальные параметры метода отправки
+
+    Returns:
+        Message: Отправленное сообщение
+
+    Raises:
+        TelegramBadRequest: Если Telegram отклонил отправку не из-за file_id
+    """
+    key = (media_hash, media_type)
+    file_id = await _lookup(key)
+    if file_id:
+        try:
+            return await send(file_id, **kwargs)
+        except TelegramBadRequest as e:
+            if not _is_stale_file_id(e):
+                raise
+            logger.warning(f"Telegram отклонил сохраненный file_id для {media_type} {media_hash[:12]}: {e}")
+            _file_ids.pop(key, None)
+            await delete_telegram_file_id(media_hash, media_type)
+
+    message = await send(make_input_file(), **kwargs)
+
+    sent_file = _sent_file(message, media_type)
+    if sent_file is not None:
+        _remember(key, sent_file.file_id)
+        await save_telegram_file_id(media_hash, media_type, sent_file.file_id, sent_file.file_unique_id)
+
+    return message
+
+async def answer_voice_file(message: Message, path: str, **kwargs) -> Message:
+    """
+    Отправляет голосовое сообщение из файла с повторным использованием file_id.
+
+    Args:
+        message: Сообщение, в чат которого отправляется голосовое
+        path: Путь к аудио-файлу
+        **kwargs: Остальные параметры answer_voice (caption, reply_markup, ...)
+
+    Returns:
+        Message: Отправленное сообщение
+    """
+    media_hash = await file_content_hash(path)
+    return await send_cached_media(message.answer_voice, "voice", media_hash, lambda: FSInputFile(path), **kwargs)
+
+async def answer_document_bytes(message: Message, data: bytes, filename: str, **kwargs) -> Message:
+    """
+    Отправляет документ из памяти с повторным использованием file_id.
+
+    Args:
+        message: Сообщение, в чат которого отправляется документ
+        data: Содержимое документа
+        filename: Имя файла
+        **kwargs: Остальные параметры answer_document (caption, reply_markup, ...)
+
+    Returns:
+        Message: Отправленное сообщение
+    """
+    return await send_cached_media(
+        message.answer_document, "document", content_hash(data),
+        lambda: BufferedInputFile(data, filename=filename), **kwargs
+    )
+
+async def answer_voice_bytes(message: Message, data: bytes, filename: str, **kwargs) -> Message:
+    """
+    Отправляет голосовое сообщение из памяти с повторным использованием file_id.
+
+    Args:
+        message: Сообщение, в чат которого отправляется голосовое
+        data: Содержимое аудио-файла
+        filename: Имя файла
+        **kwargs: Остальные параметры answer_voice (caption, reply_markup, ...)
+
+    Returns:
+        Message: Отправленное сообщение
+    """
+    return await send_cached_media(
+        message.answer_voice, "voice", content_hash(data),
+        lambda: BufferedInputFile(data, filename=filename), **kwargs
+    )
@@ -1,29 +1,33 @@
 import logging
 import os
+import time
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import FSInputFile
 from openai import AsyncOpenAI
 import httpx
 
 from button_states import MeditationStates
+from media_cache import answer_voice_bytes
+from meditation_library import get_library_meditation, get_library_report, format_library_report, build_meditation_library
+from meditation_pipeline import MeditationPipeline, MeditationRequest
+from db_utils import try_increment_usage, get_usage_count, reset_usage
 
-# Импортируем generate_audio из services.tts с обработкой ошибок
+# Импортируем synthesize_audio из services.tts с обработкой ошибок
 try:
-    from services.tts import generate_audio
+    from services.tts import synthesize_audio, iter_speech_segments
 except ImportError:
     # Создаем заглушку для generate_audio если импорт не удался
     logger = logging.getLogger(__name__)
-    logger.warning("Не удалось импортировать generate_audio из services.tts. Используем заглушку.")
+    logger.warning("Не удалось импортировать synthesize_audio из services.tts. Используем заглушку.")
     
-    async def generate_audio(text: str, user_id: int, meditation_type: str = "default") -> tuple:
+    async def synthesize_audio(text: str, user_id: int, meditation_type: str = "default") -> tuple:
         """
-        Заглушка для generate_audio.
+        Заглушка для synthesize_audio.
         
         Args:
             text: Текст для преобразования в аудио
@@ -33,17 +37,15 @@ except ImportError:
         Returns:
             tuple: (None, "Функция недоступна")
         """
-        # Создаем директорию tmp, если она не существует
-        os.makedirs("tmp", exist_ok=True)
-        
-        # Создаем пустой файл как заглушку
-        file_name = f"placeholder_{meditation_type}_{user_id}.mp3"
-        file_path = os.path.join("tmp", file_name)
-        
-        with open(file_path, "w") as f:
-            f.write("# Placeholder audio file")
-        
-        return file_path, None
+        return None, "Функция недоступна"
+
+    async def iter_speech_segments(deltas):
+        """
+        Заглушка для iter_speech_segments: выдает весь текст одной частью.
+        """
+        text = "".join([delta async for delta in deltas])
+        if text:
+            yield text
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -69,34 +71,36 @@ if OPENAI_API_KEY:
 # Константа максимального количества медитаций
 MAX_MEDITATION_COUNT = 4
 
-# Функция для обновления и проверки счетчика медитаций
-async def update_meditation_count(state: FSMContext, user_id: int) -> bool:
+# Имя счетчика медитаций в таблице usage_counters
+MEDITATION_COUNTER = "meditation"
+
+# Окно лимита медитаций: all (за все время), day, week или month
+MEDITATION_QUOTA_WINDOW = os.getenv("MEDITATION_QUOTA_WINDOW", "all")
+
+# Функция для учета медитации и проверки лимита
+async def check_meditation_quota(user_id: int) -> Optional[bool]:
     """
-    Обновляет счетчик медитаций пользователя и проверяет, превышен ли лимит.
+    Учитывает медитацию пользователя, если лимит за текущий период еще не исчерпан.
+    
+    Проверка и увеличение счетчика выполняются одним атомарным запросом
+    к таблице usage_counters.
     
     Args:
-        state: Контекст состояния FSM
         user_id: ID пользователя Telegram
         
     Returns:
-        bool: True, если пользователь может получить медитацию, False если лимит превышен
+        Optional[bool]: True, если пользователь может получить медитацию, False если
+        лимит превышен, None если лимит не удалось проверить
     """
-    # Получаем текущие данные пользователя
-    user_data = await state.get_data()
-    
-    # Получаем текущий счетчик медитаций или устанавливаем 0, если счетчика нет
-    meditation_count = user_data.get("user_meditation_count", 0)
-    
-    # Проверяем, превышен ли лимит
-    if meditation_count >= MAX_MEDITATION_COUNT:
+    allowed = await try_increment_usage(user_id, MEDITATION_COUNTER, MAX_MEDITATION_COUNT, MEDITATION_QUOTA_WINDOW)
+    if allowed is None:
+        logger.warning(f"Не удалось проверить лимит медитаций пользователя {user_id}")
+        return None
+    if not allowed:
         logger.info(f"Пользователь {user_id} превысил лимит медитаций ({MAX_MEDITATION_COUNT})")
         return False
     
-    # Увеличиваем счетчик и сохраняем его
-    meditation_count += 1
-    await state.update_data(user_meditation_count=meditation_count)
-    logger.info(f"Обновлен счетчик медитаций для пользователя {user_id}: {meditation_count}")
-    
+    logger.info(f"Учтена медитация пользователя {user_id}")
     return True
 
 # Создаем роутер для обработки медитаций
@@ -218,43 +222,29 @@ async def cmd_meditate(message: Message, state: FSMContext):
     # Устанавливаем состояние выбора типа медитации
     await state.set_state(MeditationStates.selecting_type)
 
-# Функция для генерации персонализированной медитации на основе профиля пользователя
-async def generate_personalized_meditation(user_profile: Dict[str, Any], duration: str = "short") -> str:
+# Длительность и объем текста медитации для каждого варианта продолжительности
+MEDITATION_DURATIONS = {
+    "short": ("2-3 минуты", "150-200 слов"),
+    "medium": ("5-7 минут", "300-400 слов"),
+    "long": ("10-15 минут", "600-800 слов")
+}
+
+def get_basic_meditation(personality_type: str, duration_text: str) -> str:
     """
-    Генерирует персонализированную медитацию для пользователя на основе его психологического профиля.
+    Возвращает заготовленную медитацию для типа личности.
+    
+    Используется, если OpenAI API недоступен, профиль не найден или возникла ошибка генерации.
     
     Args:
-        user_profile: Профиль пользователя (включает тип личности и полный текст профиля)
-        duration: Продолжительность медитации ('short', 'medium', 'long')
+        personality_type: Тип личности
+        duration_text: Продолжительность медитации для заголовка
         
     Returns:
         str: Текст медитации
     """
-    # Получаем тип личности и текст профиля
-    personality_type = user_profile.get("personality_type", "Интеллектуальный")
-    profile_text = user_profile.get("profile_text", "")
-    
-    # Определяем длительность в зависимости от параметра
-    if duration == "short":
-        duration_text = "2-3 минуты"
-        length_guide = "150-200 слов"
-    elif duration == "medium":
-        duration_text = "5-7 минут"
-        length_guide = "300-400 слов"
-    else:  # long
-        duration_text = "10-15 минут"
-        length_guide = "600-800 слов"
-    
-    # Проверяем, доступен ли API клиент OpenAI
-    use_fallback_meditation = not client
-    
-    # Если API недоступен или профиль не найден, используем заготовленные медитации
-    if use_fallback_meditation or not profile_text:
-        logger.warning(f"OpenAI API недоступен или профиль не найден. Используем заготовленную медитацию для типа {personality_type}")
-        
-        # Заготовленные базовые медитации
-        basic_meditations = {
-            "Интеллектуальный": f"""**Медитация для интеллектуального типа - {duration_text}**
+    # Заготовленные базовые медитации
+    basic_meditations = {
+        "Интеллектуальный": f"""**Медитация для интеллектуального типа - {duration_text}**
 
 Устройся удобно и позволь своему телу найти комфортное положение... Закрой глаза и сделай несколько глубоких вдохов...
 
@@ -265,8 +255,8 @@ async def generate_personalized_meditation(user_profile: Dict[str, Any], duratio
 Твой аналитический ум - твоя сила... Но сейчас позволь себе просто быть... Без анализа, без оценки... Только наблюдение за дыханием и ощущениями в теле...
 
 Когда будешь готова, медленно вернись в комнату... Открой глаза, сохраняя это состояние внутренней тишины и ясности...""",
-            
-            "Эмоциональный": f"""**Медитация для эмоционального типа - {duration_text}**
+        
+        "Эмоциональный": f"""**Медитация для эмоционального типа - {duration_text}**
 
 Устройся удобно, найди положение, в котором твоё тело чувствует себя защищённым... Закрой глаза и сделай глубокий вдох...
 
@@ -277,8 +267,8 @@ async def generate_personalized_meditation(user_profile: Dict[str, Any], duratio
 Твоя эмоциональная глубина - твоя сила... Сейчас ты учишься быть в гармонии со своими чувствами... Наблюдая их, как наблюдаешь закат - с восхищением и принятием...
 
 Когда будешь готова, медленно возвращайся в комнату... Открой глаза, сохраняя эту внутреннюю гармонию и спокойствие...""",
-            
-            "Творческий": f"""**Медитация для творческого типа - {duration_text}**
+        
+        "Творческий": f"""**Медитация для творческого типа - {duration_text}**
 
 Найди удобное положение и позволь своему телу полностью расслабиться... Закрой глаза и сделай три глубоких вдоха...
 
@@ -289,9 +279,9 @@ async def generate_personalized_meditation(user_profile: Dict[str, Any], duratio
 Твоя творческая сила - твой дар миру... Сейчас ты учишься доверять этому потоку, позволяя идеям приходить свободно и легко...
 
 Когда будешь готова, медленно возвращайся в комнату... Открой глаза, сохраняя это чувство творческого изобилия и свободы...""",
-            
-            # Общая медитация по умолчанию
-            "default": f"""**Медитация для расслабления и присутствия - {duration_text}**
+        
+        # Общая медитация по умолчанию
+        "default": f"""**Медитация для расслабления и присутствия - {duration_text}**
 
 Найди удобное положение и позволь своему телу полностью расслабиться... Закрой глаза и сделай три глубоких вдоха...
 
@@ -302,14 +292,27 @@ async def generate_personalized_meditation(user_profile: Dict[str, Any], duratio
 Ты в безопасности здесь и сейчас... Полностью присутствуешь в этом моменте... Позволь себе просто быть, без необходимости что-то делать или о чём-то думать...
 
 Когда будешь готова, медленно возвращайся в комнату... Сохраняя это чувство покоя и присутствия... Открой глаза, оставаясь в контакте с внутренним спокойствием..."""
-        }
+    }
+    
+    # Возвращаем базовую медитацию в зависимости от типа личности
+    return basic_meditations.get(personality_type, basic_meditations["default"])
+
+def build_meditation_messages(profile_text: str, duration: str, goal: Optional[str] = None) -> list:
+    """
+    Формирует сообщения для запроса медитации к OpenAI.
+    
+    Args:
+        profile_text: Текст психологического профиля пользователя
+        duration: Продолжительность медитации ('short', 'medium', 'long')
+        goal: Цель медитации (например, "погружение в сон"), если она задана
         
-        # Возвращаем базовую медитацию в зависимости от типа личности
-        return basic_meditations.get(personality_type, basic_meditations["default"])
+    Returns:
+        list: Сообщения для chat.completions
+    """
+    duration_text, length_guide = MEDITATION_DURATIONS.get(duration, MEDITATION_DURATIONS["long"])
     
-    try:
-        # Подготовка системного промпта
-        system_prompt = f"""Ты — поэтичный проводник по внутреннему миру проекта ONA. Создай медитацию для участницы на основе её психологического профиля. 
+    # Подготовка системного промпта
+    system_prompt = f"""Ты — поэтичный проводник по внутреннему миру проекта ONA. Создай медитацию для участницы на основе её психологического профиля. 
 
 Твоя медитация должна быть глубоко личной — используй метафоры, образы и темы, отражающие её внутренние силы, архетип, импульсы и эмоциональную структуру из профиля. Обращайся на «ты», создавай текст, который звучит как голос близкого друга — мягкий, понимающий, вдохновляющий.
 
@@ -325,440 +328,434 @@ async def generate_personalized_meditation(user_profile: Dict[str, Any], duratio
 
 Стиль: поэтичный, образный, с метафорами соответствующими типу личности из профиля. Тон: спокойный, мягкий, уверенный."""
 
-        try:
-            # Отправляем запрос в OpenAI
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                temperature=0.7,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Вот психологический профиль пользователя:\n\n{profile_text}\n\nСоздай персонализированную медитацию для этого человека длительностью {duration_text} (примерно {length_guide})."}
-                ]
-            )
-            
-            # Получаем сгенерированную медитацию
-            meditation_text = response.choices[0].message.content
-            
-            # Логируем результат
-            logger.info(f"Сгенерирована персонализированная медитация длиной {len(meditation_text)} символов")
-            
-            return meditation_text
-        except Exception as e:
-            # Проверяем, связана ли ошибка с превышением квоты
-            error_str = str(e)
-            if "quota" in error_str.lower() or "insufficient_quota" in error_str or "429" in error_str:
-                logger.error(f"Ошибка квоты OpenAI API при генерации медитации: {e}. Переключаемся на базовую медитацию.")
-                use_fallback_meditation = True
-            else:
-                # Если ошибка другого типа, пробрасываем её дальше
-                raise e
-    
-    except Exception as e:
-        logger.error(f"Ошибка при генерации медитации: {e}")
-        use_fallback_meditation = True
+    user_prompt = f"Вот психологический профиль пользователя:\n\n{profile_text}\n\nСоздай персонализированную медитацию для этого человека длительностью {duration_text} (примерно {length_guide})."
+    if goal:
+        user_prompt += f" Цель медитации: {goal}."
     
-    # Если API недоступен или возникла ошибка квоты, используем заготовленную медитацию
-    if use_fallback_meditation:
-        # Заготовленные базовые медитации
-        basic_meditations = {
-            "Интеллектуальный": f"""**Медитация для интеллектуального типа - {duration_text}**
-
-Устройся удобно и позволь своему телу найти комфортное положение... Закрой глаза и сделай несколько глубоких вдохов...
-
-Представь свой разум как бескрайнее звёздное небо... Каждая мысль - яркая звезда в этом пространстве... Наблюдай за ними с интересом и спокойствием исследователя...
-
-Почувствуй, как с каждым вдохом ты наполняешься ясностью и спокойствием... С каждым выдохом отпускаешь напряжение и беспокойство...
-
-Твой аналитический ум - твоя сила... Но сейчас позволь себе просто быть... Без анализа, без оценки... Только наблюдение за дыханием и ощущениями в теле...
-
-Когда будешь готова, медленно вернись в комнату... Открой глаза, сохраняя это состояние внутренней тишины и ясности...""",
-            
-            "Эмоциональный": f"""**Медитация для эмоционального типа - {duration_text}**
-
-Устройся удобно, найди положение, в котором твоё тело чувствует себя защищённым... Закрой глаза и сделай глубокий вдох...
-
-Представь себя на берегу тёплого моря... Волны нежно омывают песок... Каждая волна - это эмоция, приходящая и уходящая естественным образом...
-
-Почувствуй, как твоё сердце открывается навстречу этому ритму... Ты можешь просто наблюдать за своими чувствами, не отождествляясь с ними полностью...
-
-Твоя эмоциональная глубина - твоя сила... Сейчас ты учишься быть в гармонии со своими чувствами... Наблюдая их, как наблюдаешь закат - с восхищением и принятием...
-
-Когда будешь готова, медленно возвращайся в комнату... Открой глаза, сохраняя эту внутреннюю гармонию и спокойствие...""",
-            
-            "Творческий": f"""**Медитация для творческого типа - {duration_text}**
-
-Найди удобное положение и позволь своему телу полностью расслабиться... Закрой глаза и сделай три глубоких вдоха...
-
-Представь себя в центре прекрасного сада возможностей... Каждый цветок, каждое растение - проявление твоей творческой силы... Множество красок, форм и ароматов окружают тебя...
-
-Почувствуй, как твоё воображение свободно течёт, создавая новые образы и идеи... С каждым вдохом ты наполняешься вдохновением, с каждым выдохом освобождаешь пространство для нового...
-
-Твоя творческая сила - твой дар миру... Сейчас ты учишься доверять этому потоку, позволяя идеям приходить свободно и легко...
-
-Когда будешь готова, медленно возвращайся в комнату... Открой глаза, сохраняя это чувство творческого изобилия и свободы...""",
-            
-            # Общая медитация по умолчанию
-            "default": f"""**Медитация для расслабления и присутствия - {duration_text}**
-
-Найди удобное положение и позволь своему телу полностью расслабиться... Закрой глаза и сделай три глубоких вдоха...
-
-С каждым вдохом ты наполняешься спокойствием и силой... С каждым выдохом отпускаешь напряжение и усталость...
-
-Почувствуй, как твоё тело становится тяжелее... Как растворяются все тревоги в пространстве вокруг тебя...
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
 
-Ты в безопасности здесь и сейчас... Полностью присутствуешь в этом моменте... Позволь себе просто быть, без необходимости что-то делать или о чём-то думать...
+def _is_quota_error(error: Exception) -> bool:
+    error_str = str(error)
+    return "quota" in error_str.lower() or "insufficient_quota" in error_str or "429" in error_str
 
-Когда будешь готова, медленно возвращайся в комнату... Сохраняя это чувство покоя и присутствия... Открой глаза, оставаясь в контакте с внутренним спокойствием..."""
-        }
-        
-        # Возвращаем базовую медитацию в зависимости от типа личности
-        return basic_meditations.get(personality_type, basic_meditations["default"])
-
-# Обработчики для инлайн-кнопок медитаций
-@meditation_router.callback_query(F.data == "meditate_relax")
-async def get_relax_meditation(callback: CallbackQuery, state: FSMContext):
-    """
-    Обработчик запроса на медитацию для расслабления.
+async def request_meditation_text(profile_text: str, duration: str, goal: Optional[str] = None) -> str:
     """
-    await callback.answer("Подготавливаю медитацию для расслабления...")
+    Запрашивает текст медитации у gpt-4o без подмены заготовленной медитацией.
     
-    # Проверяем счетчик медитаций
-    can_get_meditation = await update_meditation_count(state, callback.from_user.id)
+    Args:
+        profile_text: Текст психологического профиля
+        duration: Продолжительность медитации ('short', 'medium', 'long')
+        goal: Цель медитации, если она задана
+        
+    Returns:
+        str: Текст медитации
     
-    if not can_get_meditation:
-        # Если лимит превышен, отправляем сообщение и выходим
-        await callback.message.edit_text(
-            "🧘 <b>Медитация для расслабления:</b>\n\n"
-            "Ты уже получила 4 уникальные медитации. Если ты чувствуешь, что готова к новой — "
-            "напиши нам отдельно, и мы обсудим.",
-            reply_markup=get_meditation_keyboard(),
-            parse_mode="HTML"
-        )
-        return
+    Raises:
+        Exception: Если API недоступен или запрос завершился ошибкой
+    """
+    if not client:
+        raise RuntimeError("OpenAI API недоступен")
     
-    # Отправляем текст медитации
-    await callback.message.edit_text(
-        "🧘 <b>Медитация для расслабления:</b>\n\n"
-        "Сейчас вы получите голосовую медитацию. Найдите удобное место, "
-        "где вас не будут беспокоить в течение 5-10 минут.",
-        reply_markup=get_meditation_keyboard(),
-        parse_mode="HTML"
+    response = await client.chat.completions.create(
+        model="gpt-4o",
+        temperature=0.7,
+        messages=build_meditation_messages(profile_text, duration, goal)
     )
+    return response.choices[0].message.content
+
+# Функция для генерации персонализированной медитации на основе профиля пользователя
+async def generate_personalized_meditation(user_profile: Dict[str, Any], duration: str = "short", goal: Optional[str] = None) -> str:
+    """
+    Генерирует персонализированную медитацию для пользователя на основе его психологического профиля.
     
-    try:
-        # Отправляем сообщение о том, что медитация готовится
-        preparing_message = await callback.message.answer(
-            "⏳ Генерирую аудио медитацию...\n"
-            "Это может занять несколько секунд."
-        )
-        
-        # Получаем данные пользователя
-        user_data = await state.get_data()
-        profile_text = user_data.get("profile_text", "")
-        user_name = user_data.get("name", "")
-        
-        # Генерируем персонализированную медитацию
-        meditation_text = await generate_personalized_meditation(
-            user_profile=user_data,
-            duration="short"
-        )
+    Args:
+        user_profile: Профиль пользователя (включает тип личности и полный текст профиля)
+        duration: Продолжительность медитации ('short', 'medium', 'long')
+        goal: Цель медитации, если она задана
         
-        # Генерируем аудио с помощью ElevenLabs API
-        audio_path, error_reason = await generate_audio(
-            text=meditation_text,
-            user_id=callback.from_user.id,
-            meditation_type="relax"
-        )
+    Returns:
+        str: Текст медитации
+    """
+    # Получаем тип личности и текст профиля
+    personality_type = user_profile.get("personality_type", "Интеллектуальный")
+    profile_text = user_profile.get("profile_text", "")
+    duration_text, _ = MEDITATION_DURATIONS.get(duration, MEDITATION_DURATIONS["long"])
+    
+    # Если API недоступен или профиль не найден, используем заготовленные медитации
+    if not client or not profile_text:
+        logger.warning(f"OpenAI API недоступен или профиль не найден. Используем заготовленную медитацию для типа {personality_type}")
+        return get_basic_meditation(personality_type, duration_text)
+    
+    try:
+        # Отправляем запрос в OpenAI
+        meditation_text = await request_meditation_text(profile_text, duration, goal)
         
-        # Удаляем сообщение о подготовке
-        await preparing_message.delete()
+        # Логируем результат
+        logger.info(f"Сгенерирована персонализированная медитация длиной {len(meditation_text)} символов")
         
-        if audio_path:
-            # Проверяем, что файл существует
-            if os.path.exists(audio_path):
-                try:
-                    # Отправляем голосовое сообщение
-                    await callback.message.answer_voice(
-                        FSInputFile(audio_path),
-                        caption="🧘 Медитация для расслабления. Сядьте удобно и следуйте инструкциям."
-                    )
-                    logger.info(f"Голосовое сообщение успешно отправлено пользователю {callback.from_user.id}")
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке голосового сообщения: {e}")
-                    # Если не удалось отправить голосовое, отправляем текст медитации
-                    await callback.message.answer(
-                        f"<b>Не удалось отправить аудио. Вот текст медитации:</b>\n\n{meditation_text}",
-                        parse_mode="HTML"
-                    )
-            else:
-                logger.error(f"Файл {audio_path} не существует")
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-файл. Вот текст медитации:</b>\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
-            
-            # Удаляем временный файл
-            try:
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                    logger.info(f"Временный файл {audio_path} удален")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении временного файла: {e}")
-        else:
-            # Обрабатываем различные причины ошибок
-            if error_reason == "quota_exceeded":
-                await callback.message.answer(
-                    "⚠️ <b>Превышен лимит генерации аудио</b>\n\n"
-                    "К сожалению, достигнут ежедневный лимит генерации аудио. "
-                    "Ниже приведен текст медитации, который вы можете прочитать самостоятельно.\n\n"
-                    f"{meditation_text}",
-                    parse_mode="HTML"
-                )
-                logger.info(f"Пользователь {callback.from_user.id} получил текст медитации из-за превышения квоты")
-            else:
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-медитацию: {error_reason}</b>\n\n"
-                    f"Вот текст медитации, который вы можете прочитать самостоятельно:\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
+        return meditation_text
     except Exception as e:
-        logger.error(f"Ошибка при обработке запроса на медитацию: {e}")
-        await callback.message.answer(
-            "Произошла ошибка при подготовке медитации. Пожалуйста, повторите запрос позже."
-        )
+        # Проверяем, связана ли ошибка с превышением квоты
+        if _is_quota_error(e):
+            logger.error(f"Ошибка квоты OpenAI API при генерации медитации: {e}. Переключаемся на базовую медитацию.")
+        else:
+            logger.error(f"Ошибка при генерации медитации: {e}")
     
-    # Сохраняем информацию о выполненной медитации
-    logger.info(f"Пользователь {callback.from_user.id} получил медитацию для расслабления")
+    # Если возникла ошибка, используем заготовленную медитацию
+    return get_basic_meditation(personality_type, duration_text)
 
-@meditation_router.callback_query(F.data == "meditate_focus")
-async def get_focus_meditation(callback: CallbackQuery, state: FSMContext):
+async def stream_personalized_meditation(user_profile: Dict[str, Any], duration: str = "short") -> AsyncIterator[str]:
     """
-    Обработчик запроса на медитацию для фокусировки.
+    Генерирует персонализированную медитацию потоком фрагментов текста.
+    
+    Фрагменты выдаются по мере генерации gpt-4o. Если API недоступен, профиль
+    не найден или ошибка произошла до первого фрагмента, выдается заготовленная
+    медитация целиком. Ошибка посреди генерации завершает поток: уже
+    полученная часть медитации остается у пользователя.
+    
+    Args:
+        user_profile: Профиль пользователя (включает тип личности и полный текст профиля)
+        duration: Продолжительность медитации ('short', 'medium', 'long')
+        
+    Yields:
+        str: Фрагменты текста медитации
     """
-    await callback.answer("Подготавливаю медитацию для фокусировки...")
+    personality_type = user_profile.get("personality_type", "Интеллектуальный")
+    profile_text = user_profile.get("profile_text", "")
+    duration_text, _ = MEDITATION_DURATIONS.get(duration, MEDITATION_DURATIONS["long"])
     
-    # Проверяем счетчик медитаций
-    can_get_meditation = await update_meditation_count(state, callback.from_user.id)
+    if not client or not profile_text:
+        logger.warning(f"OpenAI API недоступен или профиль не найден. Используем заготовленную медитацию для типа {personality_type}")
+        yield get_basic_meditation(personality_type, duration_text)
+        return
     
-    if not can_get_meditation:
-        # Если лимит превышен, отправляем сообщение и выходим
-        await callback.message.edit_text(
-            "🧠 <b>Медитация для фокусировки:</b>\n\n"
-            "Ты уже получила 4 уникальные медитации. Если ты чувствуешь, что готова к новой — "
-            "напиши нам отдельно, и мы обсудим.",
-            reply_markup=get_meditation_keyboard(),
-            parse_mode="HTML"
+    generated = 0
+    try:
+        stream = await client.chat.completions.create(
+            model="gpt-4o",
+            temperature=0.7,
+            messages=build_meditation_messages(profile_text, duration),
+            stream=True
         )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                generated += len(delta)
+                yield delta
+    except Exception as e:
+        if _is_quota_error(e):
+            logger.error(f"Ошибка квоты OpenAI API при генерации медитации: {e}. Переключаемся на базовую медитацию.")
+        else:
+            logger.error(f"Ошибка при потоковой генерации медитации: {e}")
+        if not generated:
+            yield get_basic_meditation(personality_type, duration_text)
         return
     
-    # Отправляем текст медитации
-    await callback.message.edit_text(
-        "🧠 <b>Медитация для фокусировки:</b>\n\n"
-        "Сейчас вы получите голосовую медитацию. Найдите удобное место, "
-        "где вас не будут беспокоить в течение 5-10 минут.",
-        reply_markup=get_meditation_keyboard(),
-        parse_mode="HTML"
-    )
+    logger.info(f"Сгенерирована персонализированная медитация длиной {generated} символов")
+
+async def synthesize_segments(request: MeditationRequest) -> AsyncIterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Озвучивает части текста медитации по мере их готовности.
     
-    try:
-        # Отправляем сообщение о том, что медитация готовится
-        preparing_message = await callback.message.answer(
-            "⏳ Генерирую аудио медитацию...\n"
-            "Это может занять несколько секунд."
-        )
-        
-        # Получаем данные пользователя
-        user_data = await state.get_data()
-        profile_text = user_data.get("profile_text", "")
-        user_name = user_data.get("name", "")
-        
-        # Генерируем персонализированную медитацию
-        meditation_text = await generate_personalized_meditation(
-            user_profile=user_data,
-            duration="short"
-        )
-        
-        # Генерируем аудио с помощью ElevenLabs API
-        audio_path, error_reason = await generate_audio(
-            text=meditation_text,
-            user_id=callback.from_user.id,
-            meditation_type="focus"
-        )
-        
-        # Удаляем сообщение о подготовке
-        await preparing_message.delete()
+    Озвучка каждой части запускается сразу, как только часть готова, не
+    дожидаясь конца генерации текста, а части выдаются строго по порядку.
+    После первой ошибки озвучки остальные части не озвучиваются и выдаются
+    только текстом. Ожидание каждой части текста и озвучка каждой части
+    записываются в request.work как "llm" и "tts".
+    
+    Args:
+        request: Запрос медитации с потоком частей текста в request.segments
         
-        if audio_path:
-            # Проверяем, что файл существует
-            if os.path.exists(audio_path):
-                try:
-                    # Отправляем голосовое сообщение
-                    await callback.message.answer_voice(
-                        FSInputFile(audio_path),
-                        caption="🧠 Медитация для фокусировки. Сядьте удобно и следуйте инструкциям."
-                    )
-                    logger.info(f"Голосовое сообщение успешно отправлено пользователю {callback.from_user.id}")
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке голосового сообщения: {e}")
-                    # Если не удалось отправить голосовое, отправляем текст медитации
-                    await callback.message.answer(
-                        f"<b>Не удалось отправить аудио. Вот текст медитации:</b>\n\n{meditation_text}",
-                        parse_mode="HTML"
-                    )
-            else:
-                logger.error(f"Файл {audio_path} не существует")
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-файл. Вот текст медитации:</b>\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
+    Yields:
+        Tuple[str, Optional[bytes], Optional[str]]: Текст части, содержимое mp3
+        (None при ошибке) и причина ошибки озвучки
+    """
+    segments: asyncio.Queue = asyncio.Queue()
+    failed_reason: Optional[str] = None
+    
+    async def synthesize(segment: str) -> Tuple[Optional[bytes], Optional[str]]:
+        started = time.monotonic()
+        try:
+            return await synthesize_audio(segment, request.user_id, request.kind.key)
+        finally:
+            request.add_work("tts", time.monotonic() - started)
+    
+    async def produce() -> None:
+        try:
+            waiting = time.monotonic()
+            async for segment in request.segments:
+                request.add_work("llm", time.monotonic() - waiting)
+                request.mark("first_text")
+                task = None
+                if failed_reason is None:
+                    task = asyncio.create_task(synthesize(segment))
+                await segments.put((segment, task))
+                waiting = time.monotonic()
+        finally:
+            await segments.put(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await segments.get()
+            if item is None:
+                break
+            segment, task = item
+            if failed_reason is not None:
+                if task is not None:
+                    task.cancel()
+                yield segment, None, failed_reason
+                continue
             
-            # Удаляем временный файл
-            try:
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                    logger.info(f"Временный файл {audio_path} удален")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении временного файла: {e}")
-        else:
-            # Обрабатываем различные причины ошибок
-            if error_reason == "quota_exceeded":
-                await callback.message.answer(
-                    "⚠️ <b>Превышен лимит генерации аудио</b>\n\n"
-                    "К сожалению, достигнут ежедневный лимит генерации аудио. "
-                    "Ниже приведен текст медитации, который вы можете прочитать самостоятельно.\n\n"
-                    f"{meditation_text}",
-                    parse_mode="HTML"
-                )
-                logger.info(f"Пользователь {callback.from_user.id} получил текст медитации из-за превышения квоты")
+            audio, error_reason = await task
+            if audio is None:
+                failed_reason = error_reason or "неизвестная ошибка"
             else:
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-медитацию: {error_reason}</b>\n\n"
-                    f"Вот текст медитации, который вы можете прочитать самостоятельно:\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
-    except Exception as e:
-        logger.error(f"Ошибка при обработке запроса на медитацию: {e}")
-        await callback.message.answer(
-            "Произошла ошибка при подготовке медитации. Пожалуйста, повторите запрос позже."
-        )
+                request.mark("first_audio")
+            yield segment, audio, error_reason
+        # Пробрасываем ошибку генерации текста, если она была
+        await producer
+    finally:
+        producer.cancel()
+        while not segments.empty():
+            item = segments.get_nowait()
+            if item is not None and item[1] is not None:
+                item[1].cancel()
+
+async def _library_audio(audio: bytes) -> AsyncIterator[Tuple[str, Optional[bytes], Optional[str]]]:
+    yield "", audio, None
+
+class MeditationKind:
+    """
+    Параметры типа медитации: заголовок, длительность и тексты сообщений.
+    """
     
-    # Сохраняем информацию о выполненной медитации
-    logger.info(f"Пользователь {callback.from_user.id} получил медитацию для фокусировки")
+    __slots__ = ("key", "title", "name", "duration", "minutes", "caption")
+    
+    def __init__(self, key: str, title: str, name: str, duration: str, minutes: str, caption: str):
+        self.key = key
+        self.title = title
+        self.name = name
+        self.duration = duration
+        self.minutes = minutes
+        self.caption = caption
+
+# Типы медитаций по callback_data кнопок "meditate_<тип>"
+MEDITATION_KINDS = {
+    "relax": MeditationKind(
+        "relax", "🧘 <b>Медитация для расслабления:</b>", "для расслабления", "short", "5-10 минут",
+        "🧘 Медитация для расслабления. Сядьте удобно и следуйте инструкциям."
+    ),
+    "focus": MeditationKind(
+        "focus", "🧠 <b>Медитация для фокусировки:</b>", "для фокусировки", "short", "5-10 минут",
+        "🧠 Медитация для фокусировки. Сядьте удобно и следуйте инструкциям."
+    ),
+    "sleep": MeditationKind(
+        # Для сна делаем немного длиннее
+        "sleep", "😴 <b>Медитация для сна:</b>", "для сна", "medium", "10-15 минут",
+        "😴 Медитация для сна. Расположитесь удобно и следуйте инструкциям."
+    )
+}
 
-@meditation_router.callback_query(F.data == "meditate_sleep")
-async def get_sleep_meditation(callback: CallbackQuery, state: FSMContext):
+async def check_quota_stage(request: MeditationRequest) -> bool:
     """
-    Обработчик запроса на медитацию для сна.
+    Этап проверки лимита: останавливает конвейер, если пользователь исчерпал медитации
+    или лимит не удалось проверить.
     """
-    await callback.answer("Подготавливаю медитацию для сна...")
-    
-    # Проверяем счетчик медитаций
-    can_get_meditation = await update_meditation_count(state, callback.from_user.id)
-    
-    if not can_get_meditation:
-        # Если лимит превышен, отправляем сообщение и выходим
-        await callback.message.edit_text(
-            "😴 <b>Медитация для сна:</b>\n\n"
-            "Ты уже получила 4 уникальные медитации. Если ты чувствуешь, что готова к новой — "
-            "напиши нам отдельно, и мы обсудим.",
+    allowed = await check_meditation_quota(request.user_id)
+    if allowed:
+        return True
+    
+    if allowed is None:
+        # Счетчик недоступен (например, база занята): медитацию не выдаем без учета
+        await request.callback.message.edit_text(
+            f"{request.kind.title}\n\n"
+            "Сейчас не получается подготовить медитацию. Пожалуйста, попробуй еще раз через минуту.",
             reply_markup=get_meditation_keyboard(),
             parse_mode="HTML"
         )
-        return
+        return False
     
-    # Отправляем текст медитации
-    await callback.message.edit_text(
-        "😴 <b>Медитация для сна:</b>\n\n"
+    # Если лимит превышен, отправляем сообщение и выходим
+    await request.callback.message.edit_text(
+        f"{request.kind.title}\n\n"
+        "Ты уже получила 4 уникальные медитации. Если ты чувствуешь, что готова к новой — "
+        "напиши нам отдельно, и мы обсудим.",
+        reply_markup=get_meditation_keyboard(),
+        parse_mode="HTML"
+    )
+    return False
+
+async def prepare_stage(request: MeditationRequest) -> None:
+    """
+    Этап подготовки: выбирает готовую медитацию из библиотеки или запускает генерацию.
+    
+    Без заполненного профиля отправляется готовая медитация из библиотеки,
+    а с профилем текст генерируется потоком, собирается в части по абзацам
+    и озвучивается по мере готовности. Сама генерация и озвучка выполняются
+    во время этапа отправки, их время записывается в request.work.
+    """
+    message = request.callback.message
+    await message.edit_text(
+        f"{request.kind.title}\n\n"
         "Сейчас вы получите голосовую медитацию. Найдите удобное место, "
-        "где вас не будут беспокоить в течение 10-15 минут.",
+        f"где вас не будут беспокоить в течение {request.kind.minutes}.",
         reply_markup=get_meditation_keyboard(),
         parse_mode="HTML"
     )
     
-    try:
-        # Отправляем сообщение о том, что медитация готовится
-        preparing_message = await callback.message.answer(
-            "⏳ Генерирую аудио медитацию...\n"
-            "Это может занять несколько секунд."
-        )
-        
-        # Получаем данные пользователя
-        user_data = await state.get_data()
-        profile_text = user_data.get("profile_text", "")
-        user_name = user_data.get("name", "")
-        
-        # Генерируем персонализированную медитацию
-        meditation_text = await generate_personalized_meditation(
-            user_profile=user_data,
-            duration="medium"  # Для сна делаем немного длиннее
-        )
-        
-        # Генерируем аудио с помощью ElevenLabs API
-        audio_path, error_reason = await generate_audio(
-            text=meditation_text,
-            user_id=callback.from_user.id,
-            meditation_type="sleep"
+    # Отправляем сообщение о том, что медитация готовится
+    request.preparing_message = await message.answer(
+        "⏳ Генерирую аудио медитацию...\n"
+        "Это может занять несколько секунд."
+    )
+    
+    # Получаем данные пользователя
+    request.user_profile = await request.state.get_data()
+    
+    if not request.user_profile.get("profile_text"):
+        library_item = await get_library_meditation(
+            request.kind.key, request.user_profile.get("personality_type"), request.kind.duration
         )
-        
-        # Удаляем сообщение о подготовке
-        await preparing_message.delete()
-        
-        if audio_path:
-            # Проверяем, что файл существует
-            if os.path.exists(audio_path):
-                try:
-                    # Отправляем голосовое сообщение
-                    await callback.message.answer_voice(
-                        FSInputFile(audio_path),
-                        caption="😴 Медитация для сна. Расположитесь удобно и следуйте инструкциям."
-                    )
-                    logger.info(f"Голосовое сообщение успешно отправлено пользователю {callback.from_user.id}")
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке голосового сообщения: {e}")
-                    # Если не удалось отправить голосовое, отправляем текст медитации
-                    await callback.message.answer(
-                        f"<b>Не удалось отправить аудио. Вот текст медитации:</b>\n\n{meditation_text}",
-                        parse_mode="HTML"
-                    )
-            else:
-                logger.error(f"Файл {audio_path} не существует")
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-файл. Вот текст медитации:</b>\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
+        if library_item is not None:
+            item, audio_data = library_item
+            request.library_item_id = item["id"]
+            request.audio_parts = _library_audio(audio_data)
+            return
+    
+    request.segments = iter_speech_segments(stream_personalized_meditation(request.user_profile, request.kind.duration))
+    request.audio_parts = synthesize_segments(request)
+
+async def deliver_stage(request: MeditationRequest) -> None:
+    """
+    Этап отправки: отправляет голосовые сообщения по мере готовности частей.
+    
+    Первая часть отправляется, пока остальные еще генерируются и озвучиваются.
+    Если озвучить или отправить часть не удалось, оставшийся текст медитации
+    отправляется сообщением с объяснением причины. Если не удалось отправить
+    готовую медитацию из библиотеки, а пользователь еще ничего не получил,
+    вместо нее генерируется новая.
+    """
+    message = request.callback.message
+    text_parts = []
+    error_reason = None
+    
+    while True:
+        regenerate = False
+        async for segment, audio_data, segment_error in request.audio_parts:
+            if request.preparing_message is not None:
+                # Удаляем сообщение о подготовке
+                await request.preparing_message.delete()
+                request.preparing_message = None
+            
+            if audio_data is None or error_reason == "send_failed":
+                error_reason = error_reason or segment_error
+                text_parts.append(segment)
+                continue
             
-            # Удаляем временный файл
+            part = request.delivered_parts + 1
+            started = time.monotonic()
             try:
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                    logger.info(f"Временный файл {audio_path} удален")
-            except Exception as e:
-                logger.error(f"Ошибка при удалении временного файла: {e}")
-        else:
-            # Обрабатываем различные причины ошибок
-            if error_reason == "quota_exceeded":
-                await callback.message.answer(
-                    "⚠️ <b>Превышен лимит генерации аудио</b>\n\n"
-                    "К сожалению, достигнут ежедневный лимит генерации аудио. "
-                    "Ниже приведен текст медитации, который вы можете прочитать самостоятельно.\n\n"
-                    f"{meditation_text}",
-                    parse_mode="HTML"
+                # Отправляем голосовое сообщение прямо из памяти
+                await answer_voice_bytes(
+                    message,
+                    audio_data,
+                    filename=f"meditation_{request.kind.key}_{part}.mp3",
+                    caption=request.kind.caption if part == 1 else f"Часть {part}"
                 )
-                logger.info(f"Пользователь {callback.from_user.id} получил текст медитации из-за превышения квоты")
-            else:
-                await callback.message.answer(
-                    f"<b>Не удалось создать аудио-медитацию: {error_reason}</b>\n\n"
-                    f"Вот текст медитации, который вы можете прочитать самостоятельно:\n\n{meditation_text}",
-                    parse_mode="HTML"
-                )
-    except Exception as e:
-        logger.error(f"Ошибка при обработке запроса на медитацию: {e}")
-        await callback.message.answer(
-            "Произошла ошибка при подготовке медитации. Пожалуйста, повторите запрос позже."
+                request.delivered_parts = part
+                request.mark("first_delivery")
+            except Exception as e:
+                logger.error(f"Ошибка при отправке голосового сообщения: {e}")
+                if request.library_item_id is not None and request.delivered_parts == 0:
+                    regenerate = True
+                    break
+                # Остальные части отправляем текстом
+                error_reason = error_reason or "send_failed"
+                text_parts.append(segment)
+            finally:
+                request.add_work("send", time.monotonic() - started)
+        
+        if not regenerate:
+            break
+        
+        # Готовую медитацию отправить не удалось: генерируем новую
+        await request.audio_parts.aclose()
+        request.library_item_id = None
+        request.segments = iter_speech_segments(stream_personalized_meditation(request.user_profile, request.kind.duration))
+        request.audio_parts = synthesize_segments(request)
+    
+    if not text_parts:
+        return
+    
+    meditation_text = "\n\n".join(text_parts)
+    # Обрабатываем различные причины ошибок
+    if error_reason == "send_failed":
+        await message.answer(
+            f"<b>Не удалось отправить аудио. Вот текст медитации:</b>\n\n{meditation_text}",
+            parse_mode="HTML"
         )
+    elif error_reason == "quota_exceeded":
+        await message.answer(
+            "⚠️ <b>Превышен лимит генерации аудио</b>\n\n"
+            "К сожалению, достигнут ежедневный лимит генерации аудио. "
+            "Ниже приведен текст медитации, который вы можете прочитать самостоятельно.\n\n"
+            f"{meditation_text}",
+            parse_mode="HTML"
+        )
+        logger.info(f"Пользователь {request.user_id} получил текст медитации из-за превышения квоты")
+    else:
+        await message.answer(
+            f"<b>Не удалось создать аудио-медитацию: {error_reason}</b>\n\n"
+            f"Вот текст медитации, который вы можете прочитать самостоятельно:\n\n{meditation_text}",
+            parse_mode="HTML"
+        )
+
+async def cleanup_stage(request: MeditationRequest) -> None:
+    """
+    Этап очистки: удаляет сообщение о подготовке и останавливает незавершенную генерацию.
+    """
+    if request.audio_parts is not None:
+        await request.audio_parts.aclose()
+    if request.preparing_message is not None:
+        await request.preparing_message.delete()
+        request.preparing_message = None
     
-    # Сохраняем информацию о выполненной медитации
-    logger.info(f"Пользователь {callback.from_user.id} получил медитацию для сна")
+    if request.delivered_parts:
+        source = f"из библиотеки ({request.library_item_id})" if request.library_item_id is not None else f"частей: {request.delivered_parts}"
+        logger.info(f"Пользователь {request.user_id} получил медитацию {request.kind.name}, {source}")
+
+async def report_pipeline_error(request: MeditationRequest, error: Exception) -> None:
+    """
+    Сообщает пользователю об ошибке подготовки медитации.
+    """
+    await request.callback.message.answer(
+        "Произошла ошибка при подготовке медитации. Пожалуйста, повторите запрос позже."
+    )
+
+# Общий конвейер подготовки медитаций всех типов
+meditation_pipeline = MeditationPipeline(
+    stages=[
+        ("quota", check_quota_stage),
+        ("prepare", prepare_stage),
+        ("delivery", deliver_stage)
+    ],
+    cleanup=cleanup_stage,
+    on_error=report_pipeline_error
+)
+
+# Обработчик для инлайн-кнопок медитаций
+@meditation_router.callback_query(F.data.in_({f"meditate_{key}" for key in MEDITATION_KINDS}))
+async def get_meditation(callback: CallbackQuery, state: FSMContext):
+    """
+    Обработчик запроса на медитацию любого типа: тип определяется по callback_data.
+    """
+    kind = MEDITATION_KINDS[callback.data.removeprefix("meditate_")]
+    await callback.answer(f"Подготавливаю медитацию {kind.name}...")
+    await meditation_pipeline.run(MeditationRequest(callback, state, kind))
 
 @meditation_router.callback_query(F.data == "meditate_help")
 async def meditation_help(callback: CallbackQuery):
@@ -839,15 +836,12 @@ async def back_to_main_menu(callback: CallbackQuery, state: FSMContext):
 
 # Добавляем обработчик для просмотра счетчика медитаций
 @meditation_router.message(Command("meditation_count"))
-async def cmd_meditation_count(message: Message, state: FSMContext):
+async def cmd_meditation_count(message: Message):
     """
     Обработчик команды /meditation_count для просмотра текущего счетчика медитаций.
     """
-    # Получаем текущие данные пользователя
-    user_data = await state.get_data()
-    
-    # Получаем текущий счетчик медитаций или устанавливаем 0, если счетчика нет
-    meditation_count = user_data.get("user_meditation_count", 0)
+    # Получаем текущий счетчик медитаций за текущий период
+    meditation_count = await get_usage_count(message.from_user.id, MEDITATION_COUNTER, MEDITATION_QUOTA_WINDOW)
     
     # Формируем сообщение с информацией о счетчике
     message_text = f"📊 <b>Информация о медитациях</b>\n\n"
@@ -866,9 +860,11 @@ async def cmd_meditation_count(message: Message, state: FSMContext):
 
 # Добавляем обработчик для сброса счетчика медитаций (только для администраторов)
 @meditation_router.message(Command("reset_meditation_count"))
-async def cmd_reset_meditation_count(message: Message, state: FSMContext):
+async def cmd_reset_meditation_count(message: Message):
     """
     Обработчик команды /reset_meditation_count для сброса счетчика медитаций.
+    Формат: /reset_meditation_count [all] - без параметра сбрасывает свой счетчик,
+    с параметром all - счетчики всех пользователей.
     Доступно только администраторам.
     """
     # Проверяем, является ли пользователь администратором
@@ -885,27 +881,28 @@ async def cmd_reset_meditation_count(message: Message, state: FSMContext):
         logger.warning(f"Пользователь {message.from_user.id} попытался сбросить счетчик медитаций без прав")
         return
     
-    # Получаем текущие данные пользователя
-    user_data = await state.get_data()
-    
-    # Получаем текущий счетчик медитаций
-    old_count = user_data.get("user_meditation_count", 0)
+    command_parts = message.text.split()
+    reset_all = len(command_parts) > 1 and command_parts[1] == "all"
     
-    # Сбрасываем счетчик медитаций
-    await state.update_data(user_meditation_count=0)
+    # Сбрасываем счетчики одним запросом
+    reset_count = await reset_usage(MEDITATION_COUNTER, None if reset_all else [message.from_user.id])
+    if reset_count is None:
+        await message.answer("❌ Произошла ошибка при сбросе счетчика медитаций.")
+        return
     
     # Отправляем сообщение об успешном сбросе
-    await message.answer(
-        f"✅ Счетчик медитаций сброшен с {old_count} на 0."
-    )
-    logger.info(f"Администратор {message.from_user.id} сбросил счетчик медитаций с {old_count} на 0")
+    if reset_all:
+        await message.answer(f"✅ Счетчики медитаций всех пользователей сброшены (записей: {reset_count}).")
+    else:
+        await message.answer("✅ Счетчик медитаций сброшен на 0.")
+    logger.info(f"Администратор {message.from_user.id} сбросил счетчики медитаций ({'все' if reset_all else 'свой'}), записей: {reset_count}")
 
-# Добавляем обработчик для сброса счетчика медитаций для конкретного пользователя (только для администраторов)
+# Добавляем обработчик для сброса счетчика медитаций для конкретных пользователей (только для администраторов)
 @meditation_router.message(Command("reset_user_meditation"))
 async def cmd_reset_user_meditation(message: Message):
     """
-    Обработчик команды /reset_user_meditation для сброса счетчика медитаций конкретного пользователя.
-    Формат: /reset_user_meditation USER_ID
+    Обработчик команды /reset_user_meditation для сброса счетчика медитаций конкретных пользователей.
+    Формат: /reset_user_meditation USER_ID [USER_ID ...]
     Доступно только администраторам.
     """
     # Проверяем, является ли пользователь администратором
@@ -921,50 +918,73 @@ async def cmd_reset_user_meditation(message: Message):
         logger.warning(f"Пользователь {message.from_user.id} попытался сбросить счетчик медитаций другого пользователя без прав")
         return
     
-    # Разбираем команду для получения ID пользователя
+    # Разбираем команду для получения ID пользователей
     command_parts = message.text.split()
-    if len(command_parts) != 2:
+    if len(command_parts) < 2:
         await message.answer(
-            "❌ Неверный формат команды. Используйте: /reset_user_meditation USER_ID"
+            "❌ Неверный формат команды. Используйте: /reset_user_meditation USER_ID [USER_ID ...]"
         )
         return
     
     try:
-        target_user_id = int(command_parts[1])
+        target_user_ids = [int(part) for part in command_parts[1:]]
     except ValueError:
         await message.answer(
             "❌ Неверный ID пользователя. ID должен быть числом."
         )
         return
     
-    try:
-        # Получаем диспетчер для доступа к хранилищу состояний
-        from aiogram import Bot
-        bot = Bot.get_current()
-        dp = bot.dispatcher
-        
-        # Создаем ключ для хранилища состояний
-        from aiogram.fsm.storage.base import StorageKey
-        key = StorageKey(bot_id=bot.id, user_id=target_user_id, chat_id=target_user_id)
-        
-        # Получаем данные пользователя из хранилища
-        data = await dp.storage.get_data(key)
-        
-        # Получаем текущий счетчик медитаций
-        old_count = data.get("user_meditation_count", 0)
-        
-        # Обновляем счетчик медитаций
-        data["user_meditation_count"] = 0
-        await dp.storage.set_data(key, data)
-        
-        # Отправляем сообщение об успешном сбросе
+    # Сбрасываем счетчики всех указанных пользователей одним запросом
+    reset_count = await reset_usage(MEDITATION_COUNTER, target_user_ids)
+    if reset_count is None:
+        await message.answer("❌ Произошла ошибка при сбросе счетчика медитаций.")
+        return
+    
+    # Отправляем сообщение об успешном сбросе
+    users_text = ", ".join(str(user_id) for user_id in target_user_ids)
+    await message.answer(
+        f"✅ Счетчик медитаций для пользователей {users_text} сброшен на 0."
+    )
+    logger.info(f"Администратор {message.from_user.id} сбросил счетчик медитаций пользователей {users_text}, записей: {reset_count}")
+
+# Обработчик для просмотра библиотеки готовых медитаций (только для администраторов)
+@meditation_router.message(Command("meditation_library"))
+async def cmd_meditation_library(message: Message):
+    """
+    Обработчик команды /meditation_library для просмотра покрытия и свежести библиотеки медитаций.
+    Формат: /meditation_library [build] - с параметром build запускает сборку библиотеки.
+    Доступно только администраторам.
+    """
+    # Проверяем, является ли пользователь администратором
+    admin_ids = [
+        123456789,  # Заменить на реальный ID администратора
+    ]
+    
+    # Если пользователь не администратор, отправляем сообщение об ошибке
+    if message.from_user.id not in admin_ids:
         await message.answer(
-            f"✅ Счетчик медитаций для пользователя {target_user_id} сброшен с {old_count} на 0."
+            "⛔ У вас нет прав для выполнения этой команды."
         )
-        logger.info(f"Администратор {message.from_user.id} сбросил счетчик медитаций пользователя {target_user_id} с {old_count} на 0")
-        
-    except Exception as e:
-        logger.error(f"Ошибка при сбросе счетчика медитаций пользователя {target_user_id}: {e}")
-        await message.answer(
-            f"❌ Произошла ошибка при сбросе счетчика медитаций: {str(e)}"
-        ) 
\ No newline at end of file
+        logger.warning(f"Пользователь {message.from_user.id} попытался просмотреть библиотеку медитаций без прав")
+        return
+    
+    command_parts = message.text.split()
+    if len(command_parts) > 1 and command_parts[1] == "build":
+        await message.answer("⏳ Собираю библиотеку медитаций...")
+        built = await build_meditation_library()
+        await message.answer(f"✅ Создано медитаций: {built}")
+    
+    report_text = format_library_report(await get_library_report())
+    
+    # Добавляем среднее и максимальное время этапов подготовки медитаций
+    # и отдельных операций (llm и tts - на одну часть, send - на одно сообщение)
+    stage_stats = meditation_pipeline.get_stage_stats()
+    if stage_stats:
+        report_text += "\n\n⏱ <b>Этапы и операции подготовки медитаций</b>\n"
+        report_text += "\n".join(
+            f"{name}: {stats['avg']:.2f} с в среднем, до {stats['max']:.2f} с ({stats['count']})"
+            for name, stats in stage_stats.items()
+        )
+    
+    await message.answer(report_text, parse_mode="HTML")
+    logger.info(f"Администратор {message.from_user.id} запросил отчет о библиотеке медитаций")
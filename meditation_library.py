@@ -0,0 +1,363 @@
+import os
+import random
+import asyncio
+import hashlib
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from db_utils import (
+    add_meditation_library_item, get_meditation_library_items,
+    mark_meditation_library_served, delete_meditation_library_items
+)
+from personality_scoring import PERSONALITY_TYPES, DEFAULT_PERSONALITY_TYPE
+from services.spool import get_spool, SpoolQuotaExceeded, SPOOL_MAX_FILE_AGE
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Директория с mp3-файлами библиотеки
+MEDITATION_LIBRARY_DIR = os.getenv("MEDITATION_LIBRARY_DIR", os.path.join("tmp", "meditation_library"))
+
+# Количество вариантов медитации для каждого сочетания тип/тип личности/длительность
+MEDITATION_LIBRARY_VARIANTS = int(os.getenv("MEDITATION_LIBRARY_VARIANTS", "3"))
+
+# Возраст, после которого вариант считается устаревшим и заменяется новым (дни)
+MEDITATION_LIBRARY_MAX_AGE_DAYS = int(os.getenv("MEDITATION_LIBRARY_MAX_AGE_DAYS", "14"))
+
+# Час запуска сборки библиотеки (UTC), когда бот почти не используется
+MEDITATION_LIBRARY_BUILD_HOUR = int(os.getenv("MEDITATION_LIBRARY_BUILD_HOUR", "3"))
+
+# Максимальное количество медитаций, создаваемых за один запуск (ограничивает расход API)
+MEDITATION_LIBRARY_BUILD_LIMIT = int(os.getenv("MEDITATION_LIBRARY_BUILD_LIMIT", "12"))
+
+# Цели медитаций по типам
+LIBRARY_MEDITATION_GOALS = {
+    "relax": "глубокое расслабление тела и снятие накопившегося напряжения",
+    "focus": "сосредоточение, ясность ума и собранность перед делами",
+    "sleep": "мягкое замедление и погружение в спокойный глубокий сон"
+}
+
+# Краткие описания типов личности вместо полного профиля
+LIBRARY_TYPE_PROFILES = {
+    PERSONALITY_TYPES["A"]: "Аналитический тип: опирается на логику и понимание, ценит ясность, "
+                            "структуру и спокойное наблюдение; напряжение копится в голове в виде потока мыслей.",
+    PERSONALITY_TYPES["B"]: "Эмпатический тип: глубоко чувствует себя и других, ценит тепло, близость "
+                            "и принятие; устает от чужих эмоций и забывает о собственных потребностях.",
+    PERSONALITY_TYPES["C"]: "Практический тип: ориентирован на действие и результат, ценит надежность "
+                            "и опору; напряжение копится в теле, трудно позволить себе остановиться.",
+    PERSONALITY_TYPES["D"]: "Творческий тип: живет образами и идеями, ценит свободу и вдохновение; "
+                            "ум легко перескакивает с одного на другое, нужна мягкая собранность."
+}
+
+# Типы личности, для которых библиотека хранит медитации. Библиотека отправляет
+# медитации пользователям без профиля, поэтому нужен только тип по умолчанию;
+# остальные типы имеет смысл добавлять, только если их начнут отправлять
+LIBRARY_PERSONALITY_TYPES = (DEFAULT_PERSONALITY_TYPE,)
+
+def library_slots() -> List[Tuple[str, str, str]]:
+    """
+    Возвращает все сочетания, для которых библиотека хранит готовые медитации.
+
+    Сочетания строятся по типам медитаций, которые запрашивает обработчик
+    (MEDITATION_KINDS), с их длительностью: медитации других длительностей
+    никто не получил бы.
+
+    Returns:
+        List[Tuple[str, str, str]]: Сочетания (тип медитации, тип личности, длительность)
+    """
+    from meditation_handler import MEDITATION_KINDS
+
+    return [
+        (kind.key, personality_type, kind.duration)
+        for personality_type in LIBRARY_PERSONALITY_TYPES
+        for kind in MEDITATION_KINDS.values()
+    ]
+
+def library_personality_type(personality_type: Optional[str]) -> str:
+    """
+    Приводит тип личности пользователя к типу, для которого есть медитации в библиотеке.
+
+    Args:
+        personality_type: Тип личности из данных пользователя
+
+    Returns:
+        str: Тип личности библиотеки (тип по умолчанию, если тип неизвестен)
+    """
+    if personality_type in LIBRARY_TYPE_PROFILES:
+        return personality_type
+    return DEFAULT_PERSONALITY_TYPE
+
+def _age_days(timestamp: Optional[str], now: datetime) -> float:
+    if not timestamp:
+        return float("inf")
+    created = datetime.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S")
+    return (now - created).total_seconds() / 86400
+
+def _group_by_slot(items: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], List[Dict[str, Any]]]:
+    slots = {slot: [] for slot in library_slots()}
+    for item in items:
+        slot = (item["meditation_type"], item["personality_type"], item["duration"])
+        if slot in slots:
+            slots[slot].append(item)
+    return slots
+
+async def get_library_meditation(meditation_type: str, personality_type: Optional[str], duration: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """
+    Выбирает готовую медитацию из библиотеки.
+
+    Среди свежих вариантов выбирается случайный из наименее отправлявшихся,
+    чтобы пользователи не получали одну и ту же запись подряд. Если свежих
+    вариантов нет, отправляется самый новый из устаревших.
+
+    Args:
+        meditation_type: Тип медитации (relax, focus, sleep)
+        personality_type: Тип личности пользователя (если для него медитаций
+            не хранится, выбирается медитация для типа по умолчанию)
+        duration: Продолжительность (short, medium, long)
+
+    Returns:
+        Optional[Tuple[Dict[str, Any], bytes]]: Метаданные и содержимое mp3
+        или None, если готовой медитации нет
+    """
+    personality_type = library_personality_type(personality_type)
+    if personality_type not in LIBRARY_PERSONALITY_TYPES:
+        personality_type = DEFAULT_PERSONALITY_TYPE
+    items = await get_meditation_library_items(meditation_type, personality_type, duration)
+    if not items:
+        return None
+
+    now = datetime.utcnow()
+    fresh = [item for item in items if _age_days(item["created_at"], now) <= MEDITATION_LIBRARY_MAX_AGE_DAYS]
+    if fresh:
+        least_served = min(item["served_count"] for item in fresh)
+        item = random.choice([item for item in fresh if item["served_count"] == least_served])
+    else:
+        item = items[0]
+
+    try:
+        audio = await asyncio.to_thread(Path(item["audio_path"]).read_bytes)
+    except OSError as e:
+        logger.error(f"Файл медитации {item['id']} из библиотеки недоступен: {e}")
+        await delete_meditation_library_items([item["id"]])
+        return None
+
+    await mark_meditation_library_served(item["id"])
+    return item, audio
+
+async def _render_variant(meditation_type: str, personality_type: str, duration: str) -> Optional[int]:
+    from meditation_handler import request_meditation_text
+    from services.tts import synthesize_text
+
+    # Запрос без подмены заготовленной медитацией: заготовка не учитывает цель
+    # и не должна попасть в библиотеку под видом варианта для этого сочетания
+    text = await request_meditation_text(
+        LIBRARY_TYPE_PROFILES[personality_type],
+        duration,
+        goal=LIBRARY_MEDITATION_GOALS[meditation_type]
+    )
+    if not text:
+        logger.warning(f"Пустой текст медитации для {meditation_type}/{personality_type}/{duration}")
+        return None
+    audio = await synthesize_text(text)
+
+    audio_path = os.path.join(MEDITATION_LIBRARY_DIR, hashlib.sha256(audio).hexdigest() + ".mp3")
+    await get_spool().write_file("library", audio_path, audio)
+    return await add_meditation_library_item(meditation_type, personality_type, duration, text, audio_path, len(audio))
+
+async def _remove_variants(items: List[Dict[str, Any]]) -> None:
+    if not items:
+        return
+    await delete_meditation_library_items([item["id"] for item in items])
+    for item in items:
+        try:
+            await asyncio.to_thread(os.remove, item["audio_path"])
+        except OSError:
+            pass
+
+async def remove_orphan_files() -> int:
+    """
+    Удаляет из MEDITATION_LIBRARY_DIR файлы, которых нет в библиотеке
+    (остатки прерванной сборки или неудачного удаления вариантов).
+
+    Файлы моложе SPOOL_MAX_FILE_AGE не трогаются: сборка записывает файл
+    до того, как добавляет медитацию в базу данных.
+
+    Returns:
+        int: Количество удаленных файлов
+    """
+    items = await get_meditation_library_items()
+    if not items:
+        # Пустой список бывает и при ошибке чтения базы: ничего не удаляем
+        return 0
+    known = {os.path.abspath(item["audio_path"]) for item in items}
+
+    def remove():
+        removed = 0
+        if not os.path.isdir(MEDITATION_LIBRARY_DIR):
+            return removed
+        now = time.time()
+        with os.scandir(MEDITATION_LIBRARY_DIR) as it:
+            for entry in it:
+                try:
+                    if (not entry.is_file() or os.path.abspath(entry.path) in known
+                            or now - entry.stat().st_mtime <= SPOOL_MAX_FILE_AGE):
+                        continue
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    removed = await asyncio.to_thread(remove)
+    if removed:
+        logger.info(f"Из директории библиотеки медитаций удалено файлов без записи в базе: {removed}")
+    return removed
+
+async def build_meditation_library(limit: int = MEDITATION_LIBRARY_BUILD_LIMIT) -> int:
+    """
+    Создает и озвучивает недостающие и устаревшие медитации библиотеки.
+
+    Сначала заполняются сочетания без медитаций, затем сочетания с меньшим
+    числом вариантов, затем сочетания с самыми старыми вариантами. Если
+    вариантов больше MEDITATION_LIBRARY_VARIANTS, самый старый удаляется,
+    поэтому библиотека постепенно обновляется. Медитации сочетаний, которых
+    больше нет в library_slots, удаляются. Каждая медитация сохраняется
+    сразу после озвучки, и прерванная сборка продолжается со следующего запуска.
+    Если текст медитации создать не удалось, сочетание пропускается; при ошибке
+    квоты OpenAI, ошибке озвучки или переполнении спула временных файлов
+    сборка останавливается.
+
+    Args:
+        limit: Максимальное количество медитаций за запуск
+
+    Returns:
+        int: Количество созданных медитаций
+    """
+    import meditation_handler
+    from services.tts import TTSError
+
+    if meditation_handler.client is None:
+        logger.warning("OpenAI API недоступен, сборка библиотеки медитаций пропущена")
+        return 0
+
+    now = datetime.utcnow()
+    items = await get_meditation_library_items()
+    slots = _group_by_slot(items)
+
+    # Медитации сочетаний, которые больше не отправляются, только занимают место
+    await _remove_variants([
+        item for item in items
+        if (item["meditation_type"], item["personality_type"], item["duration"]) not in slots
+    ])
+
+    def priority(slot):
+        variants = slots[slot]
+        newest_age = _age_days(variants[0]["created_at"], now) if variants else float("inf")
+        return (len(variants) >= MEDITATION_LIBRARY_VARIANTS, len(variants), -newest_age)
+
+    built = 0
+    for slot in sorted(slots, key=priority)[:limit]:
+        variants = slots[slot]
+        if len(variants) >= MEDITATION_LIBRARY_VARIANTS and _age_days(variants[0]["created_at"], now) <= MEDITATION_LIBRARY_MAX_AGE_DAYS / MEDITATION_LIBRARY_VARIANTS:
+            # Самый новый вариант еще свежий, обновлять это сочетание рано
+            continue
+
+        try:
+            item_id = await _render_variant(*slot)
+        except TTSError as e:
+            logger.error(f"Сборка библиотеки медитаций остановлена: ошибка озвучки {e.reason}")
+            break
+        except SpoolQuotaExceeded as e:
+            logger.error(f"Сборка библиотеки медитаций остановлена: {e}")
+            break
+        except Exception as e:
+            if meditation_handler._is_quota_error(e):
+                logger.error(f"Сборка библиотеки медитаций остановлена: ошибка квоты OpenAI {e}")
+                break
+            logger.error(f"Не удалось создать медитацию {'/'.join(slot)}: {e}")
+            continue
+        if item_id is None:
+            continue
+        built += 1
+
+        # Оставляем только MEDITATION_LIBRARY_VARIANTS самых новых вариантов
+        await _remove_variants(variants[MEDITATION_LIBRARY_VARIANTS - 1:])
+        logger.info(f"В библиотеку медитаций добавлена медитация {item_id}: {'/'.join(slot)}")
+
+    logger.info(f"Сборка библиотеки медитаций завершена, создано медитаций: {built}")
+    return built
+
+async def get_library_report() -> Dict[str, Any]:
+    """
+    Формирует отчет о покрытии и свежести библиотеки медитаций.
+
+    Returns:
+        Dict[str, Any]: Количество сочетаний (всего, покрытых, со свежими вариантами),
+        количество вариантов и отправок, размер файлов, возраст самого старого
+        и самого нового варианта (дни) и список сочетаний без медитаций
+    """
+    now = datetime.utcnow()
+    items = await get_meditation_library_items()
+    slots = _group_by_slot(items)
+    ages = [_age_days(item["created_at"], now) for item in items]
+
+    return {
+        "slots": len(slots),
+        "covered": sum(1 for variants in slots.values() if variants),
+        "fresh": sum(
+            1 for variants in slots.values()
+            if variants and _age_days(variants[0]["created_at"], now) <= MEDITATION_LIBRARY_MAX_AGE_DAYS
+        ),
+        "variants": len(items),
+        "served": sum(item["served_count"] for item in items),
+        "size_mb": sum(item["audio_size"] for item in items) / 1024 / 1024,
+        "oldest_days": max(ages) if ages else None,
+        "newest_days": min(ages) if ages else None,
+        "missing": [slot for slot, variants in slots.items() if not variants]
+    }
+
+def format_library_report(report: Dict[str, Any]) -> str:
+    """
+    Форматирует отчет о библиотеке медитаций для отправки администратору.
+
+    Args:
+        report: Отчет из get_library_report
+
+    Returns:
+        str: Текст отчета в HTML-разметке
+    """
+    text = (
+        "📚 <b>Библиотека медитаций</b>\n\n"
+        f"Покрыто сочетаний: <b>{report['covered']}</b> из <b>{report['slots']}</b>\n"
+        f"Со свежими вариантами (до {MEDITATION_LIBRARY_MAX_AGE_DAYS} дн.): <b>{report['fresh']}</b>\n"
+        f"Вариантов: <b>{report['variants']}</b> ({report['size_mb']:.1f} МБ), отправлено: <b>{report['served']}</b>\n"
+    )
+    if report["variants"]:
+        text += f"Самый новый вариант: {report['newest_days']:.1f} дн., самый старый: {report['oldest_days']:.1f} дн.\n"
+    if report["missing"]:
+        missing = ", ".join("/".join(slot) for slot in report["missing"][:10])
+        more = f" и еще {len(report['missing']) - 10}" if len(report["missing"]) > 10 else ""
+        text += f"\nНет медитаций: {missing}{more}"
+    return text
+
+def schedule_library_builds(scheduler) -> None:
+    """
+    Добавляет ежедневную сборку библиотеки медитаций в планировщик.
+
+    Args:
+        scheduler: Планировщик APScheduler
+    """
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler.add_job(
+        build_meditation_library,
+        trigger=CronTrigger(hour=MEDITATION_LIBRARY_BUILD_HOUR, minute=0, timezone="UTC"),
+        id="meditation_library_build",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    logger.info(f"Сборка библиотеки медитаций запланирована на {MEDITATION_LIBRARY_BUILD_HOUR:02d}:00 UTC")
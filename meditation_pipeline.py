@@ -0,0 +1,149 @@
+import time
+import logging
+from typing import Dict, Any, List, Tuple, Optional, Callable, Awaitable
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+class MeditationRequest:
+    """
+    Запрос медитации, который передается от этапа к этапу конвейера.
+
+    Этапы читают и заполняют поля запроса: профиль пользователя, поток частей
+    текста, поток озвученных частей и сообщение о подготовке. Время выполнения
+    этапов и моменты ключевых событий (первая часть текста, первое аудио,
+    первая отправка) записываются в timings и milestones.
+
+    Генерация текста, озвучка и отправка идут потоком внутри этапа отправки
+    и перекрываются, поэтому их время записывается в work там, где работа
+    действительно выполняется: каждая озвученная часть, каждая отправка.
+    """
+
+    __slots__ = (
+        "callback", "state", "kind", "user_id", "user_profile", "preparing_message",
+        "library_item_id", "segments", "audio_parts", "delivered_parts",
+        "started", "timings", "milestones", "work"
+    )
+
+    def __init__(self, callback: Any, state: Any, kind: Any):
+        self.callback = callback
+        self.state = state
+        self.kind = kind
+        self.user_id: int = callback.from_user.id
+        self.user_profile: Dict[str, Any] = {}
+        self.preparing_message = None
+        self.library_item_id: Optional[int] = None
+        self.segments = None
+        self.audio_parts = None
+        self.delivered_parts = 0
+        self.started = time.monotonic()
+        self.timings: Dict[str, float] = {}
+        self.milestones: Dict[str, float] = {}
+        self.work: Dict[str, List[float]] = {}
+
+    def mark(self, milestone: str) -> None:
+        """Запоминает время первого наступления события от начала запроса."""
+        if milestone not in self.milestones:
+            self.milestones[milestone] = time.monotonic() - self.started
+
+    def add_work(self, name: str, elapsed: float) -> None:
+        """Записывает время одной операции (например, озвучки одной части)."""
+        self.work.setdefault(name, []).append(elapsed)
+
+# Этап конвейера: возвращает False, чтобы остановить выполнение следующих этапов
+Stage = Callable[[MeditationRequest], Awaitable[Optional[bool]]]
+
+class MeditationPipeline:
+    """
+    Конвейер подготовки медитации из сменных этапов.
+
+    Этапы (например, проверка лимита, подготовка, отправка) выполняются по
+    порядку, этап очистки - всегда, в том числе после ошибки или остановки.
+    Время каждого этапа и каждой операции из request.work записывается
+    в общую статистику конвейера.
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Stage]],
+        cleanup: Optional[Stage] = None,
+        on_error: Optional[Callable[[MeditationRequest, Exception], Awaitable[None]]] = None
+    ):
+        self.stages = stages
+        self.cleanup = cleanup
+        self.on_error = on_error
+        self._stats: Dict[str, List[float]] = {}
+
+    async def _run_stage(self, name: str, stage: Stage, request: MeditationRequest) -> Optional[bool]:
+        started = time.monotonic()
+        try:
+            return await stage(request)
+        finally:
+            elapsed = time.monotonic() - started
+            request.timings[name] = elapsed
+            self._record(name, elapsed)
+
+    def _record(self, name: str, elapsed: float) -> None:
+        stats = self._stats.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+
+    async def run(self, request: MeditationRequest) -> bool:
+        """
+        Выполняет все этапы конвейера для запроса.
+
+        Args:
+            request: Запрос медитации
+
+        Returns:
+            bool: True, если все этапы выполнены, False при остановке или ошибке
+        """
+        completed = False
+        current = None
+        try:
+            for name, stage in self.stages:
+                current = name
+                if await self._run_stage(name, stage, request) is False:
+                    break
+            else:
+                completed = True
+        except Exception as e:
+            logger.error(f"Ошибка на этапе {current} подготовки медитации для пользователя {request.user_id}: {e}")
+            if self.on_error:
+                await self.on_error(request, e)
+        finally:
+            if self.cleanup:
+                try:
+                    await self._run_stage("cleanup", self.cleanup, request)
+                except Exception as e:
+                    logger.error(f"Ошибка при очистке после медитации для пользователя {request.user_id}: {e}")
+            for name, durations in request.work.items():
+                for elapsed in durations:
+                    self._record(name, elapsed)
+            self._log_timings(request)
+        return completed
+
+    def _log_timings(self, request: MeditationRequest) -> None:
+        stages = ", ".join(f"{name} {elapsed:.2f} с" for name, elapsed in request.timings.items())
+        milestones = ", ".join(f"{name} {elapsed:.2f} с" for name, elapsed in request.milestones.items())
+        work = ", ".join(
+            f"{name} {sum(durations):.2f} с ({len(durations)})" for name, durations in request.work.items()
+        )
+        logger.info(
+            f"Медитация {getattr(request.kind, 'key', request.kind)} для пользователя {request.user_id}: "
+            f"{stages}" + (f"; {milestones}" if milestones else "") + (f"; {work}" if work else "")
+        )
+
+    def get_stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Возвращает статистику времени выполнения этапов и операций с момента запуска бота.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Для каждого этапа и операции количество
+            запусков, среднее и максимальное время (секунды)
+        """
+        return {
+            name: {"count": count, "avg": total / count if count else 0.0, "max": longest}
+            for name, (count, total, longest) in self._stats.items()
+        }
@@ -0,0 +1,214 @@
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional, Iterable, Iterator
+
+import numpy as np
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Буквы вариантов ответа в порядке столбцов матрицы счетчиков
+TYPE_LETTERS = ("A", "B", "C", "D")
+
+# Названия типов личности по буквам вариантов
+PERSONALITY_TYPES = {
+    "A": "Аналитический тип",
+    "B": "Эмпатический тип",
+    "C": "Практический тип",
+    "D": "Творческий тип"
+}
+
+# Тип личности, если ответов на вопросы Vasini нет
+DEFAULT_PERSONALITY_TYPE = PERSONALITY_TYPES["A"]
+
+# Дополнительный тип учитывается, если он набрал не меньше этой доли от основного
+SECONDARY_TYPE_RATIO = 0.7
+
+# Код отсутствующего ответа в матрице ответов
+NO_ANSWER = -1
+
+_LETTER_CODES = {letter: code for code, letter in enumerate(TYPE_LETTERS)}
+
+def score_answers(answers: Dict[str, Any]) -> Tuple[Dict[str, int], str, Optional[str]]:
+    """
+    Определяет тип личности одного пользователя по ответам на вопросы Vasini.
+
+    Результат запоминается по набору ответов, поэтому повторные вызовы
+    в рамках одного сценария (завершение опроса, генерация промпта и профиля,
+    сохранение профиля) не пересчитывают его.
+
+    Args:
+        answers: Словарь с ответами пользователя
+
+    Returns:
+        Tuple[Dict[str, int], str, Optional[str]]: Количество ответов каждого типа,
+        основной тип личности и дополнительный тип (если есть)
+    """
+    # В подсчете участвуют только ответы-буквы, остальные ответы не влияют на результат
+    key = tuple(sorted(
+        (str(question_id), answer) for question_id, answer in answers.items()
+        if isinstance(answer, str) and answer.upper() in _LETTER_CODES
+    ))
+    counts, primary_type, secondary_type = _score_letter_answers(key)
+    return dict(zip(TYPE_LETTERS, counts)), primary_type, secondary_type
+
+@lru_cache(maxsize=1024)
+def _score_letter_answers(letter_answers: Tuple[Tuple[str, str], ...]) -> Tuple[Tuple[int, ...], str, Optional[str]]:
+    counts = [0] * len(TYPE_LETTERS)
+    for question_id, answer in letter_answers:
+        if question_id.startswith("vasini_") and answer in _LETTER_CODES:
+            counts[_LETTER_CODES[answer]] += 1
+
+    # Если ответов на вопросы Vasini нет, пробуем ответы в альтернативном формате
+    if not any(counts):
+        for _, answer in letter_answers:
+            counts[_LETTER_CODES[answer.upper()]] += 1
+        if any(counts):
+            logger.warning("Не найдены ответы в стандартном формате, использован альтернативный формат")
+
+    primary, secondary = classify_counts(np.array([counts]))
+    primary_type = _type_name(primary[0]) if any(counts) else DEFAULT_PERSONALITY_TYPE
+    secondary_type = _type_name(secondary[0])
+
+    if any(counts):
+        logger.info(
+            f"Определен тип личности: {primary_type}"
+            + (f" с элементами {secondary_type}" if secondary_type else "")
+            + f" (A={counts[0]}, B={counts[1]}, C={counts[2]}, D={counts[3]})"
+        )
+    else:
+        logger.warning("Не удалось определить тип личности, используется тип по умолчанию")
+
+    return tuple(counts), primary_type, secondary_type
+
+def build_answer_matrix(rows: Iterable[Tuple[int, str, str]]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Собирает матрицу ответов на вопросы Vasini.
+
+    Args:
+        rows: Строки (ID пользователя, ID вопроса, ответ)
+
+    Returns:
+        Tuple[np.ndarray, List[str], np.ndarray]: ID пользователей (строки матрицы),
+        ID вопросов (столбцы матрицы) и матрица кодов ответов int8, где 0-3 означают
+        варианты A-D, а NO_ANSWER - отсутствие ответа
+    """
+    user_ids = []
+    question_ids = []
+    codes = []
+    for user_id, question_id, answer in rows:
+        code = _LETTER_CODES.get(answer)
+        if code is None or not str(question_id).startswith("vasini_"):
+            continue
+        user_ids.append(user_id)
+        question_ids.append(str(question_id))
+        codes.append(code)
+
+    unique_users, user_rows = np.unique(np.array(user_ids, dtype=np.int64), return_inverse=True)
+    unique_questions, question_columns = np.unique(np.array(question_ids, dtype=str), return_inverse=True)
+
+    matrix = np.full((len(unique_users), len(unique_questions)), NO_ANSWER, dtype=np.int8)
+    matrix[user_rows, question_columns] = codes
+    return unique_users, unique_questions.tolist(), matrix
+
+def count_answer_types(matrix: np.ndarray) -> np.ndarray:
+    """
+    Подсчитывает ответы каждого типа для всех пользователей сразу.
+
+    Args:
+        matrix: Матрица кодов ответов (пользователи x вопросы)
+
+    Returns:
+        np.ndarray: Матрица счетчиков (пользователи x 4) в порядке TYPE_LETTERS
+    """
+    return (matrix[:, :, np.newaxis] == np.arange(len(TYPE_LETTERS))).sum(axis=1)
+
+def classify_counts(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Определяет основной и дополнительный тип по матрице счетчиков.
+
+    При равенстве счетчиков выбирается тип, идущий раньше в TYPE_LETTERS.
+
+    Args:
+        counts: Матрица счетчиков (пользователи x 4)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Индексы основного типа и дополнительного
+        типа; для дополнительного типа -1 означает, что его нет
+    """
+    rows = np.arange(len(counts))
+    primary = counts.argmax(axis=1)
+    max_counts = counts[rows, primary]
+
+    rest = counts.astype(np.int64)
+    rest[rows, primary] = -1
+    secondary = rest.argmax(axis=1)
+    second_counts = rest[rows, secondary]
+
+    has_secondary = (max_counts > 0) & (second_counts >= max_counts * SECONDARY_TYPE_RATIO)
+    return primary, np.where(has_secondary, secondary, -1)
+
+class PopulationScores:
+    """
+    Типы личности группы пользователей, посчитанные одной векторной операцией.
+    """
+
+    def __init__(self, user_ids: np.ndarray, counts: np.ndarray):
+        self.user_ids = user_ids
+        self.counts = counts
+        self.primary, self.secondary = classify_counts(counts)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, int], str, Optional[str]]]:
+        """
+        Перебирает результаты в том же формате, что и score_answers.
+
+        Yields:
+            Tuple[int, Dict[str, int], str, Optional[str]]: ID пользователя, количество
+            ответов каждого типа, основной и дополнительный тип личности
+        """
+        for user_id, counts, primary, secondary in zip(self.user_ids, self.counts, self.primary, self.secondary):
+            type_counts = dict(zip(TYPE_LETTERS, counts.tolist()))
+            primary_type = _type_name(primary) if counts.any() else DEFAULT_PERSONALITY_TYPE
+            yield int(user_id), type_counts, primary_type, _type_name(secondary)
+
+    def type_distribution(self) -> Dict[str, int]:
+        """
+        Возвращает количество пользователей каждого основного типа личности.
+
+        Returns:
+            Dict[str, int]: Словарь {название типа: количество пользователей}
+        """
+        answered = self.counts.any(axis=1)
+        totals = np.bincount(self.primary[answered], minlength=len(TYPE_LETTERS))
+        return {PERSONALITY_TYPES[letter]: int(total) for letter, total in zip(TYPE_LETTERS, totals)}
+
+def score_population(rows: Iterable[Tuple[int, str, str]]) -> PopulationScores:
+    """
+    Определяет типы личности всех пользователей по строкам ответов.
+
+    Args:
+        rows: Строки (ID пользователя, ID вопроса, ответ)
+
+    Returns:
+        PopulationScores: Счетчики и типы личности всех пользователей
+    """
+    user_ids, _, matrix = build_answer_matrix(rows)
+    return PopulationScores(user_ids, count_answer_types(matrix))
+
+async def load_population_scores() -> PopulationScores:
+    """
+    Загружает ответы всех пользователей из базы данных и определяет их типы личности.
+
+    Returns:
+        PopulationScores: Счетчики и типы личности всех пользователей
+    """
+    from db_utils import get_vasini_answer_rows
+    return score_population(await get_vasini_answer_rows())
+
+def _type_name(index: int) -> Optional[str]:
+    if index < 0:
+        return None
+    return PERSONALITY_TYPES[TYPE_LETTERS[index]]
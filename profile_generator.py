@@ -1,7 +1,7 @@
 import logging
 import os
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from openai import AsyncOpenAI
 import httpx
 import asyncio
@@ -165,72 +165,15 @@ DETAILED_PROFILES = {
 • Практикуйте метод "случайных связей" – соединяйте несвязанные концепции для создания новых идей"""
 }
 
-async def generate_profile(answers: Dict[str, str]) -> Dict[str, str]:
-    """
-    Генерирует психологический профиль пользователя на основе его ответов
-    по структуре профайлинга 2.0.
-    
-    Args:
-        answers: Словарь с ответами пользователя
-        
-    Returns:
-        Dict[str, str]: Словарь с текстом краткого профиля и детальной информацией
-    """
-    # Если нет ответов, возвращаем сообщение об ошибке
-    if not answers:
-        logger.error("Невозможно сгенерировать профиль: ответы не предоставлены")
-        return {
-            "profile": "Невозможно сгенерировать профиль: данных недостаточно.",
-            "details": "Недостаточно данных для анализа."
-        }
-    
-    try:
-        # Импортируем functions из questions.py для определения типа личности
-        from questions import generate_profile_prompt, get_personality_type_from_answers
-        
-        # Получаем тип личности
-        type_counts, primary_type, secondary_type = get_personality_type_from_answers(answers)
-        
-        # Извлекаем личные данные пользователя
-        name = answers.get("name", "пользователь")
-        age = answers.get("age", "")
-        birthdate = answers.get("birthdate", "")
-        birthplace = answers.get("birthplace", "")
-        timezone = answers.get("timezone", "")
-        
-        # Составляем личную информацию для отображения в профиле
-        personal_info = f"👤 <b>Личная информация</b>:\n"
-        
-        if name:
-            personal_info += f"• Имя: {name}\n"
-        if age:
-            personal_info += f"• Возраст: {age}\n"
-        if birthdate:
-            personal_info += f"• Дата рождения: {birthdate}\n"
-        if birthplace:
-            personal_info += f"• Место рождения: {birthplace}\n"
-        if timezone:
-            personal_info += f"• Часовой пояс: {timezone}\n"
-            
-        # Проверяем наличие API-ключа OpenAI и клиента
-        use_demo_profile = not client
-        
-        if client:
-            try:
-                # Получаем промт для генерации профиля
-                prompt = generate_profile_prompt(answers)
-                
-                # Добавляем инструкцию о компактности краткого профиля и расширенности детального анализа
-                compact_prompt = prompt + "\n\nВажно: Создай два раздела:\n1. КРАТКИЙ ПРОФИЛЬ - короткое резюме основных модулей силы (до 15 строк максимум).\n2. ПОЛНЫЙ ПРОФИЛЬ - подробный и развернутый профиль согласно всей структуре профайлинга 2.0 с ядром личности, вспомогательными модулями, общим кодом и P.S."
-                
-                # Генерируем профиль с помощью OpenAI
-                response = await client.chat.completions.create(
-                    model="gpt-4o",
-                    temperature=0.7,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": """Ты — AI-наставник проекта ONA. Твоя миссия — создавать глубокие, поэтичные и персонализированные психологические профили женщин. Ты работаешь в методологии профайлинга 2.0, структурируя ответ в виде 5 основных модулей (🌀 Архетип, 🔥 Внутренний импульс, 🌿 Сила контакта, 🌊 Эмоциональная глубина, ✨ Самоидентичность) и 5 вспомогательных (🧩 Мотивация, 🪞Механизмы защиты, 🌗 Баланс света и тени, 💬 Речевые паттерны, 🕯️ Потребность в поддержке).
+# Модель и температура генерации профиля
+PROFILE_MODEL = "gpt-4o"
+PROFILE_TEMPERATURE = 0.7
+
+# Инструкция о компактности краткого профиля и расширенности детального анализа
+COMPACT_PROFILE_INSTRUCTION = "\n\nВажно: Создай два раздела:\n1. КРАТКИЙ ПРОФИЛЬ - короткое резюме основных модулей силы (до 15 строк максимум).\n2. ПОЛНЫЙ ПРОФИЛЬ - подробный и развернутый профиль согласно всей структуре профайлинга 2.0 с ядром личности, вспомогательными модулями, общим кодом и P.S."
+
+# Системный промт генерации профиля
+PROFILE_SYSTEM_PROMPT = """Ты — AI-наставник проекта ONA. Твоя миссия — создавать глубокие, поэтичные и персонализированные психологические профили женщин. Ты работаешь в методологии профайлинга 2.0, структурируя ответ в виде 5 основных модулей (🌀 Архетип, 🔥 Внутренний импульс, 🌿 Сила контакта, 🌊 Эмоциональная глубина, ✨ Самоидентичность) и 5 вспомогательных (🧩 Мотивация, 🪞Механизмы защиты, 🌗 Баланс света и тени, 💬 Речевые паттерны, 🕯️ Потребность в поддержке).
 
 Ты создаешь тексты, насыщенные метафорами, визуальными образами и уважением к уникальной природе личности. Используй мягкий, поддерживающий тон, обращайся к участнице на «ты», избегай эзотерики и излишней формальности. Каждый модуль должен раскрывать глубину, ресурсность и уникальность женщины.
 
@@ -281,9 +224,153 @@ async def generate_profile(answers: Dict[str, str]) -> Dict[str, str]:
    Соблюдайте разнообразие и функциональную уникальность между блоками.
 
 3. Перед финализацией профиля ПРОВЕРЬ наличие повторов между основными и вспомогательными модулями. Если найдешь повторы - переработай вспомогательные модули, чтобы они были полностью уникальными."""
-                        },
-                        {"role": "user", "content": compact_prompt}
-                    ]
+
+def build_personal_info(answers: Dict[str, str]) -> str:
+    """
+    Составляет блок личной информации пользователя для отображения в профиле.
+    
+    Args:
+        answers: Словарь с ответами пользователя
+        
+    Returns:
+        str: Блок личной информации в HTML-разметке
+    """
+    personal_info = f"👤 <b>Личная информация</b>:\n"
+    
+    fields = [
+        ("name", "Имя"),
+        ("age", "Возраст"),
+        ("birthdate", "Дата рождения"),
+        ("birthplace", "Место рождения"),
+        ("timezone", "Часовой пояс")
+    ]
+    for key, label in fields:
+        value = answers.get(key, "")
+        if value:
+            personal_info += f"• {label}: {value}\n"
+    
+    return personal_info
+
+def build_profile_messages(answers: Dict[str, str]) -> List[Dict[str, str]]:
+    """
+    Формирует сообщения для запроса генерации профиля к OpenAI.
+    
+    Используется как при генерации профиля в боте, так и при пакетной
+    перегенерации профилей (regenerate_profiles.py).
+    
+    Args:
+        answers: Словарь с ответами пользователя
+        
+    Returns:
+        List[Dict[str, str]]: Список сообщений для chat.completions
+    """
+    from questions import generate_profile_prompt
+    
+    # Получаем промт для генерации профиля и добавляем инструкцию о компактности
+    compact_prompt = generate_profile_prompt(answers) + COMPACT_PROFILE_INSTRUCTION
+    
+    return [
+        {"role": "system", "content": PROFILE_SYSTEM_PROMPT},
+        {"role": "user", "content": compact_prompt}
+    ]
+
+def parse_profile_result(result: str, personal_info: str) -> Tuple[str, str]:
+    """
+    Разделяет ответ модели на краткий и детальный профиль и дополняет
+    детальный профиль личной информацией.
+    
+    Args:
+        result: Текст ответа модели
+        personal_info: Блок личной информации пользователя
+        
+    Returns:
+        Tuple[str, str]: Кортеж (краткий профиль, детальный профиль)
+    """
+    # Разделяем ответ на краткий профиль и подробный анализ
+    if "КРАТКИЙ ПРОФИЛЬ" in result and "ПОЛНЫЙ ПРОФИЛЬ" in result:
+        split_index = result.find("ПОЛНЫЙ ПРОФИЛЬ")
+        profile = result[:split_index].strip()
+        details = result[split_index:].strip()
+        logger.info(f"Профиль успешно разделен: краткий ({len(profile)} символов), полный ({len(details)} символов)")
+    else:
+        # Если ответ не содержит четкого разделения, используем весь текст как детальный профиль
+        # и первые несколько строк как краткий профиль
+        logger.warning("Не найдены маркеры разделения профиля. Используем альтернативное разделение.")
+        lines = result.strip().split('\n')
+        profile_lines = lines[:min(15, len(lines))]
+        profile = "\n".join(profile_lines)
+        details = result
+    
+    # Проверяем наличие личной информации в профилях
+    if "Личная информация" not in details and "Имя:" not in details:
+        # Добавляем личную информацию в начало детального профиля после заголовка
+        if details.startswith("ПОЛНЫЙ ПРОФИЛЬ"):
+            title_end = details.find("\n", len("ПОЛНЫЙ ПРОФИЛЬ"))
+            if title_end > 0:
+                details = details[:title_end+1] + "\n" + personal_info + "\n" + details[title_end+1:]
+                logger.info("Добавлена личная информация в начало детального профиля после заголовка")
+            else:
+                details = details + "\n\n" + personal_info
+                logger.info("Добавлена личная информация в конец детального профиля")
+        else:
+            # Если нет заголовка, добавляем в начало
+            details = f"ПОЛНЫЙ ПРОФИЛЬ\n\n{personal_info}\n\n" + details
+            logger.info("Добавлен заголовок и личная информация в начало детального профиля")
+    
+    # Проверяем корректность детального профиля
+    if len(details) < 100:
+        logger.warning(f"Детальный профиль слишком короткий ({len(details)} символов), генерируем запасной вариант")
+        details = f"""ПОЛНЫЙ ПРОФИЛЬ
+
+{personal_info}
+
+{details}
+
+Пожалуйста, обратите внимание, что детальный профиль был сгенерирован в сокращенном виде. 
+Для получения более полного анализа рекомендуется пройти опрос повторно."""
+    
+    return profile, details
+
+async def generate_profile(answers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Генерирует психологический профиль пользователя на основе его ответов
+    по структуре профайлинга 2.0.
+    
+    Args:
+        answers: Словарь с ответами пользователя
+        
+    Returns:
+        Dict[str, str]: Словарь с текстом краткого профиля и детальной информацией
+    """
+    # Если нет ответов, возвращаем сообщение об ошибке
+    if not answers:
+        logger.error("Невозможно сгенерировать профиль: ответы не предоставлены")
+        return {
+            "profile": "Невозможно сгенерировать профиль: данных недостаточно.",
+            "details": "Недостаточно данных для анализа."
+        }
+    
+    try:
+        # Импортируем functions из questions.py для определения типа личности
+        from questions import get_personality_type_from_answers
+        
+        # Получаем тип личности
+        type_counts, primary_type, secondary_type = get_personality_type_from_answers(answers)
+        
+        # Составляем личную информацию для отображения в профиле
+        name = answers.get("name", "пользователь")
+        personal_info = build_personal_info(answers)
+        
+        # Проверяем наличие API-ключа OpenAI и клиента
+        use_demo_profile = not client
+        
+        if client:
+            try:
+                # Генерируем профиль с помощью OpenAI
+                response = await client.chat.completions.create(
+                    model=PROFILE_MODEL,
+                    temperature=PROFILE_TEMPERATURE,
+                    messages=build_profile_messages(answers)
                 )
                 
                 # Получаем сгенерированный ответ
@@ -293,47 +380,7 @@ async def generate_profile(answers: Dict[str, str]) -> Dict[str, str]:
                 logger.info(f"Получен результат генерации профиля длиной {len(result)} символов")
                 
                 # Разделяем ответ на краткий профиль и подробный анализ
-                if "КРАТКИЙ ПРОФИЛЬ" in result and "ПОЛНЫЙ ПРОФИЛЬ" in result:
-                    split_index = result.find("ПОЛНЫЙ ПРОФИЛЬ")
-                    profile = result[:split_index].strip()
-                    details = result[split_index:].strip()
-                    logger.info(f"Профиль успешно разделен: краткий ({len(profile)} символов), полный ({len(details)} символов)")
-                else:
-                    # Если ответ не содержит четкого разделения, используем весь текст как детальный профиль
-                    # и первые несколько строк как краткий профиль
-                    logger.warning("Не найдены маркеры разделения профиля. Используем альтернативное разделение.")
-                    lines = result.strip().split('\n')
-                    profile_lines = lines[:min(15, len(lines))]
-                    profile = "\n".join(profile_lines)
-                    details = result
-                
-                # Проверяем наличие личной информации в профилях
-                if "Личная информация" not in details and "Имя:" not in details:
-                    # Добавляем личную информацию в начало детального профиля после заголовка
-                    if details.startswith("ПОЛНЫЙ ПРОФИЛЬ"):
-                        title_end = details.find("\n", len("ПОЛНЫЙ ПРОФИЛЬ"))
-                        if title_end > 0:
-                            details = details[:title_end+1] + "\n" + personal_info + "\n" + details[title_end+1:]
-                            logger.info("Добавлена личная информация в начало детального профиля после заголовка")
-                        else:
-                            details = details + "\n\n" + personal_info
-                            logger.info("Добавлена личная информация в конец детального профиля")
-                    else:
-                        # Если нет заголовка, добавляем в начало
-                        details = f"ПОЛНЫЙ ПРОФИЛЬ\n\n{personal_info}\n\n" + details
-                        logger.info("Добавлен заголовок и личная информация в начало детального профиля")
-                
-                # Проверяем корректность детального профиля
-                if len(details) < 100:
-                    logger.warning(f"Детальный профиль слишком короткий ({len(details)} символов), генерируем запасной вариант")
-                    details = f"""ПОЛНЫЙ ПРОФИЛЬ
-
-{personal_info}
-
-{details}
-
-Пожалуйста, обратите внимание, что детальный профиль был сгенерирован в сокращенном виде. 
-Для получения более полного анализа рекомендуется пройти опрос повторно."""
+                profile, details = parse_profile_result(result, personal_info)
                 
                 logger.info(f"Профиль успешно сгенерирован для пользователя {answers.get('name', 'неизвестно')}")
                 logger.info(f"Итоговые размеры: краткий профиль - {len(profile)} символов, детальный профиль - {len(details)} символов")
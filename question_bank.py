@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Iterator
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Путь к файлу банка вопросов
+QUESTION_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank.jsonl")
+)
+
+# Формат и поддерживаемая версия файла банка вопросов
+QUESTION_BANK_FORMAT = "ona-question-bank"
+QUESTION_BANK_VERSION = 1
+
+# Начало строки с интерпретациями ответов на вопрос
+_INTERPRETATIONS_PREFIX = b'{"interpretations": "'
+
+class QuestionBankError(Exception):
+    """Ошибка чтения файла банка вопросов."""
+
+class LazyInterpretations(Mapping):
+    """
+    Интерпретации ответов на вопрос, загружаемые из файла при первом обращении.
+
+    Ведет себя как обычный словарь {буква варианта: текст интерпретации}.
+    """
+
+    __slots__ = ("_bank", "_question_id")
+
+    def __init__(self, bank: "QuestionBank", question_id: str):
+        self._bank = bank
+        self._question_id = question_id
+
+    def _texts(self) -> Dict[str, str]:
+        return self._bank.get_interpretations(self._question_id)
+
+    def __getitem__(self, option: str) -> str:
+        return self._texts()[option]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._texts())
+
+    def __len__(self) -> int:
+        return len(self._texts())
+
+    def __repr__(self) -> str:
+        return f"LazyInterpretations({self._question_id!r})"
+
+class QuestionBank:
+    """
+    Банк вопросов опроса, хранящийся в версионированном файле JSON Lines.
+
+    Первая строка файла - заголовок с форматом и версией, затем по строке на
+    каждый вопрос (демо-вопросы и вопросы Vasini), затем по строке
+    с интерпретациями ответов на каждый вопрос Vasini. Вопросы читаются
+    при первом обращении к банку; для интерпретаций запоминается только
+    смещение строки в файле, а сами тексты читаются по запросу.
+    """
+
+    def __init__(self, path: str = QUESTION_BANK_PATH):
+        self.path = path
+        self.version: Optional[int] = None
+        self._demo_questions: Optional[List[Dict[str, Any]]] = None
+        self._vasini_questions: List[Dict[str, Any]] = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._interpretation_offsets: Dict[str, int] = {}
+        self.get_interpretations = lru_cache(maxsize=64)(self._read_interpretations)
+
+    def _load(self) -> None:
+        if self._demo_questions is not None:
+            return
+
+        demo_questions = []
+        vasini_questions = []
+        offsets = {}
+
+        with open(self.path, "rb") as file:
+            header = json.loads(file.readline())
+            if header.get("format") != QUESTION_BANK_FORMAT or header.get("version") != QUESTION_BANK_VERSION:
+                raise QuestionBankError(
+                    f"Неподдерживаемый файл банка вопросов {self.path}: "
+                    f"формат {header.get('format')}, версия {header.get('version')}"
+                )
+
+            offset = file.tell()
+            for line in file:
+                if line.startswith(_INTERPRETATIONS_PREFIX):
+                    # Запоминаем только смещение строки, сами интерпретации не разбираем
+                    start = len(_INTERPRETATIONS_PREFIX)
+                    question_id = line[start:line.index(b'"', start)].decode("utf-8")
+                    offsets[question_id] = offset
+                elif line.strip():
+                    question = json.loads(line)
+                    section = question.pop("section")
+                    if section == "demo":
+                        demo_questions.append(question)
+                    else:
+                        vasini_questions.append(question)
+                offset += len(line)
+
+        for question in vasini_questions:
+            question["interpretations"] = LazyInterpretations(self, question["id"])
+
+        self.version = header["version"]
+        self._vasini_questions = vasini_questions
+        self._by_id = {question["id"]: question for question in demo_questions + vasini_questions}
+        self._interpretation_offsets = offsets
+        self._demo_questions = demo_questions
+
+        logger.info(
+            f"Банк вопросов загружен (версия {self.version}): "
+            f"{len(demo_questions)} демо-вопросов, {len(vasini_questions)} вопросов Vasini"
+        )
+
+    def _read_interpretations(self, question_id: str) -> Dict[str, str]:
+        self._load()
+        offset = self._interpretation_offsets.get(question_id)
+        if offset is None:
+            return {}
+
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            return json.loads(file.readline())["texts"]
+
+    def get_demo_questions(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает список демо-вопросов.
+
+        Returns:
+            List[Dict[str, Any]]: Список демо-вопросов
+        """
+        self._load()
+        return self._demo_questions
+
+    def get_vasini_questions(self) -> List[Dict[str, Any]]:
+        """
+        Возвращает список вопросов Vasini.
+
+        Интерпретации ответов в вопросах читаются из файла при первом обращении.
+
+        Returns:
+            List[Dict[str, Any]]: Список вопросов Vasini
+        """
+        self._load()
+        return self._vasini_questions
+
+    def get_question(self, question_id: str) -> Dict[str, Any]:
+        """
+        Возвращает вопрос по его ID.
+
+        Args:
+            question_id: ID вопроса
+
+        Returns:
+            Dict[str, Any]: Данные вопроса или пустой словарь, если вопрос не найден
+        """
+        self._load()
+        return self._by_id.get(question_id, {})
+
+    def get_interpretation(self, question_id: str, option: str) -> Optional[str]:
+        """
+        Возвращает интерпретацию выбранного варианта ответа.
+
+        Args:
+            question_id: ID вопроса
+            option: Буква варианта ответа
+
+        Returns:
+            Optional[str]: Текст интерпретации или None, если ее нет
+        """
+        return self.get_interpretations(question_id).get(option)
+
+# Общий банк вопросов (файл читается при первом обращении)
+_bank: Optional[QuestionBank] = None
+
+def get_question_bank() -> QuestionBank:
+    """
+    Возвращает общий банк вопросов.
+
+    Returns:
+        QuestionBank: Банк вопросов
+    """
+    global _bank
+    if _bank is None:
+        _bank = QuestionBank()
+    return _bank
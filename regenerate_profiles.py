@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+"""
+Скрипт для пакетной перегенерации психологических профилей пользователей.
+
+Используется после изменения структуры промта (generate_profile_prompt в questions.py),
+системного промта в profile_generator.py или банка вопросов (question_bank.jsonl),
+чтобы обновить профили уже прошедших опрос пользователей без повторного
+прохождения опроса.
+
+Ответы берутся из сохраненных данных (user_states / user_answers) только
+для пользователей с готовым профилем, которые не проходят опрос сейчас: из
+неполных ответов профиль не строится. Профили генерируются с ограниченным
+числом одновременных запросов к OpenAI и сохраняются через save_profile_data.
+Прогресс записывается в файл контрольной точки, поэтому прерванный запуск
+можно продолжить с того же места.
+
+Примеры:
+    python regenerate_profiles.py --dry-run
+    python regenerate_profiles.py --concurrency 8
+    python regenerate_profiles.py --export-batch batch_input.jsonl
+    python regenerate_profiles.py --import-batch batch_output.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import hashlib
+import argparse
+import logging
+from typing import Dict, Any, Optional, Set
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения до импорта модулей, читающих OPENAI_API_KEY
+load_dotenv()
+
+from db_utils import iter_stored_answers, save_profile_data, get_user_state, save_user_state
+from questions import get_personality_type_from_answers, generate_profile_prompt
+from question_bank import QUESTION_BANK_PATH, QUESTION_BANK_VERSION
+import profile_generator
+from profile_generator import (
+    PROFILE_MODEL,
+    PROFILE_TEMPERATURE,
+    PROFILE_SYSTEM_PROMPT,
+    build_personal_info,
+    build_profile_messages,
+    parse_profile_result
+)
+
+# Настройка логирования
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - [REGENERATE] - %(levelname)s - %(message)s",
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger("regenerate_profiles")
+
+# Файл контрольной точки по умолчанию
+DEFAULT_CHECKPOINT = "regenerate_profiles.checkpoint.json"
+
+# Как часто сохранять контрольную точку (в обработанных пользователях)
+CHECKPOINT_EVERY = 10
+
+def get_prompt_fingerprint(question_bank_path: str = QUESTION_BANK_PATH) -> str:
+    """
+    Возвращает отпечаток текущего промта генерации профиля.
+
+    Отпечаток сохраняется в контрольной точке: если промт или банк вопросов
+    (тексты вопросов и интерпретации ответов) изменился, старая контрольная
+    точка не используется и профили перегенерируются заново.
+
+    Args:
+        question_bank_path: Путь к файлу банка вопросов
+
+    Returns:
+        str: Короткий хеш модели, системного промта, построителя пользовательского
+        промта и версии банка вопросов
+    """
+    digest = hashlib.sha256()
+    for part in (PROFILE_MODEL, str(PROFILE_TEMPERATURE), PROFILE_SYSTEM_PROMPT,
+                 inspect.getsource(generate_profile_prompt), str(QUESTION_BANK_VERSION)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\n")
+    with open(question_bank_path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class Checkpoint:
+    """
+    Контрольная точка пакетной перегенерации профилей.
+
+    Хранит множество пользователей, чьи профили уже обновлены, и ошибки
+    по остальным. Запись выполняется атомарно через временный файл.
+    """
+
+    def __init__(self, path: str, fingerprint: str, read_only: bool = False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.read_only = read_only
+        self.done: Set[int] = set()
+        self.failed: Dict[int, str] = {}
+        self._dirty = 0
+
+    def load(self) -> None:
+        """Загружает контрольную точку, если она существует и соответствует текущему промту."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать контрольную точку {self.path}: {e}")
+            return
+
+        if data.get("fingerprint") != self.fingerprint:
+            logger.warning("Промт генерации профиля изменился, контрольная точка сброшена")
+            return
+
+        self.done = set(data.get("done", []))
+        self.failed = {int(user_id): error for user_id, error in data.get("failed", {}).items()}
+        logger.info(f"Загружена контрольная точка: обработано {len(self.done)}, с ошибками {len(self.failed)}")
+
+    def mark_done(self, user_id: int) -> None:
+        self.done.add(user_id)
+        self.failed.pop(user_id, None)
+        self._mark_dirty()
+
+    def mark_failed(self, user_id: int, error: str) -> None:
+        self.failed[user_id] = error
+        self._mark_dirty()
+
+    def _mark_dirty(self) -> None:
+        self._dirty += 1
+        if self._dirty >= CHECKPOINT_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        """Атомарно сохраняет контрольную точку на диск."""
+        if self.read_only:
+            return
+        data = {
+            "fingerprint": self.fingerprint,
+            "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "done": sorted(self.done),
+            "failed": {str(user_id): error for user_id, error in self.failed.items()}
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+class Throughput:
+    """
+    Счетчики пакетной обработки и периодический отчет о пропускной способности.
+    """
+
+    def __init__(self, report_interval: float):
+        self.report_interval = report_interval
+        self.started_at = time.monotonic()
+        self.last_report_at = self.started_at
+        self.ok = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last_report_at < self.report_interval:
+            return
+        self.last_report_at = now
+
+        elapsed = now - self.started_at
+        processed = self.ok + self.failed
+        rate = processed / elapsed * 60 if elapsed > 0 else 0.0
+        logger.info(
+            f"Прогресс: успешно {self.ok}, ошибок {self.failed}, пропущено {self.skipped}, "
+            f"прошло {elapsed:.0f} с, скорость {rate:.1f} профилей/мин"
+        )
+
+async def store_profile(user_id: int, answers: Dict[str, Any], details: str) -> bool:
+    """
+    Сохраняет перегенерированный профиль в базу данных и в данные FSM пользователя.
+
+    Args:
+        user_id: ID пользователя в Telegram
+        answers: Словарь с ответами пользователя
+        details: Текст детального профиля
+
+    Returns:
+        bool: True, если профиль сохранен в базу данных
+    """
+    _, primary_type, _ = get_personality_type_from_answers(answers)
+
+    if not await save_profile_data(user_id, details, primary_type):
+        return False
+
+    # Обновляем профиль и в состоянии FSM, откуда его читают обработчики просмотра профиля
+    state_name, state_data = await get_user_state(user_id)
+    if state_data and state_data.get("profile_completed"):
+        state_data["profile_text"] = details
+        state_data["profile_details"] = details
+        await save_user_state(user_id, state_name or "", state_data)
+
+    return True
+
+async def regenerate_one(user_id: int, answers: Dict[str, Any], semaphore: asyncio.Semaphore,
+                         checkpoint: Checkpoint, stats: Throughput) -> None:
+    """
+    Перегенерирует профиль одного пользователя с учетом ограничения параллелизма.
+    """
+    async with semaphore:
+        try:
+            response = await profile_generator.client.chat.completions.create(
+                model=PROFILE_MODEL,
+                temperature=PROFILE_TEMPERATURE,
+                messages=build_profile_messages(answers)
+            )
+            result = response.choices[0].message.content
+            _, details = parse_profile_result(result, build_personal_info(answers))
+
+            if not await store_profile(user_id, answers, details):
+                raise RuntimeError("не удалось сохранить профиль в базу данных")
+
+            checkpoint.mark_done(user_id)
+            stats.ok += 1
+        except Exception as e:
+            logger.error(f"Ошибка при перегенерации профиля пользователя {user_id}: {e}")
+            checkpoint.mark_failed(user_id, str(e))
+            stats.failed += 1
+
+    stats.report()
+
+async def run_online(args: argparse.Namespace, checkpoint: Checkpoint, stats: Throughput) -> None:
+    """
+    Перегенерирует профили через OpenAI API с ограниченным параллелизмом.
+    """
+    semaphore = asyncio.Semaphore(args.concurrency)
+    pending: Set[asyncio.Task] = set()
+
+    async for user_id, answers in iter_stored_answers(batch_size=args.batch_size, completed_only=True):
+        if args.user_id and user_id not in args.user_id:
+            continue
+        if user_id in checkpoint.done:
+            stats.skipped += 1
+            continue
+        if args.limit and stats.ok + stats.failed + len(pending) >= args.limit:
+            break
+
+        if args.dry_run:
+            messages = build_profile_messages(answers)
+            prompt_chars = sum(len(message["content"]) for message in messages)
+            logger.info(f"[dry-run] Пользователь {user_id}: будет перегенерирован профиль (промт {prompt_chars} символов)")
+            stats.ok += 1
+            stats.report()
+            continue
+
+        task = asyncio.create_task(regenerate_one(user_id, answers, semaphore, checkpoint, stats))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+        # Не читаем следующие ответы, пока очередь задач заполнена
+        while len(pending) >= args.concurrency * 2:
+            await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+    if pending:
+        await asyncio.wait(pending)
+
+async def export_batch(args: argparse.Namespace, checkpoint: Checkpoint, stats: Throughput) -> None:
+    """
+    Записывает запросы на генерацию профилей в JSONL-файл формата OpenAI Batch API.
+    """
+    count = 0
+    with open(args.export_batch, "w", encoding="utf-8") as f:
+        async for user_id, answers in iter_stored_answers(batch_size=args.batch_size, completed_only=True):
+            if args.user_id and user_id not in args.user_id:
+                continue
+            if user_id in checkpoint.done:
+                stats.skipped += 1
+                continue
+            if args.limit and count >= args.limit:
+                break
+
+            request = {
+                "custom_id": str(user_id),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": PROFILE_MODEL,
+                    "temperature": PROFILE_TEMPERATURE,
+                    "messages": build_profile_messages(answers)
+                }
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            count += 1
+
+    logger.info(f"Записано {count} запросов в {args.export_batch}, пропущено {stats.skipped}")
+
+async def import_batch(args: argparse.Namespace, checkpoint: Checkpoint, stats: Throughput) -> None:
+    """
+    Сохраняет профили из JSONL-файла с результатами OpenAI Batch API.
+    """
+    results: Dict[int, Optional[str]] = {}
+    with open(args.import_batch, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            user_id = int(item["custom_id"])
+            try:
+                results[user_id] = item["response"]["body"]["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                results[user_id] = None
+                checkpoint.mark_failed(user_id, str(item.get("error") or "пустой ответ"))
+                stats.failed += 1
+
+    async for user_id, answers in iter_stored_answers(batch_size=args.batch_size, completed_only=True):
+        result = results.get(user_id)
+        if result is None:
+            continue
+        if user_id in checkpoint.done:
+            stats.skipped += 1
+            continue
+
+        _, details = parse_profile_result(result, build_personal_info(answers))
+        if args.dry_run:
+            logger.info(f"[dry-run] Пользователь {user_id}: профиль из пакета ({len(details)} символов) не сохранен")
+            stats.ok += 1
+        elif await store_profile(user_id, answers, details):
+            checkpoint.mark_done(user_id)
+            stats.ok += 1
+        else:
+            checkpoint.mark_failed(user_id, "не удалось сохранить профиль в базу данных")
+            stats.failed += 1
+        stats.report()
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Пакетная перегенерация психологических профилей пользователей")
+    parser.add_argument("--concurrency", type=int, default=4, help="Максимум одновременных запросов к OpenAI (по умолчанию 4)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Размер пачки пользователей при чтении из базы данных")
+    parser.add_argument("--limit", type=int, default=0, help="Обработать не более указанного количества пользователей")
+    parser.add_argument("--user-id", type=int, action="append", help="Обработать только указанных пользователей (можно повторять)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Путь к файлу контрольной точки")
+    parser.add_argument("--reset-checkpoint", action="store_true", help="Игнорировать существующую контрольную точку")
+    parser.add_argument("--dry-run", action="store_true", help="Показать, что будет сделано, без запросов к API и записи в базу")
+    parser.add_argument("--report-interval", type=float, default=10.0, help="Интервал отчета о прогрессе в секундах")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--export-batch", metavar="FILE", help="Записать запросы в JSONL-файл для OpenAI Batch API")
+    mode.add_argument("--import-batch", metavar="FILE", help="Сохранить профили из JSONL-файла с результатами OpenAI Batch API")
+    return parser.parse_args()
+
+async def main() -> int:
+    args = parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, get_prompt_fingerprint(), read_only=args.dry_run)
+    if not args.reset_checkpoint:
+        checkpoint.load()
+
+    stats = Throughput(args.report_interval)
+
+    if args.export_batch:
+        await export_batch(args, checkpoint, stats)
+        return 0
+
+    if args.import_batch:
+        await import_batch(args, checkpoint, stats)
+    else:
+        if not args.dry_run and not profile_generator.client:
+            logger.error("OPENAI_API_KEY не найден: перегенерация профилей невозможна (используйте --dry-run или --export-batch)")
+            return 1
+        try:
+            await run_online(args, checkpoint, stats)
+        except asyncio.CancelledError:
+            logger.warning("Перегенерация прервана, прогресс сохранен в контрольной точке")
+
+    checkpoint.save()
+
+    stats.report(force=True)
+    return 1 if stats.failed else 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        print("⚠️ Перегенерация прервана пользователем. Запустите скрипт снова, чтобы продолжить.")
+        sys.exit(130)
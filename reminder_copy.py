@@ -0,0 +1,206 @@
+import os
+import html
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from db_utils import save_reminder_copy, get_reminder_copy, delete_reminder_copy_before
+from meditation_library import LIBRARY_TYPE_PROFILES, library_personality_type
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Час запуска подготовки текстов напоминаний (UTC), когда бот почти не используется
+REMINDER_COPY_BUILD_HOUR = int(os.getenv("REMINDER_COPY_BUILD_HOUR", "4"))
+
+# Сколько текстов создается одновременно
+REMINDER_COPY_CONCURRENCY = int(os.getenv("REMINDER_COPY_CONCURRENCY", "4"))
+
+# Сколько недель вперед (включая текущую) готовятся тексты
+REMINDER_COPY_WEEKS = 2
+
+# Текст напоминания, если подготовленного текста нет
+DEFAULT_REMINDER_TEXT = (
+    "Привет! Не забудьте уделить время себе сегодня. "
+    "Медитация или другая психологическая практика поможет вам "
+    "чувствовать себя лучше и поддерживать ментальное здоровье."
+)
+
+# Настроение дня недели для текста напоминания
+WEEKDAY_THEMES = (
+    "понедельник: мягкое начало недели без спешки",
+    "вторник: внимание к телу и дыханию",
+    "среда: середина недели, пауза посреди дел",
+    "четверг: забота о себе, когда накопилась усталость",
+    "пятница: отпустить напряжение рабочей недели",
+    "суббота: время для себя и отдыха",
+    "воскресенье: спокойное завершение недели и настрой на следующую"
+)
+
+# Тексты напоминаний по неделям: неделя -> (тип личности, день недели) -> текст
+_copy_cache: Dict[str, Dict[Tuple[str, int], str]] = {}
+
+def week_key(day: date) -> str:
+    """
+    Возвращает неделю, к которой относится дата (дата понедельника).
+
+    Args:
+        day: Дата
+
+    Returns:
+        str: Дата понедельника в формате YYYY-MM-DD
+    """
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def copy_slots() -> List[Tuple[str, int]]:
+    """
+    Возвращает все сочетания, для которых на неделю готовятся тексты.
+
+    Returns:
+        List[Tuple[str, int]]: Сочетания (тип личности, день недели)
+    """
+    return [(personality_type, weekday) for personality_type in LIBRARY_TYPE_PROFILES for weekday in range(7)]
+
+async def _load_week(week: str) -> Dict[Tuple[str, int], str]:
+    texts = _copy_cache.get(week)
+    if texts is None:
+        texts = await get_reminder_copy(week)
+        # Храним только текущую и следующие недели
+        for old_week in [key for key in _copy_cache if key < week]:
+            del _copy_cache[old_week]
+        _copy_cache[week] = texts
+    return texts
+
+async def get_reminder_text(personality_type: Optional[str], local_day: date) -> str:
+    """
+    Выбирает подготовленный текст напоминания.
+
+    Тексты недели загружаются из базы одним запросом при первом обращении,
+    дальше выбор - поиск в словаре.
+
+    Args:
+        personality_type: Тип личности пользователя
+        local_day: Дата напоминания по местному времени пользователя
+
+    Returns:
+        str: Текст напоминания (DEFAULT_REMINDER_TEXT, если текст не подготовлен)
+    """
+    texts = await _load_week(week_key(local_day))
+    return texts.get((library_personality_type(personality_type), local_day.weekday()), DEFAULT_REMINDER_TEXT)
+
+def format_reminder(text: str) -> str:
+    """
+    Оформляет текст напоминания для отправки с HTML-разметкой.
+
+    Args:
+        text: Текст напоминания
+
+    Returns:
+        str: Сообщение в HTML-разметке
+    """
+    return f"🧘 <b>Напоминание о практике</b>\n\n{html.escape(text, quote=False)}"
+
+async def _generate_text(client, personality_type: str, weekday: int) -> str:
+    response = await client.chat.completions.create(
+        model="gpt-4o",
+        temperature=0.9,
+        messages=[
+            {
+                "role": "system",
+                "content": "Ты — заботливый наставник по медитации проекта ONA. Напиши короткое напоминание "
+                           "о ежедневной практике (медитации или дыхательном упражнении): 2-3 предложения, "
+                           "тепло и без давления, без приветствия по имени, без хэштегов и разметки. "
+                           "Обращайся к пользователю на «вы». Ответ должен быть на русском языке."
+            },
+            {
+                "role": "user",
+                "content": f"Тип личности: {LIBRARY_TYPE_PROFILES[personality_type]}\n"
+                           f"День недели: {WEEKDAY_THEMES[weekday]}"
+            }
+        ]
+    )
+    return response.choices[0].message.content.strip()
+
+async def build_reminder_copy(today: Optional[date] = None, concurrency: int = REMINDER_COPY_CONCURRENCY) -> int:
+    """
+    Готовит тексты напоминаний на текущую и следующую неделю.
+
+    Для каждого типа личности создается текст на каждый день недели.
+    Одновременно выполняется не больше concurrency запросов к OpenAI.
+    Каждый текст сохраняется сразу после создания, а запуск создает только
+    недостающие тексты, поэтому прерванная подготовка продолжается
+    со следующего запуска. При ошибке квоты оставшиеся запросы не выполняются.
+
+    Args:
+        today: Текущая дата (для тестов)
+        concurrency: Количество одновременных запросов
+
+    Returns:
+        int: Количество созданных текстов
+    """
+    import meditation_handler
+
+    client = meditation_handler.client
+    if client is None:
+        logger.warning("OpenAI API недоступен, подготовка текстов напоминаний пропущена")
+        return 0
+
+    today = today or datetime.now(timezone.utc).date()
+    weeks = [week_key(today + timedelta(weeks=shift)) for shift in range(REMINDER_COPY_WEEKS)]
+    removed = await delete_reminder_copy_before(weeks[0])
+
+    semaphore = asyncio.Semaphore(concurrency)
+    stopped = asyncio.Event()
+
+    async def build_one(week: str, personality_type: str, weekday: int) -> bool:
+        async with semaphore:
+            if stopped.is_set():
+                return False
+            try:
+                text = await _generate_text(client, personality_type, weekday)
+            except Exception as e:
+                if "quota" in str(e).lower() or "429" in str(e):
+                    stopped.set()
+                logger.error(f"Ошибка при создании текста напоминания {week}/{personality_type}/{weekday}: {e}")
+                return False
+            if not text or not await save_reminder_copy(week, personality_type, weekday, text):
+                return False
+            if week in _copy_cache:
+                _copy_cache[week][(personality_type, weekday)] = text
+            return True
+
+    tasks = []
+    for week in weeks:
+        existing = await get_reminder_copy(week)
+        tasks.extend(
+            build_one(week, personality_type, weekday)
+            for personality_type, weekday in copy_slots()
+            if (personality_type, weekday) not in existing
+        )
+    built = sum(await asyncio.gather(*tasks))
+
+    logger.info(
+        f"Подготовка текстов напоминаний завершена: создано {built} из {len(tasks)} недостающих, "
+        f"удалено старых: {removed}"
+    )
+    return built
+
+def schedule_reminder_copy_builds(scheduler) -> None:
+    """
+    Добавляет ежедневную подготовку текстов напоминаний в планировщик.
+
+    Args:
+        scheduler: Планировщик APScheduler
+    """
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler.add_job(
+        build_reminder_copy,
+        trigger=CronTrigger(hour=REMINDER_COPY_BUILD_HOUR, minute=0, timezone="UTC"),
+        id="reminder_copy_build",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    logger.info(f"Подготовка текстов напоминаний запланирована на {REMINDER_COPY_BUILD_HOUR:02d}:00 UTC")
@@ -1,7 +1,9 @@
 import logging
 import os
+import time
 import asyncio
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Set
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.filters import Command
@@ -10,6 +12,14 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from button_states import ReminderStates
 from survey_handler import get_main_keyboard
+from db_utils import (
+    get_reminder, save_reminder, get_unindexed_reminders, get_due_reminders,
+    set_reminder_next_fire, save_user_timezone, get_user_timezone,
+    get_unparsed_timezone_answers, save_user_timezones, queue_reminder_sent
+)
+from services.outbound import get_outbound_queue, PRIORITY_REMINDER
+from timezones import DAY_CODES, DEFAULT_TIMEZONE, parse_timezone, next_fire_time, local_date
+from reminder_copy import DEFAULT_REMINDER_TEXT, get_reminder_text, format_reminder
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -22,9 +32,247 @@ reminder_router = Router()
 # Инициализация планировщика задач
 scheduler = AsyncIOScheduler()
 
-# Словарь для хранения пользователей с включенными напоминаниями
-# {user_id: {"time": "HH:MM", "days": ["mon", "tue", ...], "active": True}}
-reminder_users = {}
+# Все дни недели (напоминания по умолчанию приходят каждый день)
+ALL_DAYS = list(DAY_CODES)
+
+# Время напоминаний по умолчанию
+DEFAULT_REMINDER_TIME = os.getenv("DEFAULT_REMINDER_TIME", "20:00")
+
+# Размер страницы напоминаний, выбираемых из индекса за один запрос
+REMINDER_PAGE_SIZE = 1000
+
+# Напоминания, опоздавшие больше чем на столько минут (бот был выключен),
+# не отправляются, а переносятся на следующее срабатывание
+REMINDER_CATCHUP_MINUTES = 5
+
+# ID единственной задачи планировщика, рассылающей напоминания
+DISPATCHER_JOB_ID = "reminder_dispatcher"
+
+# Максимальное количество напоминаний, переданных в очередь исходящих и еще не отправленных
+REMINDER_MAX_IN_FLIGHT = int(os.getenv("REMINDER_MAX_IN_FLIGHT", "5000"))
+
+# Задачи отправки напоминаний, которые ждут очереди исходящих сообщений
+_reminder_sends: Set[asyncio.Task] = set()
+
+# Начало предыдущего прохода рассылки (секунды UTC), None - после запуска бота
+_last_dispatch_at: Optional[int] = None
+
+async def _start_reminder_send(bot: Bot, user_id: int, text: str) -> None:
+    # Достигнут предел: ждем, пока очередь исходящих отправит часть напоминаний
+    while len(_reminder_sends) >= REMINDER_MAX_IN_FLIGHT:
+        await asyncio.wait(_reminder_sends, return_when=asyncio.FIRST_COMPLETED)
+    task = asyncio.create_task(send_reminder(bot, user_id, text))
+    _reminder_sends.add(task)
+    task.add_done_callback(_reminder_sends.discard)
+
+async def close_reminder_sends(timeout: float = 1.0) -> int:
+    """
+    Ждет отправки напоминаний, переданных в очередь исходящих, и отменяет оставшиеся.
+    
+    Args:
+        timeout: Время ожидания (секунды)
+    
+    Returns:
+        int: Количество отмененных отправок
+    """
+    if not _reminder_sends:
+        return 0
+    _, pending = await asyncio.wait(set(_reminder_sends), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.warning(f"Не отправлено напоминаний при остановке: {len(pending)}")
+    return len(pending)
+
+def compute_next_fire(reminder_time: str, days: List[str], tz_id: Optional[str], after: Optional[datetime] = None) -> Optional[int]:
+    """
+    Вычисляет ближайшее срабатывание напоминания для индекса.
+    
+    Args:
+        reminder_time: Местное время пользователя в формате HH:MM
+        days: Дни недели (mon, tue, ...)
+        tz_id: Часовой пояс пользователя (None - DEFAULT_TIMEZONE)
+        after: Момент, после которого ищется срабатывание (по умолчанию - сейчас)
+    
+    Returns:
+        Optional[int]: Срабатывание в секундах UTC или None, если дни не выбраны
+    
+    Raises:
+        ValueError: Если время или день недели заданы некорректно
+    """
+    fire_at = next_fire_time(reminder_time, days, tz_id, after or datetime.now(timezone.utc))
+    return int(fire_at.timestamp()) if fire_at else None
+
+async def save_reminder_settings(user_id: int, reminder_time: str, days: List[str], active: bool = True) -> bool:
+    """
+    Сохраняет настройки напоминаний и вычисляет ближайшее срабатывание
+    по часовому поясу пользователя.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        reminder_time: Местное время пользователя в формате HH:MM
+        days: Дни недели (mon, tue, ...)
+        active: Включены ли напоминания
+    
+    Returns:
+        bool: True, если операция успешна, False в противном случае
+    """
+    tz_id = await get_user_timezone(user_id) or DEFAULT_TIMEZONE
+    next_fire_at = compute_next_fire(reminder_time, days, tz_id) if active else None
+    return await save_reminder(user_id, reminder_time, days, active, timezone=tz_id, next_fire_at=next_fire_at)
+
+async def update_user_timezone(user_id: int, answer: str) -> Optional[str]:
+    """
+    Сохраняет часовой пояс из ответа пользователя и пересчитывает его напоминания.
+    
+    Args:
+        user_id: ID пользователя в Telegram
+        answer: Ответ на вопрос опроса о часовом поясе
+    
+    Returns:
+        Optional[str]: Распознанный часовой пояс или None, если ответ не распознан
+    """
+    tz_id = parse_timezone(answer)
+    if tz_id is None:
+        logger.info(f"Не удалось распознать часовой пояс пользователя {user_id}: {answer!r}")
+        return None
+    
+    await save_user_timezone(user_id, tz_id, answer)
+    reminder = await get_reminder(user_id)
+    if reminder and reminder["active"]:
+        await save_reminder_settings(user_id, reminder["time"], reminder["days"])
+    return tz_id
+
+async def dispatch_due_reminders(bot: Bot, now: Optional[datetime] = None) -> int:
+    """
+    Рассылает напоминания, время срабатывания которых уже наступило.
+    
+    Запускается планировщиком раз в минуту. Напоминания выбираются из индекса
+    страницами по REMINDER_PAGE_SIZE; перед отправкой каждому вычисляется
+    следующее срабатывание, поэтому повторный проход не отправит напоминание
+    второй раз. Напоминания передаются в очередь исходящих сообщений
+    с приоритетом ниже ответов пользователям, и проход не ждет их доставки:
+    он ждет только если в очереди уже REMINDER_MAX_IN_FLIGHT напоминаний.
+    
+    Напоминания, опоздавшие больше чем на REMINDER_CATCHUP_MINUTES (бот был
+    выключен), только переносятся. Опоздание отсчитывается от начала
+    предыдущего прохода, поэтому напоминания, наступившие во время долгой
+    рассылки, не считаются опоздавшими.
+    
+    Args:
+        bot: Бот, который отправляет напоминания
+        now: Текущее время (для тестов)
+    
+    Returns:
+        int: Количество напоминаний, переданных в очередь исходящих сообщений
+    """
+    global _last_dispatch_at
+    current = now or datetime.now(timezone.utc)
+    now_ts = int(current.timestamp())
+    stale_before = min(now_ts, _last_dispatch_at or now_ts) - REMINDER_CATCHUP_MINUTES * 60
+    _last_dispatch_at = now_ts
+    
+    started = time.monotonic()
+    total = 0
+    skipped = 0
+    while True:
+        rows = await get_due_reminders(now_ts, REMINDER_PAGE_SIZE)
+        if not rows:
+            break
+        
+        updates = []
+        recipients = []
+        for user_id, remind_time, days, tz_id, fire_at, personality_type in rows:
+            try:
+                next_fire_at = compute_next_fire(remind_time, days.split(",") if days else [], tz_id, current)
+            except ValueError as e:
+                logger.error(f"Некорректные настройки напоминаний пользователя {user_id}: {e}")
+                next_fire_at = None
+            updates.append((next_fire_at, user_id))
+            if fire_at >= stale_before:
+                # Текст подготовлен заранее для типа личности и местного дня недели
+                text = await get_reminder_text(personality_type, local_date(fire_at, tz_id))
+                recipients.append((user_id, text))
+            else:
+                skipped += 1
+        
+        # Без записи следующего срабатывания те же напоминания выбрались бы снова
+        if not await set_reminder_next_fire(updates):
+            break
+        
+        # Скорость отправки ограничивает очередь исходящих сообщений, доставку не ждем
+        for user_id, text in recipients:
+            await _start_reminder_send(bot, user_id, text)
+        total += len(recipients)
+        if len(rows) < REMINDER_PAGE_SIZE:
+            break
+    
+    if total or skipped:
+        logger.info(
+            f"Передано в очередь напоминаний: {total} за {time.monotonic() - started:.1f} с, "
+            f"перенесено опоздавших: {skipped}, ожидают отправки: {len(_reminder_sends)}"
+        )
+    return total
+
+def start_reminder_dispatcher(bot: Bot) -> None:
+    """
+    Добавляет в планировщик единственную задачу рассылки напоминаний (раз в минуту).
+    
+    Args:
+        bot: Бот, который отправляет напоминания
+    """
+    scheduler.add_job(
+        dispatch_due_reminders,
+        CronTrigger(second=0),
+        id=DISPATCHER_JOB_ID,
+        args=[bot],
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=30
+    )
+
+async def restore_reminders(bot: Bot) -> int:
+    """
+    Подготавливает рассылку напоминаний после запуска бота.
+    
+    Настройки напоминаний и ближайшие срабатывания хранятся в базе, поэтому
+    после перезапуска достаточно одной задачи планировщика. Сначала
+    распознаются ответы о часовом поясе, сохраненные до появления таблицы
+    часовых поясов, затем одним пакетом вычисляются срабатывания напоминаний,
+    у которых их еще нет.
+    
+    Args:
+        bot: Бот, который отправляет напоминания
+    
+    Returns:
+        int: Количество напоминаний, добавленных в индекс
+    """
+    started = time.monotonic()
+    timezones = []
+    for user_id, answer in await get_unparsed_timezone_answers():
+        tz_id = parse_timezone(answer)
+        if tz_id:
+            timezones.append((user_id, tz_id, answer))
+    if timezones:
+        await save_user_timezones(timezones)
+    
+    now = datetime.now(timezone.utc)
+    updates = []
+    for user_id, remind_time, days, tz_id in await get_unindexed_reminders():
+        try:
+            updates.append((compute_next_fire(remind_time, days.split(",") if days else [], tz_id, now), user_id))
+        except ValueError as e:
+            logger.error(f"Некорректные настройки напоминаний пользователя {user_id}: {e}")
+    if updates:
+        await set_reminder_next_fire(updates)
+    
+    start_reminder_dispatcher(bot)
+    logger.info(
+        f"Рассылка напоминаний запущена, распознано часовых поясов: {len(timezones)}, "
+        f"проиндексировано напоминаний: {len(updates)} за {(time.monotonic() - started) * 1000:.0f} мс"
+    )
+    return len(updates)
 
 # Функция для создания клавиатуры напоминаний
 def get_reminder_keyboard() -> InlineKeyboardMarkup:
@@ -50,8 +298,8 @@ def get_time_selection_keyboard() -> InlineKeyboardMarkup:
     # Предустановленные варианты времени
     times = ["08:00", "12:00", "16:00", "20:00", "22:00"]
     
-    for time in times:
-        builder.button(text=time, callback_data=f"time_{time}")
+    for slot in times:
+        builder.button(text=slot, callback_data=f"time_{slot}")
     
     builder.button(text="◀️ Назад", callback_data="reminder_menu")
     
@@ -92,23 +340,25 @@ def get_days_selection_keyboard(selected_days=None) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 # Функция для отправки напоминания
-async def send_reminder(bot: Bot, user_id: int):
+async def send_reminder(bot: Bot, user_id: int, text: str = DEFAULT_REMINDER_TEXT):
     """
     Отправляет напоминание пользователю.
     
     Args:
         bot: Бот, который отправляет сообщение
         user_id: ID пользователя в Telegram
+        text: Текст напоминания (подготовленный заранее)
     """
     try:
-        await bot.send_message(
-            chat_id=user_id,
-            text="🧘 <b>Напоминание о практике</b>\n\n"
-                 "Привет! Не забудьте уделить время себе сегодня. "
-                 "Медитация или другая психологическая практика поможет вам "
-                 "чувствовать себя лучше и поддерживать ментальное здоровье.",
+        # Через очередь: напоминания тысяч пользователей в одну минуту не превышают лимиты Telegram
+        await get_outbound_queue().send_message(
+            bot,
+            user_id,
+            format_reminder(text),
+            priority=PRIORITY_REMINDER,
             parse_mode="HTML"
         )
+        queue_reminder_sent(user_id)
         logger.info(f"Отправлено напоминание пользователю {user_id}")
     except Exception as e:
         logger.error(f"Ошибка при отправке напоминания пользователю {user_id}: {e}")
@@ -123,10 +373,10 @@ async def cmd_reminders(message: Message, state: FSMContext):
     user_id = message.from_user.id
     
     # Получаем информацию о текущих напоминаниях для пользователя
-    reminder_info = reminder_users.get(user_id, None)
+    reminder_info = await get_reminder(user_id)
     
     if reminder_info and reminder_info.get("active", False):
-        time = reminder_info.get("time", "20:00")
+        reminder_time = reminder_info.get("time", "20:00")
         days = reminder_info.get("days", ["mon", "tue", "wed", "thu", "fri", "sat", "sun"])
         
         # Преобразуем коды дней недели в русские названия
@@ -136,7 +386,11 @@ async def cmd_reminders(message: Message, state: FSMContext):
         }
         days_text = ", ".join([day_names[day] for day in days])
         
-        status_text = f"✅ <b>Напоминания включены</b>\n\nВы получаете напоминания в {time} в {days_text}."
+        tz_id = reminder_info.get("timezone") or DEFAULT_TIMEZONE
+        status_text = (
+            f"✅ <b>Напоминания включены</b>\n\nВы получаете напоминания в {reminder_time} в {days_text}"
+            f" (часовой пояс: {tz_id})."
+        )
     else:
         status_text = "❌ <b>Напоминания выключены</b>\n\nВключите напоминания, чтобы не забывать о практиках."
     
@@ -160,46 +414,18 @@ async def reminder_on(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     
     # Проверяем, есть ли уже настройки напоминаний
-    if user_id not in reminder_users:
-        # Получаем время по умолчанию из переменных окружения
-        default_time = os.getenv("DEFAULT_REMINDER_TIME", "20:00")
-        hour, minute = map(int, default_time.split(":"))
-        
+    reminder_info = await get_reminder(user_id)
+    if reminder_info is None:
         # Создаем настройки напоминаний по умолчанию
-        reminder_users[user_id] = {
-            "time": default_time,
-            "days": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-            "active": True
-        }
+        default_time = DEFAULT_REMINDER_TIME
+        days = ALL_DAYS
     else:
         # Активируем существующие настройки
-        reminder_users[user_id]["active"] = True
-        default_time = reminder_users[user_id]["time"]
-        hour, minute = map(int, default_time.split(":"))
-    
-    # Создаем уникальный ID для задачи
-    job_id = f"reminder_{user_id}"
+        default_time = reminder_info["time"]
+        days = reminder_info["days"]
     
-    # Удаляем существующую задачу, если она есть
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-    
-    # Дни недели в формате APScheduler
-    days = reminder_users[user_id]["days"]
-    day_of_week = ",".join(days)
-    
-    # Добавляем новую задачу в планировщик
-    scheduler.add_job(
-        send_reminder,
-        CronTrigger(hour=hour, minute=minute, day_of_week=day_of_week),
-        id=job_id,
-        args=[callback.bot, user_id],
-        replace_existing=True
-    )
-    
-    # Если планировщик не запущен, запускаем его
-    if not scheduler.running:
-        scheduler.start()
+    # Сохраняем настройки; рассылка найдет пользователя по индексу срабатываний
+    await save_reminder_settings(user_id, default_time, days, active=True)
     
     # Формируем текст дней недели для отображения
     day_names = {
@@ -227,14 +453,10 @@ async def reminder_off(callback: CallbackQuery):
     user_id = callback.from_user.id
     
     # Проверяем, есть ли настройки напоминаний
-    if user_id in reminder_users:
-        reminder_users[user_id]["active"] = False
-    
-    # Удаляем задачу из планировщика
-    job_id = f"reminder_{user_id}"
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-        logger.info(f"Задача напоминания {job_id} удалена из планировщика")
+    reminder_info = await get_reminder(user_id)
+    if reminder_info is not None:
+        # Выключенные напоминания удаляются из индекса срабатываний
+        await save_reminder_settings(user_id, reminder_info["time"], reminder_info["days"], active=False)
     
     await callback.message.edit_text(
         "⏰ <b>Напоминания отключены</b>\n\n"
@@ -272,39 +494,11 @@ async def process_time_selection(callback: CallbackQuery, state: FSMContext):
     """
     user_id = callback.from_user.id
     selected_time = callback.data.split("_")[1]
-    hour, minute = map(int, selected_time.split(":"))
     
     # Обновляем или создаем настройки напоминаний
-    if user_id not in reminder_users:
-        reminder_users[user_id] = {
-            "time": selected_time,
-            "days": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
-            "active": True
-        }
-    else:
-        reminder_users[user_id]["time"] = selected_time
-        reminder_users[user_id]["active"] = True
-    
-    # Если напоминания активны, обновляем задачу в планировщике
-    job_id = f"reminder_{user_id}"
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-    
-    # Дни недели в формате APScheduler
-    days = reminder_users[user_id]["days"]
-    day_of_week = ",".join(days)
-    
-    scheduler.add_job(
-        send_reminder,
-        CronTrigger(hour=hour, minute=minute, day_of_week=day_of_week),
-        id=job_id,
-        args=[callback.bot, user_id],
-        replace_existing=True
-    )
-    
-    # Если планировщик не запущен, запускаем его
-    if not scheduler.running:
-        scheduler.start()
+    reminder_info = await get_reminder(user_id)
+    days = reminder_info["days"] if reminder_info else ALL_DAYS
+    await save_reminder_settings(user_id, selected_time, days, active=True)
     
     # Формируем текст дней недели для отображения
     day_names = {
@@ -331,7 +525,8 @@ async def set_reminder_days(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     
     # Получаем текущие выбранные дни или устанавливаем все дни по умолчанию
-    selected_days = reminder_users.get(user_id, {}).get("days", ["mon", "tue", "wed", "thu", "fri", "sat", "sun"])
+    reminder_info = await get_reminder(user_id)
+    selected_days = reminder_info["days"] if reminder_info else list(ALL_DAYS)
     
     await callback.message.edit_text(
         "📅 <b>Выберите дни недели для напоминаний</b>\n\n"
@@ -405,39 +600,9 @@ async def save_reminder_days(callback: CallbackQuery, state: FSMContext):
         return
     
     # Обновляем или создаем настройки напоминаний
-    if user_id not in reminder_users:
-        default_time = os.getenv("DEFAULT_REMINDER_TIME", "20:00")
-        reminder_users[user_id] = {
-            "time": default_time,
-            "days": selected_days,
-            "active": True
-        }
-    else:
-        reminder_users[user_id]["days"] = selected_days
-        reminder_users[user_id]["active"] = True
-    
-    # Обновляем задачу в планировщике, если напоминания активны
-    time_str = reminder_users[user_id]["time"]
-    hour, minute = map(int, time_str.split(":"))
-    
-    job_id = f"reminder_{user_id}"
-    if scheduler.get_job(job_id):
-        scheduler.remove_job(job_id)
-    
-    # Дни недели в формате APScheduler
-    day_of_week = ",".join(selected_days)
-    
-    scheduler.add_job(
-        send_reminder,
-        CronTrigger(hour=hour, minute=minute, day_of_week=day_of_week),
-        id=job_id,
-        args=[callback.bot, user_id],
-        replace_existing=True
-    )
-    
-    # Если планировщик не запущен, запускаем его
-    if not scheduler.running:
-        scheduler.start()
+    reminder_info = await get_reminder(user_id)
+    time_str = reminder_info["time"] if reminder_info else DEFAULT_REMINDER_TIME
+    await save_reminder_settings(user_id, time_str, selected_days, active=True)
     
     # Формируем текст дней недели для отображения
     day_names = {
@@ -496,10 +661,10 @@ async def back_to_reminder_menu(callback: CallbackQuery, state: FSMContext):
     user_id = callback.from_user.id
     
     # Получаем информацию о текущих напоминаниях для пользователя
-    reminder_info = reminder_users.get(user_id, None)
+    reminder_info = await get_reminder(user_id)
     
     if reminder_info and reminder_info.get("active", False):
-        time = reminder_info.get("time", "20:00")
+        reminder_time = reminder_info.get("time", "20:00")
         days = reminder_info.get("days", ["mon", "tue", "wed", "thu", "fri", "sat", "sun"])
         
         # Преобразуем коды дней недели в русские названия
@@ -509,7 +674,11 @@ async def back_to_reminder_menu(callback: CallbackQuery, state: FSMContext):
         }
         days_text = ", ".join([day_names[day] for day in days])
         
-        status_text = f"✅ <b>Напоминания включены</b>\n\nВы получаете напоминания в {time} в {days_text}."
+        tz_id = reminder_info.get("timezone") or DEFAULT_TIMEZONE
+        status_text = (
+            f"✅ <b>Напоминания включены</b>\n\nВы получаете напоминания в {reminder_time} в {days_text}"
+            f" (часовой пояс: {tz_id})."
+        )
     else:
         status_text = "❌ <b>Напоминания выключены</b>\n\nВключите напоминания, чтобы не забывать о практиках."
     
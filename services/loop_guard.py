@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Интервал проверки отзывчивости цикла событий (секунды)
+LOOP_GUARD_INTERVAL = float(os.getenv("LOOP_GUARD_INTERVAL", "0.5"))
+
+# Задержка, начиная с которой цикл событий считается заблокированным (секунды)
+LOOP_GUARD_THRESHOLD = float(os.getenv("LOOP_GUARD_THRESHOLD", "0.3"))
+
+def assert_not_in_event_loop(function_name: str) -> None:
+    """
+    Запрещает вызов блокирующей функции из потока с работающим циклом событий.
+
+    Args:
+        function_name: Имя блокирующей функции для сообщения об ошибке
+
+    Raises:
+        RuntimeError: Если функция вызвана из работающего цикла событий
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(
+        f"{function_name} блокирует поток и не может вызываться из цикла событий бота; "
+        f"используйте асинхронную версию"
+    )
+
+async def watch_event_loop(interval: float = LOOP_GUARD_INTERVAL, threshold: float = LOOP_GUARD_THRESHOLD) -> None:
+    """
+    Следит за задержками цикла событий и сообщает о блокирующих вызовах.
+
+    Задача засыпает на interval секунд и измеряет, насколько позже она
+    проснулась. Если опоздание больше threshold, значит все это время
+    цикл событий был занят синхронным кодом и другие пользователи ждали.
+
+    Args:
+        interval: Интервал проверки (секунды)
+        threshold: Допустимое опоздание (секунды)
+    """
+    loop = asyncio.get_running_loop()
+    blocked_count = 0
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lag = loop.time() - started - interval
+        if lag > threshold:
+            blocked_count += 1
+            logger.warning(
+                f"Цикл событий был заблокирован на {lag:.2f} с "
+                f"(всего блокировок: {blocked_count}); ищите синхронные вызовы в обработчиках"
+            )
+
+def start_loop_guard() -> Optional[asyncio.Task]:
+    """
+    Запускает наблюдение за циклом событий, если оно не отключено (LOOP_GUARD_INTERVAL=0).
+
+    Returns:
+        Optional[asyncio.Task]: Задача наблюдения или None, если наблюдение отключено
+    """
+    if LOOP_GUARD_INTERVAL <= 0:
+        return None
+    return asyncio.get_running_loop().create_task(watch_event_loop())
@@ -0,0 +1,346 @@
+import os
+import time
+import asyncio
+import logging
+import itertools
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Лимит отправки через очередь (сообщений в секунду; у Telegram около 30 на бота).
+# Ответы через message.answer идут мимо очереди, поэтому лимит оставляет им запас
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "25"))
+
+# Лимит отправки в один чат (сообщений в секунду) и допустимая серия подряд
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+
+# Количество одновременных отправок
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "8"))
+
+# Сколько раз повторяется отправка после ошибки сети или сервера Telegram
+OUTBOUND_MAX_RETRIES = 3
+
+# Время на отправку оставшихся сообщений при остановке бота (секунды)
+OUTBOUND_DRAIN_TIMEOUT = 10
+
+# Сколько корзин чатов хранится, прежде чем удаляются неактивные
+CHAT_BUCKETS_LIMIT = 10000
+
+# Приоритеты очереди: меньшее значение отправляется раньше
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REMINDER = 1
+PRIORITY_BROADCAST = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_REMINDER: "reminder",
+    PRIORITY_BROADCAST: "broadcast"
+}
+
+class TokenBucket:
+    """
+    Корзина токенов: rate отправок в секунду и не больше capacity подряд.
+
+    Токен резервируется сразу, даже если корзина пуста: число токенов уходит
+    в минус, а вызывающий получает задержку, после которой токен появится.
+    Так одновременные отправки встают в очередь без повторных проверок.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        """
+        Резервирует токен.
+
+        Returns:
+            float: Задержка в секундах, после которой можно отправлять
+        """
+        self._refill(time.monotonic() if now is None else now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        """Проверяет, что корзина полностью восполнилась и ее можно забыть."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class _Delivery:
+    __slots__ = ("chat_id", "call", "priority", "future", "enqueued_at", "attempts")
+
+    def __init__(self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int, future: asyncio.Future):
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+class OutboundQueue:
+    """
+    Очередь исходящих сообщений с ограничением скорости.
+
+    Отправки через очередь (длинные ответы split_message, напоминания,
+    рассылки) проходят через общую корзину токенов и корзину чата (лимит
+    на одного пользователя). Обычные ответы (message.answer) отправляются
+    напрямую, мимо очереди, поэтому OUTBOUND_GLOBAL_RATE должен быть ниже
+    лимита Telegram с запасом под них. Очередь разделена на приоритеты:
+    ответы пользователям отправляются раньше напоминаний, а напоминания
+    раньше рассылок. При ответе Telegram "Too Many Requests" (RetryAfter)
+    вся отправка приостанавливается на указанное время, и сообщение
+    повторяется; ошибки сети и сервера повторяются с растущей паузой.
+    Остальные ошибки (например, пользователь заблокировал бота) передаются
+    вызывающему без повторов.
+    """
+
+    def __init__(self, global_rate: float = OUTBOUND_GLOBAL_RATE, chat_rate: float = OUTBOUND_CHAT_RATE,
+                 chat_burst: int = OUTBOUND_CHAT_BURST, workers: int = OUTBOUND_WORKERS,
+                 max_retries: int = OUTBOUND_MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        self._pending: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        # Отложенные повторы (отменяются при остановке очереди)
+        self._delayed: Dict[_Delivery, asyncio.TimerHandle] = {}
+
+        # Метрики с момента запуска бота
+        self.sent: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        self.failed = 0
+        self.retried = 0
+        self.flood_waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _ensure_workers(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]],
+                   priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """
+        Ставит отправку в очередь и ждет ее результата.
+
+        Сообщения одного вызывающего уходят в том порядке, в котором он их
+        отправляет, если каждое следующее ставится после завершения предыдущего.
+
+        Args:
+            chat_id: ID чата получателя (для лимита на чат)
+            call: Функция без аргументов, выполняющая запрос к Telegram,
+                  например lambda: bot.send_message(chat_id, text)
+            priority: Приоритет (PRIORITY_INTERACTIVE, PRIORITY_REMINDER, PRIORITY_BROADCAST)
+
+        Returns:
+            Any: Результат запроса (например, отправленное сообщение)
+
+        Raises:
+            TelegramAPIError: Если отправка не удалась
+        """
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        delivery = _Delivery(chat_id, call, priority, future)
+        self._pending[priority] = self._pending.get(priority, 0) + 1
+        self._queue.put_nowait((priority, next(self._sequence), delivery))
+        return await future
+
+    async def send_message(self, bot, chat_id: int, text: str, priority: int = PRIORITY_INTERACTIVE, **kwargs) -> Any:
+        """
+        Отправляет текстовое сообщение через очередь.
+
+        Args:
+            bot: Бот, который отправляет сообщение
+            chat_id: ID чата получателя
+            text: Текст сообщения
+            priority: Приоритет
+            **kwargs: Остальные параметры bot.send_message (parse_mode, reply_markup, ...)
+
+        Returns:
+            Message: Отправленное сообщение
+        """
+        return await self.send(chat_id, lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs), priority)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_LIMIT:
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_idle(now)
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _wait_for_slot(self, chat_id: int) -> None:
+        now = time.monotonic()
+        # Сначала лимит чата: пока ждем его, общий токен никому не мешает
+        delay = self._chat_bucket(chat_id, now).reserve(now)
+        if delay:
+            await asyncio.sleep(delay)
+        while True:
+            now = time.monotonic()
+            if self._paused_until > now:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            delay = self.global_bucket.reserve(now)
+            if delay:
+                await asyncio.sleep(delay)
+            return
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, delivery = await self._queue.get()
+            try:
+                await self._deliver(delivery)
+            except asyncio.CancelledError:
+                # Очередь останавливается посреди отправки: вызывающий не должен ждать вечно
+                if not delivery.future.done():
+                    delivery.future.cancel()
+                raise
+            except Exception as e:
+                # _deliver передает ошибки через future; сюда попадают только сбои самой очереди
+                logger.error(f"Ошибка очереди исходящих сообщений: {e}")
+                if not delivery.future.done():
+                    delivery.future.set_exception(e)
+
+    async def _deliver(self, delivery: _Delivery) -> None:
+        if delivery.future.cancelled():
+            self._pending[delivery.priority] -= 1
+            return
+
+        await self._wait_for_slot(delivery.chat_id)
+        if delivery.attempts == 0:
+            waited = time.monotonic() - delivery.enqueued_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        delivery.attempts += 1
+
+        try:
+            result = await delivery.call()
+        except TelegramRetryAfter as e:
+            # Telegram просит паузу для всего бота: останавливаем все отправки
+            self.flood_waits += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+            logger.warning(f"Telegram ограничил отправку на {e.retry_after} с (чат {delivery.chat_id})")
+            self._retry(delivery, 0)
+            return
+        except (TelegramNetworkError, TelegramServerError) as e:
+            if delivery.attempts <= self.max_retries:
+                self._retry(delivery, 2 ** (delivery.attempts - 1))
+                return
+            self._fail(delivery, e)
+            return
+        except Exception as e:
+            self._fail(delivery, e)
+            return
+
+        self._pending[delivery.priority] -= 1
+        self.sent[delivery.priority] = self.sent.get(delivery.priority, 0) + 1
+        if not delivery.future.done():
+            delivery.future.set_result(result)
+
+    def _retry(self, delivery: _Delivery, delay: float) -> None:
+        self.retried += 1
+
+        def requeue():
+            self._delayed.pop(delivery, None)
+            self._queue.put_nowait((delivery.priority, next(self._sequence), delivery))
+
+        if delay:
+            self._delayed[delivery] = asyncio.get_running_loop().call_later(delay, requeue)
+        else:
+            requeue()
+
+    def _fail(self, delivery: _Delivery, error: Exception) -> None:
+        self._pending[delivery.priority] -= 1
+        self.failed += 1
+        if not delivery.future.done():
+            delivery.future.set_exception(error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает метрики доставки с момента запуска бота.
+
+        Returns:
+            Dict[str, Any]: Отправленные сообщения и очередь по приоритетам, ошибки,
+            повторы, паузы по RetryAfter и время ожидания в очереди
+        """
+        total_sent = sum(self.sent.values())
+        return {
+            "sent": {PRIORITY_NAMES.get(key, str(key)): value for key, value in self.sent.items()},
+            "queued": {PRIORITY_NAMES.get(key, str(key)): value for key, value in self._pending.items()},
+            "failed": self.failed,
+            "retried": self.retried,
+            "flood_waits": self.flood_waits,
+            "avg_wait": self._wait_total / total_sent if total_sent else 0.0,
+            "max_wait": self._wait_max
+        }
+
+    async def close(self, timeout: float = OUTBOUND_DRAIN_TIMEOUT) -> None:
+        """
+        Отправляет оставшиеся сообщения (не дольше timeout) и останавливает очередь.
+
+        Args:
+            timeout: Время на отправку оставшихся сообщений (секунды)
+        """
+        if not self._tasks:
+            return
+        # Ждем и отложенные повторы, поэтому следим за счетчиком, а не за queue.join()
+        deadline = time.monotonic() + timeout
+        while sum(self._pending.values()) > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if sum(self._pending.values()) > 0:
+            logger.warning(f"Не отправлено сообщений при остановке: {sum(self._pending.values())}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Отменяем отложенные повторы и все, что осталось в очереди
+        abandoned = []
+        for delivery, handle in self._delayed.items():
+            handle.cancel()
+            abandoned.append(delivery)
+        self._delayed.clear()
+        while not self._queue.empty():
+            abandoned.append(self._queue.get_nowait()[2])
+        for delivery in abandoned:
+            if not delivery.future.done():
+                delivery.future.cancel()
+        self._queue = None
+
+# Общая очередь исходящих сообщений (создается при первом обращении)
+_outbound: Optional[OutboundQueue] = None
+
+def get_outbound_queue() -> OutboundQueue:
+    """
+    Возвращает общую очередь исходящих сообщений.
+
+    Returns:
+        OutboundQueue: Очередь исходящих сообщений
+    """
+    global _outbound
+    if _outbound is None:
+        _outbound = OutboundQueue()
+    return _outbound
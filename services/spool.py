@@ -0,0 +1,341 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple, AsyncIterator, Callable, Awaitable
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Директория для временных файлов (скачанные голосовые, озвучка)
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join("tmp", "spool"))
+
+# Максимальный суммарный размер временных файлов в мегабайтах
+SPOOL_MAX_MB = int(os.getenv("SPOOL_MAX_MB", "200"))
+
+# Время, после которого файл считается забытым и удаляется (секунды)
+SPOOL_MAX_FILE_AGE = int(os.getenv("SPOOL_MAX_FILE_AGE", "3600"))
+
+# Интервал запуска уборщика временных файлов (секунды, 0 - уборщик отключен)
+SPOOL_JANITOR_INTERVAL = int(os.getenv("SPOOL_JANITOR_INTERVAL", "300"))
+
+# Размер, который резервируется под файл, если ожидаемый размер неизвестен
+DEFAULT_RESERVATION = 1024 * 1024
+
+# Директория, куда прежние версии бота сохраняли озвучку (tmp/<user_id>_<id>.mp3)
+LEGACY_AUDIO_DIR = os.getenv("LEGACY_AUDIO_DIR", "tmp")
+
+# Расширения аудио-файлов прежних версий, которые удаляет уборщик
+LEGACY_AUDIO_SUFFIXES = (".mp3", ".ogg")
+
+# Уборка наблюдаемой директории: возвращает количество удаленных файлов
+Cleaner = Callable[[], Awaitable[int]]
+
+class SpoolQuotaExceeded(Exception):
+    """Временные файлы заняли всю выделенную квоту."""
+
+class SpoolManager:
+    """
+    Управляемая директория временных файлов с квотой и уборщиком.
+
+    Каждый файл выделяется через allocate с указанием владельца и ожидаемого
+    размера, который резервируется в квоте. Если квота исчерпана, выделение
+    отклоняется, и диск контейнера не переполняется под нагрузкой. Файл
+    удаляется через release или автоматически при выходе из spool_file.
+    Постоянные файлы (кэш озвучки, библиотека медитаций) записываются через
+    write_file: сначала во временный файл спула, затем переносятся на место.
+
+    Уборщик удаляет файлы без владельца (остатки после перезапуска), файлы,
+    которые не освобождены дольше SPOOL_MAX_FILE_AGE, и старую озвучку
+    в LEGACY_AUDIO_DIR, убирает наблюдаемые директории (watch) и сообщает
+    о занятом месте на диске.
+    """
+
+    def __init__(self, spool_dir: str = SPOOL_DIR, max_bytes: int = SPOOL_MAX_MB * 1024 * 1024,
+                 max_file_age: int = SPOOL_MAX_FILE_AGE, legacy_dir: Optional[str] = LEGACY_AUDIO_DIR):
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.max_file_age = max_file_age
+        self.legacy_dir = legacy_dir
+        # Путь файла -> (владелец, зарезервированный размер, время выделения)
+        self._files: Dict[str, Tuple[str, int, float]] = {}
+        self._reserved = 0
+        self.rejected = 0
+        # Название -> (директория, уборка) для директорий вне спула
+        self._watched: Dict[str, Tuple[str, Optional[Cleaner]]] = {}
+
+    def watch(self, name: str, directory: str, cleaner: Optional[Cleaner] = None) -> None:
+        """
+        Добавляет директорию вне спула, размер которой сообщает уборщик.
+
+        Args:
+            name: Название директории в отчете
+            directory: Путь к директории
+            cleaner: Уборка директории, которая выполняется при каждом проходе
+        """
+        self._watched[name] = (directory, cleaner)
+
+    def allocate(self, owner: str, suffix: str = "", expected_size: Optional[int] = None) -> str:
+        """
+        Выделяет путь для временного файла в пределах квоты.
+
+        Args:
+            owner: Владелец файла (например, "stt" или "tts")
+            suffix: Расширение файла
+            expected_size: Ожидаемый размер файла в байтах
+
+        Returns:
+            str: Путь к файлу (сам файл не создается)
+
+        Raises:
+            SpoolQuotaExceeded: Если файл не помещается в квоту
+        """
+        size = expected_size or DEFAULT_RESERVATION
+        if self._reserved + size > self.max_bytes:
+            self.rejected += 1
+            raise SpoolQuotaExceeded(
+                f"Квота временных файлов исчерпана: занято {self._reserved / 1024 / 1024:.1f} МБ "
+                f"из {self.max_bytes / 1024 / 1024:.0f} МБ"
+            )
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"{owner}_{uuid.uuid4().hex}{suffix}")
+        self._files[path] = (owner, size, time.time())
+        self._reserved += size
+        return path
+
+    def release(self, path: Optional[str]) -> None:
+        """
+        Удаляет временный файл и освобождает его место в квоте.
+
+        Args:
+            path: Путь, выделенный через allocate
+        """
+        if not path:
+            return
+        self._forget(path)
+        self._remove_file(path)
+
+    async def release_async(self, path: Optional[str]) -> None:
+        """
+        Удаляет временный файл, не блокируя цикл событий, и освобождает его место в квоте.
+
+        Args:
+            path: Путь, выделенный через allocate
+        """
+        if not path:
+            return
+        self._forget(path)
+        await asyncio.to_thread(self._remove_file, path)
+
+    def _forget(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            self._reserved -= entry[1]
+
+    def _remove_file(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Ошибка при удалении временного файла {path}: {e}")
+
+    async def write_file(self, owner: str, path: str, data: bytes) -> str:
+        """
+        Записывает постоянный файл через спул.
+
+        Данные записываются во временный файл в пределах квоты и затем
+        переносятся на место, поэтому недописанный файл не появляется
+        в целевой директории, а остаток после сбоя удалит уборщик.
+
+        Args:
+            owner: Владелец файла
+            path: Путь, по которому должен оказаться файл
+            data: Содержимое файла
+
+        Returns:
+            str: Путь к файлу
+
+        Raises:
+            SpoolQuotaExceeded: Если файл не помещается в квоту
+        """
+        tmp_path = self.allocate(owner, os.path.splitext(path)[1], len(data))
+        try:
+            await asyncio.to_thread(self._write_and_move, tmp_path, path, data)
+        finally:
+            await self.release_async(tmp_path)
+        return path
+
+    @staticmethod
+    def _write_and_move(tmp_path: str, path: str, data: bytes) -> None:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # shutil.move переименовывает файл, а между разными дисками копирует его
+        shutil.move(tmp_path, path)
+
+    def owns(self, path: Optional[str]) -> bool:
+        """Проверяет, выделен ли файл через спул и еще не освобожден."""
+        return path in self._files
+
+    @asynccontextmanager
+    async def spool_file(self, owner: str, suffix: str = "", expected_size: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Выделяет временный файл на время блока async with и удаляет его после выхода,
+        в том числе при ошибке.
+
+        Args:
+            owner: Владелец файла
+            suffix: Расширение файла
+            expected_size: Ожидаемый размер файла в байтах
+
+        Yields:
+            str: Путь к временному файлу
+        """
+        path = self.allocate(owner, suffix, expected_size)
+        try:
+            yield path
+        finally:
+            await self.release_async(path)
+
+    @staticmethod
+    def _scan(directory: str) -> list:
+        entries = []
+        if not os.path.isdir(directory):
+            return entries
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((entry.path, stat.st_size, stat.st_mtime))
+                except OSError:
+                    continue
+        return entries
+
+    def _remove_legacy_files(self) -> int:
+        if not self.legacy_dir or os.path.abspath(self.legacy_dir) == os.path.abspath(self.spool_dir):
+            return 0
+        removed = 0
+        now = time.time()
+        for path, _, modified_at in self._scan(self.legacy_dir):
+            if path.endswith(LEGACY_AUDIO_SUFFIXES) and now - modified_at > self.max_file_age:
+                self._remove_file(path)
+                removed += 1
+        return removed
+
+    async def cleanup(self) -> Dict[str, Any]:
+        """
+        Удаляет забытые файлы и собирает статистику директории.
+
+        Returns:
+            Dict[str, Any]: Количество файлов и их размер, удаленные файлы,
+            зарезервированный размер, отказы по квоте, файлы по владельцам,
+            удаленная старая озвучка и состояние наблюдаемых директорий
+        """
+        now = time.time()
+        files = 0
+        total_size = 0
+        stale = []
+        by_owner: Dict[str, int] = {}
+
+        for path, size, _ in await asyncio.to_thread(self._scan, self.spool_dir):
+            owned = self._files.get(path)
+            if owned is None or now - owned[2] > self.max_file_age:
+                if owned is not None:
+                    logger.warning(f"Временный файл {path} ({owned[0]}) не освобожден за {self.max_file_age} с")
+                stale.append(path)
+                continue
+            files += 1
+            total_size += size
+            by_owner[owned[0]] = by_owner.get(owned[0], 0) + 1
+
+        # Освобождаем резерв файлов, которые так и не были созданы
+        for path, (_, _, allocated_at) in list(self._files.items()):
+            if now - allocated_at > self.max_file_age and path not in stale and not os.path.exists(path):
+                stale.append(path)
+
+        for path in stale:
+            await self.release_async(path)
+
+        legacy_removed = await asyncio.to_thread(self._remove_legacy_files)
+
+        watched = {}
+        for name, (directory, cleaner) in self._watched.items():
+            removed = 0
+            if cleaner is not None:
+                try:
+                    removed = await cleaner()
+                except Exception as e:
+                    logger.error(f"Ошибка при уборке директории {directory}: {e}")
+            entries = await asyncio.to_thread(self._scan, directory)
+            watched[name] = {"files": len(entries), "size": sum(size for _, size, _ in entries), "removed": removed}
+
+        return {
+            "files": files,
+            "size": total_size,
+            "removed": len(stale),
+            "reserved": self._reserved,
+            "rejected": self.rejected,
+            "by_owner": by_owner,
+            "legacy_removed": legacy_removed,
+            "watched": watched
+        }
+
+    async def run_janitor(self, interval: int = SPOOL_JANITOR_INTERVAL) -> None:
+        """
+        Периодически удаляет забытые файлы и сообщает о занятом месте на диске.
+
+        Args:
+            interval: Интервал между проходами (секунды)
+        """
+        while True:
+            try:
+                report = await self.cleanup()
+                disk = await asyncio.to_thread(shutil.disk_usage, self.spool_dir if os.path.isdir(self.spool_dir) else ".")
+                watched = "".join(
+                    f", {name}: {stats['files']} ({stats['size'] / 1024 / 1024:.1f} МБ, удалено {stats['removed']})"
+                    for name, stats in report["watched"].items()
+                )
+                logger.info(
+                    f"Временные файлы: {report['files']} ({report['size'] / 1024 / 1024:.1f} МБ), "
+                    f"резерв {report['reserved'] / 1024 / 1024:.1f} из {self.max_bytes / 1024 / 1024:.0f} МБ, "
+                    f"удалено забытых: {report['removed']}, старой озвучки: {report['legacy_removed']}, "
+                    f"отказов по квоте: {report['rejected']}{watched}, "
+                    f"свободно на диске: {disk.free / 1024 / 1024:.0f} МБ"
+                )
+            except Exception as e:
+                logger.error(f"Ошибка уборщика временных файлов: {e}")
+            await asyncio.sleep(interval)
+
+# Общий спул временных файлов (создается при первом обращении)
+_spool: Optional[SpoolManager] = None
+
+def get_spool() -> SpoolManager:
+    """
+    Возвращает общий спул временных файлов.
+
+    Returns:
+        SpoolManager: Спул временных файлов
+    """
+    global _spool
+    if _spool is None:
+        _spool = SpoolManager()
+    return _spool
+
+def start_spool_janitor() -> Optional[asyncio.Task]:
+    """
+    Запускает уборщика временных файлов, если он не отключен (SPOOL_JANITOR_INTERVAL=0).
+
+    Returns:
+        Optional[asyncio.Task]: Задача уборщика или None, если уборщик отключен
+    """
+    if SPOOL_JANITOR_INTERVAL <= 0:
+        return None
+    return asyncio.get_running_loop().create_task(get_spool().run_janitor())
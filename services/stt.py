@@ -1,12 +1,16 @@
+import io
 import os
+import asyncio
 import logging
-import tempfile
-from typing import Optional
+from typing import Optional, Union, BinaryIO, Callable, Awaitable, Dict
 
 import httpx
 from openai import AsyncOpenAI
 from aiogram.types import Voice
 
+from services.stt_cache import get_transcript_cache, TRANSCRIPT_CACHE_ENABLED
+from services.voice_chunks import split_ogg_opus
+
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
@@ -27,42 +31,80 @@ if OPENAI_API_KEY:
     except Exception as e:
         logger.error(f"Ошибка при инициализации OpenAI API: {e}")
 
-async def download_voice_message(bot, voice: Voice) -> Optional[str]:
+# Максимальный размер голосового сообщения в мегабайтах (Telegram отдает ботам файлы до 20 МБ)
+STT_MAX_FILE_MB = int(os.getenv("STT_MAX_FILE_MB", "20"))
+
+# Имя файла, по расширению которого Whisper определяет формат аудио
+VOICE_FILENAME = "voice.ogg"
+
+# Язык распознавания голосовых сообщений
+STT_LANGUAGE = "ru"
+
+# Голосовые сообщения длиннее этого порога (секунды) распознаются по фрагментам параллельно
+STT_CHUNK_MIN_DURATION = int(os.getenv("STT_CHUNK_MIN_DURATION", "60"))
+
+# Целевая длительность фрагмента длинного голосового сообщения (секунды)
+STT_CHUNK_SECONDS = int(os.getenv("STT_CHUNK_SECONDS", "30"))
+
+# Максимальное число одновременных запросов к Whisper
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", "4"))
+
+# Ограничение одновременных запросов к Whisper (создается при первом запросе)
+_request_semaphore: Optional[asyncio.Semaphore] = None
+
+# Обработчик промежуточного результата: получает уже распознанное начало текста
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+class VoiceTooLarge(Exception):
+    """Голосовое сообщение превышает допустимый размер для распознавания."""
+
+async def download_voice_message(bot, voice: Voice) -> Optional[io.BytesIO]:
     """
-    Скачивает голосовое сообщение.
+    Скачивает голосовое сообщение в память, не создавая файлов на диске.
     
     Args:
         bot: Экземпляр бота для получения файла.
         voice: Голосовое сообщение.
         
     Returns:
-        Optional[str]: Путь к временному файлу с голосовым сообщением или None в случае ошибки.
+        Optional[io.BytesIO]: Буфер с голосовым сообщением или None в случае ошибки.
+        
+    Raises:
+        VoiceTooLarge: Если размер файла превышает STT_MAX_FILE_MB (проверяется до скачивания)
     """
+    max_bytes = STT_MAX_FILE_MB * 1024 * 1024
+    if voice.file_size and voice.file_size > max_bytes:
+        raise VoiceTooLarge(
+            f"Голосовое сообщение {voice.file_size / 1024 / 1024:.1f} МБ больше допустимых {STT_MAX_FILE_MB} МБ"
+        )
+    
     try:
-        # Получение информации о файле
-        file_info = await bot.get_file(voice.file_id)
-        file_path = file_info.file_path
-        
-        # Создание временного файла
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".ogg")
-        file_name = temp_file.name
-        temp_file.close()
-        
-        # Скачивание файла
-        await bot.download_file(file_path, file_name)
-        
-        logger.info(f"Голосовое сообщение скачано: {file_name}")
-        return file_name
+        buffer = io.BytesIO()
+        await bot.download(voice, destination=buffer)
     except Exception as e:
         logger.error(f"Ошибка при скачивании голосового сообщения: {e}")
         return None
+    
+    # Telegram может не передать размер файла заранее: проверяем фактический размер
+    size = buffer.getbuffer().nbytes
+    if size > max_bytes:
+        raise VoiceTooLarge(f"Голосовое сообщение {size / 1024 / 1024:.1f} МБ больше допустимых {STT_MAX_FILE_MB} МБ")
+    
+    logger.info(f"Голосовое сообщение скачано в память: {size} байт")
+    return buffer
+
+def _get_request_semaphore() -> asyncio.Semaphore:
+    global _request_semaphore
+    if _request_semaphore is None:
+        _request_semaphore = asyncio.Semaphore(max(STT_MAX_CONCURRENCY, 1))
+    return _request_semaphore
 
-async def transcribe_voice(file_path: str) -> Optional[str]:
+async def transcribe_voice(audio: Union[str, BinaryIO]) -> Optional[str]:
     """
     Транскрибирует голосовое сообщение в текст с помощью OpenAI Whisper API.
     
     Args:
-        file_path: Путь к аудиофайлу
+        audio: Путь к аудиофайлу или буфер с аудио в формате OGG
         
     Returns:
         str или None: Распознанный текст или None в случае ошибки
@@ -72,12 +114,18 @@ async def transcribe_voice(file_path: str) -> Optional[str]:
         return None
     
     try:
-        # Открываем файл и отправляем его в OpenAI API
-        with open(file_path, "rb") as audio_file:
+        # Буфер из памяти передаем с именем файла, по которому Whisper определяет формат
+        if isinstance(audio, str):
+            with open(audio, "rb") as audio_file:
+                audio_data = (os.path.basename(audio), audio_file.read())
+        else:
+            audio_data = (VOICE_FILENAME, audio.read())
+        
+        async with _get_request_semaphore():
             response = await client.audio.transcriptions.create(
                 model="whisper-1",
-                file=audio_file,
-                language="ru",  # Ставим русский язык
+                file=audio_data,
+                language=STT_LANGUAGE,
                 response_format="text"
             )
         
@@ -118,22 +166,94 @@ async def transcribe_voice(file_path: str) -> Optional[str]:
         logger.error(f"Детали ошибки: {traceback.format_exc()}")
         return None
 
-async def process_voice_message(bot, voice: Voice) -> Optional[str]:
+async def transcribe_chunked(data: bytes, on_progress: Optional[ProgressCallback] = None) -> Optional[str]:
+    """
+    Распознает длинное голосовое сообщение по фрагментам.
+
+    Сообщение разрезается по тихим местам на фрагменты около STT_CHUNK_SECONDS,
+    фрагменты распознаются параллельно (не больше STT_MAX_CONCURRENCY запросов
+    одновременно) и склеиваются по порядку. Как только готово очередное начало
+    текста, оно передается в on_progress.
+
+    Args:
+        data: Содержимое файла Ogg Opus
+        on_progress: Обработчик промежуточного результата
+
+    Returns:
+        Optional[str]: Распознанный текст или None, если не распознан хотя бы один фрагмент
     """
-    Обрабатывает голосовое сообщение: скачивает и транскрибирует.
+    chunks = await asyncio.to_thread(split_ogg_opus, data, STT_CHUNK_SECONDS)
+    if len(chunks) == 1:
+        return await transcribe_voice(io.BytesIO(chunks[0]))
+
+    logger.info(f"Голосовое сообщение разрезано на {len(chunks)} фрагментов")
+    
+    async def transcribe_chunk(index: int, chunk: bytes):
+        return index, await transcribe_voice(io.BytesIO(chunk))
+    
+    tasks = [asyncio.create_task(transcribe_chunk(index, chunk)) for index, chunk in enumerate(chunks)]
+    results: Dict[int, str] = {}
+    ready = 0
+    try:
+        for completed in asyncio.as_completed(tasks):
+            index, text = await completed
+            if text is None:
+                logger.error(f"Не удалось распознать фрагмент {index + 1} из {len(chunks)}")
+                return None
+            results[index] = text.strip()
+            
+            # Показываем текст, как только готово следующее по порядку начало
+            previous = ready
+            while ready in results:
+                ready += 1
+            if on_progress and previous < ready < len(chunks):
+                await on_progress(" ".join(filter(None, (results[i] for i in range(ready)))))
+    finally:
+        # Если один фрагмент не распознан, остальные запросы не нужны
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    return " ".join(filter(None, (results[i] for i in range(len(chunks)))))
+
+async def process_voice_message(bot, voice: Voice, on_progress: Optional[ProgressCallback] = None) -> Optional[str]:
+    """
+    Обрабатывает голосовое сообщение: скачивает в память и транскрибирует.
+    
+    Короткие сообщения (до STT_CHUNK_MIN_DURATION секунд по Voice.duration)
+    распознаются одним запросом, длинные - по фрагментам параллельно.
     
     Args:
         bot: Экземпляр бота для получения файла.
         voice: Голосовое сообщение.
+        on_progress: Обработчик промежуточного результата для длинных сообщений.
         
     Returns:
         Optional[str]: Распознанный текст или None в случае ошибки.
+        
+    Raises:
+        VoiceTooLarge: Если голосовое сообщение слишком большое для распознавания
     """
+    # Пересланное или повторно отправленное сообщение уже могло быть распознано
+    cache = get_transcript_cache() if TRANSCRIPT_CACHE_ENABLED else None
+    if cache and voice.file_unique_id:
+        cached = await cache.get(voice.file_unique_id)
+        if cached:
+            logger.info(f"Голосовое сообщение {voice.file_unique_id} найдено в кэше распознавания")
+            return cached["text"]
+    
     # Скачиваем голосовое сообщение
-    file_path = await download_voice_message(bot, voice)
-    if not file_path:
+    buffer = await download_voice_message(bot, voice)
+    if buffer is None:
         return None
     
     # Транскрибируем голосовое сообщение
-    text = await transcribe_voice(file_path)
-    return text 
\ No newline at end of file
+    with buffer:
+        if voice.duration and voice.duration > STT_CHUNK_MIN_DURATION:
+            text = await transcribe_chunked(buffer.getvalue(), on_progress)
+        else:
+            text = await transcribe_voice(buffer)
+    
+    if text and cache and voice.file_unique_id:
+        await cache.put(voice.file_unique_id, text, STT_LANGUAGE, voice.duration)
+    return text
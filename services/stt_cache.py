@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+from typing import Dict, Any, Optional
+
+from db_utils import get_voice_transcript, save_voice_transcript, evict_voice_transcripts
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Включение кэша распознанных голосовых сообщений
+TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+
+# Срок хранения записи без обращений (дни)
+TRANSCRIPT_CACHE_MAX_AGE_DAYS = int(os.getenv("TRANSCRIPT_CACHE_MAX_AGE_DAYS", "30"))
+
+# Максимальное количество записей в кэше
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "20000"))
+
+# Минимальный интервал между очистками кэша (секунды)
+TRANSCRIPT_CACHE_EVICT_INTERVAL = 3600
+
+class TranscriptCache:
+    """
+    Кэш распознанных голосовых сообщений по file_unique_id.
+
+    У пересланного или повторно отправленного голосового сообщения тот же
+    file_unique_id, поэтому кэш проверяется до скачивания файла, и одно
+    сообщение распознается один раз. Записи хранятся в SQLite (таблица
+    voice_transcripts) и переживают перезапуск бота. После сохранения не чаще
+    раза в TRANSCRIPT_CACHE_EVICT_INTERVAL удаляются записи без обращений
+    дольше max_age_days и самые старые записи сверх max_entries.
+    """
+
+    def __init__(self, max_age_days: int = TRANSCRIPT_CACHE_MAX_AGE_DAYS,
+                 max_entries: int = TRANSCRIPT_CACHE_MAX_ENTRIES):
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._last_evict = 0.0
+
+    async def get(self, file_unique_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Ищет распознанный текст голосового сообщения.
+
+        Args:
+            file_unique_id: Постоянный ID файла в Telegram
+
+        Returns:
+            Optional[Dict[str, Any]]: Текст, язык, длительность и время распознавания
+            или None, если сообщения нет в кэше
+        """
+        entry = await get_voice_transcript(file_unique_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    async def put(self, file_unique_id: str, text: str, language: Optional[str] = None,
+                  duration: Optional[int] = None) -> None:
+        """
+        Сохраняет распознанный текст и при необходимости очищает кэш.
+
+        Args:
+            file_unique_id: Постоянный ID файла в Telegram
+            text: Распознанный текст
+            language: Язык распознавания
+            duration: Длительность голосового сообщения в секундах
+        """
+        await save_voice_transcript(file_unique_id, text, language, duration)
+
+        now = time.monotonic()
+        if self._last_evict and now - self._last_evict < TRANSCRIPT_CACHE_EVICT_INTERVAL:
+            return
+        self._last_evict = now
+        removed = await evict_voice_transcripts(self.max_age_days, self.max_entries)
+        if removed:
+            self.evicted += removed
+            logger.info(f"Из кэша распознанных голосовых сообщений удалено {removed} записей")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику кэша с момента запуска бота.
+
+        Returns:
+            Dict[str, Any]: Попадания, промахи, доля попаданий и удаленные записи
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evicted": self.evicted
+        }
+
+# Общий кэш распознанных голосовых сообщений (создается при первом обращении)
+_cache: Optional[TranscriptCache] = None
+
+def get_transcript_cache() -> TranscriptCache:
+    """
+    Возвращает общий кэш распознанных голосовых сообщений.
+
+    Returns:
+        TranscriptCache: Кэш распознанных голосовых сообщений
+    """
+    global _cache
+    if _cache is None:
+        _cache = TranscriptCache()
+    return _cache
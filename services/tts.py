@@ -1,10 +1,16 @@
+import io
 import os
-import uuid
+import re
+import asyncio
 import logging
 import aiohttp
 import json
-import requests
 from pathlib import Path
+from typing import Optional, Tuple, List, AsyncIterator
+
+from services.tts_cache import get_tts_cache, make_cache_key
+from services.loop_guard import assert_not_in_event_loop
+from services.spool import get_spool, SpoolQuotaExceeded
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -21,87 +27,537 @@ ELEVEN_API_URL = "https://api.elevenlabs.io/v1/text-to-speech"
 # ID голоса по умолчанию (мягкий, спокойный голос)
 DEFAULT_VOICE_ID = "EXAVITQu4vr4xnSDxMaL"  # Bella - успокаивающий женский голос
 
-# Максимальная длина текста для передачи в API
+# Максимальная длина текста в одном запросе к API
 MAX_TEXT_LENGTH = 4000
 
-def synthesize_speech(text: str, output_path: str) -> bool:
+# Длина части текста при озвучке длинных текстов по частям (символы)
+TTS_CHUNK_CHARS = min(int(os.getenv("TTS_CHUNK_CHARS", "1200")), MAX_TEXT_LENGTH)
+
+# Минимальная длина первой части при потоковой озвучке: чем она короче, тем раньше звучит начало
+STREAM_FIRST_SEGMENT_CHARS = int(os.getenv("STREAM_FIRST_SEGMENT_CHARS", "200"))
+
+# Минимальная длина остальных частей при потоковой озвучке
+STREAM_SEGMENT_CHARS = int(os.getenv("STREAM_SEGMENT_CHARS", "800"))
+
+# Максимальное количество одновременных запросов к ElevenLabs (ограничение тарифа)
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "2"))
+
+# Размер части ответа API при потоковом чтении
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Сохранять ли озвучку в дисковый кэш
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Таймауты запроса к ElevenLabs (секунды)
+TTS_TIMEOUT = float(os.getenv("TTS_TIMEOUT", "120"))
+TTS_CONNECT_TIMEOUT = float(os.getenv("TTS_CONNECT_TIMEOUT", "10"))
+
+# Количество повторов запроса при временных ошибках (429, 5xx, сетевые ошибки)
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "3"))
+
+# Начальная пауза перед повтором (удваивается с каждой попыткой)
+TTS_RETRY_DELAY = 1.0
+
+# Коды ответа, при которых запрос стоит повторить
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Общая HTTP-сессия для запросов к ElevenLabs
+_http_session: Optional[aiohttp.ClientSession] = None
+
+# Ограничение одновременных запросов к ElevenLabs (создается при первом запросе)
+_request_semaphore: Optional[asyncio.Semaphore] = None
+
+# Границы предложений и пауз ("...") в тексте медитации
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])\s+|(?<=\.\.\.)(?=[^\s.])')
+
+# Границы абзацев
+_PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+
+# Битрейты MP3 Layer III (кбит/с): MPEG-1 и MPEG-2/2.5
+_MP3_BITRATES = {
+    "mpeg1": (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    "mpeg2": (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+}
+
+# Частоты дискретизации MP3 по коду версии MPEG (3 - MPEG-1, 2 - MPEG-2, 0 - MPEG-2.5)
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000)
+}
+
+class TTSError(Exception):
+    """
+    Ошибка синтеза речи.
+    
+    Атрибут reason содержит причину для пользователя: "quota_exceeded",
+    "API ключ недоступен" или "HTTP ошибка <код>".
+    """
+    
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+# Модель ElevenLabs для синтеза
+ELEVEN_MODEL_ID = "eleven_multilingual_v2"
+
+# Параметры голоса
+VOICE_SETTINGS = {
+    "stability": 0.5,  # 50%
+    "similarity_boost": 0.75,  # 75%
+    "speed": 0.9  # 0.9 скорость
+}
+
+def get_voice_id() -> str:
+    """Возвращает ID голоса ElevenLabs из окружения или голос по умолчанию."""
+    return os.getenv("ELEVENLABS_VOICE_ID", DEFAULT_VOICE_ID)
+
+def split_text_for_speech(text: str, max_chars: int = TTS_CHUNK_CHARS) -> List[str]:
     """
-    Использует ElevenLabs API для озвучивания текста и сохранения результата в mp3-файл.
+    Разбивает текст на части для озвучки отдельными запросами.
+    
+    Текст режется по границам предложений и пауз ("..."), а части
+    собираются из целых предложений так, чтобы не превышать max_chars.
+    Границы абзацев внутри части сохраняются. Предложение длиннее
+    max_chars режется по пробелам. Текст, который помещается в один
+    запрос, возвращается без изменений.
     
     Args:
         text: Текст для озвучивания
-        output_path: Путь для сохранения mp3-файла
+        max_chars: Максимальная длина части
         
     Returns:
-        bool: True в случае успешного синтеза, False в случае ошибки
+        List[str]: Части текста в исходном порядке
     """
-    # Получаем API-ключ и Voice ID из переменных окружения
-    api_key = os.getenv("ELEVENLABS_API_KEY")
-    voice_id = os.getenv("ELEVENLABS_VOICE_ID")
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
     
-    if not api_key:
-        logger.error("ELEVENLABS_API_KEY не найден в переменных окружения")
-        return False
+    chunks = []
+    current = ""
+    for paragraph in _PARAGRAPH_BOUNDARY.split(text):
+        separator = "\n\n"
+        for sentence in _SENTENCE_BOUNDARY.split(paragraph.strip()):
+            for piece in _split_by_words(sentence.strip(), max_chars):
+                if not piece:
+                    continue
+                if current and len(current) + len(separator) + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current}{separator}{piece}" if current else piece
+                separator = " "
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def iter_speech_segments(
+    deltas: AsyncIterator[str],
+    first_min_chars: int = STREAM_FIRST_SEGMENT_CHARS,
+    min_chars: int = STREAM_SEGMENT_CHARS
+) -> AsyncIterator[str]:
+    """
+    Собирает потоковый текст (например, ответ языковой модели) в части для озвучки.
+    
+    Часть выдается, как только в потоке закончился абзац и накоплено не меньше
+    min_chars символов (для первой части - first_min_chars, чтобы начало можно
+    было озвучить как можно раньше). Если абзацы слишком длинные, часть
+    отрезается по последней границе предложения после TTS_CHUNK_CHARS символов.
+    
+    Args:
+        deltas: Поток фрагментов текста
+        first_min_chars: Минимальная длина первой части
+        min_chars: Минимальная длина остальных частей
+        
+    Yields:
+        str: Части текста в исходном порядке
+    """
+    buffer = ""
+    pending = ""
+    threshold = first_min_chars
+    async for delta in deltas:
+        buffer += delta
+        
+        # Забираем из буфера законченные абзацы
+        while True:
+            match = _PARAGRAPH_BOUNDARY.search(buffer)
+            if not match:
+                break
+            paragraph = buffer[:match.start()].strip()
+            buffer = buffer[match.end():]
+            if paragraph:
+                pending = f"{pending}\n\n{paragraph}" if pending else paragraph
+            if len(pending) >= threshold:
+                yield pending
+                pending = ""
+                threshold = min_chars
+        
+        # Абзац без конца не должен задерживать озвучку слишком долго
+        if len(pending) + len(buffer) > TTS_CHUNK_CHARS:
+            boundaries = list(_SENTENCE_BOUNDARY.finditer(buffer))
+            if boundaries:
+                cut = boundaries[-1]
+                sentence = buffer[:cut.start()].strip()
+                buffer = buffer[cut.end():]
+                segment = f"{pending}\n\n{sentence}" if pending and sentence else pending or sentence
+                if segment:
+                    yield segment
+                pending = ""
+                threshold = min_chars
+    
+    rest = buffer.strip()
+    if rest:
+        pending = f"{pending}\n\n{rest}" if pending else rest
+    if pending:
+        yield pending
+
+def _split_by_words(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    
+    pieces = []
+    current = ""
+    for word in sentence.split():
+        # Слово длиннее части режем как есть
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _skip_id3(data: bytes) -> bytes:
+    # Заголовок ID3v2: "ID3", версия (2 байта), флаги, размер (4 байта по 7 бит)
+    if len(data) < 10 or not data.startswith(b"ID3"):
+        return data
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    if data[5] & 0x10:
+        size += 10  # футер
+    return data[10 + size:]
+
+def _mp3_frame_length(header: bytes) -> int:
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return 0
+    bitrate = _MP3_BITRATES["mpeg1" if version == 3 else "mpeg2"][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][sample_rate_index]
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+def _skip_xing_frame(data: bytes) -> bytes:
+    # Первый кадр с заголовком Xing/Info хранит длительность только своей части
+    frame_length = _mp3_frame_length(data[:4])
+    if frame_length and (b"Xing" in data[4:64] or b"Info" in data[4:64]):
+        return data[frame_length:]
+    return data
+
+def concatenate_mp3(parts: List[bytes]) -> bytes:
+    """
+    Склеивает озвученные части в один mp3 в исходном порядке.
+    
+    MP3 - последовательность независимых кадров, поэтому части склеиваются
+    побайтно. У всех частей, кроме первой, удаляется заголовок ID3, а у всех
+    частей - служебный кадр Xing/Info, иначе плееры показывали бы
+    длительность только первой части.
+    
+    Args:
+        parts: Содержимое mp3 каждой части
+        
+    Returns:
+        bytes: Содержимое склеенного mp3
+    """
+    if len(parts) == 1:
+        return parts[0]
+    
+    result = bytearray()
+    for index, part in enumerate(parts):
+        if index == 0 and part.startswith(b"ID3"):
+            frames = _skip_id3(part)
+            result += part[:len(part) - len(frames)]
+        else:
+            frames = _skip_id3(part)
+        result += _skip_xing_frame(frames)
+    return bytes(result)
+
+def audio_cache_key(text: str) -> str:
+    """
+    Вычисляет ключ кэша озвучки текста с текущими настройками голоса.
+    
+    Args:
+        text: Текст для озвучивания
+        
+    Returns:
+        str: Ключ кэша
+    """
+    return make_cache_key(text, get_voice_id(), ELEVEN_MODEL_ID, VOICE_SETTINGS)
+
+def lookup_cached_audio(text: str) -> Optional[str]:
+    """
+    Ищет готовую озвучку текста в кэше, не обращаясь к API.
+    
+    Длинные тексты кэшируются по частям, поэтому для них готового
+    файла нет и возвращается None.
+    
+    Args:
+        text: Текст для озвучивания
+        
+    Returns:
+        Optional[str]: Путь к mp3-файлу из кэша или None, если текст еще не озвучивался
+    """
+    if not TTS_CACHE_ENABLED:
+        return None
+    chunks = split_text_for_speech(text)
+    if len(chunks) != 1:
+        return None
+    return get_tts_cache().get(audio_cache_key(chunks[0]))
+
+def release_audio_file(path: Optional[str]) -> None:
+    """
+    Удаляет аудио-файл после отправки, если это не файл из кэша озвучки.
+    
+    Args:
+        path: Путь к аудио-файлу
+    """
+    if not path or get_tts_cache().contains_path(path):
+        return
+    spool = get_spool()
+    if spool.owns(path):
+        spool.release(path)
+        logger.info(f"Временный файл {path} удален")
+        return
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+            logger.info(f"Временный файл {path} удален")
+    except Exception as e:
+        logger.error(f"Ошибка при удалении временного файла: {e}")
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую HTTP-сессию для запросов к ElevenLabs.
+    
+    Сессия создается при первом вызове и переиспользует соединения
+    между запросами.
+    
+    Returns:
+        aiohttp.ClientSession: HTTP-сессия
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=TTS_TIMEOUT, sock_connect=TTS_CONNECT_TIMEOUT)
+        )
+    return _http_session
+
+async def close_http_session() -> None:
+    """
+    Закрывает общую HTTP-сессию (вызывается при остановке бота).
+    """
+    global _http_session, _request_semaphore
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+    _request_semaphore = None
+
+def _get_request_semaphore() -> asyncio.Semaphore:
+    global _request_semaphore
+    if _request_semaphore is None:
+        _request_semaphore = asyncio.Semaphore(max(TTS_MAX_CONCURRENCY, 1))
+    return _request_semaphore
+
+def _get_api_key() -> Optional[str]:
+    return ELEVEN_API_KEY or ELEVENLABS_API_KEY or os.getenv("ELEVENLABS_API_KEY")
+
+def _error_reason(status: int, error_text: str) -> str:
+    # Проверяем тип ошибки
+    try:
+        error_data = json.loads(error_text)
+        if status == 401 and "quota_exceeded" in str(error_data):
+            return "quota_exceeded"
+    except ValueError:
+        pass
+    return f"HTTP ошибка {status}"
+
+async def request_speech(text: str, voice_id: Optional[str] = None) -> bytes:
+    """
+    Озвучивает текст через ElevenLabs API и возвращает mp3 в памяти.
     
-    if not voice_id:
-        logger.warning("ELEVENLABS_VOICE_ID не найден, используется голос по умолчанию")
-        voice_id = DEFAULT_VOICE_ID
+    Единая точка обращения к API: общая сессия с таймаутами, не больше
+    TTS_MAX_CONCURRENCY одновременных запросов, потоковое чтение ответа
+    и повтор запроса с экспоненциальной паузой при 429, 5xx и сетевых
+    ошибках (с учетом заголовка Retry-After).
     
-    # Проверка длины текста
-    if len(text) > MAX_TEXT_LENGTH:
-        text = text[:MAX_TEXT_LENGTH-3] + "..."
-        logger.warning(f"Текст для генерации аудио был обрезан до {MAX_TEXT_LENGTH} символов")
+    Args:
+        text: Текст для озвучивания (не длиннее MAX_TEXT_LENGTH)
+        voice_id: ID голоса (по умолчанию из ELEVENLABS_VOICE_ID)
+        
+    Returns:
+        bytes: Содержимое mp3
+        
+    Raises:
+        TTSError: Если синтез не удался
+    """
+    api_key = _get_api_key()
+    if not api_key:
+        raise TTSError("API ключ недоступен")
     
-    # Формируем заголовки запроса
     headers = {
         "Accept": "audio/mpeg",
         "Content-Type": "application/json",
         "xi-api-key": api_key
     }
     
-    # Настройки голоса
-    voice_settings = {
-        "stability": 0.5,  # 50%
-        "similarity_boost": 0.75,  # 75%
-        "speed": 0.9  # 0.9 скорость
-    }
-    
-    # Данные для запроса
+    # Данные для запроса с моделью высокого качества
     data = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": voice_settings
+        "model_id": ELEVEN_MODEL_ID,
+        "voice_settings": VOICE_SETTINGS
     }
     
+    url = f"{ELEVEN_API_URL}/{voice_id or get_voice_id()}"
+    delay = TTS_RETRY_DELAY
+    
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            session = await get_http_session()
+            async with _get_request_semaphore():
+                async with session.post(url, headers=headers, json=data) as response:
+                    if response.status == 200:
+                        # Читаем аудио по частям в память
+                        buffer = io.BytesIO()
+                        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                            buffer.write(chunk)
+                        return buffer.getvalue()
+                    
+                    error_text = await response.text()
+                    logger.error(f"Ошибка при генерации аудио: {response.status}, {error_text}")
+                    if response.status not in RETRYABLE_STATUSES or attempt == TTS_MAX_RETRIES:
+                        raise TTSError(_error_reason(response.status, error_text))
+                    retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Сетевая ошибка при генерации аудио (попытка {attempt + 1}): {e!r}")
+            if attempt == TTS_MAX_RETRIES:
+                raise TTSError(f"Сетевая ошибка: {e.__class__.__name__}") from e
+        
+        try:
+            pause = float(retry_after) if retry_after else delay
+        except ValueError:
+            pause = delay
+        logger.info(f"Повтор запроса к ElevenLabs через {pause:.1f} с (попытка {attempt + 2} из {TTS_MAX_RETRIES + 1})")
+        await asyncio.sleep(pause)
+        delay *= 2
+    
+    raise TTSError("Не удалось сгенерировать аудио")
+
+async def _synthesize_chunk(text: str, cache) -> bytes:
+    cache_key = audio_cache_key(text)
+    if cache:
+        cached_path = cache.get(cache_key)
+        if cached_path:
+            return await asyncio.to_thread(Path(cached_path).read_bytes)
+    
+    audio = await request_speech(text)
+    
+    # Сохраняем озвучку части в кэш (ошибка записи не мешает отправке)
+    if cache:
+        try:
+            await cache.put(cache_key, audio)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении аудио в кэш: {e}")
+    return audio
+
+async def synthesize_text(text: str, use_cache: bool = TTS_CACHE_ENABLED) -> bytes:
+    """
+    Озвучивает текст любой длины и возвращает mp3 в памяти.
+    
+    Текст разбивается на части по предложениям и паузам (split_text_for_speech),
+    части озвучиваются параллельно в пределах TTS_MAX_CONCURRENCY и склеиваются
+    в исходном порядке. Каждая часть кэшируется отдельно, поэтому после сбоя
+    или при изменении одного абзаца повторно озвучиваются только недостающие части.
+    
+    Args:
+        text: Текст для озвучивания
+        use_cache: Использовать ли дисковый кэш озвучки
+        
+    Returns:
+        bytes: Содержимое mp3
+        
+    Raises:
+        TTSError: Если озвучить хотя бы одну часть не удалось
+    """
+    chunks = split_text_for_speech(text)
+    if not chunks:
+        raise TTSError("Пустой текст")
+    
+    cache = get_tts_cache() if use_cache else None
+    if len(chunks) == 1:
+        return await _synthesize_chunk(chunks[0], cache)
+    
+    tasks = [asyncio.create_task(_synthesize_chunk(chunk, cache)) for chunk in chunks]
     try:
-        logger.info(f"Отправка запроса к ElevenLabs API для синтеза речи")
-        # Выполняем синхронный запрос к API
-        response = requests.post(
-            f"{ELEVEN_API_URL}/{voice_id}",
-            headers=headers,
-            json=data
-        )
+        parts = await asyncio.gather(*tasks)
+    except BaseException:
+        # Если одна часть не озвучилась, остальные запросы не нужны
+        for task in tasks:
+            task.cancel()
+        raise
+    return concatenate_mp3(parts)
+
+async def synthesize_audio(text: str, user_id: int, meditation_type: str = "default") -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Озвучивает текст с помощью ElevenLabs API и возвращает mp3 в памяти.
+    
+    Длинные тексты озвучиваются по частям параллельно (synthesize_text)
+    и не обрезаются. Если включен кэш озвучки (TTS_CACHE_ENABLED), готовые
+    части берутся из кэша, а новые сохраняются в него.
+    
+    Args:
+        text: Текст для преобразования в аудио
+        user_id: ID пользователя Telegram
+        meditation_type: Тип медитации (relax, focus, sleep)
         
-        if response.status_code == 200:
-            # Создаем папку для файла, если она не существует
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            # Сохраняем аудио-файл
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            
-            logger.info(f"Аудио успешно сгенерировано и сохранено: {output_path}")
-            return True
-        else:
-            logger.error(f"Ошибка при генерации аудио: {response.status_code}, {response.text}")
-            return False
+    Returns:
+        Tuple[Optional[bytes], Optional[str]]: (содержимое mp3, None) при успехе
+        или (None, причина ошибки); причина "quota_exceeded" означает исчерпание квоты
+    """
+    chunk_count = len(split_text_for_speech(text))
+    logger.info(
+        f"Озвучка текста для пользователя {user_id} ({meditation_type}): "
+        f"{len(text)} символов, частей: {chunk_count}"
+    )
+    try:
+        audio = await synthesize_text(text)
+    except TTSError as e:
+        if e.reason == "API ключ недоступен":
+            logger.warning(f"API ключ недоступен, генерация аудио невозможна для пользователя {user_id}")
+        return None, e.reason
     except Exception as e:
         logger.error(f"Ошибка при генерации аудио: {e}")
-        return False
+        return None, str(e)
+    
+    logger.info(f"Аудио успешно сгенерировано для пользователя {user_id}: {len(audio) / 1024:.0f} КБ")
+    return audio, None
 
 async def generate_audio(text: str, user_id: int, meditation_type: str = "default") -> tuple:
     """
-    Генерирует аудио с помощью ElevenLabs API.
+    Генерирует аудио с помощью ElevenLabs API и возвращает путь к mp3-файлу.
+    
+    Оставлена для кода, которому нужен файл на диске; для отправки
+    в Telegram используйте synthesize_audio, которая не пишет файлов.
     
     Args:
         text: Текст для преобразования в аудио
@@ -109,85 +565,72 @@ async def generate_audio(text: str, user_id: int, meditation_type: str = "defaul
         meditation_type: Тип медитации (relax, focus, sleep)
         
     Returns:
-        tuple: (str, str) - (Путь к созданному аудио-файлу, причина ошибки) 
+        tuple: (str, str) - (Путь к аудио-файлу, причина ошибки) 
                Если аудио создано успешно - (путь_к_файлу, None)
+               Файл может принадлежать кэшу, удалять его нужно через release_audio_file
                Если произошла ошибка - (None, текст_ошибки)
     """
-    # Создаем директорию tmp, если она не существует
-    tmp_dir = Path("tmp")
-    tmp_dir.mkdir(exist_ok=True)
+    audio, error_reason = await synthesize_audio(text, user_id, meditation_type)
+    if audio is None:
+        return None, error_reason
     
-    # Генерируем уникальное имя файла
-    file_name = f"{meditation_type}_{user_id}_{uuid.uuid4()}.mp3"
-    file_path = tmp_dir / file_name
+    cached_path = lookup_cached_audio(text)
+    if cached_path:
+        return cached_path, None
     
-    # Если API ключ недоступен, генерируем демо-ответ
-    api_key = ELEVEN_API_KEY or ELEVENLABS_API_KEY
-    if not api_key:
-        logger.warning(f"API ключ недоступен, генерация аудио невозможна для пользователя {user_id}")
-        return None, "API ключ недоступен"
+    # Текста нет в кэше целиком: сохраняем аудио во временный файл спула
+    spool = get_spool()
+    try:
+        file_path = spool.allocate(f"tts_{meditation_type}", ".mp3", len(audio))
+    except SpoolQuotaExceeded as e:
+        logger.error(f"Не удалось сохранить аудио для пользователя {user_id}: {e}")
+        return None, "Временное хранилище переполнено"
     
     try:
-        # Подготовка данных для запроса
-        headers = {
-            "Accept": "audio/mpeg",
-            "Content-Type": "application/json",
-            "xi-api-key": api_key
-        }
-        
-        # Параметры голоса по запросу пользователя
-        voice_settings = {
-            "stability": 0.5,  # 50%
-            "similarity_boost": 0.75,  # 75%
-            "speed": 0.9  # 0.9 скорость
-        }
-        
-        # Подготавливаем текст (ограничиваем длину)
-        if len(text) > MAX_TEXT_LENGTH:
-            text = text[:MAX_TEXT_LENGTH-3] + "..."
-            logger.warning(f"Текст для генерации аудио был обрезан для пользователя {user_id}")
-        
-        # Данные для запроса с моделью высокого качества
-        data = {
-            "text": text,
-            "model_id": "eleven_multilingual_v2",  # Используем модель высокого качества
-            "voice_settings": voice_settings
-        }
-        
-        # ID голоса выбираем в зависимости от типа медитации
-        voice_id = os.getenv("ELEVENLABS_VOICE_ID", DEFAULT_VOICE_ID)
-        
-        # Отправляем запрос к API
-        logger.info(f"Отправка запроса к ElevenLabs API для пользователя {user_id}")
-        
-        # Выполняем асинхронный запрос к API
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{ELEVEN_API_URL}/{voice_id}",
-                headers=headers,
-                json=data
-            ) as response:
-                if response.status == 200:
-                    # Сохраняем аудио-файл
-                    with open(file_path, "wb") as f:
-                        f.write(await response.read())
-                    logger.info(f"Аудио успешно сгенерировано и сохранено: {file_path}")
-                    return str(file_path), None
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Ошибка при генерации аудио: {response.status}, {error_text}")
-                    
-                    # Проверяем тип ошибки
-                    try:
-                        error_data = json.loads(error_text)
-                        if response.status == 401 and "quota_exceeded" in str(error_data):
-                            error_reason = "quota_exceeded"
-                        else:
-                            error_reason = f"HTTP ошибка {response.status}"
-                    except:
-                        error_reason = f"HTTP ошибка {response.status}"
-                    
-                    return None, error_reason
-    except Exception as e:
-        logger.error(f"Ошибка при генерации аудио: {e}")
-        return None, str(e) 
\ No newline at end of file
+        await asyncio.to_thread(Path(file_path).write_bytes, audio)
+    except OSError as e:
+        logger.error(f"Ошибка при записи аудио-файла {file_path}: {e}")
+        await spool.release_async(file_path)
+        return None, "Ошибка при сохранении аудио"
+    return file_path, None
+
+def synthesize_speech(text: str, output_path: str) -> bool:
+    """
+    Синхронно озвучивает текст и сохраняет результат в mp3-файл.
+    
+    Обертка над асинхронным клиентом для командной строки
+    (examples/synthesize_speech_example.py). Вызов из работающего цикла
+    событий запрещен: он заблокировал бы всех пользователей бота.
+    
+    Args:
+        text: Текст для озвучивания
+        output_path: Путь для сохранения mp3-файла
+        
+    Returns:
+        bool: True в случае успешного синтеза, False в случае ошибки
+        
+    Raises:
+        RuntimeError: Если функция вызвана из работающего цикла событий
+    """
+    assert_not_in_event_loop("synthesize_speech")
+    
+    async def run() -> bytes:
+        try:
+            return await synthesize_text(text)
+        finally:
+            await close_http_session()
+    
+    try:
+        audio = asyncio.run(run())
+    except TTSError as e:
+        logger.error(f"Ошибка при генерации аудио: {e.reason}")
+        return False
+    
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(audio)
+    
+    logger.info(f"Аудио успешно сгенерировано и сохранено: {output_path}")
+    return True
@@ -0,0 +1,169 @@
+import os
+import json
+import hashlib
+import logging
+import asyncio
+from typing import Dict, Any, Optional
+
+from services.spool import get_spool
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Директория кэша озвученных текстов
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("tmp", "tts_cache"))
+
+# Максимальный размер кэша в мегабайтах
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "500"))
+
+# Расширение файлов кэша
+CACHE_FILE_SUFFIX = ".mp3"
+
+def make_cache_key(text: str, voice_id: str, model_id: str, voice_settings: Dict[str, Any]) -> str:
+    """
+    Вычисляет ключ кэша по всем параметрам, от которых зависит результат синтеза.
+
+    Args:
+        text: Озвучиваемый текст
+        voice_id: ID голоса ElevenLabs
+        model_id: ID модели ElevenLabs
+        voice_settings: Настройки голоса
+
+    Returns:
+        str: Ключ кэша (SHA-256 в шестнадцатеричном виде)
+    """
+    payload = json.dumps(
+        {"text": text, "voice_id": voice_id, "model_id": model_id, "voice_settings": voice_settings},
+        ensure_ascii=False,
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class TTSAudioCache:
+    """
+    Дисковый кэш озвученных текстов с адресацией по содержимому.
+
+    Файл кэша называется по ключу из make_cache_key, поэтому одинаковый текст
+    с одинаковыми настройками голоса озвучивается один раз. Запись идет через
+    спул временных файлов и атомарна, время последнего обращения хранится
+    в mtime файла, и при превышении лимита размера удаляются давно
+    не использованные файлы.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key: str) -> str:
+        """Возвращает путь к файлу кэша для ключа."""
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def contains_path(self, path: str) -> bool:
+        """Проверяет, находится ли файл в директории кэша."""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Ищет озвучку в кэше.
+
+        Args:
+            key: Ключ кэша
+
+        Returns:
+            Optional[str]: Путь к файлу или None, если озвучки нет в кэше
+        """
+        path = self.path_for(key)
+        try:
+            # Отмечаем обращение для вытеснения по давности использования
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return path
+
+    async def put(self, key: str, data: bytes) -> str:
+        """
+        Сохраняет озвучку в кэш и вытесняет старые файлы при превышении лимита.
+
+        Args:
+            key: Ключ кэша
+            data: Содержимое mp3-файла
+
+        Returns:
+            str: Путь к файлу кэша
+        """
+        path = await get_spool().write_file("tts_cache", self.path_for(key), data)
+        await asyncio.to_thread(self._evict)
+        return path
+
+    async def cleanup(self) -> int:
+        """
+        Удаляет недописанные файлы прежних версий и вытесняет старые файлы
+        при превышении лимита (для уборщика временных файлов).
+
+        Returns:
+            int: Количество удаленных файлов
+        """
+        return await asyncio.to_thread(self._evict)
+
+    def _evict(self) -> int:
+        entries = []
+        total_size = 0
+        removed = 0
+        if not os.path.isdir(self.cache_dir):
+            return removed
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp"):
+                    # Недописанный файл прежней версии кэша
+                    try:
+                        os.remove(entry.path)
+                        removed += 1
+                    except OSError:
+                        pass
+                    continue
+                if not entry.name.endswith(CACHE_FILE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        if total_size <= self.max_bytes:
+            return removed
+
+        # Удаляем файлы, к которым дольше всего не обращались
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+
+        logger.info(f"Из кэша озвучки удалено {removed} файлов, размер кэша {total_size / 1024 / 1024:.1f} МБ")
+        return removed
+
+# Общий кэш озвучки (создается при первом обращении)
+_cache: Optional[TTSAudioCache] = None
+
+def get_tts_cache() -> TTSAudioCache:
+    """
+    Возвращает общий кэш озвучки.
+
+    Returns:
+        TTSAudioCache: Кэш озвучки
+    """
+    global _cache
+    if _cache is None:
+        _cache = TTSAudioCache()
+    return _cache
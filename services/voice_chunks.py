@@ -0,0 +1,203 @@
+import struct
+import logging
+from typing import List
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Частота, в которой считаются позиции (granule position) в потоке Ogg Opus
+OPUS_SAMPLE_RATE = 48000
+
+# Доля длины фрагмента, в пределах которой ищется тихое место для разреза
+SPLIT_SEARCH_WINDOW = 0.3
+
+OGG_CAPTURE_PATTERN = b"OggS"
+OGG_HEADER = struct.Struct("<4sBBqIIIB")
+
+# Флаги заголовка страницы Ogg
+FLAG_CONTINUED = 0x01
+FLAG_BOS = 0x02
+FLAG_EOS = 0x04
+
+def _make_crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+_CRC_TABLE = _make_crc_table()
+
+def ogg_crc(data: bytes) -> int:
+    """Вычисляет контрольную сумму страницы Ogg (CRC-32 без отражения, полином 0x04C11DB7)."""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[((crc >> 24) & 0xFF) ^ byte]
+    return crc
+
+class OggPage:
+    """Страница контейнера Ogg: заголовок, таблица сегментов и данные."""
+
+    __slots__ = ("header_type", "granule", "serial", "sequence", "segments", "body")
+
+    def __init__(self, header_type: int, granule: int, serial: int, sequence: int, segments: bytes, body: bytes):
+        self.header_type = header_type
+        self.granule = granule
+        self.serial = serial
+        self.sequence = sequence
+        self.segments = segments
+        self.body = body
+
+    def to_bytes(self) -> bytes:
+        """Собирает страницу с пересчитанной контрольной суммой."""
+        header = OGG_HEADER.pack(
+            OGG_CAPTURE_PATTERN, 0, self.header_type, self.granule,
+            self.serial, self.sequence, 0, len(self.segments)
+        )
+        page = header + self.segments + self.body
+        crc = ogg_crc(page)
+        return page[:22] + struct.pack("<I", crc) + page[26:]
+
+def parse_ogg_pages(data: bytes) -> List[OggPage]:
+    """
+    Разбирает поток Ogg на страницы.
+
+    Args:
+        data: Содержимое файла Ogg
+
+    Returns:
+        List[OggPage]: Страницы потока
+
+    Raises:
+        ValueError: Если данные не являются потоком Ogg
+    """
+    pages = []
+    offset = 0
+    while offset < len(data):
+        if data[offset:offset + 4] != OGG_CAPTURE_PATTERN or offset + OGG_HEADER.size > len(data):
+            raise ValueError(f"Некорректная страница Ogg на смещении {offset}")
+        _, _, header_type, granule, serial, sequence, _, count = OGG_HEADER.unpack_from(data, offset)
+        segments_start = offset + OGG_HEADER.size
+        segments = data[segments_start:segments_start + count]
+        body_start = segments_start + count
+        body_end = body_start + sum(segments)
+        if len(segments) != count or body_end > len(data):
+            raise ValueError(f"Обрезанная страница Ogg на смещении {offset}")
+        pages.append(OggPage(header_type, granule, serial, sequence, segments, data[body_start:body_end]))
+        offset = body_end
+    return pages
+
+def _page_bitrate(page: OggPage, previous_granule: int) -> float:
+    # Кодек Opus с переменным битрейтом кодирует тишину короткими пакетами,
+    # поэтому страница с наименьшим числом байт на секунду - самое тихое место
+    samples = page.granule - previous_granule
+    if samples <= 0:
+        return float("inf")
+    return len(page.body) / samples
+
+def find_split_points(pages: List[OggPage], first_audio: int, chunk_seconds: float) -> List[int]:
+    """
+    Выбирает страницы, после которых поток разрезается на фрагменты.
+
+    Для каждого разреза рассматриваются страницы, которые заканчиваются
+    в пределах SPLIT_SEARCH_WINDOW от целевой длины фрагмента, и выбирается
+    самая тихая из них. Разрез возможен только там, где следующая страница
+    начинается с нового пакета.
+
+    Args:
+        pages: Страницы потока
+        first_audio: Индекс первой страницы с аудио (после заголовков)
+        chunk_seconds: Целевая длительность фрагмента (секунды)
+
+    Returns:
+        List[int]: Индексы страниц, которыми заканчиваются фрагменты (кроме последнего)
+    """
+    target = int(chunk_seconds * OPUS_SAMPLE_RATE)
+    window = int(target * SPLIT_SEARCH_WINDOW)
+    total = pages[-1].granule if pages else 0
+
+    splits = []
+    chunk_start = pages[first_audio - 1].granule if first_audio > 0 else 0
+    index = first_audio
+    while total - chunk_start > target + window:
+        best = None
+        best_score = float("inf")
+        previous_granule = pages[index - 1].granule if index > 0 else 0
+        for i in range(index, len(pages) - 1):
+            page = pages[i]
+            # Позиция -1 у страницы, на которой не заканчивается ни один пакет
+            if page.granule < 0:
+                continue
+            position = page.granule - chunk_start
+            if position > target + window:
+                break
+            if position >= target - window and not pages[i + 1].header_type & FLAG_CONTINUED:
+                score = _page_bitrate(page, previous_granule)
+                if score < best_score:
+                    best, best_score = i, score
+            previous_granule = page.granule
+        if best is None:
+            break
+        splits.append(best)
+        chunk_start = pages[best].granule
+        index = best + 1
+    return splits
+
+def _build_stream(header_pages: List[OggPage], audio_pages: List[OggPage], base_granule: int) -> bytes:
+    parts = []
+    sequence = 0
+    last = len(header_pages) + len(audio_pages) - 1
+    for i, page in enumerate(header_pages + audio_pages):
+        header_type = page.header_type & FLAG_CONTINUED
+        if i == 0:
+            header_type |= FLAG_BOS
+        if i == last:
+            header_type |= FLAG_EOS
+        granule = page.granule - base_granule if i >= len(header_pages) else page.granule
+        parts.append(OggPage(header_type, granule, page.serial, sequence, page.segments, page.body).to_bytes())
+        sequence += 1
+    return b"".join(parts)
+
+def split_ogg_opus(data: bytes, chunk_seconds: float) -> List[bytes]:
+    """
+    Разрезает голосовое сообщение Ogg Opus на фрагменты по тихим местам.
+
+    Каждый фрагмент - самостоятельный файл Ogg Opus: в него копируются
+    заголовки OpusHead и OpusTags исходного потока, страницы нумеруются
+    заново, а позиции отсчитываются от начала фрагмента. Аудио не
+    перекодируется.
+
+    Args:
+        data: Содержимое файла Ogg Opus
+        chunk_seconds: Целевая длительность фрагмента (секунды)
+
+    Returns:
+        List[bytes]: Фрагменты; если разрезать нельзя, список из исходных данных
+    """
+    try:
+        pages = parse_ogg_pages(data)
+    except ValueError as e:
+        logger.warning(f"Не удалось разобрать голосовое сообщение, распознаем целиком: {e}")
+        return [data]
+
+    # Заголовки Opus занимают страницы с нулевой позицией в начале потока
+    first_audio = 0
+    while first_audio < len(pages) and pages[first_audio].granule == 0:
+        first_audio += 1
+    if first_audio == 0 or first_audio >= len(pages):
+        return [data]
+
+    splits = find_split_points(pages, first_audio, chunk_seconds)
+    if not splits:
+        return [data]
+
+    header_pages = pages[:first_audio]
+    chunks = []
+    start = first_audio
+    for end in splits + [len(pages) - 1]:
+        base_granule = pages[start - 1].granule if start > first_audio else 0
+        chunks.append(_build_stream(header_pages, pages[start:end + 1], base_granule))
+        start = end + 1
+    return chunks
@@ -0,0 +1,206 @@
+import os
+import time
+import asyncio
+import secrets
+import logging
+from typing import Dict, Any, Optional, List
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Режим получения обновлений: polling (длинный опрос) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+# Публичный адрес бота (например, https://ona.up.railway.app); без него вебхук
+# в Telegram не устанавливается и сервер принимает обновления только локально
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "").rstrip("/")
+
+# Путь, на который Telegram отправляет обновления
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+
+# Секрет, который Telegram передает в заголовке X-Telegram-Bot-Api-Secret-Token.
+# Если не задан, создается при каждом запуске
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+
+# Адрес и порт HTTP-сервера (PORT задает Railway)
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", os.getenv("WEBHOOK_PORT", "8080")))
+
+# Максимальное количество принятых, но еще не обработанных обновлений
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# Количество одновременно обрабатываемых обновлений
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "16"))
+
+# Время на обработку принятых обновлений при остановке бота (секунды)
+WEBHOOK_DRAIN_TIMEOUT = 10
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик вебхука Telegram с ограниченной очередью обновлений.
+
+    Запрос с верным секретом сразу получает ответ 200, а обновление
+    ставится в очередь, которую разбирают WEBHOOK_WORKERS обработчиков.
+    Если очередь заполнена, возвращается 503: Telegram повторит доставку
+    позже, и под нагрузкой бот не копит неограниченное число задач.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, secret_token: Optional[str] = WEBHOOK_SECRET,
+                 queue_size: int = WEBHOOK_QUEUE_SIZE, workers: int = WEBHOOK_WORKERS, **data: Any):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.queue_size = queue_size
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self._handle_total = 0.0
+
+    def _ensure_workers(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(self.queue_size)
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self) -> None:
+        while True:
+            bot, update = await self._queue.get()
+            started = time.monotonic()
+            try:
+                await self._background_feed_update(bot, update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ошибка при обработке обновления {update.get('update_id')}: {e}")
+            finally:
+                self._handle_total += time.monotonic() - started
+                self._queue.task_done()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        self._ensure_workers()
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+
+        try:
+            self._queue.put_nowait((bot, update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"Очередь обновлений заполнена ({self.queue_size}), обновление {update.get('update_id')} отклонено")
+            return web.Response(status=503, text="Busy")
+
+        self.accepted += 1
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику вебхука с момента запуска бота.
+
+        Returns:
+            Dict[str, Any]: Принятые, отклоненные, обработанные и упавшие обновления,
+            размер очереди и среднее время обработки
+        """
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "avg_handle": self._handle_total / (self.processed + self.failed) if self.processed + self.failed else 0.0
+        }
+
+    async def close(self) -> None:
+        """
+        Обрабатывает принятые обновления (не дольше WEBHOOK_DRAIN_TIMEOUT) и останавливает обработчики.
+
+        Сессию бота не закрывает: это делает main при завершении работы.
+        """
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), WEBHOOK_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано обновлений при остановке: {self._queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+# Ключ, под которым обработчик вебхука хранится в приложении
+WEBHOOK_HANDLER_KEY = web.AppKey("webhook_handler", QueuedRequestHandler)
+
+def build_webhook_app(dispatcher: Dispatcher, bot: Bot, **kwargs: Any) -> web.Application:
+    """
+    Создает aiohttp-приложение, которое принимает обновления Telegram.
+
+    Кроме WEBHOOK_PATH приложение отвечает на GET /healthz статистикой
+    очереди обновлений (для проверки живости за прокси).
+
+    Args:
+        dispatcher: Диспетчер бота
+        bot: Бот
+        **kwargs: Параметры QueuedRequestHandler (secret_token, queue_size, workers)
+
+    Returns:
+        web.Application: Приложение aiohttp
+    """
+    app = web.Application()
+    handler = QueuedRequestHandler(dispatcher, bot, **kwargs)
+    handler.register(app, path=WEBHOOK_PATH)
+    app[WEBHOOK_HANDLER_KEY] = handler
+
+    async def healthz(request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", **handler.get_stats()})
+
+    app.router.add_get("/healthz", healthz)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot) -> None:
+    """
+    Запускает HTTP-сервер вебхука и работает до отмены задачи.
+
+    Если задан WEBHOOK_BASE_URL, вебхук с секретом устанавливается
+    в Telegram; иначе сервер только слушает порт, и обновления можно
+    отправлять вручную, например:
+    curl -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" -H "Content-Type: application/json"
+    -d @update.json http://localhost:8080/webhook
+
+    Args:
+        dispatcher: Диспетчер бота
+        bot: Бот
+    """
+    app = build_webhook_app(dispatcher, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Сервер вебхука слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    if WEBHOOK_BASE_URL:
+        await bot.set_webhook(
+            url=f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dispatcher.resolve_used_update_types(),
+            max_connections=min(100, WEBHOOK_WORKERS * 2)
+        )
+        logger.info(f"Вебхук установлен: {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+    else:
+        logger.warning(
+            "WEBHOOK_BASE_URL не задан, вебхук в Telegram не установлен (локальный режим); "
+            "задайте WEBHOOK_SECRET, чтобы отправлять обновления вручную"
+        )
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        logger.info(f"Сервер вебхука останавливается: {app[WEBHOOK_HANDLER_KEY].get_stats()}")
+        await runner.cleanup()
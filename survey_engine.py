@@ -0,0 +1,166 @@
+import logging
+from types import MappingProxyType
+from typing import Dict, Any, List, Tuple, Optional, Mapping
+
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Текст кнопки отмены опроса
+CANCEL_SURVEY_BUTTON = "❌ Отменить опрос"
+
+# Текст кнопки подтверждения начала теста Vasini
+VASINI_CONFIRM_BUTTON = "✅ Да, готов(а)"
+
+# Буквы вариантов ответа
+OPTION_LETTERS = ("A", "B", "C", "D")
+
+class SurveyEngine:
+    """
+    Скомпилированный опросник.
+
+    Собирается один раз при запуске бота из списков вопросов и хранит все,
+    что нужно обработчику ответов: индекс вопросов по ID, готовые тексты
+    вопросов, готовые клавиатуры с вариантами ответов и обратное отображение
+    текста кнопки ("A: ...") в букву варианта. Благодаря этому обработка
+    каждого ответа не пересобирает списки вопросов и клавиатуры.
+
+    Клавиатуры общие для всех пользователей, поэтому их нельзя изменять
+    после компиляции.
+    """
+
+    def __init__(self, demo_questions: List[Dict[str, Any]], vasini_questions: List[Dict[str, Any]]):
+        self.demo_questions: Tuple[Dict[str, Any], ...] = tuple(demo_questions)
+        self.vasini_questions: Tuple[Dict[str, Any], ...] = tuple(vasini_questions)
+        self.demo_count = len(self.demo_questions)
+        self.vasini_count = len(self.vasini_questions)
+
+        # Индекс вопросов по ID
+        self._by_id: Mapping[str, Dict[str, Any]] = MappingProxyType(
+            {question["id"]: question for question in self.demo_questions + self.vasini_questions}
+        )
+
+        # Готовые тексты вопросов
+        self._demo_texts = tuple(
+            f"Вопрос {index + 1}/{self.demo_count}: {question['text']}"
+            for index, question in enumerate(self.demo_questions)
+        )
+        self._vasini_texts = tuple(
+            f"Вопрос {index + 1}/{self.vasini_count}: {question['text']}"
+            for index, question in enumerate(self.vasini_questions)
+        )
+
+        # Клавиатура для вопросов со свободным ответом
+        self.text_keyboard = ReplyKeyboardMarkup(
+            keyboard=[[KeyboardButton(text=CANCEL_SURVEY_BUTTON)]],
+            resize_keyboard=True,
+            one_time_keyboard=False,
+            input_field_placeholder="Введите ваш ответ..."
+        )
+
+        # Клавиатура подтверждения начала теста Vasini
+        self.vasini_intro_keyboard = ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text=VASINI_CONFIRM_BUTTON)],
+                [KeyboardButton(text=CANCEL_SURVEY_BUTTON)]
+            ],
+            resize_keyboard=True,
+            one_time_keyboard=True
+        )
+
+        # Клавиатуры с вариантами ответов и обратные отображения "текст кнопки -> буква"
+        keyboards = []
+        option_maps = []
+        for question in self.vasini_questions:
+            option_by_button = {}
+            rows = []
+            for option, text in question["options"].items():
+                button_text = f"{option}: {text}"
+                option_by_button[button_text] = option
+                rows.append([KeyboardButton(text=button_text)])
+            rows.append([KeyboardButton(text=CANCEL_SURVEY_BUTTON)])
+
+            keyboards.append(ReplyKeyboardMarkup(
+                keyboard=rows,
+                resize_keyboard=True,
+                one_time_keyboard=True,
+                input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
+            ))
+            option_maps.append(MappingProxyType(option_by_button))
+
+        self._choice_keyboards: Tuple[ReplyKeyboardMarkup, ...] = tuple(keyboards)
+        self._option_by_button: Tuple[Mapping[str, str], ...] = tuple(option_maps)
+
+        logger.info(f"Опросник скомпилирован: {self.demo_count} демо-вопросов, {self.vasini_count} вопросов Vasini")
+
+    def get_question(self, question_id: str) -> Dict[str, Any]:
+        """
+        Возвращает вопрос по его ID.
+
+        Args:
+            question_id: ID вопроса
+
+        Returns:
+            Dict[str, Any]: Данные вопроса или пустой словарь, если вопрос не найден
+        """
+        return self._by_id.get(question_id, {})
+
+    def demo_question_text(self, index: int) -> str:
+        """Возвращает готовый текст демо-вопроса с номером."""
+        return self._demo_texts[index]
+
+    def vasini_question_text(self, index: int) -> str:
+        """Возвращает готовый текст вопроса Vasini с номером."""
+        return self._vasini_texts[index]
+
+    def choice_keyboard(self, index: int) -> ReplyKeyboardMarkup:
+        """Возвращает готовую клавиатуру с вариантами ответа на вопрос Vasini."""
+        return self._choice_keyboards[index]
+
+    def parse_option(self, index: int, text: Optional[str]) -> Optional[str]:
+        """
+        Определяет букву выбранного варианта ответа на вопрос Vasini.
+
+        Нажатие кнопки распознается одним поиском в словаре; для ответов,
+        введенных вручную, проверяются те же форматы, что и раньше:
+        "A: текст", "A текст", только буква и буква отдельным словом.
+
+        Args:
+            index: Индекс вопроса Vasini
+            text: Текст сообщения пользователя
+
+        Returns:
+            Optional[str]: Буква варианта (A, B, C или D) или None, если ответ не распознан
+        """
+        if not text:
+            return None
+
+        option = self._option_by_button[index].get(text)
+        if option:
+            return option
+
+        upper_text = text.upper()
+        padded_text = f" {upper_text} "
+        for opt in OPTION_LETTERS:
+            if text.startswith(f"{opt}:") or text.startswith(f"{opt} ") or upper_text == opt or f" {opt} " in padded_text:
+                return opt
+
+        return None
+
+# Скомпилированный опросник (создается при первом обращении)
+_engine: Optional[SurveyEngine] = None
+
+def get_survey_engine() -> SurveyEngine:
+    """
+    Возвращает скомпилированный опросник, компилируя его при первом вызове.
+
+    Returns:
+        SurveyEngine: Скомпилированный опросник
+    """
+    global _engine
+    if _engine is None:
+        from question_bank import get_question_bank
+        bank = get_question_bank()
+        _engine = SurveyEngine(bank.get_demo_questions(), bank.get_vasini_questions())
+    return _engine
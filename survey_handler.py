@@ -8,7 +8,11 @@ from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
 from button_states import SurveyStates, ProfileStates
 from profile_generator import generate_profile, save_profile_to_db
-from db_utils import save_survey_answers, get_user_answers, get_profile_data
+from db_utils import get_user_answers, get_profile_data
+from survey_engine import get_survey_engine, CANCEL_SURVEY_BUTTON, VASINI_CONFIRM_BUTTON
+from question_bank import get_question_bank
+from survey_progress import survey_progress, SurveySession
+from services.outbound import get_outbound_queue, PRIORITY_INTERACTIVE
 
 # Импорт функции railway_print для логирования
 try:
@@ -33,6 +37,70 @@ logger = logging.getLogger(__name__)
 # Создаем роутер для опроса
 survey_router = Router()
 
+# Компилируем опросник один раз при запуске
+survey_engine = get_survey_engine()
+
+# Банк вопросов, из которого по запросу читаются интерпретации ответов
+question_bank = get_question_bank()
+
+# Telegram ограничивает сообщения 4096 символами, оставляем запас
+MAX_MESSAGE_LENGTH = 4000
+
+def split_message(text: str, max_length: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Разбивает длинный текст на части по границам строк.
+    
+    Args:
+        text: Текст сообщения
+        max_length: Максимальная длина части
+    
+    Returns:
+        List[str]: Части текста (одна часть, если текст помещается в сообщение)
+    """
+    if len(text) <= max_length:
+        return [text]
+    
+    parts = []
+    current_part = ""
+    for line in text.split('\n'):
+        # Строку длиннее сообщения приходится резать посередине
+        while len(line) + 1 > max_length:
+            if current_part:
+                parts.append(current_part)
+                current_part = ""
+            parts.append(line[:max_length])
+            line = line[max_length:]
+        if len(current_part) + len(line) + 1 <= max_length:
+            current_part += line + '\n'
+        else:
+            parts.append(current_part)
+            current_part = line + '\n'
+    if current_part:
+        parts.append(current_part)
+    return parts
+
+async def answer_long_message(message: Message, text: str, reply_markup=None) -> None:
+    """
+    Отправляет длинный текст частями через очередь исходящих сообщений.
+    
+    Части уходят по очереди с приоритетом ответа пользователю, кнопки
+    добавляются только к последней части.
+    
+    Args:
+        message: Сообщение, в чат которого отправляется ответ
+        text: Текст в HTML-разметке
+        reply_markup: Клавиатура для последней части
+    """
+    parts = split_message(text)
+    outbound = get_outbound_queue()
+    for i, part in enumerate(parts):
+        markup = reply_markup if i == len(parts) - 1 else None
+        await outbound.send(
+            message.chat.id,
+            lambda part=part, markup=markup: message.answer(part, parse_mode="HTML", reply_markup=markup),
+            priority=PRIORITY_INTERACTIVE
+        )
+
 # Функция для получения основной клавиатуры
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """
@@ -51,6 +119,44 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
         resize_keyboard=True
     )
 
+async def send_vasini_intro(message: Message):
+    """
+    Отправляет описание теста Vasini с просьбой подтвердить начало.
+    
+    Args:
+        message: Сообщение от пользователя
+    """
+    await message.answer(
+        "🧠 <b>Основная информация собрана!</b>\n\n"
+        f"Теперь я задам вам {survey_engine.vasini_count} вопроса для определения ваших сильных сторон и талантов. "
+        "Этот тест называется Vasini Strengths Constellation и помогает выявить ваши природные способности.\n\n"
+        "На каждый вопрос нужно выбрать один из вариантов ответа (A, B, C или D).\n\n"
+        "Готовы начать?",
+        parse_mode="HTML",
+        reply_markup=survey_engine.vasini_intro_keyboard
+    )
+
+async def send_current_question(message: Message, session: SurveySession):
+    """
+    Отправляет вопрос, на котором находится пользователь.
+    
+    Args:
+        message: Сообщение от пользователя
+        session: Прогресс опроса
+    """
+    if session.is_demo_questions:
+        await message.answer(
+            survey_engine.demo_question_text(session.question_index),
+            reply_markup=survey_engine.text_keyboard
+        )
+    elif session.waiting_for_vasini_confirmation:
+        await send_vasini_intro(message)
+    else:
+        await message.answer(
+            survey_engine.vasini_question_text(session.question_index),
+            reply_markup=survey_engine.choice_keyboard(session.question_index)
+        )
+
 async def start_survey(message: Message, state: FSMContext):
     """
     Начинает опрос пользователя.
@@ -82,14 +188,22 @@ async def start_survey(message: Message, state: FSMContext):
         )
         return
     
-    # Если профиля нет, начинаем опрос сразу
-    # Импортируем функцию для получения демо-вопросов
-    from questions import get_demo_questions
+    # Сообщение может быть отправлено ботом (при вызове из callback), поэтому ID берем из ключа FSM
+    user_id = state.key.user_id
     
-    # Получаем список демо-вопросов
-    demo_questions = get_demo_questions()
+    # Если опрос был прерван, продолжаем его с того же вопроса
+    session = await survey_progress.load(user_id)
+    if session is not None and (session.answers or session.question_index or not session.is_demo_questions):
+        await message.answer(
+            "🔄 <b>Продолжаем опрос</b> с того места, где вы остановились.",
+            parse_mode="HTML"
+        )
+        await state.set_state(SurveyStates.answering_questions)
+        await send_current_question(message, session)
+        logger.info(f"Пользователь {user_id} продолжил опрос: {len(session.answers)} ответов уже сохранено")
+        return
     
-    # Показываем первый вопрос
+    # Если профиля нет, начинаем опрос сразу
     await message.answer(
         "📋 <b>Начинаем опрос!</b>\n\n"
         "Я задам несколько вопросов, чтобы лучше узнать тебя. "
@@ -100,25 +214,15 @@ async def start_survey(message: Message, state: FSMContext):
     
     # Показываем первый вопрос
     await message.answer(
-        f"Вопрос 1: {demo_questions[0]['text']}",
-        reply_markup=ReplyKeyboardMarkup(
-            keyboard=[[KeyboardButton(text="❌ Отменить опрос")]],
-            resize_keyboard=True,
-            one_time_keyboard=False,
-            input_field_placeholder="Введите ваш ответ..."
-        )
+        survey_engine.demo_question_text(0),
+        reply_markup=survey_engine.text_keyboard
     )
     
-    # Инициализируем опрос
+    # Инициализируем опрос: прогресс и ответы хранятся в таблицах опроса, а не в данных FSM
+    survey_progress.start(user_id)
     await state.set_state(SurveyStates.answering_questions)
-    await state.update_data(
-        question_index=0,
-        question_type="demo",
-        answers={},
-        is_demo_questions=True
-    )
     
-    logger.info(f"Пользователь {message.from_user.id} начал опрос")
+    logger.info(f"Пользователь {user_id} начал опрос")
 
 # Обработчик для подтверждения перезапуска опроса
 @survey_router.callback_query(F.data == "confirm_survey")
@@ -133,13 +237,14 @@ async def confirm_restart_survey(callback: CallbackQuery, state: FSMContext):
     # Удаляем сообщение с кнопками
     await callback.message.delete()
     
-    # Очищаем текущие данные профиля
+    # Очищаем текущие данные профиля и незавершенный опрос
     await state.update_data(
         answers={},
         profile_completed=False,
         profile_text="",
         personality_type=None
     )
+    survey_progress.discard(callback.from_user.id)
     
     # Начинаем опрос заново
     await start_survey(callback.message, state)
@@ -178,8 +283,11 @@ async def process_survey_answer(message: Message, state: FSMContext):
         message: Сообщение от пользователя
         state: Состояние FSM
     """
+    user_id = message.from_user.id
+    
     # Если пользователь хочет отменить опрос
-    if message.text == "❌ Отменить опрос":
+    if message.text == CANCEL_SURVEY_BUTTON:
+        survey_progress.discard(user_id)
         await state.clear()
         await message.answer(
             "❌ Опрос отменен. Вы можете начать его заново в любое время.",
@@ -188,258 +296,117 @@ async def process_survey_answer(message: Message, state: FSMContext):
         return
     
     # Получаем текущее состояние опроса
-    data = await state.get_data()
-    question_index = data.get("question_index", 0)
-    answers = data.get("answers", {})
-    is_demo_questions = data.get("is_demo_questions", True)
-    
-    # Импортируем функции для получения вопросов
-    from questions import get_demo_questions, get_all_vasini_questions
+    session = survey_progress.get_cached(user_id)
+    if session is None:
+        # После перезапуска бота восстанавливаем прогресс из базы данных
+        session = await survey_progress.load(user_id)
+        if session is None:
+            # Опрос начат до перехода на пошаговое сохранение: переносим прогресс из данных FSM
+            data = await state.get_data()
+            session = survey_progress.start(user_id, SurveySession(
+                question_index=data.get("question_index", 0),
+                is_demo_questions=data.get("is_demo_questions", True),
+                waiting_for_vasini_confirmation=data.get("waiting_for_vasini_confirmation", False),
+                answers=dict(data.get("answers") or {})
+            ))
+        
+        # Неизвестно, на какой вопрос отвечает сообщение, поэтому повторяем текущий вопрос
+        await message.answer(
+            "🔄 <b>Продолжаем опрос</b> с того места, где вы остановились.",
+            parse_mode="HTML"
+        )
+        await send_current_question(message, session)
+        return
     
-    # Получаем списки вопросов
-    demo_questions = get_demo_questions()
-    # Используем функцию get_all_vasini_questions вместо прямого объединения
-    try:
-        vasini_questions = get_all_vasini_questions()
-        logger.info(f"Загружено {len(vasini_questions)} вопросов Vasini")
-    except Exception as e:
-        logger.error(f"Ошибка при загрузке вопросов Vasini: {e}")
-        # Создаем пустой список в случае ошибки
-        vasini_questions = []
-        railway_print("ОШИБКА: Не удалось загрузить вопросы Vasini, опрос будет недоступен", "ERROR")
+    question_index = session.question_index
     
     # Определяем текущий вопрос
-    if is_demo_questions:
-        current_question = demo_questions[question_index]
-        # Сохраняем ответ на демо-вопрос
-        question_id = current_question["id"]
-        answers[question_id] = message.text
+    if session.is_demo_questions:
+        current_question = survey_engine.demo_questions[question_index]
+        
         # Переходим к следующему вопросу
-        question_index += 1
+        session.question_index += 1
         
         # Если демо-вопросы закончились, переходим к вопросам Vasini
-        if question_index >= len(demo_questions):
-            is_demo_questions = False
-            question_index = 0
-            
+        if session.question_index >= survey_engine.demo_count:
+            session.is_demo_questions = False
+            session.question_index = 0
+            session.waiting_for_vasini_confirmation = True
+        
+        # Сохраняем ответ на демо-вопрос
+        survey_progress.record_answer(user_id, session, current_question["id"], message.text)
+        
+        # Часовой пояс нужен, чтобы напоминания приходили по местному времени
+        if current_question["id"] == "timezone":
+            # Импорт внутри функции: reminder_handler сам импортирует survey_handler
+            from reminder_handler import update_user_timezone
+            await update_user_timezone(user_id, message.text)
+        
+        if session.waiting_for_vasini_confirmation:
             # Показываем информацию о начале теста Vasini
-            await message.answer(
-                "🧠 <b>Основная информация собрана!</b>\n\n"
-                "Теперь я задам вам 34 вопроса для определения ваших сильных сторон и талантов. "
-                "Этот тест называется Vasini Strengths Constellation и помогает выявить ваши природные способности.\n\n"
-                "На каждый вопрос нужно выбрать один из вариантов ответа (A, B, C или D).\n\n"
-                "Готовы начать?",
-                parse_mode="HTML",
-                reply_markup=ReplyKeyboardMarkup(
-                    keyboard=[
-                        [KeyboardButton(text="✅ Да, готов(а)")],
-                        [KeyboardButton(text="❌ Отменить опрос")]
-                    ],
-                    resize_keyboard=True,
-                    one_time_keyboard=True
-                )
-            )
-            
-            # Обновляем состояние
-            await state.update_data(
-                question_index=question_index,
-                answers=answers,
-                is_demo_questions=is_demo_questions,
-                waiting_for_vasini_confirmation=True
-            )
+            await send_vasini_intro(message)
             return
     else:
         # Проверяем, ожидаем ли мы подтверждения для начала теста Vasini
-        if data.get("waiting_for_vasini_confirmation", False):
-            if message.text == "✅ Да, готов(а)":
+        if session.waiting_for_vasini_confirmation:
+            if message.text == VASINI_CONFIRM_BUTTON:
                 # Начинаем тест Vasini
-                current_question = vasini_questions[question_index]
-                
-                # Создаем клавиатуру с вариантами ответов
-                options = current_question["options"]
-                keyboard = []
-                for option, text in options.items():
-                    # Формируем текст кнопки с более выраженной буквой варианта
-                    button_text = f"{option}: {text}"
-                    keyboard.append([KeyboardButton(text=button_text)])
-                keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-                
-                # Логируем какие варианты ответов мы показываем
-                logger.info(f"Показываем вопрос 1 с вариантами ответов: {', '.join(options.keys())}")
-                
-                await message.answer(
-                    f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                    reply_markup=ReplyKeyboardMarkup(
-                        keyboard=keyboard,
-                        resize_keyboard=True,
-                        one_time_keyboard=True,
-                        input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                    )
-                )
-                
-                # Обновляем состояние
-                await state.update_data(
-                    waiting_for_vasini_confirmation=False
-                )
-                return
-            elif message.text == "❌ Отменить опрос":
-                await state.clear()
-                await message.answer(
-                    "❌ Опрос отменен. Вы можете начать его заново в любое время.",
-                    reply_markup=get_main_keyboard()
-                )
+                session.waiting_for_vasini_confirmation = False
+                survey_progress.save_position(user_id, session)
+                await send_current_question(message, session)
                 return
             else:
                 # Если ответ не соответствует формату, просим повторить
-                options = current_question["options"]
-                keyboard = []
-                for opt, text in options.items():
-                    # Формируем текст кнопки с более выраженной буквой варианта
-                    button_text = f"{opt}: {text}"
-                    keyboard.append([KeyboardButton(text=button_text)])
-                keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-                
-                # Логируем, что пользователь должен повторить выбор
-                logger.info(f"Пользователь должен повторить выбор для вопроса {question_index + 1}")
-                
                 await message.answer(
-                    f"Пожалуйста, выберите один из предложенных вариантов ответа (A, B, C или D).\n\n"
-                    f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                    reply_markup=ReplyKeyboardMarkup(
-                        keyboard=keyboard,
-                        resize_keyboard=True,
-                        one_time_keyboard=True,
-                        input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                    )
+                    "Пожалуйста, нажмите «✅ Да, готов(а)», чтобы начать тест, или отмените опрос.",
+                    reply_markup=survey_engine.vasini_intro_keyboard
                 )
                 return
         
         # Обрабатываем ответ на вопрос Vasini
-        current_question = vasini_questions[question_index]
-        
-        # Логируем полученный текст сообщения для отладки
-        logger.info(f"Получен ответ на вопрос {question_index + 1}: '{message.text}'")
+        current_question = survey_engine.vasini_questions[question_index]
         
         # Проверяем, что ответ содержит букву варианта (A, B, C или D)
-        option = None
-        # Проверяем различные форматы ответов
-        for opt in ["A", "B", "C", "D"]:
-            # Проверка на формат "A: текст"
-            if message.text.startswith(f"{opt}:"):
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' по шаблону '{opt}:'")
-                break
-            # Проверка на формат "A текст" без двоеточия
-            elif message.text.startswith(f"{opt} "):
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' по шаблону '{opt} '")
-                break
-            # Проверка если пользователь ввел только букву "A", "B", "C" или "D"
-            elif message.text.upper() == opt:
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' (пользователь ввел только букву)")
-                break
-            # Проверка если текст содержит букву в любом месте (менее строгая проверка)
-            elif f" {opt} " in f" {message.text.upper()} ":
-                option = opt
-                logger.info(f"Распознан ответ '{opt}' в тексте '{message.text}'")
-                break
+        option = survey_engine.parse_option(question_index, message.text)
         
         if not option:
             # Если ответ не распознан, логируем это
             logger.warning(f"Не удалось распознать вариант ответа в тексте: '{message.text}'")
             
             # Если ответ не соответствует формату, просим повторить
-            options = current_question["options"]
-            keyboard = []
-            for opt, text in options.items():
-                # Формируем текст кнопки с более выраженной буквой варианта
-                button_text = f"{opt}: {text}"
-                keyboard.append([KeyboardButton(text=button_text)])
-            keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-            
-            # Логируем, что пользователь должен повторить выбор
-            logger.info(f"Пользователь должен повторить выбор для вопроса {question_index + 1}")
-            
             await message.answer(
                 f"Пожалуйста, выберите один из предложенных вариантов ответа (A, B, C или D).\n\n"
-                f"Вопрос {question_index + 1}/34: {current_question['text']}",
-                reply_markup=ReplyKeyboardMarkup(
-                    keyboard=keyboard,
-                    resize_keyboard=True,
-                    one_time_keyboard=True,
-                    input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-                )
+                f"{survey_engine.vasini_question_text(question_index)}",
+                reply_markup=survey_engine.choice_keyboard(question_index)
             )
             return
         
-        # Сохраняем ответ на вопрос Vasini
-        question_id = current_question["id"]
-        answers[question_id] = option
+        # Сохраняем ответ на вопрос Vasini и переходим к следующему вопросу
+        session.question_index += 1
+        survey_progress.record_answer(user_id, session, current_question["id"], option)
         
-        # Отправляем интерпретацию ответа пользователю
+        # Отправляем интерпретацию ответа пользователю (если она есть в банке вопросов)
         try:
-            interpretation = current_question["interpretations"][option]
-            await message.answer(
-                f"💡 <b>Интерпретация:</b>\n\n{interpretation}",
-                parse_mode="HTML"
-            )
-            # Добавляем небольшую задержку для удобства чтения
-            await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
+            interpretation = question_bank.get_interpretation(current_question["id"], option)
+            if interpretation:
+                await message.answer(
+                    f"💡 <b>Интерпретация:</b>\n\n{interpretation}",
+                    parse_mode="HTML"
+                )
+                # Добавляем небольшую задержку для удобства чтения
+                await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
+            else:
+                logger.warning(f"Нет интерпретации ответа {option} на вопрос {current_question['id']}")
         except Exception as e:
             logger.error(f"Ошибка при отправке интерпретации: {e}")
         
-        # Переходим к следующему вопросу
-        question_index += 1
-        
         # Если все вопросы Vasini заданы, завершаем опрос
-        if question_index >= len(vasini_questions):
-            await complete_survey(message, state, answers)
+        if session.question_index >= survey_engine.vasini_count:
+            await complete_survey(message, state, dict(session.answers))
             return
     
     # Показываем следующий вопрос
-    if is_demo_questions:
-        next_question = demo_questions[question_index]
-        await message.answer(
-            f"Вопрос {question_index + 1}/{len(demo_questions)}: {next_question['text']}",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[[KeyboardButton(text="❌ Отменить опрос")]],
-                resize_keyboard=True,
-                one_time_keyboard=False,
-                input_field_placeholder="Введите ваш ответ..."
-            )
-        )
-    else:
-        next_question = vasini_questions[question_index]
-        
-        # Создаем клавиатуру с вариантами ответов
-        options = next_question["options"]
-        keyboard = []
-        for option, text in options.items():
-            # Формируем текст кнопки, делая букву варианта более выраженной
-            button_text = f"{option}: {text}"
-            keyboard.append([KeyboardButton(text=button_text)])
-        keyboard.append([KeyboardButton(text="❌ Отменить опрос")])
-        
-        # Логируем какие варианты ответов мы показываем
-        logger.info(f"Показываем вопрос {question_index + 1} с вариантами ответов: {', '.join(options.keys())}")
-        
-        await message.answer(
-            f"Вопрос {question_index + 1}/34: {next_question['text']}",
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=keyboard,
-                resize_keyboard=True,
-                one_time_keyboard=True,
-                input_field_placeholder="Выберите вариант ответа (A, B, C или D)..."
-            )
-        )
-    
-    # Обновляем состояние
-    await state.update_data(
-        question_index=question_index,
-        answers=answers,
-        is_demo_questions=is_demo_questions
-    )
+    await send_current_question(message, session)
 
 async def complete_survey(message: Message, state: FSMContext, answers: Dict[str, str]):
     """
@@ -468,26 +435,9 @@ async def complete_survey(message: Message, state: FSMContext, answers: Dict[str
     type_counts, primary_type, secondary_type = get_personality_type_from_answers(answers)
     
     try:
-        # Сохраняем ответы пользователя в базу данных
+        # Ответы уже записаны в базу по ходу опроса, удаляем только позицию в опросе
         user_id = message.from_user.id
-        
-        # Преобразуем ответы из str:str в int:Union[str,int] для сохранения в базу
-        # Ключи должны быть целочисленными (ID вопросов)
-        db_answers = {}
-        for key, value in answers.items():
-            try:
-                # Пробуем преобразовать ключ в целое число
-                int_key = int(key)
-                db_answers[int_key] = value
-            except ValueError:
-                # Если ключ не является числом, пропускаем его
-                # (например, демографические данные: name, age, etc.)
-                continue
-                
-        # Сохраняем ответы в базу данных
-        answers_saved = await save_survey_answers(user_id, db_answers)
-        if not answers_saved:
-            logger.warning(f"Не удалось сохранить ответы пользователя {user_id} в базу данных")
+        survey_progress.finish(user_id)
         
         # Генерируем профиль
         profile_data = await generate_profile(answers)
@@ -531,43 +481,8 @@ async def complete_survey(message: Message, state: FSMContext, answers: Dict[str
         builder.button(text="💡 Получить совет", callback_data="get_advice")
         builder.adjust(1)  # Располагаем кнопки в столбик
         
-        # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-        max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-        
-        if len(detailed_profile) > max_message_length:
-            # Разбиваем детальный профиль на части
-            parts = []
-            current_part = ""
-            for line in detailed_profile.split('\n'):
-                if len(current_part) + len(line) + 1 <= max_message_length:
-                    current_part += line + '\n'
-                else:
-                    parts.append(current_part)
-                    current_part = line + '\n'
-            if current_part:
-                parts.append(current_part)
-            
-            # Отправляем части профиля
-            for i, part in enumerate(parts):
-                # Добавляем кнопки только к последней части
-                if i == len(parts) - 1:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML",
-                        reply_markup=builder.as_markup()
-                    )
-                else:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML"
-                    )
-        else:
-            # Отправляем профиль
-            await message.answer(
-                detailed_profile,
-                parse_mode="HTML",
-                reply_markup=builder.as_markup()
-            )
+        # Длинный профиль отправляется частями, кнопки - у последней части
+        await answer_long_message(message, detailed_profile, reply_markup=builder.as_markup())
         
         # Возвращаем основную клавиатуру
         await message.answer(
@@ -645,6 +560,7 @@ async def confirm_profile_reset(callback: CallbackQuery, state: FSMContext):
         question_index=0,
         is_demo_questions=True
     )
+    survey_progress.discard(callback.from_user.id)
     
     # Удаляем сообщение с подтверждением
     await callback.message.delete()
@@ -717,55 +633,14 @@ async def show_profile_details(callback: CallbackQuery, state: FSMContext):
         await callback.answer("Детальный профиль не найден")
         return
     
-    # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-    max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
+    # Добавляем кнопки для навигации
+    builder = InlineKeyboardBuilder()
+    builder.button(text="💡 Получить совет", callback_data="get_advice")
+    builder.button(text="🔙 Назад", callback_data="view_profile")
+    builder.adjust(1)
     
-    if len(details_text) > max_message_length:
-        # Разбиваем детальный профиль на части
-        parts = []
-        current_part = ""
-        for line in details_text.split('\n'):
-            if len(current_part) + len(line) + 1 <= max_message_length:
-                current_part += line + '\n'
-            else:
-                parts.append(current_part)
-                current_part = line + '\n'
-        if current_part:
-            parts.append(current_part)
-        
-        # Отправляем части профиля
-        for i, part in enumerate(parts):
-            # Добавляем кнопки только к последней части
-            if i == len(parts) - 1:
-                # Добавляем кнопки для навигации
-                builder = InlineKeyboardBuilder()
-                builder.button(text="💡 Получить совет", callback_data="get_advice")
-                builder.button(text="🔙 Назад", callback_data="view_profile")
-                builder.adjust(1)
-                
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-            else:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML"
-                )
-    else:
-        # Добавляем кнопки для навигации
-        builder = InlineKeyboardBuilder()
-        builder.button(text="💡 Получить совет", callback_data="get_advice")
-        builder.button(text="🔙 Назад", callback_data="view_profile")
-        builder.adjust(1)
-        
-        # Отправляем детальный профиль
-        await callback.message.answer(
-            details_text,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
+    # Длинный профиль отправляется частями, кнопки - у последней части
+    await answer_long_message(callback.message, details_text, reply_markup=builder.as_markup())
     
     # Возвращаем основную клавиатуру после вывода деталей
     await callback.message.answer(
@@ -837,43 +712,8 @@ async def view_profile_callback(callback: CallbackQuery, state: FSMContext):
     builder.button(text="🔙 Главное меню", callback_data="main_menu")
     builder.adjust(1)
     
-    # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-    max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-    
-    if len(details_text) > max_message_length:
-        # Разбиваем детальный профиль на части
-        parts = []
-        current_part = ""
-        for line in details_text.split('\n'):
-            if len(current_part) + len(line) + 1 <= max_message_length:
-                current_part += line + '\n'
-            else:
-                parts.append(current_part)
-                current_part = line + '\n'
-        if current_part:
-            parts.append(current_part)
-        
-        # Отправляем части профиля
-        for i, part in enumerate(parts):
-            # Добавляем кнопки только к последней части
-            if i == len(parts) - 1:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML",
-                    reply_markup=builder.as_markup()
-                )
-            else:
-                await callback.message.answer(
-                    part,
-                    parse_mode="HTML"
-                )
-    else:
-        # Отправляем профиль
-        await callback.message.answer(
-            details_text,
-            parse_mode="HTML",
-            reply_markup=builder.as_markup()
-        )
+    # Длинный профиль отправляется частями, кнопки - у последней части
+    await answer_long_message(callback.message, details_text, reply_markup=builder.as_markup())
     
     # Возвращаем основную клавиатуру
     await callback.message.answer(
@@ -939,43 +779,8 @@ async def command_profile(message: Message, state: FSMContext):
         builder.button(text="◀️ Вернуться в меню", callback_data="main_menu")
         builder.adjust(1)
         
-        # Проверяем, не слишком ли длинный профиль для отправки в одном сообщении
-        max_message_length = 4000  # Telegram ограничивает сообщения примерно до 4096 символов
-        
-        if len(profile_text) > max_message_length:
-            # Разбиваем детальный профиль на части
-            parts = []
-            current_part = ""
-            for line in profile_text.split('\n'):
-                if len(current_part) + len(line) + 1 <= max_message_length:
-                    current_part += line + '\n'
-                else:
-                    parts.append(current_part)
-                    current_part = line + '\n'
-            if current_part:
-                parts.append(current_part)
-            
-            # Отправляем части профиля
-            for i, part in enumerate(parts):
-                # Добавляем кнопки только к последней части
-                if i == len(parts) - 1:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML",
-                        reply_markup=builder.as_markup()
-                    )
-                else:
-                    await message.answer(
-                        part,
-                        parse_mode="HTML"
-                    )
-        else:
-            # Отправляем профиль
-            await message.answer(
-                profile_text,
-                parse_mode="HTML",
-                reply_markup=builder.as_markup()
-            )
+        # Длинный профиль отправляется частями, кнопки - у последней части
+        await answer_long_message(message, profile_text, reply_markup=builder.as_markup())
         
         # Сохраняем информацию о профиле в состоянии
         await state.update_data(
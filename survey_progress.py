@@ -0,0 +1,157 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from db_utils import (
+    queue_survey_answer, queue_survey_progress, queue_survey_reset,
+    get_survey_progress
+)
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Максимальное количество опросов, которые держатся в памяти
+MAX_CACHED_SESSIONS = 10000
+
+class SurveySession:
+    """
+    Прогресс прохождения опроса одним пользователем.
+    """
+    __slots__ = ("question_index", "is_demo_questions", "waiting_for_vasini_confirmation", "answers")
+
+    def __init__(self, question_index: int = 0, is_demo_questions: bool = True,
+                 waiting_for_vasini_confirmation: bool = False, answers: Optional[Dict[str, str]] = None):
+        self.question_index = question_index
+        self.is_demo_questions = is_demo_questions
+        self.waiting_for_vasini_confirmation = waiting_for_vasini_confirmation
+        self.answers: Dict[str, str] = answers if answers is not None else {}
+
+class SurveyProgressStore:
+    """
+    Хранилище прогресса опроса с записью после каждого ответа.
+
+    Каждый ответ сразу ставится в очередь пакетной записи в таблицы
+    survey_answers и survey_progress (одна строка ответа и одна строка
+    позиции), поэтому стоимость записи не растет с числом ответов, а после
+    перезапуска бота опрос продолжается с того же вопроса. Активные опросы
+    держатся в памяти, база читается только при промахе кэша.
+    """
+
+    def __init__(self, max_sessions: int = MAX_CACHED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[int, SurveySession]" = OrderedDict()
+
+    def get_cached(self, user_id: int) -> Optional[SurveySession]:
+        """
+        Возвращает прогресс опроса из памяти без обращения к базе данных.
+
+        Args:
+            user_id: ID пользователя в Telegram
+
+        Returns:
+            Optional[SurveySession]: Прогресс опроса или None, если его нет в памяти
+        """
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self._sessions.move_to_end(user_id)
+        return session
+
+    async def load(self, user_id: int) -> Optional[SurveySession]:
+        """
+        Возвращает прогресс опроса, при необходимости загружая его из базы данных.
+
+        Args:
+            user_id: ID пользователя в Telegram
+
+        Returns:
+            Optional[SurveySession]: Прогресс опроса или None, если опрос не начат
+        """
+        session = self.get_cached(user_id)
+        if session is not None:
+            return session
+
+        progress, answers = await get_survey_progress(user_id)
+        if progress is None:
+            return None
+
+        session = SurveySession(answers=answers, **progress)
+        self._remember(user_id, session)
+        logger.info(f"Прогресс опроса пользователя {user_id} восстановлен: {len(answers)} ответов")
+        return session
+
+    def start(self, user_id: int, session: Optional[SurveySession] = None) -> SurveySession:
+        """
+        Начинает новый опрос, удаляя предыдущий прогресс пользователя.
+
+        Args:
+            user_id: ID пользователя в Telegram
+            session: Начальный прогресс (например, перенесенный из старых данных FSM)
+
+        Returns:
+            SurveySession: Прогресс нового опроса
+        """
+        session = session or SurveySession()
+        queue_survey_reset(user_id)
+        for question_id, answer in session.answers.items():
+            queue_survey_answer(user_id, question_id, answer, session.question_index, session.is_demo_questions,
+                                session.waiting_for_vasini_confirmation)
+        queue_survey_progress(user_id, session.question_index, session.is_demo_questions,
+                              session.waiting_for_vasini_confirmation)
+        self._remember(user_id, session)
+        return session
+
+    def record_answer(self, user_id: int, session: SurveySession, question_id: str, answer: str) -> None:
+        """
+        Сохраняет ответ и текущую позицию в опросе.
+
+        Позиция в session должна быть уже переведена на следующий вопрос.
+
+        Args:
+            user_id: ID пользователя в Telegram
+            session: Прогресс опроса
+            question_id: ID вопроса
+            answer: Ответ пользователя
+        """
+        session.answers[question_id] = answer
+        queue_survey_answer(user_id, question_id, answer, session.question_index, session.is_demo_questions,
+                            session.waiting_for_vasini_confirmation)
+
+    def save_position(self, user_id: int, session: SurveySession) -> None:
+        """
+        Сохраняет текущую позицию в опросе без нового ответа.
+
+        Args:
+            user_id: ID пользователя в Telegram
+            session: Прогресс опроса
+        """
+        queue_survey_progress(user_id, session.question_index, session.is_demo_questions,
+                              session.waiting_for_vasini_confirmation)
+
+    def finish(self, user_id: int) -> None:
+        """
+        Отмечает опрос завершенным: позиция удаляется, ответы остаются в базе.
+
+        Args:
+            user_id: ID пользователя в Telegram
+        """
+        self._sessions.pop(user_id, None)
+        queue_survey_reset(user_id, keep_answers=True)
+
+    def discard(self, user_id: int) -> None:
+        """
+        Удаляет прогресс и ответы незавершенного опроса.
+
+        Args:
+            user_id: ID пользователя в Telegram
+        """
+        self._sessions.pop(user_id, None)
+        queue_survey_reset(user_id)
+
+    def _remember(self, user_id: int, session: SurveySession) -> None:
+        self._sessions[user_id] = session
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+# Общее хранилище прогресса опроса
+survey_progress = SurveyProgressStore()
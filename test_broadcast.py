@@ -0,0 +1,138 @@
+"""
+Тест рассылки: постраничный перебор получателей, сохранение прогресса, пауза и учет заблокировавших бота.
+"""
+
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+import aiosqlite
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+import db_utils
+import broadcast_handler
+from services import outbound
+
+class FakeBot:
+    """Заглушка бота: запоминает получателей, пользователи с ID, кратным 10, заблокировали бота."""
+
+    def __init__(self):
+        self.received = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id % 10 == 0:
+            raise TelegramForbiddenError(SendMessage(chat_id=chat_id, text=text), "bot was blocked by the user")
+        self.received.append(chat_id)
+
+def test_broadcast_resumes_from_checkpoint():
+    """Проверяет, что после паузы рассылка продолжается с места остановки и никому не приходит дважды."""
+    async def scenario():
+        async with aiosqlite.connect(db_utils.DB_PATH) as db:
+            await db.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT, full_name TEXT)")
+            await db.executemany("INSERT INTO users (user_id) VALUES (?)", [(user_id,) for user_id in range(1, 251)])
+            await db.commit()
+
+        bot = FakeBot()
+        broadcast_id = await db_utils.create_broadcast(1, "<b>Новости</b>")
+        assert (await db_utils.get_broadcast(broadcast_id))["total"] == 250
+
+        # Пауза после первой страницы
+        async def pause(progress):
+            await db_utils.set_broadcast_status(broadcast_id, "paused")
+
+        campaign = await broadcast_handler.run_broadcast(bot, broadcast_id, pause)
+        assert campaign["status"] == "paused"
+        assert campaign["last_user_id"] == broadcast_handler.BROADCAST_BATCH_SIZE
+        assert len(bot.received) == 90
+
+        campaign = await broadcast_handler.run_broadcast(bot, broadcast_id)
+        assert campaign["status"] == "done"
+        assert sorted(bot.received) == [user_id for user_id in range(1, 251) if user_id % 10]
+        assert (campaign["sent"], campaign["blocked"], campaign["failed"]) == (225, 25, 0)
+        assert "100%" in broadcast_handler.format_broadcast_report(campaign)
+
+        # Заблокировавшие бота в следующую рассылку не попадают
+        next_id = await db_utils.create_broadcast(1, "Еще новости")
+        assert (await db_utils.get_broadcast(next_id))["total"] == 225
+        await outbound.get_outbound_queue().close()
+
+    original_queue = outbound._outbound
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._broadcasts_ready = False
+        db_utils._reminders_ready = False
+        outbound._outbound = outbound.OutboundQueue(global_rate=100000, chat_rate=100, workers=20)
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._broadcasts_ready = False
+            db_utils._reminders_ready = False
+            outbound._outbound = original_queue
+
+def test_status_commands_check_current_status():
+    """Проверяет, что пауза, отмена и удаление черновика меняют статус только из допустимых."""
+    answers = []
+    admin = SimpleNamespace(id=broadcast_handler.BROADCAST_ADMIN_IDS[0])
+
+    async def answer(text, **kwargs):
+        answers.append(text)
+
+    def command(text):
+        return SimpleNamespace(from_user=admin, text=text, answer=answer)
+
+    async def edit_text(text, **kwargs):
+        answers.append(text)
+
+    def drop(broadcast_id):
+        return SimpleNamespace(from_user=admin, data=f"broadcast_drop_{broadcast_id}", answer=answer,
+                               message=SimpleNamespace(edit_text=edit_text))
+
+    async def status(broadcast_id):
+        return (await db_utils.get_broadcast(broadcast_id))["status"]
+
+    async def scenario():
+        async with aiosqlite.connect(db_utils.DB_PATH) as db:
+            await db.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT, full_name TEXT)")
+            await db.commit()
+        first = await db_utils.create_broadcast(1, "Новости")
+        second = await db_utils.create_broadcast(1, "Еще новости")
+
+        # Черновик нельзя поставить на паузу, но можно отменить
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_pause {first}"))
+        assert await status(first) == "draft" and "в статусе draft" in answers[-1]
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_cancel {first}"))
+        assert await status(first) == "cancelled"
+
+        # Отмененную рассылку нельзя отменить повторно, удалить кнопкой или поставить на паузу
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_cancel {first}"))
+        await broadcast_handler.drop_broadcast_callback(drop(first))
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_pause {first}"))
+        assert all("cancelled" in text for text in answers[-3:])
+
+        # Завершенную рассылку кнопка удаления черновика не отменяет
+        await db_utils.set_broadcast_status(second, "done")
+        await broadcast_handler.drop_broadcast_callback(drop(second))
+        assert await status(second) == "done" and "done" in answers[-1]
+
+        # Выполняющуюся рассылку можно поставить на паузу и отменить с паузы
+        await db_utils.set_broadcast_status(second, "running")
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_pause {second}"))
+        assert await status(second) == "paused"
+        await broadcast_handler.cmd_broadcast_stop(command(f"/broadcast_cancel {second}"))
+        assert await status(second) == "cancelled"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._broadcasts_ready = False
+        db_utils._reminders_ready = False
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._broadcasts_ready = False
+            db_utils._reminders_ready = False
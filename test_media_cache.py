@@ -0,0 +1,57 @@
+"""
+Тест кэша file_id: повторная отправка без загрузки и сброс только недействительного file_id.
+"""
+
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendVoice
+
+import db_utils
+import media_cache
+
+def test_send_cached_media():
+    """Проверяет, что file_id сбрасывается при ошибке ссылки на файл, но не при других ошибках."""
+    method = SendVoice(chat_id=1, voice="file")
+    uploads = []
+    errors = []
+
+    async def send(voice, **kwargs):
+        if errors:
+            raise TelegramBadRequest(method, errors.pop(0))
+        if isinstance(voice, str):
+            return SimpleNamespace(voice=SimpleNamespace(file_id=voice, file_unique_id="unique"))
+        uploads.append(voice)
+        return SimpleNamespace(voice=SimpleNamespace(file_id=f"file-{len(uploads)}", file_unique_id="unique"))
+
+    async def scenario():
+        make_file = lambda: object()
+        await media_cache.send_cached_media(send, "voice", "hash", make_file)
+        message = await media_cache.send_cached_media(send, "voice", "hash", make_file)
+        assert message.voice.file_id == "file-1" and len(uploads) == 1
+
+        # Ошибка не из-за file_id передается вызывающему, а file_id сохраняется
+        errors.append("Bad Request: message caption is too long")
+        with pytest.raises(TelegramBadRequest):
+            await media_cache.send_cached_media(send, "voice", "hash", make_file)
+        assert await db_utils.get_telegram_file_id("hash", "voice") == "file-1"
+
+        # Недействительный file_id удаляется, и файл загружается заново
+        errors.append("Bad Request: wrong file identifier/HTTP URL specified")
+        message = await media_cache.send_cached_media(send, "voice", "hash", make_file)
+        assert message.voice.file_id == "file-2" and len(uploads) == 2
+        assert await db_utils.get_telegram_file_id("hash", "voice") == "file-2"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        media_cache._file_ids.clear()
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            media_cache._file_ids.clear()
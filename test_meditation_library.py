@@ -0,0 +1,127 @@
+"""
+Тест библиотеки готовых медитаций: выбор варианта, отчет о покрытии и удаление недоступных файлов.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import db_utils
+import meditation_handler
+import meditation_library
+import services.tts
+from meditation_library import build_meditation_library, get_library_meditation, get_library_report, library_slots
+
+def test_meditation_library():
+    """Проверяет выдачу медитаций из библиотеки и отчет о ее покрытии."""
+    async def scenario(tmp_dir):
+        audio_path = os.path.join(tmp_dir, "relax.mp3")
+        with open(audio_path, "wb") as f:
+            f.write(b"mp3")
+        
+        first = await db_utils.add_meditation_library_item("relax", "Аналитический тип", "short", "Текст", audio_path, 3)
+        second = await db_utils.add_meditation_library_item("relax", "Аналитический тип", "short", "Текст", audio_path, 3)
+        await db_utils.add_meditation_library_item("sleep", "Аналитический тип", "medium", "Текст", os.path.join(tmp_dir, "missing.mp3"), 3)
+        
+        # Любой тип личности получает медитацию для типа по умолчанию, варианты чередуются
+        served = set()
+        for personality_type in ("Интеллектуальный", "Творческий тип"):
+            item, audio = await get_library_meditation("relax", personality_type, "short")
+            assert audio == b"mp3"
+            served.add(item["id"])
+        assert served == {first, second}
+        
+        assert await get_library_meditation("focus", "Аналитический тип", "short") is None
+        
+        # Сочетания - только типы медитаций обработчика с их длительностью
+        assert library_slots() == [(key, "Аналитический тип", kind.duration) for key, kind in meditation_handler.MEDITATION_KINDS.items()]
+        report = await get_library_report()
+        assert report["slots"] == 3
+        assert report["covered"] == report["fresh"] == 2
+        assert report["served"] == 2
+        
+        # Медитация с недоступным файлом удаляется из библиотеки
+        assert await get_library_meditation("sleep", "Аналитический тип", "medium") is None
+        assert (await get_library_report())["covered"] == 1
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        try:
+            asyncio.run(scenario(tmp_dir))
+        finally:
+            db_utils.DB_PATH = original_path
+
+def test_build_skips_failed_text():
+    """Проверяет, что без текста от OpenAI медитации не озвучиваются и не попадают в библиотеку."""
+    requests = []
+    synthesized = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        raise RuntimeError("Error code: 429 - insufficient_quota" if len(requests) > 2 else "Connection error")
+
+    async def fake_synthesize(text):
+        synthesized.append(text)
+        return b"mp3"
+
+    original_client = meditation_handler.client
+    original_synthesize = services.tts.synthesize_text
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        meditation_handler.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        services.tts.synthesize_text = fake_synthesize
+        try:
+            # Медитация сочетания, которое обработчик не запрашивает, удаляется при сборке
+            unused_path = os.path.join(tmp_dir, "unused.mp3")
+            with open(unused_path, "wb") as f:
+                f.write(b"mp3")
+            asyncio.run(db_utils.add_meditation_library_item("relax", "Творческий тип", "long", "Текст", unused_path, 3))
+            
+            # Ошибки сети пропускают сочетание, ошибка квоты останавливает сборку
+            assert asyncio.run(build_meditation_library(limit=10)) == 0
+            assert len(requests) == 3
+            assert synthesized == []
+            assert asyncio.run(get_library_report())["variants"] == 0
+            assert not os.path.exists(unused_path)
+        finally:
+            db_utils.DB_PATH = original_path
+            meditation_handler.client = original_client
+            services.tts.synthesize_text = original_synthesize
+
+def test_remove_orphan_files():
+    """Проверяет, что уборщик удаляет только старые файлы без записи в библиотеке."""
+    async def scenario(tmp_dir):
+        known, orphan, fresh = (os.path.join(tmp_dir, name) for name in ("known.mp3", "orphan.mp3", "fresh.mp3"))
+        for path in (known, orphan, fresh):
+            with open(path, "wb") as f:
+                f.write(b"mp3")
+        for path in (known, orphan):
+            os.utime(path, (time.time() - 7200, time.time() - 7200))
+        
+        # Пустая библиотека: файлы не трогаются
+        assert await meditation_library.remove_orphan_files() == 0
+        
+        await db_utils.add_meditation_library_item("relax", "Аналитический тип", "short", "Текст", known, 3)
+        assert await meditation_library.remove_orphan_files() == 1
+        assert os.path.exists(known) and os.path.exists(fresh) and not os.path.exists(orphan)
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        original_dir = meditation_library.MEDITATION_LIBRARY_DIR
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        meditation_library.MEDITATION_LIBRARY_DIR = tmp_dir
+        try:
+            asyncio.run(scenario(tmp_dir))
+        finally:
+            db_utils.DB_PATH = original_path
+            meditation_library.MEDITATION_LIBRARY_DIR = original_dir
+
+if __name__ == "__main__":
+    test_meditation_library()
+    test_build_skips_failed_text()
+    test_remove_orphan_files()
+    print("Тест библиотеки медитаций пройден")
@@ -0,0 +1,149 @@
+"""
+Тест конвейера медитаций: порядок этапов, остановка, обработка ошибок и замер времени.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from meditation_pipeline import MeditationPipeline, MeditationRequest
+
+def test_meditation_pipeline():
+    """Проверяет, что этапы выполняются по порядку, а очистка и замер времени происходят всегда."""
+    calls = []
+    errors = []
+    
+    def stage(name, result=None, error=None):
+        async def run(request):
+            calls.append(name)
+            request.mark(f"after_{name}")
+            if error:
+                raise error
+            return result
+        return run
+    
+    async def on_error(request, error):
+        errors.append(str(error))
+    
+    def make_request():
+        return MeditationRequest(SimpleNamespace(from_user=SimpleNamespace(id=7)), None, "relax")
+    
+    async def scenario():
+        pipeline = MeditationPipeline(
+            [("quota", stage("quota")), ("text", stage("text")), ("delivery", stage("delivery"))],
+            cleanup=stage("cleanup"), on_error=on_error
+        )
+        request = make_request()
+        assert await pipeline.run(request)
+        assert calls == ["quota", "text", "delivery", "cleanup"]
+        assert list(request.timings) == ["quota", "text", "delivery", "cleanup"]
+        assert request.user_id == 7 and "after_delivery" in request.milestones
+        
+        # Этап, вернувший False, останавливает конвейер, но очистка выполняется
+        calls.clear()
+        stopped = MeditationPipeline([("quota", stage("quota", result=False)), ("text", stage("text"))], cleanup=stage("cleanup"))
+        assert not await stopped.run(make_request())
+        assert calls == ["quota", "cleanup"]
+        
+        # Ошибка этапа передается в on_error, а время этапа все равно записывается
+        calls.clear()
+        failing = MeditationPipeline([("text", stage("text", error=RuntimeError("сбой")))], cleanup=stage("cleanup"), on_error=on_error)
+        request = make_request()
+        assert not await failing.run(request)
+        assert errors == ["сбой"] and calls == ["text", "cleanup"] and "text" in request.timings
+        
+        assert pipeline.get_stage_stats()["quota"]["count"] == 1
+    
+    asyncio.run(scenario())
+
+def test_work_timings():
+    """Проверяет, что время генерации и озвучки записывается по частям, а не на этапе подготовки."""
+    import meditation_handler
+    
+    async def segments():
+        for text in ("Первая часть", "Вторая часть"):
+            await asyncio.sleep(0.02)
+            yield text
+    
+    async def fake_synthesize(text, user_id, kind):
+        await asyncio.sleep(0.01)
+        return text.encode(), None
+    
+    async def deliver(request):
+        request.segments = segments()
+        request.audio_parts = meditation_handler.synthesize_segments(request)
+        assert [audio async for _, audio, _ in request.audio_parts] == ["Первая часть".encode(), "Вторая часть".encode()]
+    
+    original = meditation_handler.synthesize_audio
+    meditation_handler.synthesize_audio = fake_synthesize
+    try:
+        kind = SimpleNamespace(key="relax")
+        request = MeditationRequest(SimpleNamespace(from_user=SimpleNamespace(id=7)), None, kind)
+        pipeline = MeditationPipeline([("delivery", deliver)])
+        assert asyncio.run(pipeline.run(request))
+    finally:
+        meditation_handler.synthesize_audio = original
+    
+    assert len(request.work["llm"]) == len(request.work["tts"]) == 2
+    assert min(request.work["llm"]) >= 0.015 and min(request.work["tts"]) >= 0.005
+    assert {"first_text", "first_audio"} <= set(request.milestones)
+    stats = pipeline.get_stage_stats()
+    assert stats["tts"]["count"] == 2 and stats["delivery"]["count"] == 1
+
+def test_delivery_fallback():
+    """Проверяет, что новая медитация генерируется только если из библиотеки ничего не доставлено."""
+    import meditation_handler
+    
+    sent = []
+    answers = []
+    
+    async def fake_answer_voice_bytes(message, audio, filename, caption):
+        if audio in (b"library", b"broken"):
+            raise RuntimeError("Bad Request")
+        sent.append(audio)
+    
+    async def answer(text, **kwargs):
+        answers.append(text)
+    
+    async def parts(*items):
+        for item in items:
+            yield item
+    
+    def make_request():
+        callback = SimpleNamespace(from_user=SimpleNamespace(id=7), message=SimpleNamespace(answer=answer))
+        return MeditationRequest(callback, None, SimpleNamespace(key="relax", caption="Медитация", duration="short"))
+    
+    async def scenario():
+        # Готовую медитацию отправить не удалось: отправляется сгенерированная
+        request = make_request()
+        request.library_item_id = 1
+        request.audio_parts = parts(("", b"library", None))
+        await meditation_handler.deliver_stage(request)
+        assert request.library_item_id is None and request.delivered_parts == 2
+        assert sent == [b"a", b"b"] and answers == []
+        
+        # После отправленной части ошибка не запускает новую медитацию, остаток идет текстом
+        sent.clear()
+        request = make_request()
+        request.audio_parts = parts(("Первая", b"a", None), ("Вторая", b"broken", None), ("Третья", b"c", None))
+        await meditation_handler.deliver_stage(request)
+        assert sent == [b"a"] and request.delivered_parts == 1
+        assert len(answers) == 1 and "Вторая\n\nТретья" in answers[0]
+    
+    original_answer = meditation_handler.answer_voice_bytes
+    original_synthesize = meditation_handler.synthesize_segments
+    original_stream = meditation_handler.stream_personalized_meditation
+    meditation_handler.answer_voice_bytes = fake_answer_voice_bytes
+    meditation_handler.synthesize_segments = lambda request: parts(("Первая", b"a", None), ("Вторая", b"b", None))
+    meditation_handler.stream_personalized_meditation = lambda profile, duration: parts()
+    try:
+        asyncio.run(scenario())
+    finally:
+        meditation_handler.answer_voice_bytes = original_answer
+        meditation_handler.synthesize_segments = original_synthesize
+        meditation_handler.stream_personalized_meditation = original_stream
+
+if __name__ == "__main__":
+    test_meditation_pipeline()
+    test_work_timings()
+    test_delivery_fallback()
+    print("Тест конвейера медитаций пройден")
@@ -0,0 +1,97 @@
+"""
+Тест очереди исходящих сообщений: лимиты скорости, приоритеты и повтор после RetryAfter.
+"""
+
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramForbiddenError, TelegramNetworkError
+from aiogram.methods import SendMessage
+
+import pytest
+
+from services.outbound import (
+    OutboundQueue, TokenBucket, PRIORITY_INTERACTIVE, PRIORITY_REMINDER, PRIORITY_BROADCAST
+)
+
+def test_token_bucket():
+    """Проверяет серию подряд и задержку после исчерпания токенов."""
+    bucket = TokenBucket(rate=2, capacity=2)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0
+    assert bucket.reserve(now) == 0
+    assert bucket.reserve(now) == pytest.approx(0.5)
+    assert bucket.reserve(now + 0.5) == pytest.approx(0.5)
+
+def test_outbound_queue_priorities_and_retry_after():
+    """Проверяет, что ответы обгоняют рассылку, RetryAfter повторяется, а блокировка бота - нет."""
+    method = SendMessage(chat_id=1, text="")
+    sent = []
+    flooded = []
+
+    async def deliver(label, chat_id):
+        if label == "flood" and not flooded:
+            flooded.append(label)
+            raise TelegramRetryAfter(method, "Too Many Requests", 0)
+        if label == "blocked":
+            raise TelegramForbiddenError(method, "bot was blocked by the user")
+        sent.append(label)
+        return label
+
+    async def scenario():
+        queue = OutboundQueue(global_rate=50, chat_rate=1, chat_burst=1, workers=1)
+        started = time.monotonic()
+
+        broadcasts = [
+            asyncio.ensure_future(queue.send(100 + i, lambda i=i: deliver(f"broadcast{i}", 100 + i), PRIORITY_BROADCAST))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        reminder = asyncio.ensure_future(queue.send(200, lambda: deliver("flood", 200), PRIORITY_REMINDER))
+        reply = asyncio.ensure_future(queue.send(300, lambda: deliver("reply", 300), PRIORITY_INTERACTIVE))
+        assert await reply == "reply"
+        assert await reminder == "flood"
+        await asyncio.gather(*broadcasts)
+
+        # Первая рассылка успела уйти, дальше ответ и напоминание обогнали остальные
+        assert sent[:3] == ["broadcast0", "reply", "flood"]
+
+        # Второе сообщение в тот же чат ждет лимита чата (1 в секунду)
+        await queue.send(300, lambda: deliver("reply2", 300))
+        assert time.monotonic() - started >= 0.9
+
+        with pytest.raises(TelegramForbiddenError):
+            await queue.send(400, lambda: deliver("blocked", 400), PRIORITY_BROADCAST)
+
+        stats = queue.get_stats()
+        assert stats["sent"] == {"interactive": 2, "reminder": 1, "broadcast": 5}
+        assert stats["flood_waits"] == 1
+        assert stats["retried"] == 1
+        assert stats["failed"] == 1
+        assert sum(stats["queued"].values()) == 0
+        await queue.close()
+
+    asyncio.run(scenario())
+
+def test_outbound_queue_close_cancels_unfinished():
+    """Проверяет, что при остановке вызывающие не зависают на прерванной отправке и отложенном повторе."""
+    method = SendMessage(chat_id=1, text="")
+
+    async def hang():
+        await asyncio.sleep(60)
+
+    async def network_error():
+        raise TelegramNetworkError(method, "Connection reset")
+
+    async def scenario():
+        queue = OutboundQueue(global_rate=50, workers=2)
+        hanging = asyncio.ensure_future(queue.send(1, hang))
+        delayed = asyncio.ensure_future(queue.send(2, network_error))
+        await asyncio.sleep(0.05)
+        await queue.close(timeout=0.1)
+        await asyncio.sleep(0)
+
+        for future in (hanging, delayed):
+            assert future.cancelled()
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+"""
+Тест определения типа личности: одиночный расчет и векторный расчет для группы пользователей.
+"""
+
+from personality_scoring import score_answers, score_population
+
+def test_personality_scoring():
+    """Проверяет, что одиночный и групповой расчет дают одинаковые результаты."""
+    users = {
+        1: {"name": "Анна", "vasini_1": "A", "vasini_2": "A", "vasini_3": "B"},
+        2: {"vasini_1": "C", "vasini_2": "D", "vasini_3": "C", "vasini_4": "D"},
+        3: {"vasini_1": "B", "vasini_2": "B", "vasini_3": "B", "vasini_4": "A"},
+    }
+    
+    # Основной тип и дополнительный тип при близких счетчиках
+    assert score_answers(users[2]) == ({"A": 0, "B": 0, "C": 2, "D": 2}, "Практический тип", "Творческий тип")
+    # Дополнительный тип не учитывается, если сильно отстает
+    assert score_answers(users[3])[2] is None
+    # Без ответов используется тип по умолчанию
+    assert score_answers({"name": "Анна"}) == ({"A": 0, "B": 0, "C": 0, "D": 0}, "Аналитический тип", None)
+    
+    # Изменение возвращенных счетчиков не портит запомненный результат
+    score_answers(users[1])[0]["A"] = 100
+    assert score_answers(users[1])[0]["A"] == 2
+    
+    rows = [(user_id, question_id, answer) for user_id, answers in users.items() for question_id, answer in answers.items()]
+    population = score_population(rows)
+    assert len(population) == 3
+    for user_id, type_counts, primary_type, secondary_type in population:
+        assert (type_counts, primary_type, secondary_type) == score_answers(users[user_id])
+    
+    assert population.type_distribution()["Эмпатический тип"] == 1
+    assert len(score_population([])) == 0
+
+if __name__ == "__main__":
+    test_personality_scoring()
+    print("Тест определения типа личности пройден")
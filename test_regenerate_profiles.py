@@ -0,0 +1,105 @@
+"""
+Тест пакетной перегенерации профилей: продолжение по контрольной точке и сброс при изменении промта.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+import aiosqlite
+
+import db_utils
+import profile_generator
+from regenerate_profiles import Checkpoint, Throughput, get_prompt_fingerprint, run_online
+from question_bank import QUESTION_BANK_PATH
+
+class FakeCompletions:
+    """Заменяет запросы к OpenAI и запоминает, сколько раз они выполнялись."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content="КРАТКИЙ ПРОФИЛЬ\nТест\nПОЛНЫЙ ПРОФИЛЬ\nИмя: Тест")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def test_fingerprint_includes_question_bank():
+    """Проверяет, что изменение банка вопросов меняет отпечаток промта."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bank_path = os.path.join(tmp_dir, "question_bank.jsonl")
+        shutil.copyfile(QUESTION_BANK_PATH, bank_path)
+        assert get_prompt_fingerprint(bank_path) == get_prompt_fingerprint()
+
+        with open(bank_path, "a", encoding="utf-8") as f:
+            f.write("\n")
+        assert get_prompt_fingerprint(bank_path) != get_prompt_fingerprint()
+
+def test_resume_and_reset_by_fingerprint():
+    """Проверяет, что обработанные пользователи пропускаются, а при другом промте обрабатываются заново."""
+    completions = FakeCompletions()
+    args = argparse.Namespace(concurrency=2, batch_size=2, user_id=None, limit=0, dry_run=False)
+
+    async def run(checkpoint: Checkpoint) -> Throughput:
+        stats = Throughput(report_interval=3600)
+        await run_online(args, checkpoint, stats)
+        checkpoint.save()
+        return stats
+
+    async def scenario(checkpoint_path: str):
+        # Таблица старой схемы, которая есть в рабочей базе
+        async with aiosqlite.connect(db_utils.DB_PATH) as db:
+            await db.execute("CREATE TABLE user_answers (user_id INTEGER, question_id INTEGER, option_id INTEGER, answer_text TEXT)")
+            await db.commit()
+
+        for user_id in (1, 2, 3):
+            await db_utils.save_user_state(user_id, "", {"answers": {"name": f"user{user_id}"}, "profile_completed": True})
+
+        # Пользователь 4 проходит опрос: его неполные ответы не отправляются в модель
+        await db_utils.save_user_state(4, "", {"answers": {"name": "user4"}})
+        db_utils.queue_survey_answer(4, "q1", "Ответ", 1, True)
+        await db_utils.db_writer.flush()
+
+        # Первый запуск "прерван" после пользователя 1
+        checkpoint = Checkpoint(checkpoint_path, get_prompt_fingerprint())
+        checkpoint.mark_done(1)
+        checkpoint.save()
+
+        checkpoint = Checkpoint(checkpoint_path, get_prompt_fingerprint())
+        checkpoint.load()
+        stats = await run(checkpoint)
+        assert (stats.ok, stats.skipped, completions.calls) == (2, 1, 2)
+        assert checkpoint.done == {1, 2, 3}
+
+        profile_text, _ = await db_utils.get_profile_data(2)
+        assert "ПОЛНЫЙ ПРОФИЛЬ" in profile_text
+        assert (await db_utils.get_profile_data(4))[0] is None
+
+        # Повторный запуск с тем же промтом ничего не делает
+        checkpoint = Checkpoint(checkpoint_path, get_prompt_fingerprint())
+        checkpoint.load()
+        stats = await run(checkpoint)
+        assert (stats.ok, stats.skipped, completions.calls) == (0, 3, 2)
+
+        # Контрольная точка другого промта не используется
+        checkpoint = Checkpoint(checkpoint_path, "other-prompt")
+        checkpoint.load()
+        assert checkpoint.done == set()
+        stats = await run(checkpoint)
+        assert (stats.ok, stats.skipped, completions.calls) == (3, 0, 5)
+
+        await db_utils.db_writer.close()
+
+    original_client = profile_generator.client
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        profile_generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        try:
+            asyncio.run(scenario(os.path.join(tmp_dir, "checkpoint.json")))
+        finally:
+            db_utils.DB_PATH = original_path
+            profile_generator.client = original_client
@@ -0,0 +1,79 @@
+"""
+Тест подготовки текстов напоминаний: ограничение одновременных запросов, продолжение после сбоя и выбор текста.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import date
+
+import db_utils
+import meditation_handler
+import reminder_copy
+
+class FakeCompletions:
+    """Заглушка chat.completions: считает одновременные запросы и может падать на части запросов."""
+
+    def __init__(self, fail_every: int = 0):
+        self.fail_every = fail_every
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, model, temperature, messages):
+        self.calls += 1
+        call = self.calls
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.001)
+            if self.fail_every and call % self.fail_every == 0:
+                raise RuntimeError("Connection reset")
+            text = f"Текст <{call}>: {messages[1]['content'][:20]}"
+            message = type("Message", (), {"content": text})
+            choice = type("Choice", (), {"message": message})
+            return type("Response", (), {"choices": [choice]})
+        finally:
+            self.active -= 1
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})
+
+def test_build_reminder_copy_resumes():
+    """Проверяет, что повторный запуск создает только недостающие тексты и что выбор берет текст нужного дня."""
+    today = date(2026, 10, 21)  # среда
+    slots = len(reminder_copy.copy_slots()) * reminder_copy.REMINDER_COPY_WEEKS
+
+    async def scenario():
+        completions = FakeCompletions(fail_every=5)
+        meditation_handler.client = FakeClient(completions)
+        built = await reminder_copy.build_reminder_copy(today, concurrency=3)
+        assert completions.max_active <= 3
+        assert built == slots - slots // 5
+
+        # Повторный запуск создает только тексты, которые не удалось создать
+        completions = FakeCompletions()
+        meditation_handler.client = FakeClient(completions)
+        assert await reminder_copy.build_reminder_copy(today, concurrency=3) == slots // 5
+        assert completions.calls == slots // 5
+        assert await reminder_copy.build_reminder_copy(today) == 0
+
+        week = await db_utils.get_reminder_copy("2026-10-19")
+        text = await reminder_copy.get_reminder_text("Творческий тип", today)
+        assert text == week[("Творческий тип", 2)]
+        # Неизвестный тип личности получает текст типа по умолчанию, неделя без текстов - общий текст
+        assert await reminder_copy.get_reminder_text(None, today) == week[("Аналитический тип", 2)]
+        assert await reminder_copy.get_reminder_text(None, date(2027, 1, 6)) == reminder_copy.DEFAULT_REMINDER_TEXT
+        assert "&lt;" in reminder_copy.format_reminder(text)
+
+    original_client = meditation_handler.client
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            meditation_handler.client = original_client
+            reminder_copy._copy_cache.clear()
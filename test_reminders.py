@@ -0,0 +1,102 @@
+"""
+Тест рассылки напоминаний: индекс срабатываний в базе, часовые пояса пользователей и одна задача планировщика.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import db_utils
+import reminder_handler
+from timezones import parse_timezone, next_fire_time
+
+def test_parse_timezone():
+    """Проверяет распознавание ответов на вопрос о часовом поясе."""
+    assert parse_timezone("UTC+3 для Москвы") == "Europe/Moscow"
+    assert parse_timezone("Живу в Новосибирске") == "Asia/Novosibirsk"
+    assert parse_timezone("МСК+2") == "Etc/GMT-5"
+    assert parse_timezone("GMT-5") == "Etc/GMT+5"
+    assert parse_timezone("+05:30") == "Asia/Kolkata"
+    assert parse_timezone("Europe/Berlin") == "Europe/Berlin"
+    assert parse_timezone("не знаю") is None
+
+def test_next_fire_time_dst():
+    """Проверяет, что время в ночь перевода часов сдвигается вперед, а не теряется."""
+    # 29 марта 2026 в Берлине часы переводятся с 02:00 на 03:00
+    after = datetime(2026, 3, 28, 12, 0, tzinfo=timezone.utc)
+    fire_at = next_fire_time("02:30", ["sun"], "Europe/Berlin", after)
+    assert fire_at == datetime(2026, 3, 29, 1, 30, tzinfo=timezone.utc)
+    # После перевода то же местное время - на час раньше по UTC
+    fire_at = next_fire_time("02:30", ["sun"], "Europe/Berlin", fire_at)
+    assert fire_at == datetime(2026, 4, 5, 0, 30, tzinfo=timezone.utc)
+
+def test_dispatch_due_reminders():
+    """Проверяет индексацию старых напоминаний, рассылку по местному времени и перенос опоздавших."""
+    sent = []
+
+    async def fake_send(bot, user_id, text=None):
+        sent.append(user_id)
+
+    async def scenario():
+        # Напоминание, сохраненное до появления индекса, индексируется при запуске
+        await db_utils.save_reminder(1, "20:00", ["mon", "tue"])
+        await reminder_handler.save_reminder_settings(2, "20:00", ["tue", "mon"])
+        await reminder_handler.update_user_timezone(3, "Новосибирск")
+        await reminder_handler.save_reminder_settings(3, "20:00", ["mon"])
+        await reminder_handler.save_reminder_settings(4, "20:00", ["mon"], active=False)
+
+        assert await reminder_handler.restore_reminders(None) == 1
+        assert reminder_handler.scheduler.get_job(reminder_handler.DISPATCHER_JOB_ID)
+        reminder = await db_utils.get_reminder(3)
+        assert reminder["timezone"] == "Asia/Novosibirsk"
+
+        # Понедельник 12 октября 2026: 20:00 в Новосибирске - 13:00 UTC, в Москве - 17:00 UTC
+        novosibirsk = datetime(2026, 10, 12, 13, 0, tzinfo=timezone.utc)
+        moscow = datetime(2026, 10, 12, 17, 0, tzinfo=timezone.utc)
+        for user_id in (1, 2, 3):
+            await db_utils.set_reminder_next_fire([
+                (reminder_handler.compute_next_fire("20:00", ["mon"], (await db_utils.get_reminder(user_id))["timezone"],
+                                                    datetime(2026, 10, 12, tzinfo=timezone.utc)), user_id)
+            ])
+
+        # Проход только передает напоминания в очередь исходящих, доставка идет в фоне
+        assert await reminder_handler.dispatch_due_reminders(None, novosibirsk) == 1
+        assert await reminder_handler.close_reminder_sends() == 0
+        assert sent == [3]
+        assert await reminder_handler.dispatch_due_reminders(None, moscow) == 2
+        assert await reminder_handler.close_reminder_sends() == 0
+        assert sorted(sent[1:]) == [1, 2]
+
+        # Повторный проход ничего не отправляет, следующее срабатывание - во вторник
+        assert await reminder_handler.dispatch_due_reminders(None, moscow) == 0
+        reminder = await db_utils.get_reminder(1)
+        assert reminder["next_fire_at"] == int(datetime(2026, 10, 13, 17, 0, tzinfo=timezone.utc).timestamp())
+
+        # Напоминание, наступившее во время долгого прохода, опоздание считается от его начала
+        await db_utils.set_reminder_next_fire([(int(moscow.timestamp()) + 60, 3)])
+        assert await reminder_handler.dispatch_due_reminders(None, datetime(2026, 10, 12, 17, 10, tzinfo=timezone.utc)) == 1
+        await reminder_handler.close_reminder_sends()
+        assert sent[-1] == 3
+
+        # Напоминание, пропущенное надолго (бот был выключен), только переносится
+        reminder_handler._last_dispatch_at = None
+        later = datetime(2026, 10, 13, 19, 0, tzinfo=timezone.utc)
+        assert await reminder_handler.dispatch_due_reminders(None, later) == 0
+        reminder = await db_utils.get_reminder(1)
+        assert reminder["next_fire_at"] == int(datetime(2026, 10, 19, 17, 0, tzinfo=timezone.utc).timestamp())
+
+    original_send = reminder_handler.send_reminder
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._reminders_ready = False
+        reminder_handler.send_reminder = fake_send
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._reminders_ready = False
+            reminder_handler.send_reminder = original_send
+            reminder_handler._last_dispatch_at = None
+            reminder_handler.scheduler.remove_all_jobs()
@@ -0,0 +1,78 @@
+"""
+Тест спула временных файлов: квота, удаление после выхода из блока и уборка забытых файлов.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import pytest
+
+from services.spool import SpoolManager, SpoolQuotaExceeded
+
+def test_spool_quota_and_janitor():
+    """Проверяет отказ по квоте, освобождение файлов и удаление файлов без владельца."""
+    async def scenario(tmp_dir):
+        spool = SpoolManager(spool_dir=tmp_dir, max_bytes=1000, max_file_age=60, legacy_dir=None)
+
+        # Файл удаляется после выхода из блока, в том числе при ошибке
+        with pytest.raises(RuntimeError):
+            async with spool.spool_file("stt", ".ogg", 600) as path:
+                with open(path, "wb") as f:
+                    f.write(b"x" * 600)
+                # Второй файл не помещается в квоту
+                with pytest.raises(SpoolQuotaExceeded):
+                    spool.allocate("stt", ".ogg", 600)
+                raise RuntimeError("ошибка распознавания")
+        assert not os.path.exists(path)
+        assert spool.allocate("tts", ".mp3", 600)
+
+        # Файл, оставшийся после перезапуска, удаляется уборщиком
+        orphan = os.path.join(tmp_dir, "stt_orphan.ogg")
+        with open(orphan, "wb") as f:
+            f.write(b"x")
+        report = await spool.cleanup()
+        assert report["removed"] == 1
+        assert report["rejected"] == 1
+        assert not os.path.exists(orphan)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(scenario(tmp_dir))
+
+def test_spool_writes_and_watched_dirs():
+    """Проверяет запись постоянных файлов через спул, уборку старой озвучки и наблюдаемых директорий."""
+    async def scenario(tmp_dir):
+        legacy_dir = os.path.join(tmp_dir, "tmp")
+        cache_dir = os.path.join(legacy_dir, "tts_cache")
+        spool = SpoolManager(spool_dir=os.path.join(legacy_dir, "spool"), max_bytes=1000, max_file_age=60, legacy_dir=legacy_dir)
+
+        # Файл переносится на место, резерв квоты освобождается
+        path = await spool.write_file("tts_cache", os.path.join(cache_dir, "key.mp3"), b"x" * 600)
+        with open(path, "rb") as f:
+            assert f.read() == b"x" * 600
+        assert (await spool.cleanup())["reserved"] == 0
+        with pytest.raises(SpoolQuotaExceeded):
+            await spool.write_file("library", os.path.join(tmp_dir, "big.mp3"), b"x" * 2000)
+        assert not os.path.exists(os.path.join(tmp_dir, "big.mp3"))
+
+        # Старая озвучка удаляется по возрасту, свежая и другие файлы остаются
+        old_audio, new_audio, other = (os.path.join(legacy_dir, name) for name in ("1_old.mp3", "1_new.mp3", "notes.txt"))
+        for name in (old_audio, new_audio, other):
+            with open(name, "wb") as f:
+                f.write(b"x")
+        os.utime(old_audio, (time.time() - 120, time.time() - 120))
+
+        cleaned = []
+        async def cleaner():
+            cleaned.append(True)
+            return 2
+        spool.watch("tts_cache", cache_dir, cleaner)
+
+        report = await spool.cleanup()
+        assert report["legacy_removed"] == 1
+        assert not os.path.exists(old_audio) and os.path.exists(new_audio) and os.path.exists(other)
+        assert cleaned and report["watched"]["tts_cache"] == {"files": 1, "size": 600, "removed": 2}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        asyncio.run(scenario(tmp_dir))
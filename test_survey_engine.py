@@ -0,0 +1,39 @@
+"""
+Тест скомпилированного опросника: поиск вопросов, клавиатуры и распознавание ответов.
+"""
+
+from survey_engine import get_survey_engine, CANCEL_SURVEY_BUTTON
+
+def test_survey_engine():
+    """Проверяет индекс вопросов, готовые клавиатуры и разбор вариантов ответа."""
+    engine = get_survey_engine()
+    
+    # Опросник компилируется один раз
+    assert get_survey_engine() is engine
+    
+    # Поиск вопроса по ID
+    first_question = engine.vasini_questions[0]
+    assert engine.get_question(first_question["id"]) is first_question
+    assert engine.get_question("unknown") == {}
+    
+    # Клавиатура содержит варианты ответа и кнопку отмены
+    keyboard = engine.choice_keyboard(0)
+    button_texts = [row[0].text for row in keyboard.keyboard]
+    assert button_texts[-1] == CANCEL_SURVEY_BUTTON
+    assert len(button_texts) == len(first_question["options"]) + 1
+    
+    # Нажатие каждой кнопки распознается как соответствующая буква
+    for option, text in first_question["options"].items():
+        assert engine.parse_option(0, f"{option}: {text}") == option
+    
+    # Ответы, введенные вручную
+    assert engine.parse_option(0, "b") == "B"
+    assert engine.parse_option(0, "C какой-то текст") == "C"
+    assert engine.parse_option(0, "выбираю D вариант") == "D"
+    assert engine.parse_option(0, "не знаю") is None
+    assert engine.parse_option(0, None) is None
+    
+    print("✅ Скомпилированный опросник работает корректно.")
+
+if __name__ == "__main__":
+    test_survey_engine()
@@ -0,0 +1,77 @@
+"""
+Тест пошагового сохранения опроса: ответы пишутся по одному и восстанавливаются после перезапуска.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import db_utils
+from survey_progress import SurveyProgressStore
+
+def test_survey_progress():
+    """Проверяет запись ответов, восстановление позиции и удаление прогресса."""
+    async def scenario():
+        store = SurveyProgressStore()
+        session = store.start(42)
+        
+        session.question_index = 1
+        store.record_answer(42, session, "name", "Анна")
+        session.question_index = 2
+        store.record_answer(42, session, "age", "30")
+        
+        # Новое хранилище (как после перезапуска) читает прогресс из базы
+        restored = await SurveyProgressStore().load(42)
+        assert restored is not None
+        assert restored.question_index == 2
+        assert restored.is_demo_questions
+        assert restored.answers == {"name": "Анна", "age": "30"}
+        
+        # После завершения позиция удаляется, а ответы остаются
+        store.finish(42)
+        assert await SurveyProgressStore().load(42) is None
+        assert await db_utils.get_survey_answers(42) == {"name": "Анна", "age": "30"}
+        
+        # Новый опрос удаляет старые ответы
+        store.start(42)
+        assert await db_utils.get_survey_answers(42) == {}
+        
+        await db_utils.db_writer.close()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._survey_tables_ready = False
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._survey_tables_ready = False
+
+def test_batch_failure_keeps_other_writes():
+    """Проверяет, что ошибка одной операции в пачке не отменяет запись остальных."""
+    async def scenario():
+        writer = db_utils.BatchedWriter(flush_interval=0.05)
+        sql = "INSERT INTO survey_answers (user_id, question_id, answer) VALUES (?, ?, ?)"
+        writer.submit(sql, (1, "name", "Анна"))
+        writer.submit("INSERT INTO missing_table (user_id) VALUES (?)", (2,))
+        writer.submit(sql, (3, "name", "Борис"))
+        await writer.close()
+        
+        assert await db_utils.get_survey_answers(1) == {"name": "Анна"}
+        assert await db_utils.get_survey_answers(3) == {"name": "Борис"}
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._survey_tables_ready = False
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._survey_tables_ready = False
+
+if __name__ == "__main__":
+    test_survey_progress()
+    test_batch_failure_keeps_other_writes()
+    print("Тест пошагового сохранения опроса пройден")
@@ -0,0 +1,60 @@
+"""
+Тест кэша распознанных голосовых сообщений: повторное сообщение не скачивается, статистика и очистка.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import db_utils
+import services.stt as stt
+from services.stt_cache import TranscriptCache
+
+class FakeVoice:
+    file_id = "file-1"
+    file_unique_id = "unique-1"
+    file_size = 1000
+    duration = 3
+
+class FakeBot:
+    def __init__(self):
+        self.downloads = 0
+
+    async def download(self, voice, destination):
+        self.downloads += 1
+        destination.write(b"OggS")
+        destination.seek(0)
+
+def test_transcript_cache():
+    """Проверяет, что пересланное сообщение распознается один раз, а очистка удаляет лишние записи."""
+    async def fake_transcribe(audio):
+        return "привет"
+
+    async def scenario():
+        bot = FakeBot()
+        assert await stt.process_voice_message(bot, FakeVoice()) == "привет"
+        assert await stt.process_voice_message(bot, FakeVoice()) == "привет"
+        assert bot.downloads == 1
+
+        stats = stt.get_transcript_cache().get_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        entry = await db_utils.get_voice_transcript("unique-1")
+        assert entry["language"] == "ru" and entry["duration"] == 3
+
+        await db_utils.save_voice_transcript("unique-2", "второе")
+        assert await db_utils.evict_voice_transcripts(30, 1) == 1
+
+    original_transcribe = stt.transcribe_voice
+    original_cache = stt.get_transcript_cache
+    cache = TranscriptCache()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        stt.transcribe_voice = fake_transcribe
+        stt.get_transcript_cache = lambda: cache
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            stt.transcribe_voice = original_transcribe
+            stt.get_transcript_cache = original_cache
@@ -0,0 +1,46 @@
+"""
+Тест разбиения длинного текста медитации на части для озвучки и склейки mp3.
+"""
+
+import asyncio
+
+from services.tts import split_text_for_speech, concatenate_mp3, iter_speech_segments
+
+def test_tts_chunking():
+    """Проверяет, что текст режется по предложениям и паузам без потерь, а части склеиваются по порядку."""
+    text = "Сделайте вдох... И медленный выдох. " * 40 + "\n\nПочувствуйте тепло в ладонях..." * 10
+    chunks = split_text_for_speech(text, max_chars=300)
+    
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    # Части заканчиваются на границе предложения или паузы
+    assert all(chunk.endswith((".", "...")) for chunk in chunks)
+    # Текст не теряется и не обрезается
+    assert " ".join(chunks).split() == text.split()
+    
+    # Короткий текст отправляется одним запросом без изменений
+    assert split_text_for_speech("Просто дышите.\nСпокойно.") == ["Просто дышите.\nСпокойно."]
+    
+    # Слово длиннее части режется, а не теряется
+    assert split_text_for_speech("а" * 25, max_chars=10) == ["а" * 10, "а" * 10, "а" * 5]
+    
+    # Заголовок ID3 остается только у первой части
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x02ab"
+    frames = b"\xff\xfb\x90\x00" + b"\x00" * 20
+    assert concatenate_mp3([id3 + frames, id3 + frames]) == id3 + frames + frames
+
+def test_speech_segments_from_stream():
+    """Проверяет, что потоковый текст собирается в части по абзацам, а первая часть выдается раньше остальных."""
+    text = "".join(f"Абзац {i}... Дыши спокойно.\n\n" for i in range(20))
+    
+    async def deltas():
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+    
+    async def collect():
+        return [segment async for segment in iter_speech_segments(deltas(), first_min_chars=20, min_chars=100)]
+    
+    segments = asyncio.run(collect())
+    assert segments[0] == "Абзац 0... Дыши спокойно."
+    assert all(len(segment) >= 100 for segment in segments[1:-1])
+    assert "\n\n".join(segments) == text.strip()
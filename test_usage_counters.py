@@ -0,0 +1,55 @@
+"""
+Тест счетчиков использования: атомарный лимит, окна периодов, сброс и перенос счетчиков из FSM.
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+
+import db_utils
+
+def test_usage_counters():
+    """Проверяет, что одновременные запросы не превышают лимит, а сброс работает для группы пользователей."""
+    async def scenario():
+        # Счетчик из данных FSM переносится при создании таблицы
+        await db_utils.save_user_state(3, "", {"user_meditation_count": 2})
+        assert await db_utils.get_usage_count(3, "meditation") == 2
+        
+        # Из десяти одновременных запросов проходят только четыре
+        results = await asyncio.gather(*(db_utils.try_increment_usage(1, "meditation", 4) for _ in range(10)))
+        assert results.count(True) == 4
+        assert await db_utils.get_usage_count(1, "meditation") == 4
+        
+        # Дневное окно считается отдельно от счетчика за все время
+        assert await db_utils.try_increment_usage(1, "meditation", 4, window="day")
+        assert await db_utils.get_usage_count(1, "meditation", window="day") == 1
+        assert db_utils.usage_period("week", datetime(2026, 1, 1)) == "2026-W01"
+        
+        await db_utils.try_increment_usage(2, "meditation", 4)
+        assert await db_utils.reset_usage("meditation", [1, 2]) == 3
+        assert await db_utils.get_usage_count(1, "meditation") == 0
+        assert await db_utils.get_usage_count(3, "meditation") == 2
+        assert await db_utils.reset_usage("meditation") == 1
+        
+        # При ошибке базы использование не разрешается
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.dirname(original_path)
+        try:
+            assert await db_utils.try_increment_usage(1, "meditation", 4) is None
+        finally:
+            db_utils.DB_PATH = original_path
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        original_path = db_utils.DB_PATH
+        db_utils.DB_PATH = os.path.join(tmp_dir, "test.db")
+        db_utils._usage_counters_ready = False
+        try:
+            asyncio.run(scenario())
+        finally:
+            db_utils.DB_PATH = original_path
+            db_utils._usage_counters_ready = False
+
+if __name__ == "__main__":
+    test_usage_counters()
+    print("Тест счетчиков использования пройден")
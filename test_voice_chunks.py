@@ -0,0 +1,62 @@
+"""
+Тест разрезания длинных голосовых сообщений: разрез по тихим местам и параллельное распознавание по порядку.
+"""
+
+import asyncio
+
+import services.stt as stt
+from services.voice_chunks import OggPage, parse_ogg_pages, split_ogg_opus, ogg_crc, OPUS_SAMPLE_RATE
+
+def make_voice(seconds: int, quiet_seconds: set) -> bytes:
+    """Собирает поток Ogg Opus со страницами по одной секунде; тихие секунды кодируются короткими пакетами."""
+    pages = [
+        OggPage(0x02, 0, 7, 0, bytes([19]), b"OpusHead" + bytes(11)),
+        OggPage(0, 0, 7, 1, bytes([16]), b"OpusTags" + bytes(8))
+    ]
+    for second in range(seconds):
+        size = 10 if second in quiet_seconds else 200
+        pages.append(OggPage(0, (second + 1) * OPUS_SAMPLE_RATE, 7, second + 2, bytes([size]), bytes([second % 256]) * size))
+    return b"".join(page.to_bytes() for page in pages)
+
+def test_split_on_silence():
+    """Проверяет, что разрез приходится на тихую секунду, а фрагменты - корректные потоки Ogg."""
+    data = make_voice(100, {26, 60})
+    chunks = split_ogg_opus(data, 30)
+    assert len(chunks) == 3
+
+    for chunk in chunks:
+        pages = parse_ogg_pages(chunk)
+        assert pages[0].header_type & 0x02 and pages[-1].header_type & 0x04
+        assert [page.sequence for page in pages] == list(range(len(pages)))
+        for page in pages:
+            raw = page.to_bytes()
+            assert ogg_crc(raw[:22] + bytes(4) + raw[26:]) == int.from_bytes(raw[22:26], "little")
+
+    # Первый фрагмент заканчивается на тихой секунде, позиции следующего отсчитываются заново
+    first, second = parse_ogg_pages(chunks[0]), parse_ogg_pages(chunks[1])
+    assert first[-1].granule == 27 * OPUS_SAMPLE_RATE
+    assert second[2].granule == OPUS_SAMPLE_RATE
+    assert second[-1].granule == (61 - 27) * OPUS_SAMPLE_RATE
+
+def test_transcribe_chunked_order():
+    """Проверяет, что фрагменты распознаются параллельно, а текст склеивается и показывается по порядку."""
+    async def fake_transcribe(audio):
+        # Номер фрагмента определяем по первой секунде, записанной в данные страницы
+        index = {0: 0, 27: 1, 61: 2}[parse_ogg_pages(audio.read())[2].body[0]]
+        await asyncio.sleep((0.02, 0.01, 0.03)[index])
+        return f"часть{index}"
+
+    progress = []
+
+    async def on_progress(text):
+        progress.append(text)
+
+    original = stt.transcribe_voice
+    stt.transcribe_voice = fake_transcribe
+    try:
+        text = asyncio.run(stt.transcribe_chunked(make_voice(100, {26, 60}), on_progress))
+    finally:
+        stt.transcribe_voice = original
+
+    assert text == "часть0 часть1 часть2"
+    assert progress == ["часть0 часть1"]
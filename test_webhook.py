@@ -0,0 +1,64 @@
+"""
+Тест режима вебхука: проверка секрета, быстрый ответ 200 и ограниченная очередь обновлений.
+"""
+
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+from services.webhook import build_webhook_app, WEBHOOK_PATH
+
+def make_update(update_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Тест"},
+            "text": text
+        }
+    }
+
+def test_webhook_accepts_and_queues_updates():
+    """Проверяет отказ без секрета, обработку принятого обновления и ответ 503 при заполненной очереди."""
+    async def scenario():
+        handled = []
+        release = asyncio.Event()
+        dp = Dispatcher()
+
+        @dp.message()
+        async def on_message(message: Message):
+            await release.wait()
+            handled.append(message.text)
+
+        bot = Bot(token="123456:TEST")
+        app = build_webhook_app(dp, bot, secret_token="secret", queue_size=1, workers=1)
+        headers = {"X-Telegram-Bot-Api-Secret-Token": "secret"}
+
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post(WEBHOOK_PATH, json=make_update(1, "чужой"))
+            assert response.status == 401
+
+            # Ответ приходит сразу, хотя обработчик еще ждет
+            response = await client.post(WEBHOOK_PATH, json=make_update(2, "первое"), headers=headers)
+            assert response.status == 200
+            await asyncio.sleep(0.05)
+            response = await client.post(WEBHOOK_PATH, json=make_update(3, "второе"), headers=headers)
+            assert response.status == 200
+            # Первое обновление обрабатывается, второе ждет в очереди, третьему места нет
+            response = await client.post(WEBHOOK_PATH, json=make_update(4, "третье"), headers=headers)
+            assert response.status == 503
+
+            release.set()
+            await asyncio.sleep(0.05)
+            assert handled == ["первое", "второе"]
+
+            response = await client.get("/healthz")
+            stats = await response.json()
+            assert (stats["accepted"], stats["rejected"], stats["processed"]) == (2, 1, 2)
+        await bot.session.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,244 @@
+import os
+import re
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+# Часовой пояс для пользователей, которые не указали свой или указали его непонятно
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow")
+
+# Коды дней недели в порядке datetime.weekday()
+DAY_CODES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Города и обозначения часовых поясов, которые пишут в ответе на вопрос опроса.
+# Ключи - начала слов в нижнем регистре, чтобы совпадали падежи ("для Москвы")
+TIMEZONE_ALIASES = [
+    ("калининград", "Europe/Kaliningrad"),
+    ("москв", "Europe/Moscow"),
+    ("мск", "Europe/Moscow"),
+    ("msk", "Europe/Moscow"),
+    ("петербург", "Europe/Moscow"),
+    ("питер", "Europe/Moscow"),
+    ("спб", "Europe/Moscow"),
+    ("казан", "Europe/Moscow"),
+    ("нижн", "Europe/Moscow"),
+    ("ростов", "Europe/Moscow"),
+    ("краснодар", "Europe/Moscow"),
+    ("сочи", "Europe/Moscow"),
+    ("волгоград", "Europe/Volgograd"),
+    ("самар", "Europe/Samara"),
+    ("ижевск", "Europe/Samara"),
+    ("саратов", "Europe/Saratov"),
+    ("ульяновск", "Europe/Ulyanovsk"),
+    ("екатеринбург", "Asia/Yekaterinburg"),
+    ("челябинск", "Asia/Yekaterinburg"),
+    ("пермь", "Asia/Yekaterinburg"),
+    ("перми", "Asia/Yekaterinburg"),
+    ("уфа", "Asia/Yekaterinburg"),
+    ("уфы", "Asia/Yekaterinburg"),
+    ("тюмен", "Asia/Yekaterinburg"),
+    ("омск", "Asia/Omsk"),
+    ("новосибирск", "Asia/Novosibirsk"),
+    ("барнаул", "Asia/Barnaul"),
+    ("томск", "Asia/Tomsk"),
+    ("кемерово", "Asia/Novokuznetsk"),
+    ("новокузнецк", "Asia/Novokuznetsk"),
+    ("красноярск", "Asia/Krasnoyarsk"),
+    ("иркутск", "Asia/Irkutsk"),
+    ("улан-удэ", "Asia/Irkutsk"),
+    ("чита", "Asia/Chita"),
+    ("читы", "Asia/Chita"),
+    ("якутск", "Asia/Yakutsk"),
+    ("хабаровск", "Asia/Vladivostok"),
+    ("владивосток", "Asia/Vladivostok"),
+    ("сахалин", "Asia/Sakhalin"),
+    ("магадан", "Asia/Magadan"),
+    ("камчат", "Asia/Kamchatka"),
+    ("киев", "Europe/Kyiv"),
+    ("київ", "Europe/Kyiv"),
+    ("харьков", "Europe/Kyiv"),
+    ("одесс", "Europe/Kyiv"),
+    ("минск", "Europe/Minsk"),
+    ("кишин", "Europe/Chisinau"),
+    ("рига", "Europe/Riga"),
+    ("риге", "Europe/Riga"),
+    ("вильнюс", "Europe/Vilnius"),
+    ("таллин", "Europe/Tallinn"),
+    ("тбилиси", "Asia/Tbilisi"),
+    ("ереван", "Asia/Yerevan"),
+    ("баку", "Asia/Baku"),
+    ("астан", "Asia/Almaty"),
+    ("алмат", "Asia/Almaty"),
+    ("ташкент", "Asia/Tashkent"),
+    ("бишкек", "Asia/Bishkek"),
+    ("душанбе", "Asia/Dushanbe"),
+    ("стамбул", "Europe/Istanbul"),
+    ("турци", "Europe/Istanbul"),
+    ("дубай", "Asia/Dubai"),
+    ("оаэ", "Asia/Dubai"),
+    ("израил", "Asia/Jerusalem"),
+    ("тель-авив", "Asia/Jerusalem"),
+    ("берлин", "Europe/Berlin"),
+    ("германи", "Europe/Berlin"),
+    ("прага", "Europe/Prague"),
+    ("праге", "Europe/Prague"),
+    ("варшав", "Europe/Warsaw"),
+    ("париж", "Europe/Paris"),
+    ("франци", "Europe/Paris"),
+    ("испани", "Europe/Madrid"),
+    ("барселон", "Europe/Madrid"),
+    ("мадрид", "Europe/Madrid"),
+    ("итали", "Europe/Rome"),
+    ("рим", "Europe/Rome"),
+    ("лондон", "Europe/London"),
+    ("англи", "Europe/London"),
+    ("нью-йорк", "America/New_York"),
+    ("лос-анджелес", "America/Los_Angeles"),
+    ("бали", "Asia/Makassar"),
+    ("таиланд", "Asia/Bangkok"),
+    ("пхукет", "Asia/Bangkok"),
+    ("бангкок", "Asia/Bangkok"),
+]
+
+# Смещения, которые не делятся на час: для них нет зоны Etc/GMT, берем типичную зону
+FRACTIONAL_OFFSETS = {
+    -210: "America/St_Johns",
+    210: "Asia/Tehran",
+    270: "Asia/Kabul",
+    330: "Asia/Kolkata",
+    345: "Asia/Kathmandu",
+    390: "Asia/Yangon",
+    570: "Australia/Darwin",
+}
+
+# Смещение вида UTC+3, GMT-5, +03:00, мск+2
+_OFFSET_PATTERN = re.compile(
+    r"(utc|gmt|мск|msk)?\s*([+\-−–])\s*(\d{1,2})(?:[:.](\d{2}))?",
+    re.IGNORECASE
+)
+
+# Московское время - UTC+3, смещения "мск+N" отсчитываются от него
+MSK_OFFSET_MINUTES = 180
+
+def is_valid_timezone(tz_id: Optional[str]) -> bool:
+    """Проверяет, что часовой пояс известен базе часовых поясов."""
+    if not tz_id:
+        return False
+    try:
+        ZoneInfo(tz_id)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def _zone(tz_id: Optional[str]) -> ZoneInfo:
+    return ZoneInfo(tz_id if is_valid_timezone(tz_id) else DEFAULT_TIMEZONE)
+
+def _offset_timezone(minutes: int) -> Optional[str]:
+    if minutes % 60 == 0 and -12 * 60 <= minutes <= 14 * 60:
+        hours = minutes // 60
+        # В зонах Etc/GMT знак обратный: Etc/GMT-3 - это UTC+3
+        return "UTC" if hours == 0 else f"Etc/GMT{-hours:+d}"
+    return FRACTIONAL_OFFSETS.get(minutes)
+
+def parse_timezone(text: Optional[str]) -> Optional[str]:
+    """
+    Переводит ответ пользователя о часовом поясе в идентификатор базы часовых поясов.
+
+    Сначала ищется название зоны (Europe/Moscow) или известный город, у которого
+    учитывается переход на летнее время, затем смещение (UTC+3, GMT-5, +05:30,
+    МСК+2). Например, "UTC+3 для Москвы" дает Europe/Moscow.
+
+    Args:
+        text: Ответ пользователя
+
+    Returns:
+        Optional[str]: Идентификатор часового пояса или None, если ответ не распознан
+    """
+    if not text:
+        return None
+    text = text.strip()
+
+    # Название зоны, например Europe/Moscow
+    for token in re.findall(r"[A-Za-z_]+/[A-Za-z_\-/]+", text):
+        if is_valid_timezone(token):
+            return token
+
+    lowered = text.lower().replace("ё", "е")
+    words = re.findall(r"[a-zа-я][a-zа-я\-]*", lowered)
+    for alias, tz_id in TIMEZONE_ALIASES:
+        if any(word.startswith(alias) for word in words):
+            # "МСК+2" - это не Москва, а смещение от московского времени
+            match = _OFFSET_PATTERN.search(lowered)
+            if alias in ("мск", "msk") and match and (match.group(1) or "").lower() in ("мск", "msk"):
+                break
+            return tz_id
+
+    match = _OFFSET_PATTERN.search(lowered)
+    if match:
+        sign = -1 if match.group(2) in "-−–" else 1
+        minutes = sign * (int(match.group(3)) * 60 + int(match.group(4) or 0))
+        if match.group(1) and match.group(1).lower() in ("мск", "msk"):
+            minutes += MSK_OFFSET_MINUTES
+        return _offset_timezone(minutes)
+
+    # Просто "UTC" или "GMT" без смещения
+    if re.search(r"\b(utc|gmt)\b", lowered):
+        return "UTC"
+    return None
+
+def next_fire_time(time: str, days: List[str], tz_id: Optional[str], after: datetime) -> Optional[datetime]:
+    """
+    Вычисляет ближайший момент срабатывания напоминания в UTC.
+
+    Время напоминания - местное время пользователя. При переходе на летнее
+    время несуществующее местное время (например, 02:30 в ночь перевода
+    часов) сдвигается вперед на величину перевода, а при повторяющемся
+    часе напоминание срабатывает в первый раз.
+
+    Args:
+        time: Местное время в формате HH:MM
+        days: Дни недели (mon, tue, ...)
+        tz_id: Часовой пояс пользователя (None - DEFAULT_TIMEZONE)
+        after: Момент, после которого ищется срабатывание (aware datetime)
+
+    Returns:
+        Optional[datetime]: Момент срабатывания в UTC или None, если дни не выбраны
+
+    Raises:
+        ValueError: Если время задано некорректно
+    """
+    hour, minute = map(int, time.split(":"))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Некорректное время напоминания: {time}")
+    weekdays = {DAY_CODES.index(day) for day in days}
+    if not weekdays:
+        return None
+
+    tz = _zone(tz_id)
+    local_date = after.astimezone(tz).date()
+    # Проверяем восемь дней: сегодняшнее время могло уже пройти
+    for shift in range(8):
+        day = local_date + timedelta(days=shift)
+        if day.weekday() not in weekdays:
+            continue
+        fire_at = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz).astimezone(timezone.utc)
+        if fire_at > after:
+            return fire_at
+    return None
+
+def local_date(timestamp: int, tz_id: Optional[str]) -> date:
+    """
+    Возвращает дату момента по местному времени пользователя.
+
+    Args:
+        timestamp: Момент в секундах UTC
+        tz_id: Часовой пояс пользователя (None - DEFAULT_TIMEZONE)
+
+    Returns:
+        date: Местная дата
+    """
+    return datetime.fromtimestamp(timestamp, _zone(tz_id)).date()
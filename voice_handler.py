@@ -1,16 +1,20 @@
 import logging
 import os
-import tempfile
 from typing import Optional, Dict, Any
 from aiogram import Router, F
+from aiogram.filters import Command
 from aiogram.types import Message, Voice, FSInputFile
 from aiogram.fsm.context import FSMContext
 
-from services.stt import transcribe_voice
+from services.stt import process_voice_message, VoiceTooLarge, STT_MAX_FILE_MB
+from services.stt_cache import get_transcript_cache
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
+# Сколько последних символов промежуточного текста показывать в сообщении о распознавании
+PROGRESS_TEXT_LIMIT = 3500
+
 # Создаем роутер для обработки голосовых сообщений
 voice_router = Router()
 
@@ -35,24 +39,29 @@ async def handle_voice_message(message: Message, state: FSMContext):
     process_message = await message.answer("🎙 Обрабатываю ваше голосовое сообщение...")
     
     try:
-        # Получаем файл голосового сообщения
         voice: Voice = message.voice
-        voice_file = await message.bot.get_file(voice.file_id)
-        
-        # Сохраняем файл во временный каталог
-        with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as temp_file:
-            file_path = temp_file.name
-        
-        await message.bot.download_file(voice_file.file_path, file_path)
         
         # Показываем индикатор "печатает..." пока обрабатываем аудио
         await message.bot.send_chat_action(chat_id=message.chat.id, action="typing")
         
-        # Транскрибируем голосовое сообщение в текст
-        text = await transcribe_voice(file_path)
+        async def show_progress(partial_text: str):
+            # Длинное сообщение распознается по фрагментам: показываем готовое начало текста
+            try:
+                await process_message.edit_text(
+                    f"🎙 Распознаю голосовое сообщение...\n\n{partial_text[-PROGRESS_TEXT_LIMIT:]}"
+                )
+            except Exception as e:
+                logger.warning(f"Не удалось обновить сообщение о распознавании: {e}")
         
-        # Удаляем временный файл
-        os.unlink(file_path)
+        # Скачиваем голосовое сообщение в память и транскрибируем его в текст
+        try:
+            text = await process_voice_message(message.bot, voice, on_progress=show_progress)
+        except VoiceTooLarge as e:
+            logger.warning(f"Голосовое сообщение пользователя {message.from_user.id} отклонено: {e}")
+            await process_message.edit_text(
+                f"❌ Голосовое сообщение слишком большое (больше {STT_MAX_FILE_MB} МБ). Пожалуйста, запишите сообщение покороче или отправьте текст."
+            )
+            return
         
         # Если текст не распознан, сообщаем об ошибке
         if not text:
@@ -156,4 +165,34 @@ async def handle_voice_message(message: Message, state: FSMContext):
         # Обновляем сообщение о процессе обработки
         await process_message.edit_text(
             "❌ Произошла ошибка при обработке голосового сообщения. Пожалуйста, попробуйте еще раз или отправьте текстовое сообщение."
-        ) 
\ No newline at end of file
+        ) 
+
+@voice_router.message(Command("voice_cache"))
+async def cmd_voice_cache(message: Message):
+    """
+    Обработчик команды /voice_cache для просмотра статистики кэша распознанных голосовых сообщений.
+    Доступно только администраторам.
+    """
+    # Проверяем, является ли пользователь администратором
+    admin_ids = [
+        123456789,  # Заменить на реальный ID администратора
+    ]
+    
+    # Если пользователь не администратор, отправляем сообщение об ошибке
+    if message.from_user.id not in admin_ids:
+        await message.answer(
+            "⛔ У вас нет прав для выполнения этой команды."
+        )
+        logger.warning(f"Пользователь {message.from_user.id} попытался просмотреть кэш распознавания без прав")
+        return
+    
+    stats = get_transcript_cache().get_stats()
+    await message.answer(
+        "🎙 <b>Кэш распознанных голосовых сообщений</b>\n"
+        f"Попаданий: {stats['hits']}\n"
+        f"Промахов: {stats['misses']}\n"
+        f"Доля попаданий: {stats['hit_rate']:.0%}\n"
+        f"Удалено устаревших записей: {stats['evicted']}",
+        parse_mode="HTML"
+    )
+    logger.info(f"Администратор {message.from_user.id} запросил статистику кэша распознавания")